@@ -0,0 +1,107 @@
+"""Извлечь данные для микробенчмарков из кассеты нагрузочного теста.
+
+Кассета (loadtests/cassette.py) хранит реальные обмены с MCP и GigaChat.
+Отсюда берутся входы горячих функций:
+
+- searches — ответы ``vkusvill_products_search`` и запросы модели;
+- carts — аргументы и ответы ``vkusvill_cart_link_create`` с search_log
+  из поисков, нашедших товары корзины;
+- histories — самые длинные истории диалога из запросов к GigaChat;
+- answers — самые длинные текстовые ответы модели.
+
+Использование:
+    # запись кассеты против живых API (или --stubs)
+    uv run python loadtests/service_load_test.py --users 30 --messages 4 --burst \\
+        --seed 7 --cassette /tmp/live.json --record
+    uv run python benchmarks/capture_payloads.py /tmp/live.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+PAYLOADS_VERSION = 1
+DEFAULT_OUTPUT = Path(__file__).parent / "payloads.json"
+
+MAX_SEARCHES = 30
+MAX_CARTS = 15
+MAX_HISTORIES = 4
+MAX_ANSWERS = 20
+
+
+def _xml_ids(result: str) -> set[int]:
+    try:
+        items = json.loads(result)["data"]["items"]
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return set()
+    return {item["xml_id"] for item in items if isinstance(item, dict) and "xml_id" in item}
+
+
+def capture(cassette: dict) -> dict:
+    """Данные бенчмарков из кассеты (формат CASSETTE_VERSION 1)."""
+    searches: list[dict] = []
+    carts: list[dict] = []
+    seen_queries: set[str] = set()
+    for entry in cassette.get("mcp", []):
+        request = entry.get("request", {})
+        name = request.get("name")
+        if name == "vkusvill_products_search":
+            query = request.get("arguments", {}).get("q", "")
+            if query not in seen_queries and _xml_ids(entry["result"]):
+                seen_queries.add(query)
+                searches.append({"query": query, "result": entry["result"]})
+        elif name == "vkusvill_cart_link_create":
+            carts.append({"args": request.get("arguments", {}), "result": entry["result"]})
+
+    found = {s["query"]: _xml_ids(s["result"]) for s in searches}
+    for cart in carts:
+        ids = {p.get("xml_id") for p in cart["args"].get("products", [])}
+        cart["search_log"] = {q: sorted(x) for q, x in found.items() if x & ids}
+
+    histories = sorted(
+        (e["request"]["messages"] for e in cassette.get("gigachat", [])),
+        key=len,
+        reverse=True,
+    )
+    answers = sorted(
+        {
+            m.get("content", "")
+            for e in cassette.get("gigachat", [])
+            for m in (c.get("message", {}) for c in e["response"].get("choices", []))
+            if m.get("content") and not m.get("function_call")
+        },
+        key=len,
+        reverse=True,
+    )
+    return {
+        "version": PAYLOADS_VERSION,
+        "meta": {
+            "captured_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "recorded_at": cassette.get("meta", {}).get("recorded_at"),
+        },
+        "searches": searches[:MAX_SEARCHES],
+        "carts": carts[:MAX_CARTS],
+        "histories": histories[:MAX_HISTORIES],
+        "answers": answers[:MAX_ANSWERS],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Данные микробенчмарков из кассеты")
+    parser.add_argument("cassette", type=Path, help="Файл кассеты loadtests/cassette.py")
+    parser.add_argument("-o", "--output", type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    payloads = capture(json.loads(args.cassette.read_text(encoding="utf-8")))
+    args.output.write_text(json.dumps(payloads, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(
+        f"{args.output}: поисков {len(payloads['searches'])}, корзин {len(payloads['carts'])}, "
+        f"историй {len(payloads['histories'])}, ответов {len(payloads['answers'])}"
+    )
+
+
+if __name__ == "__main__":
+    main()
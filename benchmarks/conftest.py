@@ -0,0 +1,68 @@
+"""Фикстуры микробенчмарков: входы из payloads.json (см. capture_payloads.py)."""
+
+import os
+
+# Минимальные env-переменные до импорта модулей приложения (как в tests/conftest.py)
+os.environ.setdefault("BOT_TOKEN", "bench-token-000000000")
+os.environ.setdefault("GIGACHAT_CREDENTIALS", "bench-credentials")
+
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from gigachat.models import Messages
+
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.search_processor import SearchProcessor
+
+PAYLOADS = Path(__file__).parent / "payloads.json"
+
+
+def run_sync(coro: Any) -> Any:
+    """Выполнить корутину, которая не уходит в event loop (in-memory кеш цен).
+
+    Без asyncio.run(): создание цикла на каждый вызов стоит больше
+    измеряемой функции.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise RuntimeError("Корутина ожидает I/O — для микробенчмарка нужен синхронный путь")
+
+
+@pytest.fixture(scope="session")
+def payloads() -> dict:
+    return json.loads(PAYLOADS.read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="session")
+def searches(payloads) -> list[dict]:
+    return payloads["searches"]
+
+
+@pytest.fixture(scope="session")
+def carts(payloads) -> list[dict]:
+    return payloads["carts"]
+
+
+@pytest.fixture(scope="session")
+def answers(payloads) -> list[str]:
+    return payloads["answers"]
+
+
+@pytest.fixture(scope="session")
+def histories(payloads) -> list[list[Messages]]:
+    return [[Messages.model_validate(m) for m in h] for h in payloads["histories"]]
+
+
+@pytest.fixture(scope="session")
+def price_cache(searches) -> PriceCache:
+    """Кеш цен, заполненный товарами из записанных поисков."""
+    cache = PriceCache()
+    processor = SearchProcessor(cache)
+    for search in searches:
+        run_sync(processor.cache_prices(search["result"]))
+    return cache
@@ -0,0 +1,93 @@
+"""Бенчмарки проверок Alice-канала в Redis: Lua-скрипт против пошаговых команд.
+
+Нужен живой Redis (BENCH_REDIS_URL, например redis://localhost:6379/15):
+выигрыш — в round trip, без сети его не измерить. Ключи — с префиксом
+``bench:alice:`` и TTL, после прогона истекают сами.
+"""
+
+import asyncio
+import itertools
+import os
+import uuid
+
+import pytest
+
+from vkuswill_bot.alice_skill.idempotency import RedisIdempotencyStore
+from vkuswill_bot.alice_skill.rate_limit import RedisRateLimiter
+from vkuswill_bot.alice_skill.redis_scripts import load_scripts
+
+REDIS_URL = os.getenv("BENCH_REDIS_URL", "")
+
+pytestmark = [
+    pytest.mark.benchmark(group="alice-redis"),
+    pytest.mark.skipif(not REDIS_URL, reason="BENCH_REDIS_URL не задан"),
+]
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def redis(loop):
+    from redis.asyncio import Redis
+
+    client = Redis.from_url(REDIS_URL)
+    loop.run_until_complete(load_scripts(client))
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.fixture
+def keys():
+    """Новый ключ на каждый раунд — как первый запрос пользователя в окне."""
+    prefix = f"bench:alice:{uuid.uuid4().hex[:8]}:"
+    return (f"{prefix}{i}" for i in itertools.count())
+
+
+def test_idempotency_lua(benchmark, loop, redis, keys) -> None:
+    store = RedisIdempotencyStore(redis)
+
+    def run() -> tuple:
+        return loop.run_until_complete(store.get_done_or_start(next(keys), 30))
+
+    assert benchmark(run) == (None, True)
+
+
+def test_idempotency_get_then_set_nx(benchmark, loop, redis, keys) -> None:
+    # Прежний путь оркестратора: get_done, затем try_start — два round trip
+    store = RedisIdempotencyStore(redis)
+
+    async def begin(key: str) -> bool:
+        await store.get_done(key)
+        return await store.try_start(key, 30)
+
+    assert benchmark(lambda: loop.run_until_complete(begin(next(keys)))) is True
+
+
+def test_rate_limit_lua(benchmark, loop, redis, keys) -> None:
+    limiter = RedisRateLimiter(redis, key_prefix="")
+    key = next(keys)
+    checks = [
+        loop.run_until_complete(limiter.allow(key, limit=2, window_seconds=60)) for _ in range(3)
+    ]
+    assert checks == [True, True, False]
+
+    def run() -> bool:
+        return loop.run_until_complete(limiter.allow(next(keys), limit=12, window_seconds=60))
+
+    assert benchmark(run) is True
+
+
+def test_rate_limit_incr_expire(benchmark, loop, redis, keys) -> None:
+    # Прежний fixed-window: INCR, для первой попытки в окне — EXPIRE
+    async def allow(key: str) -> bool:
+        count = await redis.incr(key)
+        if count == 1:
+            await redis.expire(key, 60)
+        return count <= 12
+
+    assert benchmark(lambda: loop.run_until_complete(allow(next(keys)))) is True
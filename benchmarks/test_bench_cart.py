@@ -0,0 +1,48 @@
+"""Микробенчмарки CartProcessor: подготовка и проверка корзины."""
+
+import copy
+
+import pytest
+from conftest import run_sync
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+
+pytestmark = pytest.mark.benchmark(group="cart")
+
+
+def test_fix_unit_quantities(benchmark, carts, price_cache) -> None:
+    processor = CartProcessor(price_cache)
+    args = [cart["args"] for cart in carts]
+
+    def run() -> list[dict]:
+        return [run_sync(processor.fix_unit_quantities(copy.deepcopy(a))) for a in args]
+
+    fixed = benchmark(run)
+
+    assert len(fixed) == len(args)
+
+
+def test_calc_total(benchmark, carts, price_cache) -> None:
+    processor = CartProcessor(price_cache)
+
+    def run() -> list[str]:
+        return [run_sync(processor.calc_total(c["args"], c["result"])) for c in carts]
+
+    totals = benchmark(run)
+
+    assert all("price_summary" in t for t in totals)
+
+
+def test_verify_cart(benchmark, carts, price_cache) -> None:
+    processor = CartProcessor(price_cache)
+    logs = [{q: set(ids) for q, ids in c["search_log"].items()} for c in carts]
+
+    def run() -> list[dict]:
+        return [
+            run_sync(processor.verify_cart(c["args"], log))
+            for c, log in zip(carts, logs, strict=True)
+        ]
+
+    reports = benchmark(run)
+
+    assert all(r["matched"] for r in reports)
@@ -0,0 +1,35 @@
+"""Микробенчмарки истории диалога: обрезка, санитизация, сериализация для Redis."""
+
+import pytest
+
+from vkuswill_bot.services.dialog_manager import _sanitize_history, trim_message_list
+from vkuswill_bot.services.redis_dialog_manager import _deserialize, _serialize
+
+pytestmark = pytest.mark.benchmark(group="dialog")
+
+
+def test_trim_message_list(benchmark, histories) -> None:
+    # Лимит вдвое меньше истории: старые результаты функций суммаризуются
+    trimmed = benchmark(lambda: [trim_message_list(h, len(h) // 2) for h in histories])
+
+    assert all(len(t) < len(h) for t, h in zip(trimmed, histories, strict=True))
+
+
+def test_sanitize_history(benchmark, histories) -> None:
+    sanitized = benchmark(lambda: [_sanitize_history(h) for h in histories])
+
+    assert all(sanitized)
+
+
+def test_serialize(benchmark, histories) -> None:
+    raw = benchmark(lambda: [_serialize(h) for h in histories])
+
+    assert all(raw)
+
+
+def test_deserialize(benchmark, histories) -> None:
+    raw = [_serialize(h).encode() for h in histories]
+
+    restored = benchmark(lambda: [_deserialize(r) for r in raw])
+
+    assert [len(r) for r in restored] == [len(h) for h in histories]
@@ -0,0 +1,30 @@
+"""Микробенчмарки SearchProcessor: обработка ответа поиска на каждый вызов."""
+
+import pytest
+
+from vkuswill_bot.services.search_processor import SearchProcessor
+
+pytestmark = pytest.mark.benchmark(group="search")
+
+
+def test_trim_search_result(benchmark, searches, price_cache) -> None:
+    processor = SearchProcessor(price_cache)
+    results = [s["result"] for s in searches]
+
+    trimmed = benchmark(lambda: [processor.trim_search_result(r) for r in results])
+
+    assert all(len(t) < len(r) for t, r in zip(trimmed, results, strict=True))
+
+
+def test_clean_search_query(benchmark, searches) -> None:
+    queries = [s["query"] for s in searches]
+
+    cleaned = benchmark(lambda: [SearchProcessor.clean_search_query(q) for q in queries])
+
+    assert all(cleaned)
+
+
+def test_check_relevance(benchmark, searches) -> None:
+    parsed = [(s["query"], SearchProcessor.parse_search_items(s["result"])[1]) for s in searches]
+
+    benchmark(lambda: [SearchProcessor.check_relevance(q, items) for q, items in parsed])
@@ -0,0 +1,34 @@
+"""Микробенчмарки текста ответа: маскирование PII, HTML для Telegram, разбиение."""
+
+import pytest
+
+from vkuswill_bot.bot.handlers import (
+    MAX_TELEGRAM_MESSAGE_LENGTH,
+    _sanitize_telegram_html,
+    _split_message,
+)
+from vkuswill_bot.services.pii_utils import mask_pii
+
+pytestmark = pytest.mark.benchmark(group="text")
+
+
+def test_mask_pii(benchmark, answers) -> None:
+    masked = benchmark(lambda: [mask_pii(a) for a in answers])
+
+    assert len(masked) == len(answers)
+
+
+def test_sanitize_telegram_html(benchmark, answers) -> None:
+    safe = benchmark(lambda: [_sanitize_telegram_html(a) for a in answers])
+
+    assert [s.count("<b>") for s in safe] == [a.count("<b>") for a in answers]
+
+
+def test_split_message(benchmark, answers) -> None:
+    # Все ответы подряд — длинное сообщение (план питания, большой список)
+    text = "\n\n".join(answers)
+
+    chunks = benchmark(_split_message, text, MAX_TELEGRAM_MESSAGE_LENGTH)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= MAX_TELEGRAM_MESSAGE_LENGTH for c in chunks)
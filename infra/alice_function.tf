@@ -46,6 +46,7 @@ resource "yandex_function" "alice_skill" {
     ALICE_ORCHESTRATION_TIMEOUT_SECONDS  = tostring(var.alice_orchestration_timeout_seconds)
     ALICE_HANDLER_TIMEOUT_SECONDS        = tostring(var.alice_handler_timeout_seconds)
     ALICE_LANGFUSE_FLUSH_TIMEOUT_SECONDS = tostring(var.alice_langfuse_flush_timeout_seconds)
+    ALICE_PREWARM_ON_IMPORT              = tostring(var.alice_prewarm_on_import)
     ALICE_SKILL_ID                       = var.alice_skill_id
     ALICE_REQUIRE_LINKED_ACCOUNT         = "true"
     ALICE_LINKING_FAIL_CLOSED            = tostring(var.alice_linking_fail_closed)
@@ -297,6 +297,12 @@ variable "alice_handler_timeout_seconds" {
   default     = 4.2
 }
 
+variable "alice_prewarm_on_import" {
+  description = "Build Alice runtime (DB pool, Redis, MCP session) at module load, before the first request"
+  type        = bool
+  default     = true
+}
+
 variable "alice_langfuse_flush_timeout_seconds" {
   description = "Max wait time for Langfuse flush in Alice function (seconds)"
   type        = number
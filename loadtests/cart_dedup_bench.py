@@ -0,0 +1,106 @@
+"""Бенчмарк детекции дублей в корзине (CartProcessor.detect_similar_items).
+
+Сравнивает прежний попарный алгоритм (O(n²) пересечений множеств,
+``re.findall`` на каждую сборку корзины) с инвертированным индексом
+по словам из ``PriceInfo.name_words``. Результаты обязаны совпадать.
+
+Использование:
+    uv run python loadtests/cart_dedup_bench.py
+    uv run python loadtests/cart_dedup_bench.py --sizes 10 50 200 400 --repeat 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from vkuswill_bot.services.cart_processor import (
+    _MIN_NAME_OVERLAP,
+    _MIN_WORD_LEN,
+    CartProcessor,
+)
+from vkuswill_bot.services.price_cache import PriceCache
+
+# Типичные слова названий ВкусВилл: реальные корзины по плану питания
+# содержат много товаров одной категории (молочка, овощи, мясо)
+_VOCAB = [
+    "молоко", "кефир", "сыр", "творог", "йогурт", "сметана", "масло", "сливочное", "оливковое",
+    "хлеб", "ржаной", "батон", "курица", "филе", "бедро", "говядина", "фарш", "свинина",
+    "стейк", "форель", "лосось", "охл", "зам", "огурцы", "томаты", "черри", "картофель",
+    "морковь", "лук", "репчатый", "яблоки", "бананы", "гречка", "рис", "макароны", "вкусвилл",
+    "фермерское", "домашний", "натуральный", "без", "лактозы",
+]  # fmt: skip
+
+
+async def _legacy(price_cache: PriceCache, args: dict) -> list[tuple[str, str]]:
+    """Прежняя реализация: попарное сравнение множеств слов."""
+    items_info = []
+    for item in args.get("products", []):
+        cached = await price_cache.get(item.get("xml_id"))
+        if cached:
+            words = frozenset(
+                w for w in re.findall(r"\w+", cached.name.lower()) if len(w) >= _MIN_WORD_LEN
+            )
+            items_info.append((cached.name, words))
+    duplicates = []
+    for i in range(len(items_info)):
+        for j in range(i + 1, len(items_info)):
+            if len(items_info[i][1] & items_info[j][1]) >= _MIN_NAME_OVERLAP:
+                duplicates.append((items_info[i][0], items_info[j][0]))
+    return duplicates
+
+
+async def _fill_cart(price_cache: PriceCache, size: int, rng: random.Random) -> dict:
+    products = []
+    for xml_id in range(size):
+        words = rng.sample(_VOCAB, rng.randint(2, 5))
+        await price_cache.set(
+            xml_id, name=" ".join(words).capitalize() + f", {rng.randint(100, 900)} г", price=100
+        )
+        products.append({"xml_id": xml_id, "q": 1})
+    return {"products": products}
+
+
+async def _time(coro_factory, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await coro_factory()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def _bench(sizes: list[int], repeat: int) -> None:
+    rng = random.Random(42)  # noqa: S311 — синтетика, не криптография
+    print("=" * 64)
+    print(f"{'товаров':>8} {'пар':>6} {'попарно, мкс':>14} {'индекс, мкс':>13} {'ускорение':>10}")
+    for size in sizes:
+        price_cache = PriceCache()
+        processor = CartProcessor(price_cache)
+        args = await _fill_cart(price_cache, size, rng)
+
+        expected = await _legacy(price_cache, args)
+        actual = await processor.detect_similar_items(args)
+        if actual != expected:
+            raise SystemExit(f"Результаты расходятся для {size} товаров")
+
+        legacy_us = await _time(lambda a=args, c=price_cache: _legacy(c, a), repeat)
+        index_us = await _time(lambda a=args, p=processor: p.detect_similar_items(a), repeat)
+        print(
+            f"{size:>8} {len(expected):>6} {legacy_us:>14.1f} {index_us:>13.1f} "
+            f"{legacy_us / index_us:>9.1f}x"
+        )
+    print("=" * 64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк detect_similar_items")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(_bench(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Бенчмарк «Повторить корзину»: GigaChat против CartRepeater.
+
+Повтор корзины из N товаров тремя способами:
+
+- llm: ``process_message("повтори прошлую корзину")`` — модель вызывает
+  ``get_previous_cart``, затем ``vkusvill_cart_link_create``, затем отвечает;
+- repeat (cold): ``GigaChatService.repeat_cart()`` с пустым кешем цен —
+  цена каждого товара запрашивается ``vkusvill_product_details``;
+- repeat (warm): то же с прогретым кешем цен (обычный случай).
+
+GigaChat и MCP симулируются: задержка шага LLM = база + надбавка за каждую
+тысячу символов истории, задержка MCP — фиксированная.
+
+Использование:
+    uv run python loadtests/cart_repeat_bench.py
+    uv run python loadtests/cart_repeat_bench.py --items 5 15 30 --llm-latency 1.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from unittest.mock import AsyncMock
+
+from gigachat.models import (
+    Chat,
+    ChatCompletion,
+    Choices,
+    FunctionCall,
+    Messages,
+    MessagesRole,
+    Usage,
+)
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.cart_snapshot_store import InMemoryCartSnapshotStore
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+
+@dataclass
+class _Counters:
+    steps: int = 0
+    mcp_calls: int = 0
+
+
+def _response(content: str = "", call: tuple[str, dict] | None = None) -> ChatCompletion:
+    message = Messages(role=MessagesRole.ASSISTANT, content=content)
+    if call is not None:
+        message.function_call = FunctionCall(name=call[0], arguments=call[1])
+    return ChatCompletion(
+        choices=[
+            Choices(
+                message=message,
+                index=0,
+                finish_reason="function_call" if call else "stop",
+            )
+        ],
+        created=0,
+        model="GigaChat",
+        usage=Usage(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+        object="chat.completion",
+    )
+
+
+def _make_llm(counters: _Counters, base: float, per_kchar: float):
+    """Модель повторяет корзину: get_previous_cart → корзина из её товаров → текст."""
+
+    def chat(request: Chat) -> ChatCompletion:
+        chars = sum(len(m.content or "") for m in request.messages)
+        time.sleep(base + per_kchar * chars / 1000)
+        counters.steps += 1
+        done = {m.name: m.content for m in request.messages if m.role == MessagesRole.FUNCTION}
+        if "vkusvill_cart_link_create" in done:
+            return _response("Готово: повторил прошлую корзину")
+        if "get_previous_cart" in done:
+            products = [
+                {"xml_id": p["xml_id"], "q": p["q"]}
+                for p in json.loads(done["get_previous_cart"])["products"]
+            ]
+            return _response(call=("vkusvill_cart_link_create", {"products": products}))
+        return _response(call=("get_previous_cart", {}))
+
+    return chat
+
+
+def _make_mcp(counters: _Counters, latency: float) -> AsyncMock:
+    async def call_tool(name: str, args: dict) -> str:
+        counters.mcp_calls += 1
+        await asyncio.sleep(latency)
+        if name == "vkusvill_cart_link_create":
+            return json.dumps({"ok": True, "data": {"link": "https://vkusvill.ru/?share_basket=1"}})
+        xml_id = args["xml_id"]
+        details = {"name": f"Товар {xml_id}", "price": {"current": 100 + xml_id}, "unit": "шт"}
+        return json.dumps({"ok": True, "data": details}, ensure_ascii=False)
+
+    mcp = AsyncMock()
+    mcp.get_tools.return_value = [
+        {"name": "vkusvill_cart_link_create", "description": "Корзина", "parameters": {}},
+    ]
+    mcp.call_tool = AsyncMock(side_effect=call_tool)
+    return mcp
+
+
+async def _run(mode: str, n: int, args: argparse.Namespace) -> tuple[_Counters, float]:
+    counters = _Counters()
+    mcp = _make_mcp(counters, args.mcp_latency)
+    search_processor = SearchProcessor()
+    snapshots = InMemoryCartSnapshotStore()
+    executor = ToolExecutor(
+        mcp_client=mcp,
+        search_processor=search_processor,
+        cart_processor=CartProcessor(search_processor.price_cache),
+        cart_snapshot_store=snapshots,
+    )
+    service = GigaChatService(
+        credentials="bench",
+        model="GigaChat",
+        scope="GIGACHAT_API_PERS",
+        mcp_client=mcp,
+        tool_executor=executor,
+        max_tool_calls=10,
+        max_history=50,
+    )
+    service._client.chat = _make_llm(  # type: ignore[method-assign]
+        counters, args.llm_latency, args.llm_per_kchar
+    )
+
+    products = [{"xml_id": i, "q": 1} for i in range(1, n + 1)]
+    await snapshots.save(1, products, "https://vkusvill.ru/?share_basket=0", None)
+    if mode != "repeat (cold)":
+        # Прогретый кеш: цены товаров известны по недавним поискам
+        for p in products:
+            await search_processor.price_cache.set(p["xml_id"], f"Товар {p['xml_id']}", 100.0)
+
+    start = time.perf_counter()
+    if mode == "llm":
+        await service.process_message(user_id=1, text="повтори прошлую корзину")
+    else:
+        await service.repeat_cart(user_id=1)
+    return counters, time.perf_counter() - start
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    print("=" * 64)
+    print(
+        f"LLM: {args.llm_latency:.2f} с + {args.llm_per_kchar:.3f} с/1k символов, "
+        f"MCP: {args.mcp_latency:.2f} с"
+    )
+    print(f"{'товаров':>8} {'сценарий':>15} {'шагов LLM':>10} {'MCP':>5} {'время, с':>9}")
+    for n in args.items:
+        for mode in ("llm", "repeat (cold)", "repeat (warm)"):
+            c, elapsed = await _run(mode, n, args)
+            print(f"{n:>8} {mode:>15} {c.steps:>10} {c.mcp_calls:>5} {elapsed:>9.2f}")
+    print("=" * 64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк «Повторить корзину»")
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 15, 30])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="База шага LLM, с")
+    parser.add_argument(
+        "--llm-per-kchar", type=float, default=0.02, help="Надбавка за 1000 символов истории, с"
+    )
+    parser.add_argument("--mcp-latency", type=float, default=0.1, help="Задержка MCP, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
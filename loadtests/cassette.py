@@ -0,0 +1,290 @@
+"""Кассеты GigaChat и MCP: запись живых ответов и офлайн-воспроизведение.
+
+Нагрузочные тесты сервисного слоя ходят в живые GigaChat и MCP — без
+доступа к ним регрессии производительности не поймать. Кассета один раз
+записывает обмены с живыми API, а затем воспроизводит их детерминированно,
+с исходными или масштабированными задержками:
+
+- GigaChat: запрос ``Chat`` (сообщения, функции, режим function_call) →
+  ``ChatCompletion`` и время ответа;
+- MCP: ``tools/list`` и ``tools/call`` (имя + аргументы) → текст ответа
+  и время ответа.
+
+Сопоставление — по нормализованному запросу (пробелы схлопнуты, ключи
+аргументов отсортированы; хеш sha256). Одинаковые запросы с разными
+ответами воспроизводятся по кругу в порядке записи. Промах кассеты —
+по явной политике:
+
+- ``error`` — исключение CassetteMiss (по умолчанию: регрессия видна сразу);
+- ``stub`` — заглушка (GigaChat — текстовый ответ, MCP — ``ok: false``);
+- ``live`` — вызов живого API (и дозапись, если кассета пишется).
+
+Формат — JSON с номером версии (CASSETTE_VERSION): при смене формата
+старые кассеты не читаются молча, а отклоняются.
+
+Использование (см. service_load_test.py):
+    cassette = Cassette.load(path, miss_policy="error", latency_scale=1.0)
+    cassette.attach(service, mcp_client)
+    ...
+    cassette.save()  # только при записи
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from gigachat.models import (
+    Chat,
+    ChatCompletion,
+    Choices,
+    Messages,
+    MessagesRole,
+    Usage,
+)
+
+logger = logging.getLogger(__name__)
+
+# Версия формата файла кассеты
+CASSETTE_VERSION = 1
+
+MISS_POLICIES = ("error", "stub", "live")
+
+_SPACES_RE = re.compile(r"\s+")
+
+
+class CassetteMiss(LookupError):
+    """В кассете нет ответа на запрос (политика промаха ``error``)."""
+
+
+def _normalize_text(text: str | None) -> str:
+    return _SPACES_RE.sub(" ", text or "").strip()
+
+
+def _key(payload: Any) -> str:
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _arguments(raw: Any) -> Any:
+    """Аргументы вызова функции: строка JSON → объект, как их видит модель."""
+    if isinstance(raw, str):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return _normalize_text(raw)
+    return raw
+
+
+def chat_key(chat: Chat) -> str:
+    """Ключ запроса GigaChat: сообщения, имена функций, режим function_call."""
+    messages = []
+    for m in chat.messages:
+        role = m.role.value if hasattr(m.role, "value") else str(m.role)
+        item: dict[str, Any] = {"role": role, "content": _normalize_text(m.content)}
+        if m.function_call is not None:
+            item["call"] = [m.function_call.name, _arguments(m.function_call.arguments)]
+        if getattr(m, "name", None):
+            item["name"] = m.name
+        messages.append(item)
+    functions = sorted(f["name"] if isinstance(f, dict) else f.name for f in (chat.functions or []))
+    function_call = chat.function_call
+    if not isinstance(function_call, str | None):
+        function_call = str(function_call)
+    return _key({"messages": messages, "functions": functions, "function_call": function_call})
+
+
+def mcp_key(method: str, name: str = "", arguments: dict | None = None) -> str:
+    """Ключ обмена MCP: метод JSON-RPC, инструмент и аргументы."""
+    return _key({"method": method, "name": name, "arguments": arguments or {}})
+
+
+def _stub_completion() -> ChatCompletion:
+    return ChatCompletion(
+        choices=[
+            Choices(
+                message=Messages(
+                    role=MessagesRole.ASSISTANT,
+                    content="Ответ не найден в кассете.",
+                ),
+                index=0,
+                finish_reason="stop",
+            )
+        ],
+        created=0,
+        model="cassette-stub",
+        usage=Usage(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+        object="chat.completion",
+    )
+
+
+class Cassette:
+    """Записанные обмены с GigaChat и MCP.
+
+    Режимы: запись (``recording=True`` — вызовы идут в живые API и
+    сохраняются) и воспроизведение (ответы и задержки — из кассеты).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        recording: bool = False,
+        miss_policy: str = "error",
+        latency_scale: float = 1.0,
+    ) -> None:
+        if miss_policy not in MISS_POLICIES:
+            raise ValueError(f"miss_policy: одно из {MISS_POLICIES}, получено {miss_policy!r}")
+        self.path = Path(path)
+        self.recording = recording
+        self.miss_policy = miss_policy
+        self.latency_scale = latency_scale
+        self._entries: dict[str, dict[str, list[dict]]] = {"gigachat": {}, "mcp": {}}
+        self._cursor: dict[tuple[str, str], int] = defaultdict(int)
+        self.stats: dict[str, int] = defaultdict(int)
+        self.meta: dict[str, Any] = {}
+
+    # ---- Файл ----
+
+    @classmethod
+    def load(cls, path: str | Path, **kwargs: Any) -> Cassette:
+        """Открыть кассету для воспроизведения."""
+        cassette = cls(path, recording=False, **kwargs)
+        data = json.loads(cassette.path.read_text(encoding="utf-8"))
+        version = data.get("version")
+        if version != CASSETTE_VERSION:
+            raise ValueError(
+                f"Кассета {path}: версия формата {version}, поддерживается {CASSETTE_VERSION}"
+            )
+        cassette.meta = data.get("meta", {})
+        for kind in ("gigachat", "mcp"):
+            for entry in data.get(kind, []):
+                cassette._entries[kind].setdefault(entry["key"], []).append(entry)
+        return cassette
+
+    def save(self) -> None:
+        """Записать кассету в файл (записи в порядке появления)."""
+        data = {
+            "version": CASSETTE_VERSION,
+            "meta": {**self.meta, "recorded_at": datetime.now(UTC).isoformat(timespec="seconds")},
+            "gigachat": [e for entries in self._entries["gigachat"].values() for e in entries],
+            "mcp": [e for entries in self._entries["mcp"].values() for e in entries],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        logger.info(
+            "Кассета %s: %d ответов GigaChat, %d ответов MCP",
+            self.path,
+            len(data["gigachat"]),
+            len(data["mcp"]),
+        )
+
+    # ---- Поиск и запись ----
+
+    def _next(self, kind: str, key: str) -> dict | None:
+        entries = self._entries[kind].get(key)
+        if not entries:
+            self.stats[f"{kind}_misses"] += 1
+            return None
+        i = self._cursor[(kind, key)]
+        self._cursor[(kind, key)] = i + 1
+        self.stats[f"{kind}_hits"] += 1
+        return entries[i % len(entries)]
+
+    def _record(self, kind: str, key: str, entry: dict) -> None:
+        self._entries[kind].setdefault(key, []).append({"key": key, **entry})
+        self.stats[f"{kind}_recorded"] += 1
+
+    def _delay(self, entry: dict) -> float:
+        return entry.get("latency", 0.0) * self.latency_scale
+
+    # ---- GigaChat ----
+
+    def wrap_chat(self, chat_fn):
+        """Обёртка синхронного ``GigaChat.chat`` (вызывается в потоке)."""
+
+        def chat(request: Chat) -> ChatCompletion:
+            key = chat_key(request)
+            if not self.recording:
+                entry = self._next("gigachat", key)
+                if entry is not None:
+                    time.sleep(self._delay(entry))
+                    return ChatCompletion.model_validate(entry["response"])
+                if self.miss_policy == "error":
+                    raise CassetteMiss(f"GigaChat: нет ответа для запроса {key[:12]}")
+                if self.miss_policy == "stub":
+                    return _stub_completion()
+            start = time.perf_counter()
+            response = chat_fn(request)
+            if self.recording:
+                self._record(
+                    "gigachat",
+                    key,
+                    {
+                        "request": request.model_dump(
+                            mode="json", by_alias=True, exclude_none=True
+                        ),
+                        "response": response.model_dump(
+                            mode="json", by_alias=True, exclude_none=True
+                        ),
+                        "latency": round(time.perf_counter() - start, 4),
+                    },
+                )
+            return response
+
+        return chat
+
+    # ---- MCP ----
+
+    async def _mcp(self, key: str, request: dict, live) -> Any:
+        if not self.recording:
+            entry = self._next("mcp", key)
+            if entry is not None:
+                await asyncio.sleep(self._delay(entry))
+                return entry["result"]
+            if self.miss_policy == "error":
+                raise CassetteMiss(f"MCP: нет ответа для {request}")
+            if self.miss_policy == "stub":
+                if request["method"] == "tools/list":
+                    return []
+                return json.dumps({"ok": False, "error": "cassette miss"})
+        start = time.perf_counter()
+        result = await live()
+        if self.recording:
+            self._record(
+                "mcp",
+                key,
+                {
+                    "request": request,
+                    "result": result,
+                    "latency": round(time.perf_counter() - start, 4),
+                },
+            )
+        return result
+
+    def attach(self, service: Any, mcp_client: Any) -> None:
+        """Подключить кассету к GigaChatService и MCP-клиенту."""
+        service._client.chat = self.wrap_chat(service._client.chat)
+        get_tools, call_tool = mcp_client.get_tools, mcp_client.call_tool
+
+        async def replay_get_tools() -> list[dict]:
+            request = {"method": "tools/list"}
+            return await self._mcp(mcp_key("tools/list"), request, get_tools)
+
+        async def replay_call_tool(name: str, arguments: dict) -> str:
+            request = {"method": "tools/call", "name": name, "arguments": arguments}
+            return await self._mcp(
+                mcp_key("tools/call", name, arguments),
+                request,
+                lambda: call_tool(name, arguments),
+            )
+
+        mcp_client.get_tools = replay_get_tools
+        mcp_client.call_tool = replay_call_tool
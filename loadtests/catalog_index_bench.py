@@ -0,0 +1,205 @@
+"""Замер латентности и полноты (recall) локального индекса каталога.
+
+Строит CatalogIndex из записанных ответов MCP ``vkusvill_products_search``
+и сравнивает локальную выдачу с выдачей MCP по тем же запросам:
+
+- latency: p50/p95/p99 ``CatalogIndex.search_result()``;
+- recall@k: доля xml_id из top-k MCP, найденных в top-k индекса;
+- hit rate: доля запросов, на которые индекс вообще ответил.
+
+Формат файла ответов (JSONL): ``{"q": "молоко", "result": "<ответ MCP>"}``.
+
+Использование:
+    # Записать ответы MCP по списку запросов (один запрос в строке)
+    uv run python loadtests/catalog_index_bench.py --record queries.txt --answers answers.jsonl
+
+    # Замер по записанным ответам
+    uv run python loadtests/catalog_index_bench.py --answers answers.jsonl
+
+    # Офлайн-прогон на синтетическом каталоге
+    uv run python loadtests/catalog_index_bench.py --synthetic 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from vkuswill_bot.services.catalog_index import CatalogIndex
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
+
+_SYNTHETIC_WORDS = [
+    "молоко",
+    "кефир",
+    "сыр",
+    "творог",
+    "хлеб",
+    "батон",
+    "яблоки",
+    "бананы",
+    "курица",
+    "говядина",
+    "гречка",
+    "рис",
+    "макароны",
+    "йогурт",
+    "сметана",
+    "масло",
+    "огурцы",
+    "помидоры",
+    "картофель",
+    "морковь",
+]
+_SYNTHETIC_ATTRS = ["фермерское", "безлактозное", "домашний", "цельнозерновой", "отборные", ""]
+
+
+def _load_answers(path: str) -> list[tuple[str, str]]:
+    answers: list[tuple[str, str]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            result = row["result"]
+            if not isinstance(result, str):
+                result = json.dumps(result, ensure_ascii=False)
+            answers.append((row["q"], result))
+    return answers
+
+
+def _synthetic_answers(n_products: int, seed: int = 42) -> list[tuple[str, str]]:
+    """Синтетический каталог: ответы «MCP» — товары, содержащие слово запроса."""
+    rng = random.Random(seed)  # noqa: S311 — синтетика, не криптография
+    products = []
+    for xml_id in range(1, n_products + 1):
+        word = rng.choice(_SYNTHETIC_WORDS)
+        attr = rng.choice(_SYNTHETIC_ATTRS)
+        products.append(
+            {
+                "xml_id": xml_id,
+                "name": f"{word.capitalize()} {attr} {xml_id}".replace("  ", " "),
+                "price": {"current": rng.randint(50, 900)},
+                "unit": "шт",
+                "rating": round(rng.uniform(3.5, 5.0), 1),
+            }
+        )
+    answers = []
+    for word in _SYNTHETIC_WORDS:
+        matched = [p for p in products if word in p["name"].lower()]
+        matched.sort(key=lambda p: -p["rating"])
+        answers.append(
+            (word, json.dumps({"ok": True, "data": {"items": matched[:10]}}, ensure_ascii=False))
+        )
+    return answers
+
+
+async def _record(queries_path: str, out_path: str, mcp_url: str) -> None:
+    from vkuswill_bot.services.mcp_client import VkusvillMCPClient
+
+    client = VkusvillMCPClient(mcp_url)
+    with open(queries_path, encoding="utf-8") as f:
+        queries = [q.strip() for q in f if q.strip()]
+    try:
+        with open(out_path, "w", encoding="utf-8") as out:
+            for q in queries:
+                result = await client.call_tool(
+                    "vkusvill_products_search", {"q": q, "limit": SEARCH_LIMIT}
+                )
+                out.write(json.dumps({"q": q, "result": result}, ensure_ascii=False) + "\n")
+                print(f"  записан ответ: {q}")
+    finally:
+        await client.close()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[idx]
+
+
+async def _bench(answers: list[tuple[str, str]], k: int, repeat: int) -> None:
+    price_cache = PriceCache()
+    processor = SearchProcessor(price_cache)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "catalog.db")
+        index = CatalogIndex(db_path, price_cache)
+
+        start = time.perf_counter()
+        for _, result in answers:
+            await processor.cache_prices(result)
+        indexed = await index.index_results([result for _, result in answers])
+        build_ms = (time.perf_counter() - start) * 1000
+
+        latencies: list[float] = []
+        recalls: list[float] = []
+        hits = 0
+        for q, result in answers:
+            expected = [
+                item["xml_id"]
+                for item in (SearchProcessor.parse_search_items(result) or ({}, []))[1][:k]
+                if isinstance(item, dict) and "xml_id" in item
+            ]
+            local: str | None = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                local = await index.search_result(q, limit=k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            found = set(processor.extract_xml_ids(local)) if local else set()
+            if local:
+                hits += 1
+            if expected:
+                recalls.append(len(found & set(expected)) / len(expected))
+
+        size_kb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 1024
+        await index.close()
+
+    print("=" * 60)
+    print(f"Запросов: {len(answers)}, товаров в индексе: {indexed}")
+    print(f"Построение индекса: {build_ms:.1f} мс, размер БД: {size_kb:.0f} КБ")
+    print(
+        f"Латентность search_result: p50={statistics.median(latencies):.2f} мс, "
+        f"p95={_percentile(latencies, 95):.2f} мс, p99={_percentile(latencies, 99):.2f} мс"
+    )
+    if recalls:
+        print(f"Recall@{k}: {statistics.mean(recalls):.3f}")
+    print(f"Hit rate: {hits / len(answers):.1%}")
+    print("=" * 60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк локального индекса каталога")
+    parser.add_argument("--answers", help="JSONL с записанными ответами MCP")
+    parser.add_argument("--record", help="Файл запросов: записать ответы MCP в --answers")
+    parser.add_argument("--mcp-url", default="https://mcp001.vkusvill.ru/mcp")
+    parser.add_argument("--synthetic", type=int, default=0, help="Синтетический каталог из N")
+    parser.add_argument("--k", type=int, default=SEARCH_LIMIT, help="Глубина сравнения top-k")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов каждого запроса")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.answers:
+            parser.error("--record требует --answers (куда писать)")
+        asyncio.run(_record(args.record, args.answers, args.mcp_url))
+        return
+
+    if args.synthetic:
+        answers = _synthetic_answers(args.synthetic)
+    elif args.answers:
+        answers = _load_answers(args.answers)
+    else:
+        parser.error("нужен --answers или --synthetic")
+        sys.exit(2)
+
+    asyncio.run(_bench(answers, args.k, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,9 @@
     uv run locust -f loadtests/locustfile.py \
         --host http://localhost:8080 \
         --users 100 --spawn-rate 10 --run-time 5m --headless
+
+Без живых GigaChat, MCP и Telegram: бот запускается с переменными окружения,
+которые печатает ``loadtests/stub_backends.py`` (см. loadtests/README.md).
 """
 
 from __future__ import annotations
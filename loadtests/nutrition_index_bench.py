@@ -0,0 +1,129 @@
+"""Замер офлайн-индекса КБЖУ: время сборки, размер и латентность поиска.
+
+Собирает ``NutritionIndex`` из дампа Open Food Facts (или синтетического
+дампа того же формата) и прогоняет поток запросов ``search()``:
+
+- build: время импорта и размер файла индекса;
+- latency: p50/p95/p99 поиска (холодный запуск не отделяется — mmap
+  после первого прохода в page cache);
+- hit rate: доля запросов, на которые индекс ответил без API.
+
+Использование:
+    # Синтетический дамп (по умолчанию 30 000 продуктов — порядок RU-части OFF)
+    uv run python loadtests/nutrition_index_bench.py --synthetic 30000
+
+    # Реальный дамп и свои запросы (один запрос в строке)
+    uv run python loadtests/nutrition_index_bench.py \\
+        --dump en.openfoodfacts.org.products.csv.gz --queries queries.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from vkuswill_bot.services.nutrition_index import NutritionIndex, build_index
+
+_SYNTHETIC_WORDS = [
+    "молоко", "кефир", "сыр", "творог", "йогурт", "сметана", "масло", "хлеб",
+    "батон", "гречка", "рис", "овсянка", "макароны", "курица", "филе", "говядина",
+    "свинина", "колбаса", "сосиски", "пельмени", "яблоко", "банан", "сок", "шоколад",
+    "печенье", "вафли", "пряники", "мёд", "чай", "кофе",
+]  # fmt: skip
+_SYNTHETIC_ATTRS = [
+    "домашний", "фермерский", "классический", "отборный", "нежный", "деревенский",
+    "пастеризованное", "цельнозерновой", "молочный", "копчёная", "варёная", "сливочное",
+]  # fmt: skip
+_SYNTHETIC_QUERIES = [
+    "молоко", "творог 5%", "сыр", "гречка", "куриное филе", "масло сливочное",
+    "колбаса варёная", "шоколад молочный", "хлеб", "пельмени", "кефир 1%",
+    "авокадо", "киноа", "тофу",
+]  # fmt: skip
+
+
+def _write_synthetic(path: str, size: int) -> None:
+    rng = random.Random(42)  # noqa: S311
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(size):
+            words = [rng.choice(_SYNTHETIC_WORDS), *rng.sample(_SYNTHETIC_ATTRS, rng.randint(0, 2))]
+            product = {
+                "code": str(4600000000000 + i),
+                "product_name": f"{' '.join(words).capitalize()} {rng.randint(1, 9)}%",
+                "brands": f"Бренд {rng.randint(1, 500)}",
+                "countries_tags": ["en:russia"] if rng.random() < 0.8 else ["en:france"],
+                "nutrition_grades": rng.choice("abcde"),
+                "nutriments": {
+                    "energy-kcal_100g": rng.randint(20, 600),
+                    "proteins_100g": round(rng.uniform(0, 30), 1),
+                    "fat_100g": round(rng.uniform(0, 40), 1),
+                    "carbohydrates_100g": round(rng.uniform(0, 80), 1),
+                },
+            }
+            f.write(json.dumps(product, ensure_ascii=False) + "\n")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _bench(dump: str, queries: list[str], rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "nutrition.idx")
+        summary = build_index(dump, index_path)
+        index = NutritionIndex(index_path)
+
+        hits = sum(bool(index.search(q)) for q in queries)
+        latencies = []
+        for _ in range(rounds):
+            for q in queries:
+                start = time.perf_counter()
+                index.search(q)
+                latencies.append((time.perf_counter() - start) * 1e6)
+        index.close()
+
+    print("=" * 60)
+    print(f"Дамп: {os.path.basename(dump)} ({os.path.getsize(dump) / 1e6:.1f} МБ)")
+    print(
+        f"Сборка: {summary['seconds']:.2f} с, продуктов {summary['products']}, "
+        f"токенов {summary['tokens']}, индекс {summary['bytes'] / 1e6:.2f} МБ"
+    )
+    print(f"Запросов: {len(queries)}, hit rate {hits / len(queries):.1%}")
+    print(
+        f"Поиск: p50 {_percentile(latencies, 0.5):.0f} мкс, "
+        f"p95 {_percentile(latencies, 0.95):.0f} мкс, "
+        f"p99 {_percentile(latencies, 0.99):.0f} мкс, "
+        f"mean {statistics.mean(latencies):.0f} мкс"
+    )
+    print("=" * 60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер офлайн-индекса КБЖУ")
+    parser.add_argument("--dump", help="Дамп Open Food Facts (.csv/.jsonl, можно .gz)")
+    parser.add_argument("--synthetic", type=int, default=30000, help="Размер синтетического дампа")
+    parser.add_argument("--queries", help="Файл с запросами (по умолчанию — встроенные)")
+    parser.add_argument("--rounds", type=int, default=200, help="Повторов потока запросов")
+    args = parser.parse_args()
+
+    queries = _SYNTHETIC_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    if args.dump:
+        _bench(args.dump, queries, args.rounds)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "synthetic.jsonl")
+        _write_synthetic(dump, args.synthetic)
+        _bench(dump, queries, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
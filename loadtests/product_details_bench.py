@@ -0,0 +1,157 @@
+"""Бенчмарк кеша карточек товаров (``vkusvill_product_details``).
+
+Диалоги «про состав»: каждый пользователь спрашивает о нескольких товарах,
+популярность товаров — по Ципфу (немногие товары спрашивают чаще всего).
+Каждый вопрос — вызов ``vkusvill_product_details`` через ToolExecutor
+(execute + postprocess), как в цикле GigaChat. Сценарии:
+
+- no cache: каждый вызов идёт в MCP;
+- cache: ProductDetailsCache (L1 + SQLite во временном файле).
+
+MCP симулируется: фиксированная задержка и «тяжёлая» карточка (картинки,
+ссылки, длинное описание). Размер результата в символах — оценка токенов,
+которые уходят в контекст LLM.
+
+Использование:
+    uv run python loadtests/product_details_bench.py
+    uv run python loadtests/product_details_bench.py --users 200 --catalog 500 --mcp-latency 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.product_details_cache import ProductDetailsCache
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+
+def _card(xml_id: int) -> dict:
+    return {
+        "xml_id": xml_id,
+        "name": f"Товар {xml_id}",
+        "price": {"current": 100 + xml_id % 50, "old": 150},
+        "unit": "шт",
+        "weight": {"value": 500, "unit": "г"},
+        "composition": "молоко нормализованное, закваска, " * 4,
+        "nutrition": {"calories": 120, "proteins": 3.2, "fats": 3.2, "carbohydrates": 4.7},
+        "description": "Подробное описание товара. " * 60,
+        "images": [f"https://img.vkusvill.ru/{xml_id}/{i}.jpg" for i in range(8)],
+        "url": f"https://vkusvill.ru/goods/{xml_id}.html",
+        "breadcrumbs": ["Молочные продукты", "Молоко", "Пастеризованное"],
+    }
+
+
+def _make_mcp(calls: list[int], latency: float) -> AsyncMock:
+    async def call_tool(name: str, args: dict) -> str:
+        calls.append(args["xml_id"])
+        await asyncio.sleep(latency)
+        return json.dumps({"ok": True, "data": _card(args["xml_id"])}, ensure_ascii=False)
+
+    mcp = AsyncMock()
+    mcp.call_tool = AsyncMock(side_effect=call_tool)
+    return mcp
+
+
+def _conversations(args: argparse.Namespace) -> list[list[int]]:
+    """Вопросы пользователей: xml_id по распределению Ципфа."""
+    rng = random.Random(args.seed)  # noqa: S311 — синтетика, не криптография
+    ids = list(range(1, args.catalog + 1))
+    weights = [1 / rank**args.zipf for rank in ids]
+    return [rng.choices(ids, weights=weights, k=args.questions) for _ in range(args.users)]
+
+
+async def _run(
+    cache: ProductDetailsCache | None,
+    conversations: list[list[int]],
+    args: argparse.Namespace,
+) -> tuple[int, float, float, int]:
+    calls: list[int] = []
+    search_processor = SearchProcessor()
+    executor = ToolExecutor(
+        mcp_client=_make_mcp(calls, args.mcp_latency),
+        search_processor=search_processor,
+        cart_processor=CartProcessor(search_processor.price_cache),
+        product_details_cache=cache,
+    )
+    sem = asyncio.Semaphore(args.concurrency)
+    chars = 0
+
+    async def conversation(user_id: int, questions: list[int]) -> float:
+        nonlocal chars
+        async with sem:
+            start = time.perf_counter()
+            for xml_id in questions:
+                tool_args = {"xml_id": xml_id}
+                raw = await executor.execute("vkusvill_product_details", tool_args, user_id)
+                result = await executor.postprocess_result(
+                    "vkusvill_product_details", tool_args, raw, {}, {}
+                )
+                chars += len(result)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    durations = await asyncio.gather(
+        *(conversation(uid, q) for uid, q in enumerate(conversations, start=1))
+    )
+    elapsed = time.perf_counter() - start
+    return len(calls), elapsed, sum(durations) / len(durations), chars
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    conversations = _conversations(args)
+    total = sum(len(q) for q in conversations)
+    raw_chars = len(json.dumps({"ok": True, "data": _card(1)}, ensure_ascii=False))
+    print("=" * 72)
+    print(
+        f"{args.users} диалогов × {args.questions} вопросов, каталог {args.catalog}, "
+        f"Ципф s={args.zipf}, MCP {args.mcp_latency:.2f} с"
+    )
+    print(f"Карточка MCP: {raw_chars} символов до обрезки")
+    print(
+        f"{'сценарий':>10} {'MCP':>6} {'hit rate':>9} {'время, с':>9} "
+        f"{'диалог, с':>10} {'симв./ответ':>12}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("no cache", "cache"):
+            cache = (
+                ProductDetailsCache(db_path=str(Path(tmp) / "details.db"))
+                if mode == "cache"
+                else None
+            )
+            mcp_calls, elapsed, per_dialog, chars = await _run(cache, conversations, args)
+            hit_rate = cache.stats["hit_rate"] if cache is not None else 0.0
+            if cache is not None:
+                await cache.close()
+            print(
+                f"{mode:>10} {mcp_calls:>6} {hit_rate:>8.0%} {elapsed:>9.2f} "
+                f"{per_dialog:>10.2f} {chars / total:>12.0f}"
+            )
+    print("=" * 72)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк кеша карточек товаров")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=5, help="Вопросов о товарах в диалоге")
+    parser.add_argument("--catalog", type=int, default=300, help="Товаров в каталоге")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Параметр распределения Ципфа")
+    parser.add_argument("--concurrency", type=int, default=20, help="Одновременных диалогов")
+    parser.add_argument("--mcp-latency", type=float, default=0.2, help="Задержка MCP, с")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Оценка кеша рецептов на потоке запросов блюд.
+
+Прогоняет один и тот же поток названий блюд через прежний кеш
+(``RecipeStore``, ключ ``dish_name.strip().lower()``) и многоуровневый
+(``TieredRecipeStore``: нормальные формы + нечёткий поиск). Промах =
+вызов GigaChat для извлечения рецепта, поэтому разница промахов —
+сэкономленные вызовы LLM.
+
+Формат внешнего потока: текстовый файл, одно название блюда на строку.
+
+Использование:
+    uv run python loadtests/recipe_cache_eval.py
+    uv run python loadtests/recipe_cache_eval.py --dishes dishes.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from vkuswill_bot.services.recipe_store import RecipeStore, TieredRecipeStore
+
+# Поток запросов: одни и те же блюда в разных формулировках
+STREAM: list[str] = [
+    "борщ", "Борщ", "борщ украинский", "борщик", "Украинский борщ",
+    "блины", "блинчики", "Блины", "блины на молоке",
+    "плов", "плов узбекский", "Плов",
+    "котлеты", "котлеты куриные", "куриные котлеты", "котлеты рыбные",
+    "салат цезарь", "цезарь", "салат Цезарь", "салат греческий", "греческий салат",
+    "оливье", "салат оливье", "Оливье",
+    "пельмени", "вареники", "пельмени домашние",
+    "гуляш", "гуляш из говядины", "сырники", "сырники из творога",
+    "паста карбонара", "карбонара", "паста болоньезе", "лазанья", "лазанья болоньезе",
+    "омлет", "омлет с сыром", "щи", "щи из квашеной капусты", "уха", "уха из лосося",
+    "шарлотка", "шарлотка с яблоками", "солянка", "солянка мясная", "рататуй",
+]  # fmt: skip
+
+_INGREDIENTS = [{"name": "ингредиент", "quantity": 1, "unit": "шт", "search_query": "x"}]
+
+
+async def _replay(store: RecipeStore, stream: list[str]) -> int:
+    """Прогнать поток через кеш; промах — «извлечение» и сохранение. Вернуть промахи."""
+    misses = 0
+    for dish in stream:
+        if await store.get(dish) is None:
+            misses += 1
+            await store.save(dish, 4, _INGREDIENTS)
+    return misses
+
+
+async def _evaluate(stream: list[str]) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = RecipeStore(str(Path(tmp) / "legacy.db"))
+        tiered = TieredRecipeStore(str(Path(tmp) / "tiered.db"))
+        legacy_misses = await _replay(legacy, stream)
+        tiered_misses = await _replay(tiered, stream)
+        stats = tiered.stats
+        await legacy.close()
+        await tiered.close()
+
+    total = len(stream)
+    print("=" * 60)
+    print(f"Запросов блюд: {total}")
+    results = (("Точный ключ (прежний)", legacy_misses), ("Многоуровневый", tiered_misses))
+    for title, misses in results:
+        print(f"{title:22s} hit rate {(total - misses) / total:6.1%}, вызовов LLM: {misses}")
+    print(
+        "По уровням: "
+        + ", ".join(f"{tier}={int(stats[tier])}" for tier in ("l1", "sqlite", "redis", "fuzzy"))
+    )
+    print(f"Сэкономлено вызовов LLM: {legacy_misses - tiered_misses}")
+    print("=" * 60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Оценка кеша рецептов")
+    parser.add_argument("--dishes", help="Файл с названиями блюд (по умолчанию — встроенный поток)")
+    args = parser.parse_args()
+    stream = STREAM
+    if args.dishes:
+        lines = Path(args.dishes).read_text("utf-8").splitlines()
+        stream = [line.strip() for line in lines if line.strip()]
+    asyncio.run(_evaluate(stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Бенчмарк плана питания: recipes_plan против recipe_ingredients + recipe_search.
+
+Прогоняет ``GigaChatService.process_message()`` для плана из N блюд двумя
+сценариями модели:
+
+- legacy: ``recipe_ingredients`` и ``recipe_search`` на каждое блюдо
+  (2×N шагов function calling), затем корзина;
+- plan: один ``recipes_plan`` со всеми блюдами, затем корзина.
+
+GigaChat и MCP симулируются: задержка шага LLM = база + надбавка за каждую
+тысячу символов истории (история пересылается целиком на каждом шаге),
+задержка MCP — фиксированная. Кеш рецептов холодный — извлечение рецепта
+тоже вызов LLM. Считаются шаги function calling, вызовы извлечения,
+вызовы MCP, отправленный объём истории и время на сообщение.
+
+Использование:
+    uv run python loadtests/recipes_plan_bench.py
+    uv run python loadtests/recipes_plan_bench.py --dishes 3 5 7 --llm-latency 1.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from unittest.mock import AsyncMock
+
+from gigachat.models import (
+    Chat,
+    ChatCompletion,
+    Choices,
+    FunctionCall,
+    Messages,
+    MessagesRole,
+    Usage,
+)
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.recipe_search import RecipeSearchService
+from vkuswill_bot.services.recipe_store import RecipeStore
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+_DISHES = ["омлет", "борщ", "плов", "сырники", "паста карбонара", "оливье", "гуляш"]
+
+# Ингредиенты повторяются между блюдами — как в реальном меню на неделю
+_PANTRY = [
+    ("лук репчатый", 150, "г"),
+    ("морковь", 200, "г"),
+    ("яйца куриные", 3, "шт"),
+    ("молоко", 200, "мл"),
+    ("масло сливочное", 30, "г"),
+    ("картофель", 400, "г"),
+    ("говядина", 500, "г"),
+    ("рис", 300, "г"),
+    ("творог", 400, "г"),
+    ("сыр твёрдый", 100, "г"),
+    ("сметана", 150, "г"),
+    ("свёкла", 300, "г"),
+]
+
+
+@dataclass
+class _Counters:
+    steps: int = 0
+    extractions: int = 0
+    mcp_calls: int = 0
+    history_chars: int = 0
+
+
+def _response(content: str = "", call: tuple[str, dict] | None = None) -> ChatCompletion:
+    message = Messages(role=MessagesRole.ASSISTANT, content=content)
+    if call is not None:
+        message.function_call = FunctionCall(name=call[0], arguments=call[1])
+    return ChatCompletion(
+        choices=[
+            Choices(
+                message=message,
+                index=0,
+                finish_reason="function_call" if call else "stop",
+            )
+        ],
+        created=0,
+        model="GigaChat",
+        usage=Usage(prompt_tokens=0, completion_tokens=0, total_tokens=0),
+        object="chat.completion",
+    )
+
+
+def _recipe(dish: str) -> list[dict]:
+    """Детерминированный рецепт блюда: 6 продуктов общей «кладовой» (у блюд разные наборы)."""
+    start = _DISHES.index(dish) * 5
+    return [
+        {"name": name, "quantity": qty, "unit": unit, "search_query": name}
+        for name, qty, unit in (_PANTRY[(start + i) % len(_PANTRY)] for i in range(6))
+    ]
+
+
+def _script(mode: str, dishes: list[str]) -> list:
+    """Шаги модели: (имя функции, args | callable(последний результат)) или текст."""
+    if mode == "plan":
+        steps: list = [("recipes_plan", {"dishes": [{"dish": d, "servings": 2} for d in dishes]})]
+    else:
+        steps = []
+        for dish in dishes:
+            steps.append(("recipe_ingredients", {"dish": dish, "servings": 2}))
+            steps.append(
+                ("recipe_search", lambda last: {"ingredients": json.loads(last)["ingredients"]})
+            )
+    steps.append(("vkusvill_cart_link_create", {"products": [{"xml_id": 1, "q": 1}]}))
+    steps.append("Готово: корзина по плану питания")
+    return steps
+
+
+def _make_llm(script: list, counters: _Counters, base: float, per_kchar: float):
+    def chat(request: Chat) -> ChatCompletion:
+        chars = sum(len(m.content or "") for m in request.messages)
+        time.sleep(base + per_kchar * chars / 1000)
+        if len(request.messages) == 1:
+            # Отдельный вызов извлечения рецепта (RecipeService)
+            counters.extractions += 1
+            dish = next(d for d in _DISHES if f"«{d}»" in request.messages[0].content)
+            return _response(json.dumps(_recipe(dish), ensure_ascii=False))
+
+        counters.history_chars += chars
+        step = script[counters.steps]
+        counters.steps += 1
+        if isinstance(step, str):
+            return _response(step)
+        name, args = step
+        if callable(args):
+            args = args(request.messages[-1].content)
+        return _response(call=(name, args))
+
+    return chat
+
+
+def _make_mcp(counters: _Counters, latency: float) -> AsyncMock:
+    async def call_tool(name: str, args: dict) -> str:
+        counters.mcp_calls += 1
+        await asyncio.sleep(latency)
+        if name == "vkusvill_cart_link_create":
+            return json.dumps({"ok": True, "data": {"link": "https://vkusvill.ru/?share_basket=1"}})
+        item = {"xml_id": 1, "name": args["q"], "price": {"current": 100}, "unit": "шт"}
+        return json.dumps(
+            {"ok": True, "data": {"meta": {"q": args["q"]}, "items": [item]}},
+            ensure_ascii=False,
+        )
+
+    mcp = AsyncMock()
+    mcp.get_tools.return_value = [
+        {"name": "vkusvill_products_search", "description": "Поиск", "parameters": {}},
+        {"name": "vkusvill_cart_link_create", "description": "Корзина", "parameters": {}},
+    ]
+    mcp.call_tool = AsyncMock(side_effect=call_tool)
+    return mcp
+
+
+async def _run(mode: str, n: int, args: argparse.Namespace) -> tuple[_Counters, float]:
+    counters = _Counters()
+    mcp = _make_mcp(counters, args.mcp_latency)
+    search_processor = SearchProcessor()
+    executor = ToolExecutor(
+        mcp_client=mcp,
+        search_processor=search_processor,
+        cart_processor=CartProcessor(search_processor.price_cache),
+        recipe_search_service=RecipeSearchService(mcp, search_processor),
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RecipeStore(os.path.join(tmp, "recipes.db"))
+        service = GigaChatService(
+            credentials="bench",
+            model="GigaChat",
+            scope="GIGACHAT_API_PERS",
+            mcp_client=mcp,
+            recipe_store=store,
+            tool_executor=executor,
+            max_tool_calls=40,
+            max_history=200,
+        )
+        service._client.chat = _make_llm(  # type: ignore[method-assign]
+            _script(mode, _DISHES[:n]), counters, args.llm_latency, args.llm_per_kchar
+        )
+        start = time.perf_counter()
+        await service.process_message(user_id=1, text=f"План питания: {n} блюд")
+        elapsed = time.perf_counter() - start
+        await store.close()
+    return counters, elapsed
+
+
+async def _bench(args: argparse.Namespace) -> None:
+    print("=" * 78)
+    print(
+        f"LLM: {args.llm_latency:.2f} с + {args.llm_per_kchar:.3f} с/1k символов, "
+        f"MCP: {args.mcp_latency:.2f} с"
+    )
+    print(
+        f"{'блюд':>5} {'сценарий':>9} {'шагов LLM':>10} {'извлеч.':>8} "
+        f"{'MCP':>5} {'история, k':>11} {'время, с':>9}"
+    )
+    for n in args.dishes:
+        for mode in ("legacy", "plan"):
+            c, elapsed = await _run(mode, n, args)
+            print(
+                f"{n:>5} {mode:>9} {c.steps:>10} {c.extractions:>8} {c.mcp_calls:>5} "
+                f"{c.history_chars / 1000:>11.1f} {elapsed:>9.2f}"
+            )
+    print("=" * 78)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк recipes_plan")
+    parser.add_argument("--dishes", type=int, nargs="+", default=[3, 5, 7])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="База шага LLM, с")
+    parser.add_argument(
+        "--llm-per-kchar", type=float, default=0.02, help="Надбавка за 1000 символов истории, с"
+    )
+    parser.add_argument("--mcp-latency", type=float, default=0.1, help="Задержка MCP, с")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    if max(args.dishes) > len(_DISHES):
+        parser.error(f"не больше {len(_DISHES)} блюд")
+    asyncio.run(_bench(args))
+
+
+if __name__ == "__main__":
+    main()
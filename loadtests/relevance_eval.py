@@ -0,0 +1,149 @@
+"""Оценка проверки релевантности поиска на размеченном наборе.
+
+Сравнивает прежнюю проверку (подстрока в названиях) с морфологической
+(``SearchProcessor.check_relevance``):
+
+- false warning rate: доля релевантных выдач, на которые выдан relevance_warning;
+- missed warning rate: доля нерелевантных выдач без предупреждения;
+- сэкономленные шаги LLM: каждое ложное предупреждение — лишний уточняющий
+  ход GigaChat (модель спрашивает «подойдёт ли альтернатива?»).
+
+Формат внешней разметки (JSONL):
+    {"q": "яйца", "names": ["Яйцо куриное С0"], "relevant": true}
+
+Использование:
+    uv run python loadtests/relevance_eval.py
+    uv run python loadtests/relevance_eval.py --labels labelled.jsonl --time
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from vkuswill_bot.services.search_processor import (
+    _MIN_RELEVANCE_WORD_LEN,
+    _STOP_WORDS,
+    SearchProcessor,
+)
+
+# (запрос, названия товаров в выдаче, выдача релевантна запросу)
+LABELLED: list[tuple[str, list[str], bool]] = [
+    ("яйца", ["Яйцо куриное С0, 10 шт", "Яйцо перепелиное"], True),
+    ("курицы", ["Курица тушка охл.", "Филе курицы"], True),
+    ("курица", ["Курица тушка охл."], True),
+    ("куриное филе", ["Филе куриное охл.", "Филе бедра"], True),
+    ("помидоры черри", ["Томаты черри красные"], False),
+    ("томаты черри", ["Томаты черри красные"], True),
+    ("огурцов", ["Огурцы короткоплодные"], True),
+    ("молока", ["Молоко 3,2%", "Молоко безлактозное"], True),
+    ("сметаны", ["Сметана 15%"], True),
+    ("сыра", ["Сыр Российский", "Сыр Гауда"], True),
+    ("яблок", ["Яблоки Гренни Смит"], True),
+    ("бананов", ["Бананы"], True),
+    ("говядины", ["Говядина тушеная", "Стейк из говядины"], True),
+    ("свиной фарш", ["Фарш свиной охл."], True),
+    ("гречки", ["Крупа гречневая ядрица", "Гречка зеленая"], True),
+    ("шоколад", ["Батончик шоколадный", "Шоколад горький 72%"], True),
+    ("творожный сыр", ["Сыр творожный сливочный"], True),
+    ("сливочного масла", ["Масло сливочное 82,5%"], True),
+    ("зелёного лука", ["Лук зеленый", "Лук репчатый"], True),
+    ("картошки", ["Картофель молодой"], False),
+    ("картофеля", ["Картофель молодой"], True),
+    ("моркови", ["Морковь мытая"], True),
+    ("стейк вагю", ["Стейк Мачете из мраморной говядины", "Форель стейк"], False),
+    ("фуа-гра", ["Печень куриная охл."], False),
+    ("трюфельное масло", ["Масло оливковое"], False),
+    ("кокосовое молоко", ["Молоко 3,2%", "Молоко овсяное"], False),
+    ("хамон", ["Колбаса сырокопченая", "Ветчина"], False),
+    ("авокадо", ["Авокадо Хасс"], True),
+    ("киноа", ["Рис басмати", "Булгур"], False),
+    ("йогуртов", ["Йогурт греческий 2%"], True),
+    ("пельменей", ["Пельмени домашние"], True),
+    ("сосисок", ["Сосиски молочные"], True),
+    ("апельсиновый сок", ["Сок апельсиновый 1 л"], True),
+    ("ряженки", ["Ряженка 4%"], True),
+    ("кефира", ["Кефир 2,5%"], True),
+    ("лосося", ["Лосось слабосоленый", "Стейк лосося"], True),
+]
+
+
+def _legacy_check(query: str, names: list[str]) -> list[str]:
+    """Прежняя проверка: слово запроса как подстрока объединённых названий."""
+    words = [
+        w.lower()
+        for w in query.split()
+        if len(w) >= _MIN_RELEVANCE_WORD_LEN and w.lower() not in _STOP_WORDS
+    ]
+    all_names = " ".join(n.lower() for n in names)
+    return [w for w in words if w not in all_names]
+
+
+def _morph_check(query: str, names: list[str]) -> list[str]:
+    return SearchProcessor.check_relevance(query, [{"name": n} for n in names])
+
+
+def _evaluate(check, labelled: list[tuple[str, list[str], bool]]) -> dict:
+    false_warn = missed = relevant = irrelevant = 0
+    for query, names, is_relevant in labelled:
+        warned = bool(check(query, names))
+        if is_relevant:
+            relevant += 1
+            false_warn += warned
+        else:
+            irrelevant += 1
+            missed += not warned
+    return {
+        "false_warnings": false_warn,
+        "false_warning_rate": false_warn / relevant if relevant else 0.0,
+        "missed_warnings": missed,
+        "missed_warning_rate": missed / irrelevant if irrelevant else 0.0,
+    }
+
+
+def _load_labels(path: str) -> list[tuple[str, list[str], bool]]:
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                rows.append((row["q"], list(row["names"]), bool(row["relevant"])))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Оценка проверки релевантности")
+    parser.add_argument("--labels", help="JSONL с разметкой (по умолчанию — встроенный набор)")
+    parser.add_argument("--time", action="store_true", help="Замерить время проверки")
+    args = parser.parse_args()
+
+    labelled = _load_labels(args.labels) if args.labels else LABELLED
+    legacy = _evaluate(_legacy_check, labelled)
+    morph = _evaluate(_morph_check, labelled)
+
+    print("=" * 60)
+    print(f"Размеченных выдач: {len(labelled)}")
+    for title, res in (("Подстрока (прежняя)", legacy), ("Морфология", morph)):
+        print(
+            f"{title:20s} false warnings: {res['false_warnings']} "
+            f"({res['false_warning_rate']:.1%}), missed: {res['missed_warnings']} "
+            f"({res['missed_warning_rate']:.1%})"
+        )
+    saved = legacy["false_warnings"] - morph["false_warnings"]
+    print(f"Сэкономлено уточняющих шагов LLM: {saved} на {len(labelled)} поисков")
+
+    if args.time:
+        for title, check in (("Подстрока", _legacy_check), ("Морфология", _morph_check)):
+            start = time.perf_counter()
+            rounds = 200
+            for _ in range(rounds):
+                for query, names, _ in labelled:
+                    check(query, names)
+            per_call = (time.perf_counter() - start) / (rounds * len(labelled)) * 1e6
+            print(f"{title:20s} {per_call:.1f} мкс на проверку (с прогретым LRU)")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,39 @@
 Стреляет напрямую в GigaChatService.process_message(), минуя Telegram.
 Находит реальные узкие места: GigaChat API, MCP, Redis, корзина.
 
+Считает и шаги GigaChat (вызовы LLM) на сообщение — основную составляющую
+латентности. Сценарий ``--lists`` шлёт только списки покупок; с ``--no-batch``
+у модели нет products_search_batch — так сравнивается число шагов на корзину.
+
+Офлайн-режим: ``--cassette PATH --record`` записывает обмены с живыми
+GigaChat и MCP в кассету (loadtests/cassette.py), ``--cassette PATH`` без
+``--record`` воспроизводит их без сети — с исходными задержками или
+масштабированными (``--latency-scale``). Запросы пользователей выбираются
+детерминированно по ``--seed``, поэтому повтор с теми же параметрами
+совпадает с записью.
+
 Использование:
     uv run python loadtests/service_load_test.py --users 50 --messages 100 --rps 10
     uv run python loadtests/service_load_test.py --users 200 --burst
+    uv run python loadtests/service_load_test.py --users 10 --messages 3 --lists
+    uv run python loadtests/service_load_test.py --users 10 --messages 3 --lists --no-batch
+    uv run python loadtests/service_load_test.py --users 10 --burst --cassette c.json --record
+    uv run python loadtests/service_load_test.py --users 10 --burst --cassette c.json
+    uv run python loadtests/service_load_test.py --users 500 --burst --stubs
+
+``--stubs`` поднимает заглушки MCP и GigaChat (loadtests/stub_backends.py)
+в отдельном потоке и направляет на них сервис — нагрузка без живых API;
+задержки и ошибки — ``--mcp-latency``, ``--gigachat-latency``,
+``--mcp-errors``, ``--gigachat-errors``.
 """
 
 from __future__ import annotations
 
 import argparse
 import asyncio
+import contextvars
 import logging
+import os
 import random
 import statistics
 import sys
@@ -20,6 +43,9 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 
+from cassette import MISS_POLICIES, Cassette
+from stub_backends import StubBackends, add_behaviour_args, backends_from_args
+
 # ---------------------------------------------------------------------------
 # Типичные запросы пользователей (имитация реальных сценариев)
 # ---------------------------------------------------------------------------
@@ -51,6 +77,15 @@ FOLLOWUP_QUERIES = [
     "А есть со скидкой?",
 ]
 
+# Списки покупок: цель products_search_batch — меньше шагов LLM на корзину
+LIST_QUERIES = [
+    "Собери корзину: молоко, хлеб, сыр и масло",
+    "Купи яйца, сметану, творог и бананы",
+    "Нужны гречка, рис, макароны, томатная паста",
+    "молоко, кефир, йогурт, сливки, ряженка",
+    "Закажи курицу, картофель, лук, морковь и чеснок",
+]
+
 SIMPLE_QUERIES = [
     "Привет!",
     "Спасибо!",
@@ -69,6 +104,7 @@ class RequestResult:
     success: bool
     error: str = ""
     response_length: int = 0
+    steps: int = 0
 
 
 @dataclass
@@ -79,6 +115,7 @@ class LoadTestReport:
     successful: int = 0
     failed: int = 0
     latencies_ms: list[float] = field(default_factory=list)
+    steps: list[int] = field(default_factory=list)
     errors: dict[str, int] = field(default_factory=dict)
     start_time: float = 0.0
     end_time: float = 0.0
@@ -128,6 +165,7 @@ class LoadTestReport:
         if result.success:
             self.successful += 1
             self.latencies_ms.append(result.latency_ms)
+            self.steps.append(result.steps)
         else:
             self.failed += 1
             err_key = result.error[:80]
@@ -153,6 +191,11 @@ class LoadTestReport:
             print(f"    среднее:           {statistics.mean(self.latencies_ms):.0f}")
             if len(self.latencies_ms) > 1:
                 print(f"    std dev:           {statistics.stdev(self.latencies_ms):.0f}")
+        if self.steps:
+            print()
+            print("  Шаги GigaChat на сообщение:")
+            print(f"    среднее:           {statistics.mean(self.steps):.2f}")
+            print(f"    max:               {max(self.steps)}")
         if self.errors:
             print()
             print("  Ошибки:")
@@ -161,8 +204,31 @@ class LoadTestReport:
         print("=" * 70)
 
 
-async def create_gigachat_service():
-    """Инициализация GigaChatService с реальными зависимостями."""
+# Счётчик вызовов GigaChat текущего сообщения (у каждого пользователя своя задача)
+_steps: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("steps", default=None)
+
+
+def count_gigachat_steps(service) -> None:
+    """Обернуть вызов GigaChat счётчиком шагов."""
+    original = service._call_gigachat_with_fc
+
+    async def counted(*args, **kwargs):
+        counter = _steps.get()
+        if counter is not None:
+            counter[0] += 1
+        return await original(*args, **kwargs)
+
+    service._call_gigachat_with_fc = counted
+
+
+async def disable_batch_search(service) -> None:
+    """Убрать products_search_batch из инструментов модели (базовая линия)."""
+    functions = await service._get_functions()
+    service._functions = [f for f in functions if f["name"] != "products_search_batch"]
+
+
+async def create_gigachat_service(cassette: Cassette | None = None):
+    """Инициализация GigaChatService с реальными зависимостями (или кассетой)."""
     from vkuswill_bot.config import config
     from vkuswill_bot.services.cart_processor import CartProcessor
     from vkuswill_bot.services.dialog_manager import DialogManager
@@ -227,6 +293,9 @@ async def create_gigachat_service():
         gigachat_max_concurrent=config.gigachat_max_concurrent,
     )
 
+    if cassette is not None:
+        cassette.attach(service, mcp_client)
+
     # Предзагрузка инструментов
     try:
         await mcp_client.get_tools()
@@ -236,20 +305,22 @@ async def create_gigachat_service():
     return service, redis_client
 
 
-def pick_query(message_idx: int) -> str:
+def pick_query(message_idx: int, lists_only: bool = False, rng: random.Random = random) -> str:
     """Выбрать запрос в зависимости от номера сообщения."""
+    if lists_only:
+        return rng.choice(LIST_QUERIES)
     if message_idx == 0:
         # Первое сообщение — поисковый запрос
-        return random.choice(SEARCH_QUERIES)
-    elif random.random() < 0.7:
+        return rng.choice(SEARCH_QUERIES)
+    elif rng.random() < 0.7:
         # 70% — follow-up
-        return random.choice(FOLLOWUP_QUERIES)
-    elif random.random() < 0.5:
+        return rng.choice(FOLLOWUP_QUERIES)
+    elif rng.random() < 0.5:
         # 15% — новый поиск
-        return random.choice(SEARCH_QUERIES)
+        return rng.choice(SEARCH_QUERIES)
     else:
         # 15% — простые сообщения
-        return random.choice(SIMPLE_QUERIES)
+        return rng.choice(SIMPLE_QUERIES)
 
 
 async def simulate_user(
@@ -259,10 +330,19 @@ async def simulate_user(
     report: LoadTestReport,
     rps_limiter: asyncio.Semaphore | None,
     delay_between_messages: float = 0.0,
+    lists_only: bool = False,
+    seed: int | None = None,
 ) -> None:
-    """Симуляция одного пользователя: отправка серии сообщений."""
+    """Симуляция одного пользователя: отправка серии сообщений.
+
+    С ``seed`` у пользователя свой генератор — последовательность запросов
+    не зависит от того, в каком порядке отвечают другие пользователи.
+    """
+    rng = random.Random(seed + user_id) if seed is not None else random  # noqa: S311
     for i in range(num_messages):
-        query = pick_query(i)
+        query = pick_query(i, lists_only, rng)
+        counter = [0]
+        _steps.set(counter)
 
         if rps_limiter:
             await rps_limiter.acquire()
@@ -277,6 +357,7 @@ async def simulate_user(
                 latency_ms=latency_ms,
                 success=True,
                 response_length=len(response),
+                steps=counter[0],
             )
         except Exception as e:
             latency_ms = (time.monotonic() - start) * 1000
@@ -293,7 +374,7 @@ async def simulate_user(
         status = "✓" if result.success else "✗"
         print(
             f"  {status} user={user_id} msg={i+1}/{num_messages} "
-            f"latency={result.latency_ms:.0f}ms "
+            f"latency={result.latency_ms:.0f}ms steps={result.steps} "
             f"query=\"{query[:40]}...\"",
         )
 
@@ -318,6 +399,11 @@ async def run_load_test(
     messages_per_user: int,
     target_rps: float,
     burst: bool,
+    lists_only: bool = False,
+    no_batch: bool = False,
+    cassette: Cassette | None = None,
+    seed: int | None = None,
+    stubs: StubBackends | None = None,
 ) -> None:
     """Основная функция нагрузочного тестирования."""
     total_messages = num_users * messages_per_user
@@ -329,11 +415,22 @@ async def run_load_test(
     print(f"  Сообщений на пользователя: {messages_per_user}")
     print(f"  Всего сообщений:           {total_messages}")
     print(f"  Целевой RPS:               {'burst (без лимита)' if burst else target_rps}")
+    if cassette is not None:
+        mode = "запись" if cassette.recording else (
+            f"воспроизведение, задержки ×{cassette.latency_scale}, "
+            f"промах: {cassette.miss_policy}"
+        )
+        print(f"  Кассета:                   {cassette.path} ({mode})")
+    if stubs is not None:
+        print(f"  Заглушки MCP/GigaChat:     {stubs.base_url}")
     print("=" * 70)
     print()
 
     print("Инициализация сервисов...")
-    service, redis_client = await create_gigachat_service()
+    service, redis_client = await create_gigachat_service(cassette)
+    count_gigachat_steps(service)
+    if no_batch:
+        await disable_batch_search(service)
     print("✓ Сервисы инициализированы\n")
 
     report = LoadTestReport()
@@ -362,6 +459,8 @@ async def run_load_test(
             report=report,
             rps_limiter=rps_limiter,
             delay_between_messages=0.5 if not burst else 0.0,
+            lists_only=lists_only,
+            seed=seed,
         )
         for uid in user_ids
     ]
@@ -386,6 +485,12 @@ async def run_load_test(
         await close_redis_client(redis_client)
 
     report.print_report()
+    if cassette is not None:
+        if cassette.recording:
+            cassette.save()
+        print(f"  Кассета: {dict(cassette.stats)}")
+    if stubs is not None:
+        print(f"  Заглушки: {stubs.stats()}")
 
 
 def main() -> None:
@@ -408,6 +513,39 @@ def main() -> None:
         "--burst", action="store_true",
         help="Burst-режим: все запросы без ограничения RPS",
     )
+    parser.add_argument(
+        "--lists", action="store_true",
+        help="Только списки покупок (замер шагов GigaChat на корзину)",
+    )
+    parser.add_argument(
+        "--no-batch", action="store_true",
+        help="Без products_search_batch (базовая линия для сравнения шагов)",
+    )
+    parser.add_argument(
+        "--cassette",
+        help="Файл кассеты GigaChat/MCP: воспроизведение без сети (или запись с --record)",
+    )
+    parser.add_argument(
+        "--record", action="store_true",
+        help="Записать обмены с живыми GigaChat и MCP в --cassette",
+    )
+    parser.add_argument(
+        "--miss-policy", choices=MISS_POLICIES, default="error",
+        help="Запроса нет в кассете: error — ошибка, stub — заглушка, live — живой API",
+    )
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0,
+        help="Множитель записанных задержек при воспроизведении (0 — без задержек)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Детерминированный выбор запросов (по умолчанию 42 с --cassette)",
+    )
+    parser.add_argument(
+        "--stubs", action="store_true",
+        help="Заглушки MCP и GigaChat вместо живых API (loadtests/stub_backends.py)",
+    )
+    add_behaviour_args(parser)
     parser.add_argument(
         "--verbose", "-v", action="store_true",
         help="Подробное логирование",
@@ -424,12 +562,40 @@ def main() -> None:
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("httpcore").setLevel(logging.WARNING)
 
+    if args.stubs and args.cassette and not args.record:
+        parser.error("--stubs и воспроизведение --cassette несовместимы")
+    stubs = None
+    if args.stubs:
+        stubs = backends_from_args(args)
+        stubs.start_in_thread()
+        # config и SDK gigachat читают окружение при создании сервиса
+        os.environ.update(stubs.env())
+
+    cassette = None
+    seed = args.seed
+    if args.cassette:
+        if args.record:
+            cassette = Cassette(args.cassette, recording=True)
+        else:
+            cassette = Cassette.load(
+                args.cassette,
+                miss_policy=args.miss_policy,
+                latency_scale=args.latency_scale,
+            )
+        if seed is None:
+            seed = 42
+
     asyncio.run(
         run_load_test(
             num_users=args.users,
             messages_per_user=args.messages,
             target_rps=args.rps,
             burst=args.burst,
+            lists_only=args.lists,
+            no_batch=args.no_batch,
+            cassette=cassette,
+            seed=seed,
+            stubs=stubs,
         ),
     )
 
@@ -0,0 +1,783 @@
+"""Локальные заглушки внешних API бота: MCP ВкусВилл, GigaChat, Telegram Bot API.
+
+Нагрузка в 10× от продовой на живые GigaChat и MCP стоит денег и бьёт по
+ВкусВиллу. Заглушки поднимают все три API на одном локальном порту:
+
+- ``/mcp`` — MCP-сервер по тому же протоколу, что ждёт VkusvillMCPClient:
+  JSON-RPC (initialize, notifications/initialized, tools/list, tools/call),
+  сессия в заголовке ``mcp-session-id``, ответы SSE (``--no-sse`` — JSON).
+  Инструменты ``vkusvill_products_search``, ``vkusvill_product_details`` и
+  ``vkusvill_cart_link_create`` работают по синтетическому каталогу;
+- ``/api/v2/oauth`` и ``/api/v1/chat/completions`` — симулятор GigaChat
+  для SDK ``gigachat``: по истории диалога отвечает вызовами функций, как
+  модель в типовых сценариях (поиск → корзина → ответ, список покупок
+  одним ``products_search_batch``, болтовня — сразу текстом);
+- ``/bot<token>/<method>`` — Telegram Bot API для webhook-режима бота.
+
+Задержки и ошибки задаются распределениями:
+
+- задержка: ``0``, ``fixed:0.2``, ``uniform:0.1:0.5``,
+  ``lognormal:МЕДИАНА:P95`` (секунды);
+- ошибки: ``429:0.02,500:0.005`` — HTTP-статус и его вероятность.
+
+Бот направляется на заглушки переменными окружения (их печатает запуск):
+``MCP_SERVER_URL``, ``GIGACHAT_BASE_URL``/``GIGACHAT_AUTH_URL`` (читает
+SDK gigachat), ``TELEGRAM_API_SERVER``.
+
+Использование:
+    uv run python loadtests/stub_backends.py --port 8765
+    uv run python loadtests/stub_backends.py --gigachat-latency lognormal:1.5:4 \\
+        --gigachat-errors 429:0.02 --mcp-latency lognormal:0.2:0.8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+MCP_PROTOCOL_VERSION = "2025-03-26"
+
+# Шагов вызова функций на одно сообщение, после которых симулятор отвечает текстом
+MAX_SCRIPT_STEPS = 8
+
+# Слов в поисковом запросе из позиции списка
+MAX_QUERY_WORDS = 3
+
+# Синтетический каталог: база названия → варианты
+_CATALOG_BASE: dict[str, list[str]] = {
+    "Молоко": ["3,2%", "2,5%", "безлактозное 1,5%", "ультрапастеризованное 3,2%", "овсяное"],
+    "Хлеб": ["бородинский", "цельнозерновой", "безглютеновый", "тостовый"],
+    "Сыр": ["российский", "гауда", "моцарелла", "пармезан", "творожный"],
+    "Масло сливочное": ["82,5%", "72,5%"],
+    "Яйца куриные": ["С0, 10 шт", "С1, 10 шт"],
+    "Сметана": ["15%", "20%"],
+    "Творог": ["5%", "9%", "обезжиренный"],
+    "Кефир": ["1%", "3,2%"],
+    "Йогурт": ["греческий", "питьевой клубничный", "натуральный"],
+    "Сливки": ["10%", "33%"],
+    "Ряженка": ["4%"],
+    "Бананы": ["весовые"],
+    "Яблоки": ["гала", "голден", "зелёные"],
+    "Апельсины": ["весовые"],
+    "Сок": ["апельсиновый", "яблочный", "томатный"],
+    "Гречка": ["ядрица", "зелёная"],
+    "Рис": ["басмати", "круглозёрный", "жасмин"],
+    "Макароны": ["спагетти", "пенне", "фузилли"],
+    "Паста томатная": ["в банке"],
+    "Курица": ["филе грудки", "бедро", "тушка"],
+    "Картофель": ["молодой", "мытый"],
+    "Лук": ["репчатый", "красный"],
+    "Морковь": ["мытая"],
+    "Чеснок": ["молодой"],
+    "Помидоры": ["черри", "розовые"],
+    "Огурцы": ["среднеплодные", "короткоплодные"],
+    "Салат": ["айсберг", "романо", "Цезарь с курицей"],
+    "Кофе": ["в зёрнах", "молотый", "растворимый"],
+    "Чай": ["чёрный", "зелёный"],
+    "Батончик протеиновый": ["шоколадный", "ореховый"],
+    "Пюре детское": ["яблочное", "грушевое"],
+    "Шоколад": ["горький 70%", "молочный"],
+    "Лосось": ["филе охлаждённое", "слабосолёный"],
+    "Бекон": ["сырокопчёный"],
+    "Тофу": ["классический"],
+    "Хумус": ["классический"],
+    "Вода": ["негазированная 1,5 л"],
+}
+
+_WORD_RE = re.compile(r"[а-яёa-z0-9]+")
+
+# Начальные фразы сообщений пользователя перед перечнем товаров
+_LEAD_RE = re.compile(
+    r"^(собери корзину|хочу купить|хочу заказать|купи|закажи|нужны|нужно|найди|"
+    r"подбери|добавь ещё|добавь|покажи|есть ли|что есть из)[:\s]*"
+)
+_SPLIT_RE = re.compile(r",|\sи\s")
+_SEARCH_TOOLS = ("vkusvill_products_search", "products_search_batch")
+
+# Служебные сообщения бота с ролью user («[Системная подсказка] ...»)
+SYSTEM_HINT_PREFIX = "["
+
+_SMALL_TALK_RE = re.compile(r"привет|спасибо|умеешь|помощ|сколько|подешевле|скидк|убери")
+
+
+# ---------------------------------------------------------------------------
+# Распределения задержек и ошибок
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Latency:
+    """Распределение задержки ответа (секунды)."""
+
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> Latency:
+        """``0`` | ``fixed:S`` | ``uniform:MIN:MAX`` | ``lognormal:MEDIAN:P95``."""
+        parts = spec.split(":")
+        try:
+            if len(parts) == 1:
+                return cls("fixed", float(parts[0]))
+            kind, *values = parts
+            numbers = [float(v) for v in values]
+        except ValueError:
+            raise ValueError(f"Некорректная задержка: {spec!r}") from None
+        if kind == "fixed" and len(numbers) == 1:
+            return cls(kind, numbers[0])
+        if kind in ("uniform", "lognormal") and len(numbers) == 2:
+            return cls(kind, *numbers)
+        raise ValueError(f"Некорректная задержка: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal" and self.a > 0:
+            # P95 = медиана · e^(1.645σ)
+            sigma = math.log(max(self.b, self.a) / self.a) / 1.645
+            return rng.lognormvariate(math.log(self.a), sigma)
+        return self.a
+
+
+def parse_errors(spec: str) -> dict[int, float]:
+    """``429:0.02,500:0.005`` → {HTTP-статус: вероятность}."""
+    errors: dict[int, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        status, _, probability = part.partition(":")
+        try:
+            errors[int(status)] = float(probability)
+        except ValueError:
+            raise ValueError(f"Некорректная ошибка: {part!r}") from None
+    if sum(errors.values()) > 1:
+        raise ValueError(f"Сумма вероятностей ошибок больше 1: {spec!r}")
+    return errors
+
+
+@dataclass
+class Behaviour:
+    """Задержка и ошибки одного API."""
+
+    latency: Latency = field(default_factory=Latency)
+    errors: dict[int, float] = field(default_factory=dict)
+
+    def fault(self, rng: random.Random) -> int | None:
+        """HTTP-статус ошибки или None."""
+        roll = rng.random()
+        for status, probability in self.errors.items():
+            if roll < probability:
+                return status
+            roll -= probability
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Синтетический каталог
+# ---------------------------------------------------------------------------
+
+
+def _stem(word: str) -> str:
+    return word[:5]
+
+
+class SyntheticCatalog:
+    """Товары с ценами и весом; поиск — совпадение основ слов названия."""
+
+    def __init__(self, size: int = 500, seed: int = 1) -> None:
+        rng = random.Random(seed)  # noqa: S311 — синтетика, не криптография
+        variants = [
+            f"{base} {variant}" for base, items in _CATALOG_BASE.items() for variant in items
+        ]
+        self.products: dict[int, dict[str, Any]] = {}
+        for i in range(max(size, len(variants))):
+            name = variants[i % len(variants)]
+            if i >= len(variants):
+                name = f"{name}, фасовка {i // len(variants) + 1}"
+            xml_id = 10_000 + i
+            price = round(rng.uniform(39, 899))
+            weighted = rng.random() < 0.2
+            self.products[xml_id] = {
+                "xml_id": xml_id,
+                "name": name,
+                "price": {
+                    "current": price,
+                    "old": round(price * 1.2) if rng.random() < 0.3 else None,
+                },
+                "unit": "кг" if weighted else "шт",
+                "weight": {
+                    "value": 1 if weighted else rng.choice([200, 500, 900]),
+                    "unit": "кг" if weighted else "г",
+                },
+                "rating": round(rng.uniform(4.0, 5.0), 1),
+                "description": f"{name}. Синтетический товар для нагрузочного теста.",
+                "composition": "Состав: "
+                + ", ".join(rng.sample(["молоко", "соль", "сахар", "мука", "вода", "масло"], 3)),
+                "nutrition": {
+                    "kcal": round(rng.uniform(20, 550)),
+                    "protein": round(rng.uniform(0, 30), 1),
+                },
+                "images": [f"https://img.example/{xml_id}.jpg"],
+                "url": f"https://vkusvill.example/goods/{xml_id}.html",
+            }
+        self._stems = {
+            xml_id: {_stem(w) for w in _WORD_RE.findall(p["name"].lower())}
+            for xml_id, p in self.products.items()
+        }
+
+    def search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
+        terms = {_stem(w) for w in _WORD_RE.findall(query.lower()) if len(w) > 2}
+        scored = [
+            (len(terms & stems), xml_id) for xml_id, stems in self._stems.items() if terms & stems
+        ]
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [self._card(self.products[xml_id]) for _, xml_id in scored[:limit]]
+
+    @staticmethod
+    def _card(product: dict[str, Any]) -> dict[str, Any]:
+        keys = ("xml_id", "name", "price", "unit", "weight", "rating", "images", "url")
+        return {k: product[k] for k in keys}
+
+
+# ---------------------------------------------------------------------------
+# MCP
+# ---------------------------------------------------------------------------
+
+MCP_TOOLS = [
+    {
+        "name": "vkusvill_products_search",
+        "description": "Поиск товаров ВкусВилл по запросу",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "q": {"type": "string", "description": "Поисковый запрос"},
+                "limit": {"type": "integer"},
+            },
+            "required": ["q"],
+        },
+    },
+    {
+        "name": "vkusvill_product_details",
+        "description": "Подробная информация о товаре: состав, КБЖУ",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"xml_id": {"type": "integer"}},
+            "required": ["xml_id"],
+        },
+    },
+    {
+        "name": "vkusvill_cart_link_create",
+        "description": "Создать ссылку на корзину",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "products": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {"xml_id": {"type": "integer"}, "q": {"type": "number"}},
+                        "required": ["xml_id"],
+                    },
+                }
+            },
+            "required": ["products"],
+        },
+    },
+]
+
+
+class StubMCP:
+    """MCP-сервер по протоколу Streamable HTTP над синтетическим каталогом."""
+
+    def __init__(
+        self,
+        catalog: SyntheticCatalog,
+        behaviour: Behaviour,
+        rng: random.Random,
+        sse: bool = True,
+    ) -> None:
+        self._catalog = catalog
+        self._behaviour = behaviour
+        self._rng = rng
+        self._sse = sse
+        self._sessions: set[str] = set()
+        self.stats: Counter[str] = Counter()
+
+    def _reply(self, payload: dict, headers: dict[str, str] | None = None) -> web.Response:
+        if self._sse:
+            body = f"event: message\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            return web.Response(text=body, content_type="text/event-stream", headers=headers)
+        return web.json_response(payload, headers=headers, dumps=_dumps)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        message = await request.json()
+        method = message.get("method", "")
+        self.stats[method] += 1
+        if "id" not in message:
+            return web.Response(status=202)
+        if method == "initialize":
+            session = uuid.uuid4().hex
+            self._sessions.add(session)
+            result = {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "vkusvill-stub", "version": "1.0"},
+            }
+            return self._reply(_rpc_result(message, result), {"mcp-session-id": session})
+        if request.headers.get("mcp-session-id") not in self._sessions:
+            self.stats["unknown_session"] += 1
+            return web.Response(status=404, text="Session not found")
+        if method == "tools/list":
+            return self._reply(_rpc_result(message, {"tools": MCP_TOOLS}))
+        if method != "tools/call":
+            return self._reply(
+                {
+                    "jsonrpc": "2.0",
+                    "id": message["id"],
+                    "error": {"code": -32601, "message": method},
+                }
+            )
+
+        await asyncio.sleep(self._behaviour.latency.sample(self._rng))
+        status = self._behaviour.fault(self._rng)
+        if status is not None:
+            self.stats[f"error_{status}"] += 1
+            return web.Response(status=status, text="stub fault")
+        params = message.get("params", {})
+        name = params.get("name", "")
+        self.stats[name] += 1
+        text = json.dumps(self.call(name, params.get("arguments") or {}), ensure_ascii=False)
+        return self._reply(_rpc_result(message, {"content": [{"type": "text", "text": text}]}))
+
+    def call(self, name: str, args: dict) -> dict:
+        """Ответ инструмента в формате MCP ВкусВилл."""
+        if name == "vkusvill_products_search":
+            query = str(args.get("q", ""))
+            items = self._catalog.search(query, int(args.get("limit") or 5))
+            return {"ok": True, "data": {"meta": {"q": query, "total": len(items)}, "items": items}}
+        if name == "vkusvill_product_details":
+            product = self._catalog.products.get(_int(args.get("xml_id")))
+            if product is None:
+                return {"ok": False, "error": "Товар не найден"}
+            return {"ok": True, "data": product}
+        if name == "vkusvill_cart_link_create":
+            products = args.get("products") or []
+            ids = [_int(p.get("xml_id")) for p in products if isinstance(p, dict)]
+            known = [x for x in ids if x in self._catalog.products]
+            if not known:
+                return {"ok": False, "error": "Нет товаров для корзины"}
+            share = ",".join(map(str, known))
+            return {"ok": True, "data": {"link": f"https://vkusvill.example/?share_basket={share}"}}
+        return {"ok": False, "error": f"Неизвестный инструмент {name}"}
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _rpc_result(message: dict, result: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": message["id"], "result": result}
+
+
+# ---------------------------------------------------------------------------
+# GigaChat
+# ---------------------------------------------------------------------------
+
+
+def extract_items(text: str) -> list[str]:
+    """Товары из сообщения пользователя: «Купи яйца, сметану и творог» → 3 запроса."""
+    text = text.lower().strip(" !?.")
+    if _SMALL_TALK_RE.search(text):
+        return []
+    if " на " in text and text.startswith("замени"):
+        text = text.split(" на ", 1)[1]
+    text = _LEAD_RE.sub("", text)
+    items = []
+    for part in _SPLIT_RE.split(text):
+        words = _WORD_RE.findall(part)[:MAX_QUERY_WORDS]
+        if words:
+            items.append(" ".join(words))
+    return items
+
+
+def _best_items(content: str) -> list[dict]:
+    """Лучший товар каждого поиска из ответа функции (одиночного или пакетного)."""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(data, dict):
+        return []
+    groups = data.get("results")
+    if not isinstance(groups, list):
+        inner = data.get("data") if isinstance(data.get("data"), dict) else data
+        groups = [{"items": inner.get("items", [])}]
+    best = []
+    for group in groups:
+        items = group.get("items") if isinstance(group, dict) else None
+        if items and isinstance(items[0], dict) and "xml_id" in items[0]:
+            best.append(items[0])
+    return best
+
+
+def _text(content: str) -> dict:
+    return {"role": "assistant", "content": content}
+
+
+def _cart_answer(results: list[dict]) -> dict:
+    """Финальный ответ по последнему созданию корзины — в формате из промпта бота.
+
+    Вступление, позиции из ``price_summary.items``, итог, ссылка и дисклеймер:
+    по длине и разметке как ответ модели, чтобы обработка ответа в боте
+    (санитизация HTML, разбиение на сообщения) нагружалась реалистично.
+    """
+    carts = [m for m in results if m.get("name") == "vkusvill_cart_link_create"]
+    data: dict = {}
+    if carts:
+        with contextlib.suppress(ValueError, TypeError, AttributeError):
+            data = json.loads(carts[-1]["content"]).get("data") or {}
+    link = data.get("link", "")
+    if not link:
+        return _text("Корзину собрать не удалось.")
+    summary = data.get("price_summary") or {}
+    lines = [
+        "Собрал для вас корзину во ВкусВилл! 🛒",
+        "",
+        "<b>Состав корзины:</b>",
+        *(f"• {str(item).strip(' -')}" for item in summary.get("items", [])),
+        "",
+        f"<b>{summary.get('total_text', 'Итого: —')}</b>",
+        "",
+        f'👉 <a href="{link}">Открыть корзину во ВкусВилл</a>',
+        "",
+        "<i>Цены и наличие могут отличаться в зависимости от магазина. "
+        "Перед оплатой проверьте состав корзины.</i>",
+    ]
+    return _text("\n".join(lines))
+
+
+def script_reply(messages: list[dict], functions: list[str]) -> dict:
+    """Следующее сообщение ассистента по истории — как у модели в типовом сценарии.
+
+    Сценарий восстанавливается из хвоста истории после последнего сообщения
+    пользователя, поэтому симулятор не хранит состояние диалогов. Корзина
+    собирается из лучших товаров всех поисков диалога — «добавь ещё»
+    дополняет прошлую корзину.
+    """
+    users = [
+        i
+        for i, m in enumerate(messages)
+        if m.get("role") == "user" and not (m.get("content") or "").startswith(SYSTEM_HINT_PREFIX)
+    ]
+    if not users:
+        return _text("Здравствуйте! Чем помочь?")
+    tail = messages[users[-1] + 1 :]
+    results = [m for m in tail if m.get("role") == "function"]
+    if tail and tail[-1].get("role") == "user":
+        # системная подсказка бота: «создай корзину» или «сформируй ответ»
+        if "vkusvill_cart_link_create" in (tail[-1].get("content") or ""):
+            return _cart_call(messages)
+        return _cart_answer(results)
+    items = extract_items(messages[users[-1]].get("content") or "")
+    if not items:
+        return _text("Я помогу подобрать продукты ВкусВилл и собрать корзину.")
+    if len(results) >= MAX_SCRIPT_STEPS:
+        return _text("Не получилось собрать корзину, попробуйте уточнить.")
+    if results and results[-1].get("name") == "vkusvill_cart_link_create":
+        return _cart_answer(results)
+
+    searches = [m for m in results if m.get("name") in _SEARCH_TOOLS]
+    if not searches:
+        if len(items) > 1 and "products_search_batch" in functions:
+            return _call("products_search_batch", {"queries": items})
+        return _call("vkusvill_products_search", {"q": items[0]})
+    if searches[-1].get("name") == "vkusvill_products_search" and len(searches) < len(items):
+        return _call("vkusvill_products_search", {"q": items[len(searches)]})
+
+    return _cart_call(messages)
+
+
+def _cart_call(messages: list[dict]) -> dict:
+    """Корзина из лучших товаров всех поисков диалога."""
+    found: dict[int, dict] = {}
+    for m in messages:
+        if m.get("role") == "function" and m.get("name") in _SEARCH_TOOLS:
+            for item in _best_items(m.get("content", "")):
+                found[item["xml_id"]] = item
+    if not found:
+        return _text("К сожалению, ничего не нашлось.")
+    products = [{"xml_id": xml_id, "q": 1} for xml_id in found]
+    return _call("vkusvill_cart_link_create", {"products": products})
+
+
+def _call(name: str, arguments: dict) -> dict:
+    return {
+        "role": "assistant",
+        "content": "",
+        "function_call": {"name": name, "arguments": arguments},
+    }
+
+
+class GigaChatSimulator:
+    """OAuth и chat/completions для SDK ``gigachat``."""
+
+    def __init__(self, behaviour: Behaviour, rng: random.Random) -> None:
+        self._behaviour = behaviour
+        self._rng = rng
+        self.stats: Counter[str] = Counter()
+
+    async def oauth(self, request: web.Request) -> web.Response:
+        self.stats["oauth"] += 1
+        expires_at = int((time.time() + 1800) * 1000)
+        return web.json_response({"access_token": "stub-token", "expires_at": expires_at})
+
+    async def chat(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(self._behaviour.latency.sample(self._rng))
+        status = self._behaviour.fault(self._rng)
+        if status is not None:
+            self.stats[f"error_{status}"] += 1
+            return web.json_response({"status": status, "message": "stub fault"}, status=status)
+        messages = body.get("messages") or []
+        functions = [f.get("name", "") for f in body.get("functions") or []]
+        if body.get("function_call") == "none":
+            functions = []
+        message = script_reply(messages, functions)
+        if "function_call" in message and message["function_call"]["name"] not in functions:
+            message = {"role": "assistant", "content": "Готово."}
+        self.stats["function_call" if "function_call" in message else "text"] += 1
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 3
+        completion_tokens = max(1, len(json.dumps(message, ensure_ascii=False)) // 3)
+        return web.json_response(
+            {
+                "choices": [
+                    {
+                        "message": message,
+                        "index": 0,
+                        "finish_reason": "function_call" if "function_call" in message else "stop",
+                    }
+                ],
+                "created": int(time.time()),
+                "model": body.get("model") or "GigaChat-stub",
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+                "object": "chat.completion",
+            },
+            dumps=_dumps,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Telegram Bot API
+# ---------------------------------------------------------------------------
+
+
+class TelegramStub:
+    """Bot API: методы отправки возвращают сообщение, остальные — True."""
+
+    def __init__(self) -> None:
+        self._message_id = 0
+        self.stats: Counter[str] = Counter()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.stats[method] += 1
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        if method == "getMe":
+            result: Any = {"id": 1, "is_bot": True, "first_name": "StubBot", "username": "stub_bot"}
+        elif method.startswith(("send", "edit")):
+            self._message_id += 1
+            chat_id = _int(params.get("chat_id"))
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": str(params.get("text", "")),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result}, dumps=_dumps)
+
+
+# ---------------------------------------------------------------------------
+# Сервер
+# ---------------------------------------------------------------------------
+
+# Base64 произвольных «credentials»: SDK проверяет только формат
+STUB_CREDENTIALS = base64.b64encode(b"stub:stub").decode()
+
+
+class StubBackends:
+    """Все заглушки на одном aiohttp-приложении."""
+
+    def __init__(
+        self,
+        catalog_size: int = 500,
+        mcp: Behaviour | None = None,
+        gigachat: Behaviour | None = None,
+        sse: bool = True,
+        seed: int = 1,
+    ) -> None:
+        rng = random.Random(seed)  # noqa: S311 — синтетика, не криптография
+        self.mcp = StubMCP(SyntheticCatalog(catalog_size, seed), mcp or Behaviour(), rng, sse)
+        self.gigachat = GigaChatSimulator(gigachat or Behaviour(), rng)
+        self.telegram = TelegramStub()
+        self.base_url = ""
+        self._runner: web.AppRunner | None = None
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024**2)
+        app.router.add_post("/mcp", self.mcp.handle)
+        app.router.add_post("/api/v2/oauth", self.gigachat.oauth)
+        app.router.add_post("/api/v1/chat/completions", self.gigachat.chat)
+        app.router.add_route("*", "/bot{token}/{method}", self.telegram.handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> str:
+        """Запустить сервер. Returns: базовый URL (порт 0 — свободный)."""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        sockets = site._server.sockets if site._server else []  # type: ignore[union-attr]
+        actual_port = sockets[0].getsockname()[1] if sockets else port
+        self.base_url = f"http://{host}:{actual_port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Запустить в отдельном потоке со своим event loop.
+
+        Цикл бота не обслуживает заглушки; GIL остаётся общим, поэтому
+        для поиска потолка пропускной способности — отдельный процесс.
+        """
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start(host, port))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name="stub-backends", daemon=True).start()
+        started.wait(timeout=10)
+        return self.base_url
+
+    def env(self) -> dict[str, str]:
+        """Переменные окружения бота для работы через заглушки."""
+        return {
+            "MCP_SERVER_URL": f"{self.base_url}/mcp",
+            "GIGACHAT_BASE_URL": f"{self.base_url}/api/v1",
+            "GIGACHAT_AUTH_URL": f"{self.base_url}/api/v2/oauth",
+            "GIGACHAT_CREDENTIALS": STUB_CREDENTIALS,
+            "TELEGRAM_API_SERVER": self.base_url,
+        }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "mcp": dict(self.mcp.stats),
+            "gigachat": dict(self.gigachat.stats),
+            "telegram": dict(self.telegram.stats),
+        }
+
+
+def add_behaviour_args(parser: argparse.ArgumentParser) -> None:
+    """Аргументы задержек и ошибок (общие с service_load_test.py)."""
+    parser.add_argument(
+        "--mcp-latency",
+        type=Latency.parse,
+        default=Latency.parse("lognormal:0.15:0.6"),
+        help="Задержка MCP: 0 | fixed:S | uniform:MIN:MAX | lognormal:MEDIAN:P95",
+    )
+    parser.add_argument(
+        "--mcp-errors",
+        type=parse_errors,
+        default={},
+        help="Ошибки MCP: СТАТУС:ВЕРОЯТНОСТЬ через запятую, например 503:0.01",
+    )
+    parser.add_argument(
+        "--gigachat-latency",
+        type=Latency.parse,
+        default=Latency.parse("lognormal:1.2:3.5"),
+        help="Задержка одного шага GigaChat (формат как у --mcp-latency)",
+    )
+    parser.add_argument(
+        "--gigachat-errors",
+        type=parse_errors,
+        default={},
+        help="Ошибки GigaChat, например 429:0.02,500:0.005",
+    )
+    parser.add_argument(
+        "--catalog-size",
+        type=int,
+        default=500,
+        help="Товаров в синтетическом каталоге",
+    )
+
+
+def backends_from_args(args: argparse.Namespace, sse: bool = True) -> StubBackends:
+    return StubBackends(
+        catalog_size=args.catalog_size,
+        mcp=Behaviour(args.mcp_latency, args.mcp_errors),
+        gigachat=Behaviour(args.gigachat_latency, args.gigachat_errors),
+        sse=sse,
+    )
+
+
+async def _serve(backends: StubBackends, host: str, port: int) -> None:
+    await backends.start(host, port)
+    print(f"Заглушки запущены: {backends.base_url}")
+    print("Переменные окружения бота:")
+    for key, value in backends.env().items():
+        print(f"  export {key}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await backends.stop()
+        print(json.dumps(backends.stats(), ensure_ascii=False, indent=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Заглушки MCP, GigaChat и Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-sse", action="store_true", help="MCP отвечает JSON, а не SSE")
+    add_behaviour_args(parser)
+    args = parser.parse_args()
+    backends = backends_from_args(args, sse=not args.no_sse)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_serve(backends, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,11 @@
 # Build ZIP artifact for Alice Yandex Cloud Function
 # Usage:
 #   bash scripts/build_alice_function_zip.sh [output_zip]
+#
+# Env:
+#   ALICE_PRECOMPILE=1 — положить в ZIP байткод (.pyc, нужен python3.11):
+#                        холодный старт не тратит время на компиляцию модулей
+# Рядом с ZIP пишется отчёт о времени импорта: <output>.importtime.txt
 # ============================================================
 
 set -euo pipefail
@@ -87,6 +92,7 @@ find "${STAGE_DIR}/vkuswill_bot/services" -maxdepth 1 -type f -name "*.py" \
   ! -name "__init__.py" \
   ! -name "mcp_client.py" \
   ! -name "redis_client.py" \
+  ! -name "metrics.py" \
   ! -name "user_store.py" \
   ! -name "migration_runner.py" \
   ! -name "search_processor.py" \
@@ -119,6 +125,44 @@ find "${STAGE_DIR}" -type d -name "*.dist-info" -prune -exec rm -rf {} + 2>/dev/
 find "${STAGE_DIR}" -type d -name "__pycache__" -prune -exec rm -rf {} + 2>/dev/null || true
 find "${STAGE_DIR}" -type f -name "*.pyc" -delete 2>/dev/null || true
 
+precompile_bytecode() {
+  if ! "${PYTHON_BIN}" -c 'import sys; sys.exit(sys.version_info[:2] != (3, 11))'; then
+    echo "[build-alice-zip] ALICE_PRECOMPILE=1 needs python3.11 (function runtime), skipped"
+    return
+  fi
+  echo "[build-alice-zip] Precompiling bytecode..."
+  # unchecked-hash: .pyc валиден без сверки mtime исходника после распаковки ZIP
+  "${PYTHON_BIN}" -m compileall -q --invalidation-mode unchecked-hash "${STAGE_DIR}" >/dev/null || true
+}
+
+report_import_time() {
+  local report="${OUT_ZIP%.zip}.importtime.txt"
+  local raw
+  raw="$(mktemp)"
+  # Как на холодном старте функции: байткод из ZIP, без записи новых .pyc
+  if ! PYTHONPATH="${STAGE_DIR}" PYTHONDONTWRITEBYTECODE=1 ALICE_PREWARM_ON_IMPORT=0 \
+    "${PYTHON_BIN}" -X importtime -c "import vkuswill_bot.alice_skill.handler" 2>"${raw}"; then
+    echo "[build-alice-zip] WARNING: handler import failed, see ${raw}"
+    return
+  fi
+  {
+    echo "# python -X importtime: import vkuswill_bot.alice_skill.handler"
+    echo "# self [us] | cumulative [us] | module (sorted by cumulative)"
+    grep '^import time:' "${raw}" | grep -v 'self \[us\]' | sort -t'|' -k2 -n -r
+  } >"${report}"
+  rm -f "${raw}"
+  echo "[build-alice-zip] Import time report: ${report}"
+  head -n 22 "${report}" | tail -n 20
+}
+
+if [[ "${ALICE_PRECOMPILE:-0}" == "1" ]]; then
+  precompile_bytecode
+fi
+# Колёса кросс-сборки под другую платформу локально не импортируются
+if [[ "$(uname -s)" == "Linux" && "${ALICE_FORCE_CROSS_BUILD:-0}" != "1" ]]; then
+  report_import_time
+fi
+
 echo "[build-alice-zip] Creating ZIP: ${OUT_ZIP}"
 rm -f "${OUT_ZIP}"
 (
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Сборка офлайн-индекса КБЖУ из дампа Open Food Facts.
+
+Дамп: https://world.openfoodfacts.org/data — CSV-выгрузка
+(en.openfoodfacts.org.products.csv.gz) или JSONL
+(openfoodfacts-products.jsonl.gz). Из дампа берутся продукты
+с тегом страны (по умолчанию en:russia) и калорийностью.
+
+Использование:
+    python scripts/build_nutrition_index.py \\
+        en.openfoodfacts.org.products.csv.gz data/nutrition.idx
+
+    # Все страны (индекс заметно больше)
+    python scripts/build_nutrition_index.py dump.jsonl.gz data/nutrition.idx --all-countries
+
+Затем указать путь в .env: NUTRITION_INDEX_PATH=data/nutrition.idx
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+
+from vkuswill_bot.services.nutrition_index import DEFAULT_COUNTRY, build_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Сборка офлайн-индекса КБЖУ (Open Food Facts)")
+    parser.add_argument("dump", help="Дамп Open Food Facts: .csv/.tsv или .jsonl (можно .gz)")
+    parser.add_argument("out", help="Путь к файлу индекса")
+    parser.add_argument(
+        "--country",
+        default=DEFAULT_COUNTRY,
+        help=f"Тег страны Open Food Facts (по умолчанию {DEFAULT_COUNTRY})",
+    )
+    parser.add_argument("--all-countries", action="store_true", help="Не фильтровать по стране")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    summary = build_index(args.dump, args.out, None if args.all_countries else args.country)
+    print(
+        f"Продуктов: {summary['products']}, токенов: {summary['tokens']}, "
+        f"размер: {summary['bytes'] / 1e6:.1f} МБ, время: {summary['seconds']:.1f} с"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Замер холодного и тёплого вызова функции навыка Алисы.
+
+Каждый «инстанс» — новый процесс Python: импорт модуля handler
+(холодный старт), затем несколько вызовов ``handler(event, None)``
+подряд. Первый вызов — холодный (сборка runtime, если она не сделана
+при загрузке модуля), остальные — тёплые.
+
+Бэкенды берутся из окружения как в функции (ALICE_REDIS_URL,
+ALICE_DATABASE_URL, ALICE_MCP_*, ALICE_PREWARM_ON_IMPORT, ...). Пустая
+фраза по умолчанию не ходит в MCP — замеряются импорт, сборка runtime
+и накладные расходы обработчика.
+
+Использование:
+    python scripts/measure_alice_cold_start.py --instances 5 --calls 5
+
+    # Распакованный артефакт (unzip dist/alice-skill.zip -d /tmp/alice)
+    python scripts/measure_alice_cold_start.py --path /tmp/alice
+
+    # С предсборкой runtime при загрузке модуля
+    ALICE_PREWARM_ON_IMPORT=true python scripts/measure_alice_cold_start.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Код дочернего процесса: время импорта и времена вызовов (секунды)
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from vkuswill_bot.alice_skill.handler import handler
+import_s = time.perf_counter() - started
+event = json.loads(sys.argv[1])
+calls = []
+for _ in range(int(sys.argv[2])):
+    started = time.perf_counter()
+    handler(event, None)
+    calls.append(time.perf_counter() - started)
+print(json.dumps({"import_s": import_s, "calls_s": calls}))
+"""
+
+
+def _event(utterance: str) -> dict:
+    return {
+        "version": "1.0",
+        "session": {
+            "session_id": "cold-start-bench",
+            "skill_id": os.getenv("ALICE_SKILL_ID", ""),
+            "user": {"user_id": "cold-start-bench"},
+        },
+        "request": {"command": utterance, "original_utterance": utterance},
+    }
+
+
+def _run_instance(path: str | None, utterance: str, calls: int) -> dict:
+    env = dict(os.environ)
+    if path:
+        env["PYTHONPATH"] = path
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _CHILD, json.dumps(_event(utterance)), str(calls)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _ms(values: list[float]) -> str:
+    if not values:
+        return "—"
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"медиана {statistics.median(values) * 1000:.1f} мс, p95 {p95 * 1000:.1f} мс"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Холодный и тёплый вызов функции Алисы")
+    parser.add_argument("--instances", type=int, default=5, help="Новых процессов (инстансов)")
+    parser.add_argument("--calls", type=int, default=5, help="Вызовов в каждом инстансе")
+    parser.add_argument("--utterance", default="", help="Фраза запроса (пустая — без MCP)")
+    parser.add_argument("--path", help="PYTHONPATH: распакованный ZIP-артефакт")
+    args = parser.parse_args()
+
+    imports: list[float] = []
+    cold: list[float] = []
+    warm: list[float] = []
+    for _ in range(args.instances):
+        run = _run_instance(args.path, args.utterance, max(1, args.calls))
+        imports.append(run["import_s"])
+        cold.append(run["calls_s"][0])
+        warm.extend(run["calls_s"][1:])
+
+    print(f"Импорт модуля:     {_ms(imports)}")
+    print(f"Холодный вызов:    {_ms(cold)}")
+    print(f"Импорт + холодный: {_ms([i + c for i, c in zip(imports, cold, strict=True)])}")
+    print(f"Тёплый вызов:      {_ms(warm)}")
+
+
+if __name__ == "__main__":
+    main()
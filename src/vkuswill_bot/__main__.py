@@ -23,6 +23,8 @@ import asyncpg
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.types import FSInputFile
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
@@ -31,16 +33,27 @@ from vkuswill_bot.bot.handlers import admin_router, router
 from vkuswill_bot.bot.middlewares import ThrottlingMiddleware, UserMiddleware
 from vkuswill_bot.config import config
 from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.cache_warmer import CacheWarmer
+from vkuswill_bot.services.catalog_index import CatalogIndex
+from vkuswill_bot.services.cart_link_cache import CartLinkCache
 from vkuswill_bot.services.dialog_manager import DialogManager
 from vkuswill_bot.services.gigachat_service import GigaChatService
 from vkuswill_bot.services.langfuse_tracing import LangfuseService
+from vkuswill_bot.services import metrics
+from vkuswill_bot.services.list_fast_path import ListFastPath
+from vkuswill_bot.services.loop_monitor import LoopMonitor
 from vkuswill_bot.services.mcp_client import VkusvillMCPClient
 from vkuswill_bot.services.migration_runner import MigrationRunner
 from vkuswill_bot.services.preferences_store import PreferencesStore
 from vkuswill_bot.services.price_cache import PriceCache, TwoLevelPriceCache
+from vkuswill_bot.services.price_invalidation import PriceInvalidationSubscriber
+from vkuswill_bot.services.price_refresher import PriceRefresher
+from vkuswill_bot.services.product_details_cache import ProductDetailsCache
+from vkuswill_bot.services.profiler import MemoryTracker, SamplingProfiler
 from vkuswill_bot.services.recipe_search import RecipeSearchService
-from vkuswill_bot.services.recipe_store import RecipeStore
+from vkuswill_bot.services.recipe_store import TieredRecipeStore
 from vkuswill_bot.services.redis_client import close_redis_client, create_redis_client
+from vkuswill_bot.services.search_prefetcher import SearchPrefetcher
 from vkuswill_bot.services.search_processor import SearchProcessor
 from vkuswill_bot.services.stats_aggregator import StatsAggregator
 from vkuswill_bot.services.tool_executor import ToolExecutor
@@ -133,6 +146,14 @@ WEBHOOK_PATH = "/webhook"
 # ---------------------------------------------------------------------------
 
 
+async def _metrics_handler(request: web.Request) -> web.Response:
+    """Метрики в формате Prometheus text exposition."""
+    return web.Response(
+        body=metrics.render().encode(),
+        headers={"Content-Type": metrics.CONTENT_TYPE},
+    )
+
+
 async def _health_handler(request: web.Request) -> web.Response:
     """Проверка работоспособности бота и зависимостей.
 
@@ -166,6 +187,11 @@ async def _health_handler(request: web.Request) -> web.Response:
     else:
         checks["postgres"] = None
 
+    # Event loop (информативно: задержка не переводит в degraded)
+    loop_monitor = request.app.get("loop_monitor")
+    if loop_monitor is not None:
+        checks["event_loop"] = loop_monitor.health()
+
     # MCP
     mcp_client_ref = request.app.get("mcp_client")
     if mcp_client_ref is not None:
@@ -196,9 +222,23 @@ async def main() -> None:
     loop = asyncio.get_running_loop()
     loop.set_default_executor(ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS))
 
+    # Задержка event loop и детектор блокирующего кода
+    loop_monitor: LoopMonitor | None = None
+    if config.loop_monitor_enabled:
+        loop_monitor = LoopMonitor(
+            interval=config.loop_monitor_interval,
+            slow_callback_ms=config.loop_slow_callback_ms,
+        )
+        loop_monitor.start()
+
     # Telegram-бот
+    session = None
+    if config.telegram_api_server:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.telegram_api_server))
+        logger.warning("Telegram Bot API: %s", config.telegram_api_server)
     bot = Bot(
         token=config.bot_token,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
     dp = Dispatcher()
@@ -217,6 +257,7 @@ async def main() -> None:
                 dsn=config.database_url,
                 min_size=config.db_pool_min,
                 max_size=config.db_pool_max,
+                init=metrics.instrument_postgres if config.metrics_enabled else None,
             )
             # Применить все SQL-миграции (версионированно)
             migration_runner = MigrationRunner(pg_pool)
@@ -264,7 +305,8 @@ async def main() -> None:
 
     # Rate-limiting: 5 сообщений / 60 секунд на пользователя
     # (ThrottlingMiddleware идёт ПОСЛЕ UserMiddleware)
-    dp.message.middleware(ThrottlingMiddleware(rate_limit=5, period=60.0))
+    throttling = ThrottlingMiddleware(rate_limit=5, period=60.0)
+    dp.message.middleware(throttling)
 
     # MCP-клиент для ВкусВилл
     mcp_client = VkusvillMCPClient(config.mcp_server_url)
@@ -272,11 +314,9 @@ async def main() -> None:
     # Хранилище предпочтений (SQLite, отдельная БД)
     prefs_store = PreferencesStore(config.database_path)
 
-    # Кеш рецептов (SQLite, отдельная БД — исключает конфликты блокировок)
-    recipe_store = RecipeStore(config.recipe_database_path)
-
     # Менеджер диалогов, кэш цен, снимок корзины: Redis или in-memory
     redis_client = None
+    price_invalidation: PriceInvalidationSubscriber | None = None
     if config.storage_backend == "redis" and config.redis_url:
         try:
             from vkuswill_bot.services.cart_snapshot_store import (
@@ -292,9 +332,18 @@ async def main() -> None:
                 max_history=config.max_history_messages,
             )
             # Двухуровневый кэш цен: L1 (in-memory) + L2 (Redis)
-            price_cache = TwoLevelPriceCache(redis=redis_client)
+            price_cache = TwoLevelPriceCache(
+                redis=redis_client,
+                publish_invalidations=config.price_invalidation_enabled,
+            )
+            if config.price_invalidation_enabled:
+                price_invalidation = PriceInvalidationSubscriber(price_cache, redis_client)
+                price_invalidation.start()
             # Снимок корзины в Redis (24h TTL)
-            cart_snapshot_store = CartSnapshotStore(redis=redis_client)
+            cart_snapshot_store = CartSnapshotStore(
+                redis=redis_client,
+                history_size=config.cart_history_size,
+            )
             logger.info(
                 "Redis-бэкенд: диалоги, кэш цен (L1+L2), снимки корзины",
             )
@@ -311,7 +360,9 @@ async def main() -> None:
             dialog_manager = DialogManager(
                 max_history=config.max_history_messages,
             )
-            cart_snapshot_store = InMemoryCartSnapshotStore()
+            cart_snapshot_store = InMemoryCartSnapshotStore(
+                history_size=config.cart_history_size,
+            )
     else:
         from vkuswill_bot.services.cart_snapshot_store import (
             InMemoryCartSnapshotStore,
@@ -321,7 +372,37 @@ async def main() -> None:
         dialog_manager = DialogManager(
             max_history=config.max_history_messages,
         )
-        cart_snapshot_store = InMemoryCartSnapshotStore()
+        cart_snapshot_store = InMemoryCartSnapshotStore(
+            history_size=config.cart_history_size,
+        )
+
+    # Кеш рецептов: L1 (LRU) + SQLite (отдельная БД — исключает конфликты
+    # блокировок) + Redis (общий для подов, если доступен)
+    recipe_store = TieredRecipeStore(
+        config.recipe_database_path,
+        redis=redis_client,
+        l1_size=config.recipe_cache_size,
+        fuzzy_threshold=config.recipe_fuzzy_threshold,
+    )
+
+    # Локальный индекс каталога (SQLite FTS5, опционально)
+    catalog_index: CatalogIndex | None = None
+    if config.catalog_index_enabled:
+        catalog_index = CatalogIndex(
+            config.catalog_database_path,
+            price_cache,
+            mode=config.catalog_index_mode,
+            mcp_timeout=config.catalog_index_mcp_timeout,
+            max_age=config.catalog_index_max_age_days * 86400,
+        )
+        catalog_index.start()
+        logger.info("Индекс каталога включён (режим %s)", config.catalog_index_mode)
+
+    # Морфология проверки релевантности (по умолчанию — стеммер Snowball)
+    if config.morphology_backend == "pymorphy":
+        from vkuswill_bot.services.morphology import use_pymorphy
+
+        use_pymorphy()
 
     # Процессоры: поиск и корзина (получают PriceCache через DI)
     search_processor = SearchProcessor(price_cache)
@@ -330,13 +411,96 @@ async def main() -> None:
         mcp_client=mcp_client,
         search_processor=search_processor,
         max_concurrency=5,
+        catalog_index=catalog_index,
     )
 
-    # КБЖУ-сервис (Open Food Facts, бесплатный, без API key)
+    # КБЖУ-сервис (Open Food Facts, бесплатный, без API key):
+    # офлайн-индекс дампа + SQLite-кеш + объединение запросов + token bucket перед API
+    from vkuswill_bot.services.nutrition_cache import NutritionCache
+    from vkuswill_bot.services.nutrition_index import NutritionIndex
     from vkuswill_bot.services.nutrition_service import NutritionService
 
-    nutrition_service = NutritionService()
-    logger.info("NutritionService включён (Open Food Facts)")
+    nutrition_index: NutritionIndex | None = None
+    if config.nutrition_index_path:
+        try:
+            nutrition_index = NutritionIndex(config.nutrition_index_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Индекс КБЖУ недоступен, только API: %s", e)
+
+    nutrition_service = NutritionService(
+        cache=NutritionCache(
+            config.nutrition_database_path,
+            ttl=config.nutrition_cache_ttl_days * 86400,
+            negative_ttl=config.nutrition_negative_ttl_hours * 3600,
+        ),
+        rate_per_minute=config.nutrition_rate_per_minute,
+        index=nutrition_index,
+    )
+    logger.info(
+        "NutritionService включён (Open Food Facts + SQLite-кеш%s)",
+        " + офлайн-индекс" if nutrition_index is not None else "",
+    )
+
+    # Прогрев кешей по историческому спросу (нужен UserStore)
+    cache_warmer: CacheWarmer | None = None
+    if config.cache_warmup_enabled and user_store is not None:
+        cache_warmer = CacheWarmer(
+            user_store=user_store,
+            mcp_client=mcp_client,
+            search_processor=search_processor,
+            price_cache=price_cache,
+            recipe_store=recipe_store,
+            catalog_index=catalog_index,
+            top_queries=config.cache_warmup_top_queries,
+            top_dishes=config.cache_warmup_top_dishes,
+            lookback_days=config.cache_warmup_lookback_days,
+            concurrency=config.cache_warmup_concurrency,
+            interval=config.cache_warmup_interval_hours * 3600,
+        )
+        cache_warmer.start()
+
+    # Refresh-ahead цен горячих товаров (до истечения TTL в Redis)
+    price_refresher: PriceRefresher | None = None
+    if config.price_refresh_enabled:
+        price_refresher = PriceRefresher(
+            mcp_client=mcp_client,
+            search_processor=search_processor,
+            price_cache=price_cache,
+            calls_per_minute=config.price_refresh_calls_per_minute,
+            min_hits=config.price_refresh_min_hits,
+        )
+        price_refresher.start()
+
+    # Префетч поиска по списку покупок из сообщения (параллельно с первым вызовом LLM)
+    search_prefetcher: SearchPrefetcher | None = None
+    if config.search_prefetch_enabled:
+        search_prefetcher = SearchPrefetcher(max_queries=config.search_prefetch_max_queries)
+        logger.info("Префетч поиска включён (до %d запросов)", config.search_prefetch_max_queries)
+
+    # Кеш ссылок на корзину по содержимому (L2 в Redis — общий для подов)
+    cart_link_cache: CartLinkCache | None = None
+    if config.cart_link_cache_ttl > 0:
+        cart_link_cache = CartLinkCache(redis=redis_client, ttl=config.cart_link_cache_ttl)
+        logger.info(
+            "Кеш ссылок корзин включён (TTL %d с, %s)",
+            config.cart_link_cache_ttl,
+            "L1 + Redis" if redis_client is not None else "L1",
+        )
+
+    # Кеш карточек товаров (L2: Redis, если есть, иначе SQLite)
+    product_details_cache: ProductDetailsCache | None = None
+    if config.product_details_cache_ttl_hours > 0:
+        product_details_cache = ProductDetailsCache(
+            redis=redis_client,
+            db_path=config.product_details_database_path,
+            ttl=config.product_details_cache_ttl_hours * 3600,
+            refresh_ahead=config.product_details_refresh_ahead,
+        )
+        logger.info(
+            "Кеш карточек товаров включён (TTL %d ч, %s)",
+            config.product_details_cache_ttl_hours,
+            "L1 + Redis" if redis_client is not None else "L1 + SQLite",
+        )
 
     # Исполнитель инструментов (маршрутизация MCP/локальных вызовов)
     tool_executor = ToolExecutor(
@@ -348,6 +512,11 @@ async def main() -> None:
         nutrition_service=nutrition_service,
         recipe_search_service=recipe_search_service,
         user_store=user_store,
+        catalog_index=catalog_index,
+        cache_warmer=cache_warmer,
+        search_prefetcher=search_prefetcher,
+        cart_link_cache=cart_link_cache,
+        product_details_cache=product_details_cache,
     )
 
     # Langfuse — LLM-observability (опционально)
@@ -359,6 +528,15 @@ async def main() -> None:
         anonymize_messages=config.langfuse_anonymize_messages,
     )
 
+    # Быстрый путь без LLM для простых списков покупок
+    fast_path: ListFastPath | None = None
+    if config.list_fast_path_enabled:
+        fast_path = ListFastPath(tool_executor, max_items=config.list_fast_path_max_items)
+        logger.info(
+            "Быстрый путь для списков включён (до %d позиций)",
+            config.list_fast_path_max_items,
+        )
+
     # GigaChat-сервис — все зависимости инжектируются явно
     gigachat_service = GigaChatService(
         credentials=config.gigachat_credentials,
@@ -374,6 +552,7 @@ async def main() -> None:
         gigachat_max_concurrent=config.gigachat_max_concurrent,
         langfuse_service=langfuse_service,
         ca_bundle_file=config.gigachat_ca_bundle,
+        fast_path=fast_path,
     )
 
     # Предзагрузка MCP-инструментов
@@ -384,6 +563,34 @@ async def main() -> None:
         logger.warning("Не удалось загрузить MCP инструменты при старте: %s", e)
         logger.warning("Инструменты будут загружены при первом запросе")
 
+    # Счётчики кешей и фоновых задач в /metrics (читаются при запросе)
+    if config.metrics_enabled:
+        for component, source in {
+            "event_loop": loop_monitor,
+            "recipe_store": recipe_store,
+            "nutrition": nutrition_service,
+            "price_refresher": price_refresher,
+            "price_invalidation": price_invalidation,
+            "search_prefetch": search_prefetcher,
+            "cart_link_cache": cart_link_cache,
+            "product_details_cache": product_details_cache,
+            "list_fast_path": fast_path,
+        }.items():
+            if source is not None:
+                metrics.register_stats(component, source)
+
+    # Профилирование по команде администратора (/admin_profile, /admin_memory):
+    # без накладных расходов, пока команда не вызвана
+    memory_tracker = MemoryTracker()
+    memory_tracker.track("dialog_locks", dialog_manager.lock_count)
+    if hasattr(dialog_manager, "conversations"):
+        memory_tracker.track("dialog_conversations", lambda: len(dialog_manager.conversations))
+    memory_tracker.track("search_logs", gigachat_service.search_log_count)
+    memory_tracker.track("price_cache", price_cache)
+    memory_tracker.track("throttling_users", throttling.tracked_user_count)
+    dp["profiler"] = SamplingProfiler()
+    dp["memory_tracker"] = memory_tracker
+
     # Передаём сервисы в хендлеры через DI
     dp["gigachat_service"] = gigachat_service
     if user_store is not None:
@@ -397,10 +604,24 @@ async def main() -> None:
 
     async def _cleanup() -> None:
         logger.info("Закрытие ресурсов...")
+        if loop_monitor is not None:
+            await loop_monitor.stop()
+        if cache_warmer is not None:
+            await cache_warmer.stop()
+        if price_invalidation is not None:
+            await price_invalidation.stop()
+        if price_refresher is not None:
+            await price_refresher.stop()
+        if search_prefetcher is not None:
+            search_prefetcher.close()
         await gigachat_service.close()
         await recipe_store.close()
+        if catalog_index is not None:
+            await catalog_index.close()
         await prefs_store.close()
         await nutrition_service.close()
+        if product_details_cache is not None:
+            await product_details_cache.close()
         await close_redis_client(redis_client)
         await mcp_client.close()
         if stats_aggregator is not None:
@@ -428,6 +649,7 @@ async def main() -> None:
             mcp_client=mcp_client,
             user_store=user_store,
             gigachat_service=gigachat_service,
+            loop_monitor=loop_monitor,
             cleanup=_cleanup,
         )
     else:
@@ -490,6 +712,7 @@ async def _run_webhook(
     mcp_client: VkusvillMCPClient,
     user_store: UserStore | None,
     gigachat_service: GigaChatService,
+    loop_monitor: LoopMonitor | None = None,
     cleanup: object,
 ) -> None:
     """Запуск бота в режиме webhook через aiohttp."""
@@ -503,9 +726,13 @@ async def _run_webhook(
     app["redis_client"] = redis_client
     app["pg_pool"] = pg_pool
     app["mcp_client"] = mcp_client
+    app["loop_monitor"] = loop_monitor
 
     # Health check
     app.router.add_get("/health", _health_handler)
+    # Метрики Prometheus (снаружи закрыты nginx: location / → 404)
+    if config.metrics_enabled:
+        app.router.add_get("/metrics", _metrics_handler)
     # Voice linking API (вариант 1: Alice Function -> VM API -> PostgreSQL)
     register_voice_link_routes(
         app,
@@ -1,7 +1,20 @@
-"""Yandex Cloud Function handler для навыка Алисы."""
+"""Yandex Cloud Function handler для навыка Алисы.
+
+Холодный старт: тяжёлые зависимости (``asyncpg``, ``redis``) импортируются
+только при сборке runtime и только если заданы DSN/URL; независимые
+бэкенды (пул PostgreSQL, Redis, Langfuse, MCP-сессия) инициализируются
+параллельно. С ``ALICE_PREWARM_ON_IMPORT=true`` runtime собирается
+при загрузке модуля — в init-фазе инстанса, вне бюджета первого запроса.
+Каждый вызов пишет в лог событие ``alice_invocation`` (cold/warm, время
+импорта и сборки runtime).
+"""
 
 from __future__ import annotations
 
+import time
+
+_MODULE_LOAD_STARTED = time.perf_counter()
+
 import asyncio
 import hmac
 import json
@@ -16,43 +29,35 @@ try:
 except ImportError:  # pragma: no cover - optional in local dev, bundled in function artifact
     sniffio = None
 
-try:
-    import asyncpg
-except Exception as asyncpg_import_error:  # pragma: no cover - runtime guard for broken artifacts
-    asyncpg = None
-    _ASYNCPG_IMPORT_ERROR = asyncpg_import_error
-else:
-    _ASYNCPG_IMPORT_ERROR = None
-
 from vkuswill_bot.alice_skill.account_linking import (
+    AccountLinkStore,
     HttpAccountLinkStore,
     InMemoryAccountLinkStore,
     PostgresAccountLinkStore,
     UnavailableAccountLinkStore,
 )
 from vkuswill_bot.alice_skill.delivery import AliceAppDeliveryAdapter
+from vkuswill_bot.alice_skill.idempotency import IdempotencyStore
 from vkuswill_bot.alice_skill.idempotency import InMemoryIdempotencyStore
 from vkuswill_bot.alice_skill.idempotency import RedisIdempotencyStore
 from vkuswill_bot.alice_skill.models import VoiceOrderResult
 from vkuswill_bot.alice_skill.orchestrator import AliceOrderOrchestrator
 from vkuswill_bot.alice_skill.rate_limit import InMemoryRateLimiter
+from vkuswill_bot.alice_skill.rate_limit import RateLimiter
 from vkuswill_bot.alice_skill.rate_limit import RedisRateLimiter
+from vkuswill_bot.alice_skill.redis_scripts import load_scripts
 from vkuswill_bot.alice_skill.voice_order_client import HttpVoiceOrderClient
 from vkuswill_bot.services.langfuse_tracing import LangfuseService
 from vkuswill_bot.services.mcp_client import VkusvillMCPClient
 
-try:
-    from vkuswill_bot.services.redis_client import create_redis_client
-except Exception as redis_import_error:  # pragma: no cover - runtime guard for broken artifacts
-    create_redis_client = None
-    _REDIS_IMPORT_ERROR = redis_import_error
-else:
-    _REDIS_IMPORT_ERROR = None
-
 DEFAULT_MCP_URL = "https://mcp001.vkusvill.ru/mcp"
 DEFAULT_WEBHOOK_HEADER_NAME = "X-Alice-Webhook-Token"
 _RUNTIME: _Runtime | None = None
 _EVENT_LOOP: asyncio.AbstractEventLoop | None = None
+_ASYNCPG_IMPORT_ERROR: Exception | None = None
+_REDIS_IMPORT_ERROR: Exception | None = None
+# Вызовов, обслуженных этим инстансом (0 — следующий будет холодным)
+_INVOCATIONS = 0
 logger = logging.getLogger(__name__)
 
 
@@ -60,6 +65,42 @@ logger = logging.getLogger(__name__)
 class _Runtime:
     orchestrator: AliceOrderOrchestrator
     langfuse: LangfuseService = field(default_factory=lambda: LangfuseService(enabled=False))
+    init_seconds: float = 0.0
+
+
+def _load_asyncpg() -> Any | None:
+    """Ленивый импорт asyncpg (None, если модуль не собрался в артефакте)."""
+    global _ASYNCPG_IMPORT_ERROR
+    if "asyncpg" not in globals():
+        try:
+            import asyncpg
+        except Exception as exc:  # pragma: no cover - runtime guard for broken artifacts
+            asyncpg = None
+            _ASYNCPG_IMPORT_ERROR = exc
+        globals()["asyncpg"] = asyncpg
+    return globals()["asyncpg"]
+
+
+def _load_redis_factory() -> Any | None:
+    """Ленивый импорт фабрики Redis-клиента (None при битом артефакте)."""
+    global _REDIS_IMPORT_ERROR
+    if "create_redis_client" not in globals():
+        try:
+            from vkuswill_bot.services.redis_client import create_redis_client
+        except Exception as exc:  # pragma: no cover - runtime guard for broken artifacts
+            create_redis_client = None
+            _REDIS_IMPORT_ERROR = exc
+        globals()["create_redis_client"] = create_redis_client
+    return globals()["create_redis_client"]
+
+
+def __getattr__(name: str) -> Any:
+    # Атрибуты модуля asyncpg/create_redis_client — через ленивый импорт (PEP 562)
+    if name == "asyncpg":
+        return _load_asyncpg()
+    if name == "create_redis_client":
+        return _load_redis_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _parse_bool_env(name: str, default: bool) -> bool:
@@ -124,13 +165,140 @@ def _load_codes() -> dict[str, int]:
     return codes
 
 
+def _fallback_account_links(
+    *,
+    require_linked_account: bool,
+    linking_fail_closed: bool,
+    degrade_to_guest: bool,
+) -> AccountLinkStore:
+    if require_linked_account and linking_fail_closed and not degrade_to_guest:
+        return UnavailableAccountLinkStore()
+    return InMemoryAccountLinkStore(_load_links(), codes=_load_codes())
+
+
+async def _init_account_links(
+    *,
+    resources: list[Any],
+    database_url: str,
+    db_connect_timeout: float,
+    require_linked_account: bool,
+    linking_fail_closed: bool,
+    degrade_to_guest: bool,
+) -> tuple[AccountLinkStore, bool]:
+    """Хранилище привязок на PostgreSQL и итоговый флаг обязательной привязки."""
+    asyncpg = _load_asyncpg()
+    if asyncpg is None:
+        logger.warning(
+            "Alice skill: asyncpg import failed (%r), fallback mode",
+            _ASYNCPG_IMPORT_ERROR,
+        )
+    else:
+        try:
+            from vkuswill_bot.services.user_store import UserStore
+
+            pool = await asyncpg.create_pool(
+                dsn=database_url,
+                min_size=1,
+                max_size=3,
+                timeout=db_connect_timeout,
+                command_timeout=db_connect_timeout,
+            )
+            resources.append(pool)
+            user_store = UserStore(pool, schema_ready=True)
+            return PostgresAccountLinkStore(user_store, provider="alice"), require_linked_account
+        except Exception:
+            logger.exception("Alice skill: DB init failed, fallback mode")
+    account_links = _fallback_account_links(
+        require_linked_account=require_linked_account,
+        linking_fail_closed=linking_fail_closed,
+        degrade_to_guest=degrade_to_guest,
+    )
+    return account_links, require_linked_account and not degrade_to_guest
+
+
+async def _init_redis_stores(
+    *,
+    resources: list[Any],
+    redis_url: str,
+    db_connect_timeout: float,
+    idempotency_key_prefix: str,
+    rate_limit_key_prefix: str,
+) -> tuple[IdempotencyStore, RateLimiter]:
+    """Идемпотентность и rate-limit в Redis (in-memory, если Redis недоступен)."""
+    fallback_rate_limiter = InMemoryRateLimiter()
+    create_redis_client = _load_redis_factory()
+    if create_redis_client is None:
+        logger.warning(
+            "Alice skill: Redis client import failed (%r), fallback to in-memory",
+            _REDIS_IMPORT_ERROR,
+        )
+        return InMemoryIdempotencyStore(), fallback_rate_limiter
+    try:
+        redis_client = await create_redis_client(
+            redis_url,
+            decode_responses=False,
+            socket_connect_timeout=db_connect_timeout,
+            socket_timeout=max(db_connect_timeout, 5.0),
+        )
+    except Exception:
+        logger.exception(
+            "Alice skill: Redis init failed for idempotency/rate-limit, fallback to in-memory",
+        )
+        return InMemoryIdempotencyStore(), fallback_rate_limiter
+    resources.append(redis_client)
+    try:
+        await load_scripts(redis_client)
+    except Exception:
+        # Не фатально: скрипт загрузится по NOSCRIPT при первом вызове
+        logger.warning("Alice skill: Redis SCRIPT LOAD failed", exc_info=True)
+    return (
+        RedisIdempotencyStore(redis_client, key_prefix=idempotency_key_prefix),
+        RedisRateLimiter(
+            redis_client,
+            key_prefix=rate_limit_key_prefix,
+            fallback_limiter=fallback_rate_limiter,
+        ),
+    )
+
+
+async def _warm_up_mcp(mcp_client: VkusvillMCPClient, timeout: float) -> None:
+    """Открыть соединение и MCP-сессию до первого вызова инструмента."""
+    try:
+        await asyncio.wait_for(mcp_client.warm_up(), timeout=timeout)
+    except Exception:
+        logger.warning("Alice skill: MCP pre-warm failed, session on first call", exc_info=True)
+
+
+async def _close_resources(resources: list[Any]) -> None:
+    """Закрыть пулы и клиенты, созданные до отмены или сбоя сборки runtime."""
+    for resource in reversed(resources):
+        close = getattr(resource, "aclose", None) or getattr(resource, "close", None)
+        if close is None:
+            continue
+        try:
+            await close()
+        except Exception:
+            logger.warning("Alice skill: failed to close %r", resource, exc_info=True)
+
+
+async def _timed(name: str, timings: dict[str, float], coro: Any) -> Any:
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
 async def _get_runtime() -> _Runtime:
     global _RUNTIME
     if _RUNTIME is not None:
         return _RUNTIME
 
+    started = time.perf_counter()
     mcp_url = os.getenv("ALICE_MCP_SERVER_URL", DEFAULT_MCP_URL)
     mcp_api_key = os.getenv("ALICE_MCP_API_KEY", "")
+    mcp_prewarm = _parse_bool_env("ALICE_MCP_PREWARM", default=True)
+    mcp_prewarm_timeout = _parse_float_env("ALICE_MCP_PREWARM_TIMEOUT_SECONDS", default=1.0)
     require_linked_account = _parse_bool_env("ALICE_REQUIRE_LINKED_ACCOUNT", default=False)
     linking_fail_closed = _parse_bool_env("ALICE_LINKING_FAIL_CLOSED", default=True)
     degrade_to_guest = _parse_bool_env("ALICE_DEGRADE_TO_GUEST_ON_DB_ERROR", default=False)
@@ -195,8 +363,15 @@ async def _get_runtime() -> _Runtime:
         api_key=mcp_api_key or None,
     )
 
+    # Независимые бэкенды поднимаются параллельно: холодный старт — максимум
+    # из времён подключения, а не их сумма.
+    timings: dict[str, float] = {}
+    backends: dict[str, Any] = {}
+    # Созданные пулы и клиенты: закрываются, если сборку отменили (таймаут прогрева)
+    resources: list[Any] = [mcp_client]
+
     if link_api_url and link_api_key:
-        account_links = HttpAccountLinkStore(
+        account_links: AccountLinkStore = HttpAccountLinkStore(
             base_url=link_api_url,
             api_key=link_api_key,
             provider="alice",
@@ -208,48 +383,66 @@ async def _get_runtime() -> _Runtime:
             "Alice skill: ALICE_LINK_API_URL/ALICE_LINK_API_KEY misconfigured, fail_closed=%s",
             linking_fail_closed,
         )
-        if require_linked_account and linking_fail_closed:
-            account_links = UnavailableAccountLinkStore()
-        else:
-            account_links = InMemoryAccountLinkStore(_load_links(), codes=_load_codes())
+        account_links = _fallback_account_links(
+            require_linked_account=require_linked_account,
+            linking_fail_closed=linking_fail_closed,
+            degrade_to_guest=False,
+        )
     elif database_url:
-        if asyncpg is None:
-            logger.warning(
-                "Alice skill: asyncpg import failed (%r), fallback mode",
-                _ASYNCPG_IMPORT_ERROR,
-            )
-            if require_linked_account and linking_fail_closed and not degrade_to_guest:
-                account_links = UnavailableAccountLinkStore()
-            else:
-                account_links = InMemoryAccountLinkStore(_load_links(), codes=_load_codes())
-            if degrade_to_guest:
-                effective_require_linked = False
-        else:
-            try:
-                from vkuswill_bot.services.user_store import UserStore
-
-                pool = await asyncpg.create_pool(
-                    dsn=database_url,
-                    min_size=1,
-                    max_size=3,
-                    timeout=db_connect_timeout,
-                    command_timeout=db_connect_timeout,
-                )
-                user_store = UserStore(pool, schema_ready=True)
-                account_links = PostgresAccountLinkStore(user_store, provider="alice")
-            except Exception:
-                logger.exception("Alice skill: DB init failed, fallback mode")
-                if require_linked_account and linking_fail_closed and not degrade_to_guest:
-                    account_links = UnavailableAccountLinkStore()
-                else:
-                    account_links = InMemoryAccountLinkStore(_load_links(), codes=_load_codes())
-                if degrade_to_guest:
-                    effective_require_linked = False
+        backends["postgres"] = _init_account_links(
+            resources=resources,
+            database_url=database_url,
+            db_connect_timeout=db_connect_timeout,
+            require_linked_account=require_linked_account,
+            linking_fail_closed=linking_fail_closed,
+            degrade_to_guest=degrade_to_guest,
+        )
     else:
-        if require_linked_account and linking_fail_closed:
-            account_links = UnavailableAccountLinkStore()
-        else:
-            account_links = InMemoryAccountLinkStore(_load_links(), codes=_load_codes())
+        account_links = _fallback_account_links(
+            require_linked_account=require_linked_account,
+            linking_fail_closed=linking_fail_closed,
+            degrade_to_guest=False,
+        )
+
+    if redis_url:
+        backends["redis"] = _init_redis_stores(
+            resources=resources,
+            redis_url=redis_url,
+            db_connect_timeout=db_connect_timeout,
+            idempotency_key_prefix=idempotency_key_prefix,
+            rate_limit_key_prefix=rate_limit_key_prefix,
+        )
+    langfuse = LangfuseService(enabled=False)
+    if langfuse_enabled:
+        # Импорт SDK Langfuse и создание клиента синхронны — в поток
+        backends["langfuse"] = asyncio.to_thread(
+            LangfuseService,
+            enabled=langfuse_enabled,
+            public_key=langfuse_public_key,
+            secret_key=langfuse_secret_key,
+            host=langfuse_host,
+            anonymize_messages=langfuse_anonymize_messages,
+        )
+    if mcp_prewarm:
+        backends["mcp"] = _warm_up_mcp(mcp_client, mcp_prewarm_timeout)
+
+    try:
+        gathered = await asyncio.gather(
+            *(_timed(name, timings, coro) for name, coro in backends.items()),
+        )
+    except BaseException:
+        # Отмена посреди gather: готовые пул asyncpg и клиент Redis иначе утекут
+        await _close_resources(resources)
+        raise
+    results = dict(zip(backends, gathered, strict=True))
+    if "postgres" in results:
+        account_links, effective_require_linked = results["postgres"]
+    idempotency_store: IdempotencyStore = InMemoryIdempotencyStore()
+    order_rate_limiter: RateLimiter = InMemoryRateLimiter()
+    if "redis" in results:
+        idempotency_store, order_rate_limiter = results["redis"]
+    link_code_rate_limiter = order_rate_limiter
+    langfuse = results.get("langfuse", langfuse)
 
     voice_order_client = None
     if order_api_url and order_api_key:
@@ -260,41 +453,6 @@ async def _get_runtime() -> _Runtime:
             verify_ssl=order_api_verify_ssl,
         )
 
-    fallback_rate_limiter = InMemoryRateLimiter()
-    order_rate_limiter = fallback_rate_limiter
-    link_code_rate_limiter = fallback_rate_limiter
-    idempotency_store = InMemoryIdempotencyStore()
-    if redis_url:
-        if create_redis_client is None:
-            logger.warning(
-                "Alice skill: Redis client import failed (%r), fallback to in-memory",
-                _REDIS_IMPORT_ERROR,
-            )
-        else:
-            try:
-                redis_client = await create_redis_client(
-                    redis_url,
-                    decode_responses=False,
-                    socket_connect_timeout=db_connect_timeout,
-                    socket_timeout=max(db_connect_timeout, 5.0),
-                )
-                idempotency_store = RedisIdempotencyStore(
-                    redis_client,
-                    key_prefix=idempotency_key_prefix,
-                )
-                shared_rate_limiter = RedisRateLimiter(
-                    redis_client,
-                    key_prefix=rate_limit_key_prefix,
-                    fallback_limiter=fallback_rate_limiter,
-                )
-                order_rate_limiter = shared_rate_limiter
-                link_code_rate_limiter = shared_rate_limiter
-            except Exception:
-                logger.exception(
-                    "Alice skill: Redis init failed for idempotency/rate-limit, "
-                    "fallback to in-memory",
-                )
-
     orchestrator = AliceOrderOrchestrator(
         mcp_client,
         voice_order_client=voice_order_client,
@@ -314,15 +472,16 @@ async def _get_runtime() -> _Runtime:
         link_code_rate_limit=link_code_rate_limit,
         link_code_rate_window_seconds=link_code_rate_window_seconds,
     )
+    init_seconds = time.perf_counter() - started
+    logger.info(
+        "Alice skill: runtime ready in %.0f ms (backends, ms: %s)",
+        init_seconds * 1000,
+        timings,
+    )
     _RUNTIME = _Runtime(
         orchestrator=orchestrator,
-        langfuse=LangfuseService(
-            enabled=langfuse_enabled,
-            public_key=langfuse_public_key,
-            secret_key=langfuse_secret_key,
-            host=langfuse_host,
-            anonymize_messages=langfuse_anonymize_messages,
-        ),
+        langfuse=langfuse,
+        init_seconds=init_seconds,
     )
     return _RUNTIME
 
@@ -623,16 +782,11 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         logger.warning("Alice skill: rejected event with invalid skill_id")
         return _forbidden_alice_response(event)
 
-    global _EVENT_LOOP
-    if _EVENT_LOOP is None or _EVENT_LOOP.is_closed():
-        _EVENT_LOOP = asyncio.new_event_loop()
-        asyncio.set_event_loop(_EVENT_LOOP)
-    token = None
-    if sniffio is not None and hasattr(sniffio, "current_async_library_cvar"):
-        token = sniffio.current_async_library_cvar.set("asyncio")
     handler_timeout = max(0.5, _parse_float_env("ALICE_HANDLER_TIMEOUT_SECONDS", default=4.2))
+    started = time.perf_counter()
+    runtime_ready = _RUNTIME is not None
     try:
-        response = _EVENT_LOOP.run_until_complete(
+        response = _run_until_complete(
             asyncio.wait_for(
                 _handle_async(alice_event),
                 timeout=handler_timeout,
@@ -642,8 +796,58 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         logger.error("Alice skill: handler timeout (%.2fs)", handler_timeout)
         response = _timeout_alice_response(alice_event)
     finally:
-        if token is not None and sniffio is not None:
-            sniffio.current_async_library_cvar.reset(token)
+        _log_invocation(time.perf_counter() - started, runtime_ready=runtime_ready)
     if _is_http_proxy_event(event):
         return _wrap_http_response(response)
     return response
+
+
+def _run_until_complete(coro: Any) -> Any:
+    """Выполнить корутину в event loop инстанса (loop живёт между вызовами)."""
+    global _EVENT_LOOP
+    if _EVENT_LOOP is None or _EVENT_LOOP.is_closed():
+        _EVENT_LOOP = asyncio.new_event_loop()
+        asyncio.set_event_loop(_EVENT_LOOP)
+    token = None
+    if sniffio is not None and hasattr(sniffio, "current_async_library_cvar"):
+        token = sniffio.current_async_library_cvar.set("asyncio")
+    try:
+        return _EVENT_LOOP.run_until_complete(coro)
+    finally:
+        if token is not None and sniffio is not None:
+            sniffio.current_async_library_cvar.reset(token)
+
+
+def _log_invocation(total_seconds: float, *, runtime_ready: bool) -> None:
+    """Событие alice_invocation: холодный/тёплый вызов и из чего сложилось время."""
+    global _INVOCATIONS
+    cold = _INVOCATIONS == 0
+    _INVOCATIONS += 1
+    init_ms = round(_RUNTIME.init_seconds * 1000, 1) if _RUNTIME is not None else 0.0
+    event: dict[str, Any] = {
+        "event": "alice_invocation",
+        "cold": cold,
+        "total_ms": round(total_seconds * 1000, 1),
+        # Runtime собран внутри этого вызова
+        "runtime_init_ms": 0.0 if runtime_ready else init_ms,
+    }
+    if cold:
+        event["import_ms"] = round(_IMPORT_SECONDS * 1000, 1)
+        # Runtime собран при загрузке модуля (ALICE_PREWARM_ON_IMPORT)
+        event["prewarm_ms"] = init_ms if runtime_ready else 0.0
+    logger.info("Alice invocation: %s", json.dumps(event))
+
+
+def _prewarm_runtime() -> None:
+    """Собрать runtime при загрузке модуля — в init-фазе инстанса функции."""
+    timeout = max(0.5, _parse_float_env("ALICE_PREWARM_TIMEOUT_SECONDS", default=3.0))
+    try:
+        _run_until_complete(asyncio.wait_for(_get_runtime(), timeout=timeout))
+    except Exception:
+        logger.warning("Alice skill: pre-warm failed, runtime on first request", exc_info=True)
+
+
+_IMPORT_SECONDS = time.perf_counter() - _MODULE_LOAD_STARTED
+
+if _parse_bool_env("ALICE_PREWARM_ON_IMPORT", default=False):
+    _prewarm_runtime()
@@ -10,6 +10,7 @@ from typing import Protocol
 
 from vkuswill_bot.alice_skill.models import DeliveryResult
 from vkuswill_bot.alice_skill.models import VoiceOrderResult
+from vkuswill_bot.alice_skill.redis_scripts import IDEMPOTENCY_BEGIN
 
 if TYPE_CHECKING:
     from redis.asyncio import Redis
@@ -31,6 +32,13 @@ class IdempotencyStore(Protocol):
     async def try_start(self, key: str, ttl_seconds: int) -> bool:
         """Забронировать ключ для обработки, если он свободен."""
 
+    async def get_done_or_start(
+        self,
+        key: str,
+        ttl_seconds: int,
+    ) -> tuple[VoiceOrderResult | None, bool]:
+        """Готовый результат или бронь ключа: ``(результат, забронирован)``."""
+
     async def mark_done(self, key: str, result: VoiceOrderResult, ttl_seconds: int) -> None:
         """Зафиксировать успешный результат по ключу."""
 
@@ -72,6 +80,17 @@ class InMemoryIdempotencyStore:
         )
         return True
 
+    async def get_done_or_start(
+        self,
+        key: str,
+        ttl_seconds: int,
+    ) -> tuple[VoiceOrderResult | None, bool]:
+        """Готовый результат или бронь ключа: ``(результат, забронирован)``."""
+        cached = await self.get_done(key)
+        if cached is not None:
+            return cached, False
+        return None, await self.try_start(key, ttl_seconds)
+
     async def mark_done(self, key: str, result: VoiceOrderResult, ttl_seconds: int) -> None:
         """Зафиксировать успешный результат по ключу."""
         now = monotonic()
@@ -178,14 +197,7 @@ class RedisIdempotencyStore:
             error_code=error_code,
         )
 
-    async def get_done(self, key: str) -> VoiceOrderResult | None:
-        full_key = self._full_key(key)
-        try:
-            raw = await self._redis.get(full_key)
-        except Exception:
-            return await self._fallback_store.get_done(key)
-        if raw is None:
-            return None
+    def _parse_done(self, raw: object) -> VoiceOrderResult | None:
         if isinstance(raw, bytes):
             raw = raw.decode("utf-8", errors="ignore")
         if not isinstance(raw, str):
@@ -201,6 +213,16 @@ class RedisIdempotencyStore:
             return None
         return self._deserialize_result(result_payload)
 
+    async def get_done(self, key: str) -> VoiceOrderResult | None:
+        full_key = self._full_key(key)
+        try:
+            raw = await self._redis.get(full_key)
+        except Exception:
+            return await self._fallback_store.get_done(key)
+        if raw is None:
+            return None
+        return self._parse_done(raw)
+
     async def try_start(self, key: str, ttl_seconds: int) -> bool:
         full_key = self._full_key(key)
         payload = {"status": "in_progress"}
@@ -215,6 +237,27 @@ class RedisIdempotencyStore:
             return await self._fallback_store.try_start(key, ttl_seconds)
         return bool(created)
 
+    async def get_done_or_start(
+        self,
+        key: str,
+        ttl_seconds: int,
+    ) -> tuple[VoiceOrderResult | None, bool]:
+        """GET и SET NX одним Lua-скриптом — один round trip вместо двух."""
+        full_key = self._full_key(key)
+        payload = {"status": "in_progress"}
+        try:
+            reply = await IDEMPOTENCY_BEGIN(
+                self._redis,
+                [full_key],
+                [json.dumps(payload, ensure_ascii=False), max(1, ttl_seconds)],
+            )
+        except Exception:
+            return await self._fallback_store.get_done_or_start(key, ttl_seconds)
+        if isinstance(reply, int):
+            return None, True
+        # Ключ занят: готовый результат или чужая бронь
+        return self._parse_done(reply), False
+
     async def mark_done(self, key: str, result: VoiceOrderResult, ttl_seconds: int) -> None:
         full_key = self._full_key(key)
         payload = {
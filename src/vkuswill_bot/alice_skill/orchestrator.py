@@ -461,11 +461,12 @@ class AliceOrderOrchestrator:
             utterance,
             self._current_minute_bucket(),
         )
-        cached = await self._idempotency_store.get_done(idem_key)
+        cached, started = await self._idempotency_store.get_done_or_start(
+            idem_key,
+            self._idempotency_ttl_seconds,
+        )
         if cached is not None:
             return cached
-
-        started = await self._idempotency_store.try_start(idem_key, self._idempotency_ttl_seconds)
         if not started:
             return VoiceOrderResult(
                 ok=False,
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import uuid
 from dataclasses import dataclass
 from time import monotonic
 from typing import TYPE_CHECKING
 from typing import Protocol
 
+from vkuswill_bot.alice_skill.redis_scripts import SLIDING_WINDOW_ALLOW
+
 if TYPE_CHECKING:
     from redis.asyncio import Redis
 
@@ -51,7 +54,11 @@ class InMemoryRateLimiter:
 
 
 class RedisRateLimiter:
-    """Redis fixed-window limiter shared между инстансами."""
+    """Redis sliding-window limiter shared между инстансами.
+
+    Проверка и запись попытки — один Lua-скрипт (один round trip, ключ
+    всегда с TTL).
+    """
 
     def __init__(
         self,
@@ -72,9 +79,11 @@ class RedisRateLimiter:
             return True
         full_key = self._full_key(key)
         try:
-            count = await self._redis.incr(full_key)
-            if count == 1:
-                await self._redis.expire(full_key, max(1, window_seconds))
-            return count <= limit
+            allowed = await SLIDING_WINDOW_ALLOW(
+                self._redis,
+                [full_key],
+                [limit, window_seconds * 1000, uuid.uuid4().hex],
+            )
+            return bool(allowed)
         except Exception:
             return await self._fallback.allow(key, limit=limit, window_seconds=window_seconds)
@@ -0,0 +1,90 @@
+"""Lua-скрипты Redis для Alice-канала: одна проверка — один round trip.
+
+Скрипты выполняются через EVALSHA; тело загружается ``SCRIPT LOAD``
+заранее (при сборке runtime) или лениво — при ответе NOSCRIPT (рестарт
+или failover Redis). Модуль не импортирует redis: клиент передаётся
+вызывающим, импорт функции Алисы остаётся лёгким.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+from typing import Any
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class LuaScript:
+    """Lua-скрипт, вызываемый по SHA1 (EVALSHA с дозагрузкой по NOSCRIPT)."""
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+    async def load(self, redis: Redis) -> None:
+        """Загрузить скрипт в кеш скриптов Redis (SCRIPT LOAD)."""
+        await redis.script_load(self.source)
+
+    async def __call__(self, redis: Redis, keys: list[str], args: list[Any]) -> Any:
+        try:
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+        except Exception as exc:
+            if not _is_noscript(exc):
+                raise
+        await self.load(redis)
+        return await redis.evalsha(self.sha, len(keys), *keys, *args)
+
+
+def _is_noscript(exc: Exception) -> bool:
+    from redis.exceptions import NoScriptError
+
+    return isinstance(exc, NoScriptError)
+
+
+# Идемпотентность: готовый результат или бронь ключа за один вызов.
+# KEYS[1] — ключ; ARGV[1] — payload «in_progress»; ARGV[2] — TTL брони, с.
+# Ключ есть — возвращается его значение (done или чужая бронь),
+# ключа нет — SET EX и 1 (бронь наша).
+IDEMPOTENCY_BEGIN = LuaScript(
+    """
+local current = redis.call('GET', KEYS[1])
+if current then
+    return current
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+)
+
+# Скользящее окно: ZSET отметок времени разрешённых попыток (мс, часы Redis —
+# одни на все инстансы функции). Отклонённые попытки не записываются.
+# KEYS[1] — ключ лимита; ARGV[1] — лимит; ARGV[2] — окно, мс;
+# ARGV[3] — уникальный суффикс попытки. Ответ: 1 — разрешено, 0 — лимит.
+# Строковый счётчик прежнего fixed-window (INCR) под тем же ключом удаляется.
+# Требует Redis >= 5 (репликация эффектов: TIME перед записью).
+SLIDING_WINDOW_ALLOW = LuaScript(
+    """
+local kind = redis.call('TYPE', KEYS[1])['ok']
+if kind ~= 'zset' and kind ~= 'none' then
+    redis.call('DEL', KEYS[1])
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, now .. ':' .. ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return 1
+"""
+)
+
+
+async def load_scripts(redis: Redis) -> None:
+    """SCRIPT LOAD всех скриптов — первый запрос не платит за NOSCRIPT."""
+    for script in (IDEMPOTENCY_BEGIN, SLIDING_WINDOW_ALLOW):
+        await script.load(redis)
@@ -4,23 +4,29 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import html
 import logging
 import re
+import time
 from typing import TYPE_CHECKING
 
 from aiogram import F, Router
 from aiogram.enums import ChatAction
 from aiogram.filters import BaseFilter, Command, CommandStart
 from aiogram.types import (
+    BufferedInputFile,
     CallbackQuery,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     Message,
 )
 
+from vkuswill_bot.services.cart_repeat import describe_cart
 from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.profiler import DEFAULT_PROFILE_SECONDS, MAX_PROFILE_SECONDS
 
 if TYPE_CHECKING:
+    from vkuswill_bot.services.profiler import MemoryTracker, SamplingProfiler
     from vkuswill_bot.services.stats_aggregator import StatsAggregator
     from vkuswill_bot.services.user_store import UserStore
 
@@ -453,6 +459,7 @@ async def cmd_help(message: Message) -> None:
         "3. Перейди по ссылке на сайт ВкусВилл для оформления заказа\n\n"
         f"{_freemium_user_note()}\n\n"
         "<b>Команды:</b>\n"
+        "/repeat — повторить одну из прошлых корзин\n"
         "/reset — сбросить историю диалога\n"
         "/link_voice — привязать Алису\n"
         "/unlink_voice — отвязать Алису\n"
@@ -625,6 +632,84 @@ async def cmd_unlink_voice(
         )
 
 
+# ── «Повторить корзину»: корзина из истории без GigaChat ──────────
+
+# «Повтори корзину», «повторить последнюю корзину» — без уточнений
+_REPEAT_CART_RE = re.compile(
+    r"^\s*повтори(?:ть)?\s+(?:мою\s+)?(?:последнюю\s+|прошлую\s+)?корзину\s*[.!]?\s*$",
+    re.IGNORECASE,
+)
+
+
+async def _repeat_cart(
+    message: Message,
+    user_id: int,
+    cart_id: str | None,
+    gigachat_service: GigaChatService,
+) -> None:
+    """Пересобрать корзину из истории (None — последняя) и отправить ответ."""
+    try:
+        response = await gigachat_service.repeat_cart(user_id, cart_id)
+    except Exception as e:
+        logger.error("Ошибка повтора корзины user %d: %s", user_id, e, exc_info=True)
+        response = "Не получилось повторить корзину. Попробуйте позже."
+    await _send_answer(message, response)
+
+
+@router.message(Command("repeat"))
+async def cmd_repeat(
+    message: Message,
+    gigachat_service: GigaChatService,
+) -> None:
+    """Обработчик /repeat — выбрать прошлую корзину и собрать её заново."""
+    if not message.from_user:
+        return
+    user_id = message.from_user.id
+    carts = await gigachat_service.get_cart_history(user_id)
+    if not carts:
+        await message.answer("Прошлых корзин пока нет. Напиши, что хочешь купить!")
+        return
+    if len(carts) == 1:
+        await _repeat_cart(message, user_id, None, gigachat_service)
+        return
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=f"\U0001f501 {describe_cart(cart)}",
+                    # id состава, а не позиция: новая корзина сдвигает историю
+                    callback_data=f"cart_repeat_{cart['id']}",
+                ),
+            ]
+            for cart in carts
+        ],
+    )
+    await message.answer("Какую корзину повторить?", reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("cart_repeat_"))
+async def cart_repeat_callback(
+    callback: CallbackQuery,
+    gigachat_service: GigaChatService,
+) -> None:
+    """Кнопка «Повторить корзину» — корзина истории по её id."""
+    if not callback.message or not callback.from_user or not callback.data:
+        return
+    cart_id = callback.data.removeprefix("cart_repeat_")
+    if not cart_id:
+        await callback.answer()
+        return
+    await callback.answer("Собираю корзину…")
+    with contextlib.suppress(Exception):
+        await callback.message.edit_reply_markup(reply_markup=None)  # type: ignore[union-attr]
+    await _repeat_cart(
+        callback.message,  # type: ignore[arg-type]
+        callback.from_user.id,
+        cart_id,
+        gigachat_service,
+    )
+
+
 @router.message(Command("reset"))
 async def cmd_reset(
     message: Message,
@@ -1158,6 +1243,11 @@ async def handle_text(
         await message.answer("Не удалось сохранить отзыв. Попробуйте позже: /survey")
         return
 
+    # «Повтори корзину» — последняя корзина без GigaChat
+    if _REPEAT_CART_RE.match(message.text):
+        await _repeat_cart(message, user_id, None, gigachat_service)
+        return
+
     # Implicit consent: если пользователь отправил текст без явного согласия,
     # фиксируем факт использования как implicit consent (ADR-002)
     if user_store is not None:
@@ -1227,6 +1317,11 @@ async def handle_text(
             with contextlib.suppress(Exception):
                 await progress_msg.delete()
 
+    await _send_answer(message, response)
+
+
+async def _send_answer(message: Message, response: str) -> None:
+    """Отправить ответ бота: санитизация, кнопка корзины, разбивка по лимиту."""
     # Санитизация: пропускаем только Telegram-безопасные HTML-теги,
     # экранируем опасные (script, img, iframe и пр.)
     safe_response = _sanitize_telegram_html(response)
@@ -1735,3 +1830,93 @@ async def cmd_admin_cart_feedback(
         text += f"\n<b>Последние негативные:</b>\n{recent_lines}"
 
     await message.answer(text)
+
+
+# Длина строки отчёта tracemalloc в ответе /admin_memory
+_MEMORY_LINE_LIMIT = 180
+
+
+@admin_router.message(Command("admin_profile"))
+async def cmd_admin_profile(
+    message: Message,
+    profiler: SamplingProfiler | None = None,
+) -> None:
+    """Профиль event loop: /admin_profile [секунды] — collapsed stacks файлом."""
+    if profiler is None:
+        await message.answer("Профайлер не настроен.")
+        return
+    if profiler.running:
+        await message.answer("Профилирование уже запущено.")
+        return
+
+    seconds = DEFAULT_PROFILE_SECONDS
+    if message.text:
+        parts = message.text.split(maxsplit=1)
+        if len(parts) > 1:
+            with contextlib.suppress(ValueError):
+                seconds = max(1, min(int(parts[1]), MAX_PROFILE_SECONDS))
+
+    await message.answer(f"Профилирую event loop {seconds} с...")
+    result = await profiler.capture(seconds)
+
+    top = "\n".join(
+        f"{share * 100:5.1f}% {html.escape(leaf)}" for leaf, share in result.top_functions(10)
+    )
+    caption = (
+        f"<b>Профиль event loop, {seconds} с</b>\n"
+        f"Сэмплов: {result.samples}, простой: {result.idle_share() * 100:.0f}%\n"
+        "Файл — collapsed stacks (flamegraph.pl, speedscope)."
+    )
+    document = BufferedInputFile(
+        result.collapsed().encode(),
+        filename=f"profile-{time.strftime('%Y%m%d-%H%M%S')}.collapsed",
+    )
+    await message.answer_document(document, caption=caption)
+    if top:
+        await message.answer(f"<b>Собственное время (без простоя):</b>\n<pre>{top}</pre>")
+
+
+@admin_router.message(Command("admin_memory"))
+async def cmd_admin_memory(
+    message: Message,
+    memory_tracker: MemoryTracker | None = None,
+) -> None:
+    """Снимки tracemalloc: /admin_memory start | diff | stop."""
+    if memory_tracker is None:
+        await message.answer("Трекер памяти не настроен.")
+        return
+
+    parts = (message.text or "").split(maxsplit=1)
+    action = parts[1].strip().lower() if len(parts) > 1 else ""
+
+    if action == "start":
+        await asyncio.to_thread(memory_tracker.start)
+        await message.answer(
+            "tracemalloc включён, базовый снимок снят.\n"
+            "Через некоторое время: /admin_memory diff, по окончании — /admin_memory stop."
+        )
+    elif action == "diff":
+        try:
+            report = await asyncio.to_thread(memory_tracker.diff)
+        except RuntimeError:
+            await message.answer("Сначала /admin_memory start.")
+            return
+        sizes = "\n".join(
+            f"{name}: {before} → {after}" for name, (before, after) in report.sizes.items()
+        )
+        # Строки отчёта укорочены — ответ укладывается в одно сообщение
+        top = "\n".join(html.escape(line[:_MEMORY_LINE_LIMIT]) for line in report.top)
+        text = (
+            f"<b>Память за {report.seconds / 60:.0f} мин</b>\n"
+            f"tracemalloc: {report.traced_current / 2**20:.1f} МБ "
+            f"(пик {report.traced_peak / 2**20:.1f} МБ)\n"
+        )
+        if sizes:
+            text += f"\n<b>Размеры:</b>\n<pre>{html.escape(sizes)}</pre>\n"
+        text += f"\n<b>Рост по строкам:</b>\n<pre>{top or '—'}</pre>"
+        await message.answer(text)
+    elif action == "stop":
+        memory_tracker.stop()
+        await message.answer("tracemalloc выключен.")
+    else:
+        await message.answer("Использование: /admin_memory start | diff | stop")
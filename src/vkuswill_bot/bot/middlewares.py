@@ -203,6 +203,10 @@ class ThrottlingMiddleware(BaseMiddleware):
         self._user_timestamps: dict[int, list[float]] = {}
         self._last_full_cleanup: float = time.monotonic()
 
+    def tracked_user_count(self) -> int:
+        """Число пользователей с записями rate limit (диагностика утечек)."""
+        return len(self._user_timestamps)
+
     def _full_cleanup(self, now: float) -> None:
         """Полная очистка: удалить всех пользователей с устаревшими записями."""
         cutoff = now - self.period
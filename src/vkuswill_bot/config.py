@@ -44,11 +44,69 @@ class Config(BaseSettings):
     database_path: str = "data/preferences.db"
     recipe_database_path: str = "data/recipes.db"
 
+    # Кеш рецептов: in-memory LRU + SQLite + Redis (при storage_backend=redis)
+    recipe_cache_size: int = 256  # рецептов в L1
+    recipe_fuzzy_threshold: float = 0.6  # сходство названий блюд; 0 = без нечёткого поиска
+
+    # Локальный индекс каталога (SQLite FTS5) — товары из результатов поиска
+    catalog_index_enabled: bool = False
+    catalog_database_path: str = "data/catalog.db"
+    catalog_index_mode: str = "fallback"  # "fallback" | "first"
+    catalog_index_mcp_timeout: float = 0.0  # сек; 0 = ждать штатного таймаута MCP
+    catalog_index_max_age_days: int = 7  # товары старше не отдаются из индекса
+
+    # КБЖУ (Open Food Facts): SQLite-кеш и ограничение частоты запросов
+    nutrition_database_path: str = "data/nutrition.db"
+    nutrition_cache_ttl_days: int = 30
+    nutrition_negative_ttl_hours: int = 24  # «не найдено» кешируется короче
+    nutrition_rate_per_minute: float = 10.0  # рекомендация Open Food Facts
+    # Офлайн-индекс дампа (scripts/build_nutrition_index.py); пусто — только API
+    nutrition_index_path: str = ""
+
+    # Прогрев кешей по популярным запросам и блюдам из user_events (нужен PostgreSQL)
+    cache_warmup_enabled: bool = False
+    cache_warmup_top_queries: int = 100
+    cache_warmup_top_dishes: int = 50
+    cache_warmup_lookback_days: int = 7
+    cache_warmup_concurrency: int = 2  # одновременных запросов к MCP
+    cache_warmup_interval_hours: float = 6.0  # 0 = только при старте
+
+    # Refresh-ahead цен горячих товаров: обновление до истечения TTL цены в Redis
+    price_refresh_enabled: bool = False
+    price_refresh_calls_per_minute: int = 30  # бюджет вызовов MCP
+    price_refresh_min_hits: float = 2.0  # обращений (с затуханием) до «горячего» товара
+
+    # Префетч поиска: список покупок из сообщения ищется параллельно с первым вызовом LLM
+    search_prefetch_enabled: bool = False
+    search_prefetch_max_queries: int = 8
+
+    # Быстрый путь без LLM: простой список покупок → поиск, лучший товар, корзина, шаблон ответа
+    list_fast_path_enabled: bool = False
+    list_fast_path_max_items: int = 8
+
+    # «Повторить корзину»: сколько прошлых корзин хранить на пользователя
+    cart_history_size: int = 5
+
+    # Кеш ссылок на корзину по содержимому (сек, 0 = выключен): L1 + Redis, если есть.
+    # Выключен по умолчанию: время жизни ссылок ВкусВилл не документировано
+    cart_link_cache_ttl: int = 0
+
+    # Кеш карточек товаров vkusvill_product_details (часы, 0 = выключен):
+    # L1 + Redis, без Redis — SQLite; горячие карточки обновляются в фоне
+    product_details_cache_ttl_hours: int = 72
+    product_details_database_path: str = "data/product_details.db"
+    product_details_refresh_ahead: float = 0.8  # доля TTL; 0 = без фонового обновления
+
+    # Морфология проверки релевантности: "snowball" | "pymorphy" (pymorphy3 — отдельно)
+    morphology_backend: str = "snowball"
+
     # Бэкенд хранилища: "redis" | "memory"
     storage_backend: str = "memory"
 
     # Redis
     redis_url: str = ""
+    # Инвалидация L1 кеша цен между подами (поток price:invalidations в Redis)
+    price_invalidation_enabled: bool = False
 
     # PostgreSQL (управление пользователями)
     database_url: str = ""
@@ -113,6 +171,16 @@ class Config(BaseSettings):
     webhook_host: str = ""
     webhook_port: int = 8080
     webhook_cert_path: str = ""  # путь к самоподписанному SSL-сертификату для Telegram
+    # Адрес Bot API (пусто — api.telegram.org); для нагрузочных тестов —
+    # заглушка loadtests/stub_backends.py
+    telegram_api_server: str = ""
+    # /metrics (Prometheus) на порту webhook; снаружи закрыт nginx
+    metrics_enabled: bool = True
+    # Мониторинг event loop: задержка (в /metrics и /health) и, если порог > 0,
+    # стек кода, блокирующего цикл дольше порога
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval: float = 0.5  # секунды между замерами задержки
+    loop_slow_callback_ms: int = 0  # 0 — детектор медленных callback выключен
 
     # S3 логирование (Yandex Object Storage)
     s3_log_enabled: bool = False
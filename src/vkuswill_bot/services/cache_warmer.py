@@ -0,0 +1,236 @@
+"""Прогрев кешей по историческому спросу.
+
+После деплоя или рестарта L1-кеши (цены, рецепты, индекс каталога) пусты,
+и первые пользователи платят полную латентность MCP/GigaChat. CacheWarmer
+при старте и затем периодически берёт из ``user_events`` самые частые
+запросы поиска (``product_search.query``) и блюда (``recipe_request.dish``):
+
+- запросы прогоняются через MCP-поиск → кеш цен и индекс каталога;
+- блюда поднимаются в L1 кеша рецептов из SQLite/Redis (без вызова LLM).
+
+Параллелизм ограничен, а при живом трафике прогрев уступает: ToolExecutor
+отмечает каждый вызов инструмента (``mark_live``), и прогрев ждёт паузы.
+Через 10 минут после прогрева в лог пишется hit rate кешей за этот период.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from vkuswill_bot.services.recipe_service import RecipeService
+from vkuswill_bot.services.recipe_store import TieredRecipeStore
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT
+
+if TYPE_CHECKING:
+    from vkuswill_bot.services.catalog_index import CatalogIndex
+    from vkuswill_bot.services.mcp_client import VkusvillMCPClient
+    from vkuswill_bot.services.price_cache import PriceCache
+    from vkuswill_bot.services.recipe_store import RecipeStore
+    from vkuswill_bot.services.search_processor import SearchProcessor
+    from vkuswill_bot.services.user_store import UserStore
+
+logger = logging.getLogger(__name__)
+
+# Окно оценки эффекта прогрева (секунды)
+REPORT_AFTER = 600
+
+# Живой трафик считается активным, если последний вызов был не раньше (секунды)
+_LIVE_IDLE_GAP = 2.0
+
+# Шаг ожидания паузы в живом трафике (секунды)
+_YIELD_STEP = 0.5
+
+# Максимальное ожидание паузы на один элемент — иначе прогрев не закончится
+# при постоянной нагрузке (секунды)
+_MAX_YIELD = 30.0
+
+
+class CacheWarmer:
+    """Фоновый прогрев кешей цен, поиска и рецептов популярными запросами."""
+
+    def __init__(
+        self,
+        user_store: UserStore,
+        mcp_client: VkusvillMCPClient,
+        search_processor: SearchProcessor,
+        price_cache: PriceCache,
+        recipe_store: RecipeStore,
+        catalog_index: CatalogIndex | None = None,
+        top_queries: int = 100,
+        top_dishes: int = 50,
+        lookback_days: int = 7,
+        concurrency: int = 2,
+        interval: float = 6 * 3600,
+    ) -> None:
+        self._user_store = user_store
+        self._mcp_client = mcp_client
+        self._search_processor = search_processor
+        self._price_cache = price_cache
+        self._recipe_store = recipe_store
+        self._catalog_index = catalog_index
+        self._top_queries = top_queries
+        self._top_dishes = top_dishes
+        self._lookback_days = lookback_days
+        self._concurrency = max(1, concurrency)
+        self._interval = interval
+        self._last_live = 0.0
+        self._task: asyncio.Task | None = None
+
+    # ---- Живой трафик ----
+
+    def mark_live(self) -> None:
+        """Отметить живой запрос пользователя (прогрев уступит ему)."""
+        self._last_live = time.monotonic()
+
+    async def _wait_for_idle(self) -> None:
+        """Дождаться паузы в живом трафике (не дольше _MAX_YIELD)."""
+        waited = 0.0
+        while time.monotonic() - self._last_live < _LIVE_IDLE_GAP and waited < _MAX_YIELD:
+            await asyncio.sleep(_YIELD_STEP)
+            waited += _YIELD_STEP
+
+    # ---- Прогрев ----
+
+    async def _warm_query(self, query: str, sem: asyncio.Semaphore) -> bool:
+        """Прогнать поисковый запрос через MCP: цены + индекс каталога."""
+        args = {"q": self._search_processor.clean_search_query(query), "limit": SEARCH_LIMIT}
+        async with sem:
+            # Пауза трафика проверяется под семафором — прямо перед вызовом MCP
+            await self._wait_for_idle()
+            raw = await self._mcp_client.call_tool("vkusvill_products_search", args)
+        await self._search_processor.cache_prices(raw)
+        if self._catalog_index is not None:
+            self._catalog_index.submit(raw)
+        return True
+
+    async def _warm_dish(self, dish: str, sem: asyncio.Semaphore) -> bool:
+        """Поднять рецепт в L1 из нижних уровней кеша (без вызова LLM)."""
+        async with sem:
+            await self._wait_for_idle()
+            if isinstance(self._recipe_store, TieredRecipeStore):
+                # Прогрев не считается попаданием в статистике кеша рецептов
+                return await self._recipe_store.preload(
+                    dish,
+                    prompt_version=RecipeService._PROMPT_VERSION,
+                )
+            recipe = await self._recipe_store.get(
+                dish,
+                prompt_version=RecipeService._PROMPT_VERSION,
+            )
+        return recipe is not None
+
+    async def warm_up(self) -> dict[str, float]:
+        """Один проход прогрева.
+
+        Returns:
+            Сводка: прогретые запросы и блюда, ошибки, длительность (сек).
+        """
+        start = time.monotonic()
+        queries = await self._user_store.top_event_values(
+            "product_search", "query", days=self._lookback_days, limit=self._top_queries
+        )
+        dishes = await self._user_store.top_event_values(
+            "recipe_request", "dish", days=self._lookback_days, limit=self._top_dishes
+        )
+
+        sem = asyncio.Semaphore(self._concurrency)
+        outcomes = await asyncio.gather(
+            *(self._warm_query(q, sem) for q in queries),
+            *(self._warm_dish(d, sem) for d in dishes),
+            return_exceptions=True,
+        )
+        query_outcomes, dish_outcomes = outcomes[: len(queries)], outcomes[len(queries) :]
+        errors = [o for o in outcomes if isinstance(o, Exception)]
+        for exc in errors[:3]:
+            logger.debug("CacheWarmer: ошибка прогрева: %s", exc)
+
+        summary = {
+            "queries": sum(o is True for o in query_outcomes),
+            "dishes": sum(o is True for o in dish_outcomes),
+            "errors": len(errors),
+            "duration": time.monotonic() - start,
+        }
+        logger.info(
+            "CacheWarmer: прогрев за %.1f с — запросов %d/%d, рецептов %d/%d, ошибок %d",
+            summary["duration"],
+            summary["queries"],
+            len(queries),
+            summary["dishes"],
+            len(dishes),
+            summary["errors"],
+        )
+        return summary
+
+    # ---- Эффект прогрева ----
+
+    def _snapshot(self) -> dict[str, int]:
+        """Текущие счётчики попаданий кешей."""
+        snapshot = {
+            "price_hits": self._price_cache.hits,
+            "price_misses": self._price_cache.misses,
+        }
+        if isinstance(self._recipe_store, TieredRecipeStore):
+            stats = self._recipe_store.stats
+            snapshot["recipe_hits"] = int(stats["llm_calls_saved"])
+            snapshot["recipe_misses"] = int(stats["misses"])
+        return snapshot
+
+    def log_hit_rate(self, baseline: dict[str, int]) -> dict[str, float]:
+        """Записать в лог hit rate кешей с момента ``baseline``.
+
+        Returns:
+            {"prices": hit_rate, "recipes": hit_rate} (если есть обращения).
+        """
+        current = self._snapshot()
+        rates: dict[str, float] = {}
+        for name, prefix in (("prices", "price"), ("recipes", "recipe")):
+            if f"{prefix}_hits" not in current:
+                continue
+            hits = current[f"{prefix}_hits"] - baseline.get(f"{prefix}_hits", 0)
+            misses = current[f"{prefix}_misses"] - baseline.get(f"{prefix}_misses", 0)
+            if hits + misses:
+                rates[name] = hits / (hits + misses)
+        logger.info(
+            "CacheWarmer: hit rate за %d мин после прогрева: %s",
+            REPORT_AFTER // 60,
+            ", ".join(f"{k} {v:.1%}" for k, v in rates.items()) or "обращений не было",
+        )
+        return rates
+
+    # ---- Фоновая задача ----
+
+    async def _run_safely(self) -> None:
+        try:
+            await self.warm_up()
+        except Exception as exc:
+            logger.warning("CacheWarmer: прогрев не выполнен: %s", exc)
+
+    async def _loop(self) -> None:
+        """Прогрев при старте, отчёт через REPORT_AFTER, затем периодически."""
+        await self._run_safely()
+        baseline = self._snapshot()
+        await asyncio.sleep(REPORT_AFTER)
+        self.log_hit_rate(baseline)
+        if self._interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self._interval)
+            await self._run_safely()
+
+    def start(self) -> None:
+        """Запустить фоновую задачу."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info("CacheWarmer: фоновая задача запущена")
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            logger.info("CacheWarmer: фоновая задача остановлена")
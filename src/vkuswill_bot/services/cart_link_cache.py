@@ -0,0 +1,175 @@
+"""Кеш ссылок на корзину по содержимому (content-addressed).
+
+Одна и та же корзина часто создаётся повторно: после уточняющего вопроса,
+при пересборке моделью в той же сессии, при «Повторить корзину». Каждый
+раз ``vkusvill_cart_link_create`` — поход в MCP. CartLinkCache хранит
+успешный ответ MCP под ключом — хешем отсортированного набора
+``(xml_id, q)`` после ``fix_cart_args``/``fix_unit_quantities``, поэтому
+одинаковое содержимое в любом порядке даёт ту же ссылку. ``price_summary``
+к ответу из кеша дописывается как обычно — в постобработке, по текущим ценам.
+
+Уровни: L1 (in-memory, LRU + TTL) и L2 (Redis, общий для подов, если есть).
+
+Redis-структура:
+    cart_link:{sha256} → ответ MCP (JSON-строка), TTL = CART_LINK_TTL
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from vkuswill_bot.services.cart_snapshot_store import CART_SNAPSHOT_TTL
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# Ссылка живёт столько же, сколько снимок корзины (get_previous_cart
+# отдаёт её пользователю весь этот срок)
+CART_LINK_TTL = CART_SNAPSHOT_TTL
+
+# Макс. ссылок в L1
+MAX_LOCAL_LINKS = 2000
+
+# Логировать статистику каждые N попаданий
+_STATS_LOG_EVERY = 50
+
+_KEY_PREFIX = "cart_link:"
+
+
+def cart_key(products: list[dict]) -> str | None:
+    """Ключ корзины: sha256 отсортированного набора (xml_id, q).
+
+    Returns:
+        Хеш или None, если в корзине нет валидных позиций.
+    """
+    items: list[tuple[int, float]] = []
+    for item in products:
+        if not isinstance(item, dict) or not isinstance(item.get("xml_id"), int):
+            return None
+        q = item.get("q", 1)
+        if not isinstance(q, int | float):
+            return None
+        # 2 и 2.0 — одно количество
+        items.append((item["xml_id"], float(q)))
+    if not items:
+        return None
+    canonical = json.dumps(sorted(items), separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class CartLinkCache:
+    """Ответы ``vkusvill_cart_link_create`` по содержимому корзины.
+
+    Кешируются только успешные ответы (ok: true). Ошибки Redis не мешают
+    работе — кеш деградирует до L1.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        ttl: int = CART_LINK_TTL,
+        max_size: int = MAX_LOCAL_LINKS,
+    ) -> None:
+        self._redis = redis
+        self._ttl = ttl
+        self._max_size = max_size
+        self._local: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._stats: dict[str, float] = {
+            "hits": 0,
+            "misses": 0,
+            "mcp_calls": 0,
+            "mcp_seconds": 0.0,
+            "saved_seconds": 0.0,
+        }
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Попадания, промахи, hit rate и сэкономленное время MCP (оценка по среднему)."""
+        s = self._stats
+        total = s["hits"] + s["misses"]
+        return {**s, "hit_rate": s["hits"] / total if total else 0.0}
+
+    def _avg_latency(self) -> float:
+        calls = self._stats["mcp_calls"]
+        return self._stats["mcp_seconds"] / calls if calls else 0.0
+
+    async def get(self, products: list[dict]) -> str | None:
+        """Ответ MCP для корзины с тем же содержимым или None."""
+        key = cart_key(products)
+        if key is None:
+            return None
+        result = self._get_local(key)
+        if result is None and self._redis is not None:
+            try:
+                # Остаток TTL — чтобы L1 не держал ссылку дольше, чем L2
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.get(f"{_KEY_PREFIX}{key}")
+                pipe.ttl(f"{_KEY_PREFIX}{key}")
+                raw, ttl = await pipe.execute()
+            except Exception as e:
+                logger.warning("Redis get error for cart_link:%s: %s", key[:12], e)
+                raw, ttl = None, 0
+            if raw is not None:
+                result = raw.decode() if isinstance(raw, bytes) else str(raw)
+                self._set_local(key, result, ttl if ttl > 0 else self._ttl)
+        if result is None:
+            self._stats["misses"] += 1
+            return None
+
+        self._stats["hits"] += 1
+        self._stats["saved_seconds"] += self._avg_latency()
+        logger.info("Корзина %s: ссылка из кеша", key[:12])
+        if self._stats["hits"] % _STATS_LOG_EVERY == 0:
+            stats = self.stats
+            logger.info(
+                "Кеш ссылок корзин: hit rate %.1f%%, попаданий %d, сэкономлено ~%.1f с MCP",
+                stats["hit_rate"] * 100,
+                stats["hits"],
+                stats["saved_seconds"],
+            )
+        return result
+
+    async def set(self, products: list[dict], result: str, latency: float) -> None:
+        """Сохранить успешный ответ MCP и учесть задержку вызова.
+
+        Args:
+            products: Товары корзины (после предобработки).
+            result: Ответ ``vkusvill_cart_link_create``.
+            latency: Время вызова MCP, с.
+        """
+        self._stats["mcp_calls"] += 1
+        self._stats["mcp_seconds"] += latency
+        key = cart_key(products)
+        if key is None:
+            return
+        self._set_local(key, result, self._ttl)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(f"{_KEY_PREFIX}{key}", result, ex=self._ttl)
+        except Exception as e:
+            logger.warning("Redis set error for cart_link:%s: %s", key[:12], e)
+
+    def _get_local(self, key: str) -> str | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return result
+
+    def _set_local(self, key: str, result: str, ttl: float) -> None:
+        self._local[key] = (time.monotonic() + ttl, result)
+        self._local.move_to_end(key)
+        while len(self._local) > self._max_size:
+            self._local.popitem(last=False)
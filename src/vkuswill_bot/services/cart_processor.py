@@ -4,7 +4,6 @@ import copy
 import json
 import logging
 import math
-import re
 
 from vkuswill_bot.services.price_cache import PriceCache
 
@@ -398,44 +397,48 @@ class CartProcessor:
     ) -> list[tuple[str, str]]:
         """Обнаружить похожие товары в корзине.
 
-        Сравнивает названия товаров попарно. Если два товара имеют
-        >= _MIN_NAME_OVERLAP общих значимых слов — считаем их похожими.
+        Если два товара имеют >= _MIN_NAME_OVERLAP общих значимых слов —
+        считаем их похожими. Вместо попарного сравнения всех товаров
+        строится инвертированный индекс слово → товары: общие слова
+        считаются только для пар, у которых они действительно есть.
+        Слова названия берутся из записи кеша цен (``PriceInfo.name_words``)
+        и не разбираются заново при каждой сборке корзины.
 
         Пример: «Форель радужная стейк охл.» и «Форель радужная стейк зам.»
         имеют 3 общих слова → дубль.
 
         Returns:
-            Список пар (name1, name2) похожих товаров.
+            Список пар (name1, name2) похожих товаров в порядке корзины.
         """
         products = args.get("products", [])
         if len(products) < 2:
             return []
 
-        # Собираем (xml_id, name, значимые_слова)
-        items_info: list[tuple[int, str, frozenset[str]]] = []
+        names: list[str] = []
+        word_index: dict[str, list[int]] = {}
+        pairs: list[tuple[int, int]] = []
         for item in products:
             if not isinstance(item, dict):
                 continue
-            xml_id = item.get("xml_id")
-            cached = await self._price_cache.get(xml_id)
-            if cached:
-                name = cached.name
-                words = frozenset(
-                    w for w in re.findall(r"\w+", name.lower()) if len(w) >= _MIN_WORD_LEN
-                )
-                items_info.append((xml_id, name, words))
-
-        # Попарное сравнение
-        duplicates: list[tuple[str, str]] = []
-        for i in range(len(items_info)):
-            for j in range(i + 1, len(items_info)):
-                _, name1, words1 = items_info[i]
-                _, name2, words2 = items_info[j]
-                overlap = words1 & words2
-                if len(overlap) >= _MIN_NAME_OVERLAP:
-                    duplicates.append((name1, name2))
-
-        return duplicates
+            cached = await self._price_cache.get(item.get("xml_id"))
+            if not cached:
+                continue
+            pos = len(names)
+            names.append(cached.name)
+
+            # Сколько значимых слов текущий товар делит с каждым предыдущим
+            overlap: dict[int, int] = {}
+            for word in cached.name_words:
+                if len(word) < _MIN_WORD_LEN:
+                    continue
+                postings = word_index.setdefault(word, [])
+                for prev in postings:
+                    overlap[prev] = overlap.get(prev, 0) + 1
+                postings.append(pos)
+            pairs.extend((prev, pos) for prev, n in overlap.items() if n >= _MIN_NAME_OVERLAP)
+
+        pairs.sort()
+        return [(names[i], names[j]) for i, j in pairs]
 
     async def add_duplicate_warning(
         self,
@@ -0,0 +1,164 @@
+"""«Повторить корзину» без LLM.
+
+Повтор заказа через GigaChat — минимум три шага: ``get_previous_cart``,
+``vkusvill_cart_link_create`` и текст ответа. CartRepeater делает то же
+детерминированно по истории корзин (CartSnapshotStore):
+
+1. Цены всех товаров снимка — пакетно из кеша цен, промахи — через
+   ``vkusvill_product_details``; товары без цены считаются недоступными.
+2. Корзина из доступных товаров — один вызов ``vkusvill_cart_link_create``
+   через ToolExecutor (лимиты freemium, расчёт итога, новый снимок).
+3. Ответ по шаблону корзины + изменение итога и недоступные позиции.
+
+Сообщения пишутся в историю диалога так же, как их оставил бы GigaChat.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime
+
+from gigachat.models import Messages, MessagesRole
+
+from vkuswill_bot.services.list_fast_path import (
+    FastPathOutcome,
+    render_cart_answer,
+    tool_messages,
+)
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Разница итога, которую не стоит упоминать (копейки округления)
+_TOTAL_CHANGE_THRESHOLD = 1.0
+
+
+def cart_date(snapshot: dict) -> str:
+    """Дата корзины «ДД.ММ» (пусто, если неизвестна)."""
+    try:
+        return datetime.fromisoformat(snapshot.get("created_at", "")).strftime("%d.%m")
+    except (TypeError, ValueError):
+        return ""
+
+
+def describe_cart(snapshot: dict) -> str:
+    """Короткое описание корзины для кнопки: «12.10 · 5 поз. · 1234 руб»."""
+    parts = [cart_date(snapshot), f"{len(snapshot.get('products', []))} поз."]
+    total = snapshot.get("total")
+    if isinstance(total, int | float):
+        parts.append(f"{total:.0f} руб")
+    return " · ".join(p for p in parts if p)
+
+
+class CartRepeater:
+    """Повтор корзины из истории без вызовов GigaChat."""
+
+    def __init__(self, tool_executor: ToolExecutor) -> None:
+        self._te = tool_executor
+
+    async def carts(self, user_id: int) -> list[dict]:
+        """Прошлые корзины пользователя, новые первыми."""
+        return await self._te.get_cart_history(user_id)
+
+    async def repeat(self, user_id: int, cart_id: str | None = None) -> FastPathOutcome:
+        """Пересобрать корзину из истории по её ``id`` (None — последняя).
+
+        Returns:
+            FastPathOutcome с готовым ответом и сообщениями для истории
+            диалога (запрос пользователя, вызов корзины, ответ).
+        """
+        history = await self.carts(user_id)
+        snapshot = next(
+            (s for s in history if cart_id is None or s.get("id") == cart_id),
+            None,
+        )
+        if snapshot is None:
+            answer = "Не нашёл сохранённой корзины. Соберите новую — напишите, что купить."
+            return FastPathOutcome(answer=answer)
+
+        date = cart_date(snapshot)
+        title = f"Повторил корзину от {date}" if date else "Повторил корзину"
+        outcome = FastPathOutcome(
+            messages=[
+                Messages(
+                    role=MessagesRole.USER,
+                    content=f"Повтори корзину от {date}" if date else "Повтори корзину",
+                )
+            ]
+        )
+
+        products = snapshot["products"]
+        prices = await self._te.refresh_prices([p["xml_id"] for p in products])
+        available = [p for p in products if p["xml_id"] in prices]
+        unavailable = len(products) - len(available)
+        if not available:
+            outcome.answer = (
+                "Товаров из этой корзины сейчас нет в продаже. "
+                "Напишите, что купить, — подберу замену."
+            )
+        else:
+            te = self._te
+            args = await te.preprocess_args(
+                "vkusvill_cart_link_create", {"products": available}, {}
+            )
+            cart = await te.execute("vkusvill_cart_link_create", args, user_id)
+            cart = await te.postprocess_result(
+                "vkusvill_cart_link_create", args, cart, {}, {}, user_id=user_id
+            )
+            outcome.messages += tool_messages("vkusvill_cart_link_create", args, cart)
+            notes = self._notes(snapshot, cart, unavailable)
+            outcome.answer = render_cart_answer(cart, title, notes) or self._fallback(cart)
+            logger.info(
+                "Повтор корзины для user %d: %d поз., недоступно %d",
+                user_id,
+                len(available),
+                unavailable,
+            )
+
+        outcome.messages.append(Messages(role=MessagesRole.ASSISTANT, content=outcome.answer))
+        return outcome
+
+    @staticmethod
+    def _notes(snapshot: dict, cart_result: str, unavailable: int) -> list[str]:
+        """Что изменилось с прошлого раза: итог и недоступные позиции."""
+        notes: list[str] = []
+        old_total = snapshot.get("total")
+        try:
+            summary = json.loads(cart_result)["data"]["price_summary"]
+            new_total = summary.get("total")
+        except (json.JSONDecodeError, KeyError, TypeError):
+            new_total = None
+        if (
+            isinstance(old_total, int | float)
+            and isinstance(new_total, int | float)
+            and abs(new_total - old_total) >= _TOTAL_CHANGE_THRESHOLD
+        ):
+            diff = "дороже" if new_total > old_total else "дешевле"
+            notes.append(
+                f"Цены изменились: в прошлый раз {old_total:.2f} руб, "
+                f"сейчас на {abs(new_total - old_total):.2f} руб {diff}."
+            )
+        if unavailable:
+            notes.append(
+                f"Нет в продаже: {unavailable} поз. из прошлой корзины — "
+                "напишите, и я подберу замену."
+            )
+        return notes
+
+    @staticmethod
+    def _fallback(cart_result: str) -> str:
+        """Ответ, когда шаблон неприменим: ссылка, лимит или ошибка."""
+        try:
+            result = json.loads(cart_result)
+        except (json.JSONDecodeError, TypeError):
+            result = {}
+        if not isinstance(result, dict):
+            result = {}
+        data = result.get("data")
+        link = data.get("link") if isinstance(data, dict) else None
+        if isinstance(link, str) and link:
+            return f'Корзина готова.\n\n<a href="{link}">Открыть корзину</a>'
+        if result.get("error") == "cart_limit_reached" and result.get("message"):
+            return str(result["message"])
+        return "Не получилось повторить корзину. Попробуйте позже или соберите её заново."
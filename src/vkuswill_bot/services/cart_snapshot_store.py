@@ -3,12 +3,22 @@
 Сохраняет последнюю корзину пользователя (товары, ссылку, стоимость)
 после успешного создания корзины. TTL = 24 часа.
 
+Дополнительно хранит последние N корзин в компактном виде — для
+«Повторить корзину» с выбором одной из прошлых. TTL истории = 30 дней.
+
 Redis-структура:
     cart:{user_id} → JSON (products, link, total, created_at)
+    cart_history:{user_id} → LIST JSON {items: [[xml_id, q], ...], total, created_at},
+        новые слева
+
+Корзины истории отдаются со стабильным ``id`` — хешем состава: кнопка
+«Повторить» ссылается на него, а не на позицию в списке, которая
+сдвигается при сохранении новой корзины.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 from datetime import datetime, UTC
@@ -22,8 +32,55 @@ logger = logging.getLogger(__name__)
 # TTL снимка корзины (24 часа)
 CART_SNAPSHOT_TTL = 86400
 
+# Сколько прошлых корзин хранить на пользователя
+CART_HISTORY_SIZE = 5
+
+# TTL истории корзин (30 дней)
+CART_HISTORY_TTL = 30 * 86400
+
 # Префикс ключа в Redis
 _KEY_PREFIX = "cart:"
+_HISTORY_KEY_PREFIX = "cart_history:"
+
+
+def _compact(products: list[dict], total: float | None, created_at: str) -> dict:
+    """Компактная запись истории: только xml_id и количество."""
+    items = [
+        [p["xml_id"], p.get("q", 1)]
+        for p in products
+        if isinstance(p, dict) and isinstance(p.get("xml_id"), int)
+    ]
+    return {"items": items, "total": total, "created_at": created_at}
+
+
+def _cart_id(key: tuple) -> str:
+    """Стабильный id корзины истории — короткий хеш её состава."""
+    return hashlib.sha1(repr(key).encode(), usedforsecurity=False).hexdigest()[:10]
+
+
+def _expand(entries: list[dict]) -> list[dict]:
+    """Снимки из компактных записей; повторы одной и той же корзины схлопываются.
+
+    Returns:
+        [{id, products: [{xml_id, q}], total, created_at}], новые первыми.
+    """
+    seen: set[tuple] = set()
+    snapshots: list[dict] = []
+    for entry in entries:
+        items = entry.get("items") or []
+        key = tuple(sorted((int(x), q) for x, q in items))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        snapshots.append(
+            {
+                "id": _cart_id(key),
+                "products": [{"xml_id": x, "q": q} for x, q in items],
+                "total": entry.get("total"),
+                "created_at": entry.get("created_at", ""),
+            }
+        )
+    return snapshots
 
 
 class InMemoryCartSnapshotStore:
@@ -33,9 +90,15 @@ class InMemoryCartSnapshotStore:
     При рестарте бота данные теряются.
     """
 
-    def __init__(self, ttl: int = CART_SNAPSHOT_TTL) -> None:
+    def __init__(
+        self,
+        ttl: int = CART_SNAPSHOT_TTL,
+        history_size: int = CART_HISTORY_SIZE,
+    ) -> None:
         self._ttl = ttl
+        self._history_size = history_size
         self._data: dict[int, dict] = {}
+        self._history: dict[int, list[dict]] = {}
 
     async def save(
         self,
@@ -45,12 +108,16 @@ class InMemoryCartSnapshotStore:
         total: float | None = None,
     ) -> None:
         """Сохранить снимок корзины в памяти."""
+        created_at = datetime.now(UTC).isoformat()
         self._data[user_id] = {
             "products": products,
             "link": link,
             "total": total,
-            "created_at": datetime.now(UTC).isoformat(),
+            "created_at": created_at,
         }
+        history = self._history.setdefault(user_id, [])
+        history.insert(0, _compact(products, total, created_at))
+        del history[self._history_size :]
         logger.debug(
             "Снимок корзины сохранён (in-memory): user=%d, products=%d",
             user_id,
@@ -61,6 +128,10 @@ class InMemoryCartSnapshotStore:
         """Получить последний снимок корзины пользователя."""
         return self._data.get(user_id)
 
+    async def history(self, user_id: int) -> list[dict]:
+        """Последние корзины пользователя, новые первыми."""
+        return _expand(self._history.get(user_id, []))
+
     async def delete(self, user_id: int) -> None:
         """Удалить снимок корзины пользователя."""
         self._data.pop(user_id, None)
@@ -69,9 +140,15 @@ class InMemoryCartSnapshotStore:
 class CartSnapshotStore:
     """Сохранение и получение последней корзины пользователя из Redis."""
 
-    def __init__(self, redis: Redis, ttl: int = CART_SNAPSHOT_TTL) -> None:
+    def __init__(
+        self,
+        redis: Redis,
+        ttl: int = CART_SNAPSHOT_TTL,
+        history_size: int = CART_HISTORY_SIZE,
+    ) -> None:
         self._redis = redis
         self._ttl = ttl
+        self._history_size = history_size
 
     async def save(
         self,
@@ -88,19 +165,30 @@ class CartSnapshotStore:
             link: Ссылка на корзину ВкусВилл.
             total: Общая стоимость (None если не удалось рассчитать).
         """
+        created_at = datetime.now(UTC).isoformat()
         snapshot = {
             "products": products,
             "link": link,
             "total": total,
-            "created_at": datetime.now(UTC).isoformat(),
+            "created_at": created_at,
         }
         key = f"{_KEY_PREFIX}{user_id}"
+        history_key = f"{_HISTORY_KEY_PREFIX}{user_id}"
         try:
-            await self._redis.set(
+            # Снимок и история — одна транзакция, один round trip
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.set(
                 key,
                 json.dumps(snapshot, ensure_ascii=False),
                 ex=self._ttl,
             )
+            pipe.lpush(
+                history_key,
+                json.dumps(_compact(products, total, created_at), separators=(",", ":")),
+            )
+            pipe.ltrim(history_key, 0, self._history_size - 1)
+            pipe.expire(history_key, CART_HISTORY_TTL)
+            await pipe.execute()
             logger.info(
                 "Снимок корзины сохранён: user=%d, products=%d, total=%s",
                 user_id,
@@ -137,6 +225,25 @@ class CartSnapshotStore:
             )
             return None
 
+    async def history(self, user_id: int) -> list[dict]:
+        """Последние корзины пользователя, новые первыми.
+
+        Returns:
+            [{id, products: [{xml_id, q}], total, created_at}] или [] при ошибке.
+        """
+        key = f"{_HISTORY_KEY_PREFIX}{user_id}"
+        try:
+            raw = await self._redis.lrange(key, 0, self._history_size - 1)
+            entries = [json.loads(item) for item in raw]
+            return _expand([e for e in entries if isinstance(e, dict)])
+        except Exception as e:
+            logger.warning(
+                "Ошибка чтения истории корзин user=%d: %s",
+                user_id,
+                e,
+            )
+            return []
+
     async def delete(self, user_id: int) -> None:
         """Удалить снимок корзины пользователя."""
         key = f"{_KEY_PREFIX}{user_id}"
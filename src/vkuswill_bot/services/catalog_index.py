@@ -0,0 +1,370 @@
+"""Локальный снимок каталога ВкусВилл (SQLite FTS5).
+
+Каждый товар, увиденный в ответах ``vkusvill_products_search``, попадает
+в SQLite-таблицу с полнотекстовым индексом FTS5. Индекс используется
+как запасной (или первый) уровень поиска, когда MCP медленный или недоступен.
+
+Цены в индексе не считаются источником истины: при выдаче локального
+результата цена берётся из PriceCache (с его TTL), товары без свежей
+цены отбрасываются — иначе корзина собралась бы по устаревшим данным.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+
+import aiosqlite
+
+from vkuswill_bot.services import morphology
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
+
+logger = logging.getLogger(__name__)
+
+# Метка источника в meta локального результата
+LOCAL_SOURCE = "catalog_index"
+
+# Режимы использования индекса
+MODE_FALLBACK = "fallback"  # только при ошибке/таймауте MCP
+MODE_FIRST = "first"  # сначала индекс, MCP — если мало совпадений
+_MODES = frozenset({MODE_FALLBACK, MODE_FIRST})
+
+# Товар, не встречавшийся в выдаче дольше этого срока, не отдаётся (7 дней)
+DEFAULT_MAX_AGE = 7 * 86400
+
+# Минимум совпадений, при котором режим "first" не ходит в MCP
+DEFAULT_MIN_HITS = 3
+
+# Очередь фоновой индексации: ответы сверх лимита отбрасываются
+_QUEUE_MAXSIZE = 1000
+
+# Сколько ответов поиска записывать одной транзакцией
+_WRITE_BATCH = 50
+
+# Минимальная длина основы для prefix-поиска (короче — ищем слово целиком)
+_MIN_STEM_LEN = 3
+
+_CREATE_PRODUCTS_SQL = """\
+CREATE TABLE IF NOT EXISTS products (
+    xml_id        INTEGER PRIMARY KEY,
+    name          TEXT    NOT NULL,
+    unit          TEXT    NOT NULL DEFAULT 'шт',
+    weight_value  REAL,
+    weight_unit   TEXT,
+    price         REAL,
+    rating        REAL,
+    updated_at    REAL    NOT NULL
+)
+"""
+
+_CREATE_FTS_SQL = """\
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+_UPSERT_PRODUCT_SQL = """\
+INSERT INTO products
+    (xml_id, name, unit, weight_value, weight_unit, price, rating, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(xml_id) DO UPDATE SET
+    name         = excluded.name,
+    unit         = excluded.unit,
+    weight_value = excluded.weight_value,
+    weight_unit  = excluded.weight_unit,
+    price        = excluded.price,
+    rating       = excluded.rating,
+    updated_at   = excluded.updated_at
+"""
+
+_SEARCH_SQL = """\
+SELECT p.xml_id, p.name, p.unit, p.weight_value, p.weight_unit, p.price, p.rating
+FROM products_fts
+JOIN products p ON p.xml_id = products_fts.rowid
+WHERE products_fts MATCH ? AND p.updated_at >= ?
+ORDER BY bm25(products_fts), p.rating DESC
+LIMIT ?
+"""
+
+
+def _normalize_text(text: str) -> str:
+    """Привести текст к виду для FTS: lower + ё → е (unicode61 их не сводит)."""
+    return text.lower().replace("ё", "е")
+
+
+class CatalogIndex:
+    """Локальный FTS5-индекс товаров, накапливаемый из ответов поиска.
+
+    Запись идёт в фоне: ``submit()`` только кладёт ответ в очередь,
+    фоновая задача (``start()``/``stop()``) пишет пачками, не задерживая
+    ответ пользователю.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        price_cache: PriceCache,
+        mode: str = MODE_FALLBACK,
+        mcp_timeout: float = 0.0,
+        min_hits: int = DEFAULT_MIN_HITS,
+        max_age: float = DEFAULT_MAX_AGE,
+    ) -> None:
+        if mode not in _MODES:
+            raise ValueError(f"Неизвестный режим каталога: {mode!r}")
+        self._db_path = db_path
+        self._price_cache = price_cache
+        self.mode = mode
+        self.mcp_timeout = mcp_timeout
+        self.min_hits = max(1, min_hits)
+        self._max_age = max_age
+        self._db: aiosqlite.Connection | None = None
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=_QUEUE_MAXSIZE)
+        self._task: asyncio.Task | None = None
+        self.local_hits = 0
+        self.local_misses = 0
+
+    async def _ensure_db(self) -> aiosqlite.Connection:
+        """Открыть или переиспользовать соединение с БД."""
+        if self._db is None:
+            db_dir = os.path.dirname(self._db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._db = await aiosqlite.connect(self._db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute(_CREATE_PRODUCTS_SQL)
+            await self._db.execute(_CREATE_FTS_SQL)
+            await self._db.commit()
+            logger.info("SQLite индекс каталога открыт: %s", self._db_path)
+        return self._db
+
+    # ---- Индексация ----
+
+    @staticmethod
+    def _item_to_row(item: object, now: float) -> tuple | None:
+        """Преобразовать товар из ответа MCP в строку таблицы products."""
+        if not isinstance(item, dict):
+            return None
+        xml_id = item.get("xml_id")
+        name = item.get("name")
+        if not isinstance(xml_id, int) or not isinstance(name, str) or not name:
+            return None
+        price_info = item.get("price")
+        price = price_info.get("current") if isinstance(price_info, dict) else price_info
+        if not isinstance(price, (int, float)):
+            price = None
+        weight = item.get("weight")
+        weight_value = weight.get("value") if isinstance(weight, dict) else None
+        weight_unit = weight.get("unit") if isinstance(weight, dict) else None
+        rating = item.get("rating")
+        if not isinstance(rating, (int, float)):
+            rating = None
+        return (
+            xml_id,
+            name,
+            str(item.get("unit") or "шт"),
+            weight_value if isinstance(weight_value, (int, float)) else None,
+            weight_unit if isinstance(weight_unit, str) else None,
+            price,
+            rating,
+            now,
+        )
+
+    async def index_results(self, results: list[str]) -> int:
+        """Записать товары из ответов vkusvill_products_search в индекс.
+
+        Ответы, собранные самим индексом (meta.source == catalog_index),
+        пропускаются.
+
+        Returns:
+            Количество записанных товаров.
+        """
+        now = time.time()
+        rows: dict[int, tuple] = {}
+        for result_text in results:
+            parsed = SearchProcessor.parse_search_items(result_text)
+            if parsed is None:
+                continue
+            data, items = parsed
+            meta = data["data"].get("meta")
+            if isinstance(meta, dict) and meta.get("source") == LOCAL_SOURCE:
+                continue
+            for item in items:
+                row = self._item_to_row(item, now)
+                if row is not None:
+                    rows[row[0]] = row
+        if not rows:
+            return 0
+
+        db = await self._ensure_db()
+        await db.executemany(_UPSERT_PRODUCT_SQL, list(rows.values()))
+        await db.executemany(
+            "DELETE FROM products_fts WHERE rowid = ?",
+            [(xml_id,) for xml_id in rows],
+        )
+        await db.executemany(
+            "INSERT INTO products_fts (rowid, name) VALUES (?, ?)",
+            [(xml_id, _normalize_text(row[1])) for xml_id, row in rows.items()],
+        )
+        await db.commit()
+        return len(rows)
+
+    @staticmethod
+    def is_local_result(result_text: str) -> bool:
+        """Ответ собран самим индексом (meta.source == catalog_index).
+
+        Цены в таком ответе взяты из PriceCache: записывать их обратно
+        в кеш, в индекс и в статистику refresh-ahead нельзя.
+        """
+        if LOCAL_SOURCE not in result_text:
+            return False
+        parsed = SearchProcessor.parse_search_items(result_text)
+        if parsed is None:
+            return False
+        meta = parsed[0]["data"].get("meta")
+        return isinstance(meta, dict) and meta.get("source") == LOCAL_SOURCE
+
+    def submit(self, result_text: str) -> None:
+        """Поставить ответ поиска в очередь фоновой индексации (не блокирует)."""
+        try:
+            self._queue.put_nowait(result_text)
+        except asyncio.QueueFull:
+            logger.debug("Очередь индекса каталога переполнена, ответ пропущен")
+
+    async def _drain(self, first: str) -> None:
+        """Записать ``first`` и всё, что уже накопилось в очереди (до _WRITE_BATCH)."""
+        batch = [first]
+        while len(batch) < _WRITE_BATCH and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        try:
+            count = await self.index_results(batch)
+            logger.debug("Индекс каталога: записано %d товаров", count)
+        except Exception as exc:
+            logger.warning("Ошибка записи в индекс каталога: %s", exc)
+
+    async def _loop(self) -> None:
+        """Фоновая запись ответов поиска в индекс."""
+        while True:
+            first = await self._queue.get()
+            await self._drain(first)
+
+    def start(self) -> None:
+        """Запустить фоновую индексацию."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info("CatalogIndex: фоновая индексация запущена")
+
+    async def stop(self) -> None:
+        """Остановить фоновую индексацию, дописав накопленную очередь."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        while not self._queue.empty():
+            await self._drain(self._queue.get_nowait())
+
+    # ---- Поиск ----
+
+    @staticmethod
+    def build_match_query(query: str) -> str:
+        """Построить FTS5 MATCH-выражение: основы всех слов запроса как префиксы.
+
+        Основа по Snowball покрывает падежные окончания ("молока" → "молок*").
+        """
+        terms: list[str] = []
+        for token in morphology.tokenize(query):
+            if len(token) < 2 or token.isdigit():
+                continue
+            base = morphology.stem(token)
+            terms.append(f'"{base if len(base) >= _MIN_STEM_LEN else token}"*')
+        return " ".join(terms)
+
+    async def search(self, query: str, limit: int = SEARCH_LIMIT) -> list[dict]:
+        """Найти товары в индексе (без проверки свежести цен).
+
+        Returns:
+            Список строк индекса (dict) в порядке релевантности.
+        """
+        match = self.build_match_query(query)
+        if not match or limit <= 0:
+            return []
+        db = await self._ensure_db()
+        cursor = await db.execute(_SEARCH_SQL, (match, time.time() - self._max_age, limit))
+        rows = await cursor.fetchall()
+        return [
+            {
+                "xml_id": row[0],
+                "name": row[1],
+                "unit": row[2],
+                "weight_value": row[3],
+                "weight_unit": row[4],
+                "price": row[5],
+                "rating": row[6],
+            }
+            for row in rows
+        ]
+
+    async def search_result(
+        self,
+        query: str,
+        limit: int = SEARCH_LIMIT,
+        min_hits: int = 1,
+    ) -> str | None:
+        """Собрать ответ в формате vkusvill_products_search из локального индекса.
+
+        Цена берётся из PriceCache; товары без свежей цены пропускаются.
+
+        Returns:
+            JSON-строка ответа или None, если свежих совпадений меньше ``min_hits``.
+        """
+        items: list[dict] = []
+        # Берём с запасом: часть товаров может отсеяться по цене
+        for row in await self.search(query, limit * 2):
+            cached = await self._price_cache.get(row["xml_id"])
+            if cached is None:
+                continue
+            item: dict = {
+                "xml_id": row["xml_id"],
+                "name": row["name"],
+                "price": {"current": cached.price},
+                "unit": row["unit"],
+            }
+            if row["weight_value"] is not None:
+                item["weight"] = {"value": row["weight_value"], "unit": row["weight_unit"]}
+            if row["rating"] is not None:
+                item["rating"] = row["rating"]
+            items.append(item)
+            if len(items) >= limit:
+                break
+
+        if len(items) < min_hits or not items:
+            self.local_misses += 1
+            return None
+        self.local_hits += 1
+        return json.dumps(
+            {
+                "ok": True,
+                "data": {"meta": {"q": query, "source": LOCAL_SOURCE}, "items": items},
+            },
+            ensure_ascii=False,
+        )
+
+    async def count(self) -> int:
+        """Количество товаров в индексе."""
+        db = await self._ensure_db()
+        cursor = await db.execute("SELECT COUNT(*) FROM products")
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def close(self) -> None:
+        """Остановить индексацию и закрыть соединение с БД."""
+        await self.stop()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+            logger.info("SQLite индекс каталога закрыт.")
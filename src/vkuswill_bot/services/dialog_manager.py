@@ -262,6 +262,10 @@ class DialogManager:
             self._locks[user_id] = asyncio.Lock()
         return self._locks[user_id]
 
+    def lock_count(self) -> int:
+        """Число per-user lock в памяти (диагностика утечек)."""
+        return len(self._locks)
+
     # ---- Sync API (обратная совместимость) ----
 
     def get_history(self, user_id: int) -> list[Messages]:
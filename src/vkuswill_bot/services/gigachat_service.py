@@ -6,6 +6,7 @@ import asyncio
 import contextlib
 import json
 import logging
+import time
 from collections import OrderedDict
 from collections.abc import Callable, Coroutine
 from typing import TYPE_CHECKING, Any
@@ -15,6 +16,7 @@ from gigachat.context import session_id_cvar
 from gigachat.models import Chat, ChatCompletion, Messages, MessagesRole
 
 from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.cart_repeat import CartRepeater
 from vkuswill_bot.services.dialog_manager import MAX_CONVERSATIONS, DialogManager
 from vkuswill_bot.services.pii_utils import mask_pii, sanitize_tool_args
 from vkuswill_bot.services.langfuse_tracing import (
@@ -22,6 +24,19 @@ from vkuswill_bot.services.langfuse_tracing import (
     _messages_to_langfuse,
 )
 from vkuswill_bot.services.mcp_client import VkusvillMCPClient
+from vkuswill_bot.services.message_timing import (
+    MessageTiming,
+    current_timing,
+    reset_timing,
+    start_timing,
+)
+from vkuswill_bot.services.metrics import (
+    ERRORS,
+    GIGACHAT_DURATION,
+    GIGACHAT_SEMAPHORE_WAIT,
+    RATE_LIMITED,
+    RETRIES,
+)
 from vkuswill_bot.services.preferences_store import PreferencesStore
 from vkuswill_bot.services.prompts import (
     CART_PREVIOUS_TOOL,
@@ -29,8 +44,10 @@ from vkuswill_bot.services.prompts import (
     ERROR_TOO_MANY_STEPS,
     LOCAL_TOOLS,
     NUTRITION_TOOL,
+    PRODUCTS_SEARCH_BATCH_TOOL,
     RECIPE_SEARCH_TOOL,
     RECIPE_TOOL,
+    RECIPES_PLAN_TOOL,
 )
 from vkuswill_bot.services.recipe_service import RecipeService
 from vkuswill_bot.services.recipe_store import RecipeStore
@@ -38,6 +55,7 @@ from vkuswill_bot.services.search_processor import SearchProcessor
 from vkuswill_bot.services.tool_executor import CallTracker, ToolExecutor
 
 if TYPE_CHECKING:
+    from vkuswill_bot.services.list_fast_path import ListFastPath
     from vkuswill_bot.services.redis_dialog_manager import RedisDialogManager
 
 logger = logging.getLogger(__name__)
@@ -51,6 +69,9 @@ MAX_USER_MESSAGE_LENGTH = 4096
 # Лимит длины результата инструмента для логирования
 MAX_RESULT_LOG_LENGTH = 1000
 
+# Метка исхода сообщения в метриках по ответу-ошибке
+_MESSAGE_OUTCOMES = {ERROR_GIGACHAT: "gigachat_error", ERROR_TOO_MANY_STEPS: "too_many_steps"}
+
 # Макс. параллельных запросов к GigaChat API (семафор)
 DEFAULT_GIGACHAT_MAX_CONCURRENT = 15
 
@@ -88,6 +109,8 @@ class GigaChatService:
     _LOCAL_TOOLS = LOCAL_TOOLS
     _CART_PREVIOUS_TOOL = CART_PREVIOUS_TOOL
     _NUTRITION_TOOL = NUTRITION_TOOL
+    _PRODUCTS_SEARCH_BATCH_TOOL = PRODUCTS_SEARCH_BATCH_TOOL
+    _RECIPES_PLAN_TOOL = RECIPES_PLAN_TOOL
 
     def __init__(
         self,
@@ -105,6 +128,7 @@ class GigaChatService:
         gigachat_max_concurrent: int = DEFAULT_GIGACHAT_MAX_CONCURRENT,
         langfuse_service: LangfuseService | None = None,
         ca_bundle_file: str | None = None,
+        fast_path: ListFastPath | None = None,
     ) -> None:
         # SSL-верификация с сертификатами НУЦ Минцифры (ca_bundle_file).
         # Если ca_bundle_file указан и файл существует — verify=True.
@@ -145,6 +169,7 @@ class GigaChatService:
         self._recipe_store = recipe_store
         self._max_tool_calls = max_tool_calls
         self._max_history = max_history
+        self._fast_path = fast_path
 
         # Семафор для ограничения параллельных запросов к GigaChat API
         self._api_semaphore = asyncio.Semaphore(gigachat_max_concurrent)
@@ -174,6 +199,7 @@ class GigaChatService:
             cart_processor=self._cart_processor,
             preferences_store=preferences_store,
         )
+        self._cart_repeater = CartRepeater(self._tool_executor)
 
         if recipe_service is not None:
             self._recipe_service = recipe_service
@@ -181,6 +207,7 @@ class GigaChatService:
             self._recipe_service = RecipeService(
                 gigachat_client=self._client,
                 recipe_store=recipe_store,
+                llm_semaphore=self._api_semaphore,
             )
         else:
             self._recipe_service = None
@@ -207,6 +234,9 @@ class GigaChatService:
         if self._recipe_store is not None:
             self._functions.append(self._RECIPE_TOOL)
             self._functions.append(self._RECIPE_SEARCH_TOOL)
+            self._functions.append(self._RECIPES_PLAN_TOOL)
+        # Пакетный поиск по списку покупок (всегда доступен)
+        self._functions.append(self._PRODUCTS_SEARCH_BATCH_TOOL)
         # Инструмент получения предыдущей корзины (всегда доступен)
         self._functions.append(self._CART_PREVIOUS_TOOL)
         # КБЖУ через Open Food Facts (всегда доступен, без API key)
@@ -221,6 +251,10 @@ class GigaChatService:
 
     # ---- Session-level search_log ----
 
+    def search_log_count(self) -> int:
+        """Число пользователей с search_log в памяти (диагностика утечек)."""
+        return len(self._search_logs)
+
     def _get_search_log(self, user_id: int) -> dict[str, set[int]]:
         """Получить search_log для пользователя (накопленный за сессию).
 
@@ -259,6 +293,79 @@ class GigaChatService:
             return await self._recipe_service.get_ingredients(args)
         return json.dumps({"ok": False, "error": "Кеш рецептов не настроен"}, ensure_ascii=False)
 
+    async def _handle_recipes_plan(
+        self,
+        args: dict,
+        user_id: int,
+        progress: ProgressCallback,
+    ) -> str:
+        """План питания: рецепты всех блюд + один пакетный поиск ингредиентов.
+
+        Заменяет 2×N шагов LLM (recipe_ingredients и recipe_search на каждое
+        блюдо) одним вызовом инструмента.
+        """
+        if self._recipe_service is None:
+            return json.dumps(
+                {"ok": False, "error": "Кеш рецептов не настроен"}, ensure_ascii=False
+            )
+        plan = await self._recipe_service.resolve_plan(args.get("dishes"))
+        ingredients = plan["ingredients"]
+        if not ingredients:
+            return json.dumps(
+                {
+                    "ok": False,
+                    "dishes": plan["dishes"],
+                    "error": "Не удалось получить рецепты блюд плана",
+                },
+                ensure_ascii=False,
+            )
+        if not self._tool_executor.has_recipe_search:
+            return json.dumps(
+                {
+                    "ok": True,
+                    "dishes": plan["dishes"],
+                    "ingredients": ingredients,
+                    "hint": (
+                        "Найди ингредиенты одним вызовом products_search_batch "
+                        "(queries = search_query), затем vkusvill_cart_link_create."
+                    ),
+                },
+                ensure_ascii=False,
+            )
+
+        n = len(ingredients)
+        await progress(f"\U0001f50d Ищу продукты (0/{n})...")
+        raw = await self._tool_executor.execute(
+            "recipe_search",
+            {"ingredients": ingredients},
+            user_id,
+            on_ingredient_found=self._make_search_progress(progress, n),
+        )
+        try:
+            found = json.loads(raw)
+        except (json.JSONDecodeError, TypeError):
+            return raw
+        if not isinstance(found, dict) or not found.get("ok"):
+            return raw
+        # Для каждого товара — в каких блюдах нужен ингредиент
+        for result, ingredient in zip(found.get("results", []), ingredients, strict=False):
+            if isinstance(result, dict):
+                result["dishes"] = ingredient.get("dishes", [])
+        return json.dumps(
+            {
+                "ok": True,
+                "dishes": plan["dishes"],
+                "results": found.get("results", []),
+                "not_found": found.get("not_found", []),
+                "search_log": found.get("search_log", {}),
+                "hint": (
+                    "Ингредиенты всех блюд уже сложены. Создай ОДНУ корзину через "
+                    "vkusvill_cart_link_create (xml_id и suggested_q из best_match)."
+                ),
+            },
+            ensure_ascii=False,
+        )
+
     async def close(self) -> None:
         """Закрыть клиент GigaChat."""
         try:
@@ -270,6 +377,33 @@ class GigaChatService:
         """Получить последний снимок корзины пользователя."""
         return await self._tool_executor.get_last_cart_snapshot(user_id)
 
+    async def get_cart_history(self, user_id: int) -> list[dict[str, Any]]:
+        """Прошлые корзины пользователя для «Повторить корзину» (новые первыми)."""
+        return await self._cart_repeater.carts(user_id)
+
+    async def repeat_cart(self, user_id: int, cart_id: str | None = None) -> str:
+        """Повторить корзину из истории без вызовов GigaChat (None — последняя).
+
+        Запрос и результат записываются в историю диалога — следующие
+        правки («убери молоко») обрабатываются обычным циклом.
+        """
+        async with self._dialog_manager.get_lock(user_id):
+            outcome = await self._cart_repeater.repeat(user_id, cart_id)
+            dm = self._dialog_manager
+            history = await dm.aget_history(user_id)
+            history.extend(outcome.messages)
+            await dm.save_history(user_id, dm.trim_list(history))
+            answer = outcome.answer or ""
+            trace = self._langfuse.trace(
+                name="repeat_cart",
+                user_id=str(user_id),
+                session_id=str(user_id),
+                input=f"repeat_cart {cart_id or 'last'}",
+                tags=["telegram", "repeat_cart"],
+            )
+            trace.update(output=answer, metadata={"fast_path": True, "total_steps": 0})
+            return answer
+
     async def process_message(
         self,
         user_id: int,
@@ -285,12 +419,25 @@ class GigaChatService:
                 MAX_USER_MESSAGE_LENGTH,
             )
             text = text[:MAX_USER_MESSAGE_LENGTH]
-        async with self._dialog_manager.get_lock(user_id):
-            return await self._process_message_locked(
-                user_id,
-                text,
-                on_progress=on_progress,
-            )
+        timing, token = start_timing()
+        outcome = "exception"
+        try:
+            async with self._dialog_manager.get_lock(user_id):
+                # Поиски по списку покупок стартуют параллельно с первым вызовом LLM
+                self._tool_executor.start_prefetch(user_id, text)
+                try:
+                    answer = await self._process_message_locked(
+                        user_id,
+                        text,
+                        on_progress=on_progress,
+                    )
+                finally:
+                    self._tool_executor.finish_prefetch(user_id)
+            outcome = _MESSAGE_OUTCOMES.get(answer, "ok")
+            return answer
+        finally:
+            reset_timing(token)
+            timing.finish(user_id, outcome)
 
     async def _call_gigachat(
         self,
@@ -337,15 +484,34 @@ class GigaChatService:
         if function_call != "none":
             chat_kwargs["functions"] = functions
 
+        timing = current_timing() or MessageTiming()
+        timing.llm_calls += 1
+
         for attempt in range(GIGACHAT_MAX_RETRIES):
             try:
+                wait_start = time.perf_counter()
                 async with self._api_semaphore:
-                    return await asyncio.to_thread(
-                        self._client.chat,
-                        Chat(**chat_kwargs),
-                    )
+                    start = time.perf_counter()
+                    GIGACHAT_SEMAPHORE_WAIT.observe(start - wait_start)
+                    timing.add("semaphore_wait", start - wait_start)
+                    outcome = "error"
+                    try:
+                        response = await asyncio.to_thread(
+                            self._client.chat,
+                            Chat(**chat_kwargs),
+                        )
+                        outcome = "ok"
+                        return response
+                    finally:
+                        elapsed = time.perf_counter() - start
+                        GIGACHAT_DURATION.observe(elapsed, outcome)
+                        timing.add("gigachat", elapsed)
             except Exception as e:
-                if attempt < GIGACHAT_MAX_RETRIES - 1 and self._is_rate_limit_error(e):
+                rate_limited = self._is_rate_limit_error(e)
+                if rate_limited:
+                    RATE_LIMITED.inc("gigachat")
+                if attempt < GIGACHAT_MAX_RETRIES - 1 and rate_limited:
+                    RETRIES.inc("gigachat")
                     delay = 2**attempt  # 1s, 2s
                     logger.warning(
                         "GigaChat rate limit, retry %d/%d через %ds: %s",
@@ -355,7 +521,9 @@ class GigaChatService:
                         e,
                     )
                     await asyncio.sleep(delay)
+                    timing.add("retry_backoff", delay)
                     continue
+                ERRORS.inc("gigachat")
                 raise
 
         # Unreachable, но для безопасности типов
@@ -390,8 +558,11 @@ class GigaChatService:
         # session_id → system prompt + tools кешируются и НЕ тарифицируются.
         session_id_cvar.set(f"user-{user_id}")
 
+        timing = current_timing() or MessageTiming()
         dm = self._dialog_manager
+        stage_start = time.perf_counter()
         history = await dm.aget_history(user_id)
+        timing.add("history_load", time.perf_counter() - stage_start)
         history.append(Messages(role=MessagesRole.USER, content=text))
         functions = await self._get_functions()
         call_tracker = CallTracker()
@@ -439,6 +610,24 @@ class GigaChatService:
                 "recipe_not_found_count": recipe_not_found_count,
             }
 
+        # ── Быстрый путь: простой список покупок — корзина без вызовов LLM ──
+        if self._fast_path is not None:
+            stage_start = time.perf_counter()
+            fast = await self._fast_path.run(user_id, text, search_log)
+            timing.add("fast_path", time.perf_counter() - stage_start)
+            if fast is not None:
+                history.extend(fast.messages)
+                real_calls += sum(1 for m in fast.messages if m.function_call)
+                if fast.answer is not None:
+                    self._save_search_log(user_id, search_log)
+                    history = dm.trim_list(history)
+                    await self._save_history_timed(user_id, history, timing)
+                    trace.update(
+                        output=fast.answer,
+                        metadata={"fast_path": True, "total_steps": 0, "tool_calls": real_calls},
+                    )
+                    return fast.answer
+
         while real_calls < self._max_tool_calls and total_steps < max_total_steps:
             total_steps += 1
 
@@ -551,6 +740,7 @@ class GigaChatService:
                     "arguments": msg.function_call.arguments,
                 }
             usage_details, cost_details = self._extract_usage(response)
+            timing.add_usage(usage_details)
             gen.end(
                 output=gen_output,
                 usage_details=usage_details,
@@ -563,7 +753,7 @@ class GigaChatService:
                 final_text = msg.content or "Не удалось получить ответ."
                 self._save_search_log(user_id, search_log)
                 history = dm.trim_list(history)
-                await dm.save_history(user_id, history)
+                await self._save_history_timed(user_id, history, timing)
                 trace.update(
                     output=final_text,
                     metadata={
@@ -579,7 +769,9 @@ class GigaChatService:
             args = te.parse_arguments(msg.function_call.arguments)
             logger.info("Вызов: %s(%s)", tool_name, sanitize_tool_args(tool_name, args))
 
+            stage_start = time.perf_counter()
             args = await te.preprocess_args(tool_name, args, user_prefs)
+            timing.add("preprocess", time.perf_counter() - stage_start)
             if te.is_duplicate_call(tool_name, args, call_tracker, history):
                 consecutive_skips += 1
                 continue
@@ -596,7 +788,9 @@ class GigaChatService:
             # ── Прогресс: статус перед вызовом инструмента ──
             _TOOL_PROGRESS = {
                 "recipe_ingredients": "\U0001f373 Подбираю рецепт...",
+                "recipes_plan": "\U0001f373 Подбираю рецепты блюд...",
                 "vkusvill_products_search": "\U0001f50d Ищу товары...",
+                "products_search_batch": "\U0001f50d Ищу товары...",
                 "vkusvill_cart_link_create": "\U0001f6d2 Формирую корзину...",
             }
             if tool_name in _TOOL_PROGRESS:
@@ -607,8 +801,11 @@ class GigaChatService:
                     f"\U0001f50d Ищу продукты (0/{n})...",
                 )
 
+            stage_start = time.perf_counter()
             if tool_name == "recipe_ingredients" and self._recipe_service is not None:
                 result = await self._recipe_service.get_ingredients(args)
+            elif tool_name == "recipes_plan" and self._recipe_service is not None:
+                result = await self._handle_recipes_plan(args, user_id, _progress)
             elif tool_name == "recipe_search" and on_progress is not None:
                 n = len(args.get("ingredients", []))
                 result = await te.execute(
@@ -622,12 +819,14 @@ class GigaChatService:
                 )
             else:
                 result = await te.execute(tool_name, args, user_id)
+            timing.add_tool(tool_name, time.perf_counter() - stage_start)
             logger.info(
                 "Результат %s: %s",
                 tool_name,
                 mask_pii(result[:MAX_RESULT_LOG_LENGTH]),
             )
 
+            stage_start = time.perf_counter()
             result = await te.postprocess_result(
                 tool_name,
                 args,
@@ -636,6 +835,7 @@ class GigaChatService:
                 search_log,
                 user_id=user_id,
             )
+            timing.add("postprocess", time.perf_counter() - stage_start)
 
             # ── Recipe метаданные для Langfuse ──
             if tool_name == "recipe_ingredients":
@@ -647,7 +847,7 @@ class GigaChatService:
                         recipe_ingredient_count = max(recipe_ingredient_count, len(ingredients))
                 except (json.JSONDecodeError, TypeError):
                     pass
-            elif tool_name == "recipe_search":
+            elif tool_name in ("recipe_search", "recipes_plan"):
                 recipe_mode = True
                 recipe_search_used = True
                 try:
@@ -655,11 +855,14 @@ class GigaChatService:
                     not_found = recipe_search_data.get("not_found", [])
                     if isinstance(not_found, list):
                         recipe_not_found_count = max(recipe_not_found_count, len(not_found))
+                    planned = recipe_search_data.get("results", [])
+                    if tool_name == "recipes_plan" and isinstance(planned, list):
+                        recipe_ingredient_count = max(recipe_ingredient_count, len(planned))
                     if not recipe_search_data.get("ok", False):
                         recipe_search_fallback = True
                 except (json.JSONDecodeError, TypeError):
                     recipe_search_fallback = True
-            elif tool_name == "vkusvill_products_search" and recipe_mode:
+            elif tool_name in ("vkusvill_products_search", "products_search_batch") and recipe_mode:
                 # Поингредиентный поиск в recipe-сценарии = fallback path.
                 recipe_search_fallback = True
 
@@ -687,7 +890,7 @@ class GigaChatService:
 
         self._save_search_log(user_id, search_log)
         history = dm.trim_list(history)
-        await dm.save_history(user_id, history)
+        await self._save_history_timed(user_id, history, timing)
 
         trace.update(
             output=ERROR_TOO_MANY_STEPS,
@@ -700,6 +903,17 @@ class GigaChatService:
         )
         return ERROR_TOO_MANY_STEPS
 
+    async def _save_history_timed(
+        self,
+        user_id: int,
+        history: list[Messages],
+        timing: MessageTiming,
+    ) -> None:
+        """Сохранить историю диалога с замером этапа ``history_save``."""
+        start = time.perf_counter()
+        await self._dialog_manager.save_history(user_id, history)
+        timing.add("history_save", time.perf_counter() - start)
+
     @staticmethod
     def _make_search_progress(
         progress_fn: Callable[[str], Coroutine[Any, Any, None]],
@@ -0,0 +1,244 @@
+"""Быстрый путь без LLM для простых списков покупок.
+
+Сообщение вида «молоко, хлеб, сыр и масло» GigaChat обрабатывает за
+несколько шагов: поиск, корзина, текст ответа. Для списков, где решение
+очевидно, ListFastPath делает то же детерминированно: пакетный поиск
+(``products_search_batch``), лучший товар на каждую позицию,
+``vkusvill_cart_link_create`` и ответ по стандартному шаблону
+(список из price_summary, итог, ссылка, дисклеймер).
+
+В историю диалога пишутся те же сообщения, что оставил бы GigaChat
+(вызовы инструментов, их результаты, ответ ассистента), поэтому следующие
+реплики («убери сыр», «добавь кефир») обрабатываются обычным циклом.
+
+Путь срабатывает только при высокой уверенности:
+- сообщение — чистый список (без вопросов, количеств и правок корзины);
+- у пользователя нет сохранённых предпочтений (их учитывает LLM);
+- каждая позиция нашлась без предупреждения о релевантности.
+
+Если поиск прошёл, но уверенности нет — результат поиска остаётся
+в истории, и GigaChat продолжает с него, не повторяя поиск.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+
+from gigachat.models import FunctionCall, Messages, MessagesRole
+
+from vkuswill_bot.services.prompts import CART_DISCLAIMER
+from vkuswill_bot.services.search_prefetcher import extract_queries
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Больше позиций — список отдаётся LLM (длинные списки чаще с оговорками)
+MAX_FAST_PATH_ITEMS = 8
+
+# Количества, вопросы и правки существующей корзины требуют LLM
+_LOW_CONFIDENCE_RE = re.compile(
+    r"[?\d]|\b(?:еще|ещё|добав\w*|убер\w*|убрать|удал\w*|замен\w*|вместо|"
+    r"тоже|также|тот|такой|такое|как|рецепт\w*|приготов\w*|ужин\w*|обед\w*|"
+    r"завтрак\w*|меню|идеи|посоветуй|подбери|что-нибудь|что-то|"
+    r"без|для|кбжу|калори\w*)\b",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class FastPathOutcome:
+    """Результат быстрого пути.
+
+    messages — сообщения для истории (вызовы инструментов и ответы);
+    answer — готовый ответ пользователю или None, если нужен цикл LLM.
+    """
+
+    messages: list[Messages] = field(default_factory=list)
+    answer: str | None = None
+
+
+def parse_list(text: str, max_items: int = MAX_FAST_PATH_ITEMS) -> list[str]:
+    """Позиции списка покупок, если сообщение — однозначный список, иначе []."""
+    if _LOW_CONFIDENCE_RE.search(text.lower()):
+        return []
+    queries = extract_queries(text)
+    if len(queries) > max_items:
+        return []
+    return queries
+
+
+def render_cart_answer(
+    cart_result: str,
+    title: str = "Собрал корзину по вашему списку",
+    notes: list[str] | None = None,
+) -> str | None:
+    """Ответ с корзиной по шаблону системного промпта.
+
+    notes — строки после итога (изменения цен, недоступные товары).
+    None — корзина не создана, цены известны не все или есть похожие
+    товары (duplicate_warning): такой ответ формулирует LLM.
+    """
+    try:
+        data = json.loads(cart_result).get("data") or {}
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return None
+    summary = data.get("price_summary")
+    link = data.get("link")
+    if not isinstance(summary, dict) or not isinstance(link, str) or not link:
+        return None
+    if data.get("duplicate_warning"):
+        return None
+    items = [str(line).strip().removeprefix("- ") for line in summary.get("items", [])]
+    if not items or "total" not in summary:
+        return None
+
+    lines = [f"{title} — {len(items)} поз.", ""]
+    lines += [f"{i}. {item}" for i, item in enumerate(items, 1)]
+    lines += ["", f"<b>{summary['total_text']}</b>"]
+    if notes:
+        lines += ["", *notes]
+    lines += [
+        "",
+        f'<a href="{link}">Открыть корзину</a>',
+        "",
+        f"<i>{CART_DISCLAIMER}</i>",
+    ]
+    return "\n".join(lines)
+
+
+def tool_messages(name: str, args: dict, result: str) -> list[Messages]:
+    """Вызов инструмента и его результат — как в истории цикла LLM."""
+    call = Messages(role=MessagesRole.ASSISTANT, content="")
+    call.function_call = FunctionCall(name=name, arguments=args)
+    return [call, Messages(role=MessagesRole.FUNCTION, content=result, name=name)]
+
+
+class ListFastPath:
+    """Корзина по простому списку покупок без вызовов GigaChat.
+
+    Работает через ToolExecutor — те же предобработка, кеш цен,
+    search_log, верификация корзины, лимиты freemium и снимки корзин,
+    что и у вызовов инструментов из цикла LLM.
+    """
+
+    def __init__(
+        self,
+        tool_executor: ToolExecutor,
+        max_items: int = MAX_FAST_PATH_ITEMS,
+    ) -> None:
+        self._te = tool_executor
+        self._max_items = max_items
+        self._stats: dict[str, int] = {
+            "messages": 0,
+            "served": 0,
+            "low_confidence": 0,
+            "errors": 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Счётчики: списков, обслужено без LLM, отдано LLM, ошибок."""
+        return dict(self._stats)
+
+    async def run(
+        self,
+        user_id: int,
+        text: str,
+        search_log: dict[str, set[int]],
+    ) -> FastPathOutcome | None:
+        """Попробовать собрать корзину без LLM.
+
+        Returns:
+            None — сообщение не для быстрого пути (обычный цикл LLM);
+            FastPathOutcome с answer — корзина готова;
+            FastPathOutcome без answer — поиск в истории, дальше LLM.
+        """
+        queries = parse_list(text, self._max_items)
+        if not queries:
+            return None
+        try:
+            if await self._te.load_preferences(user_id):
+                return None
+        except Exception as e:
+            logger.debug("Быстрый путь: предпочтения user %d недоступны: %s", user_id, e)
+            return None
+
+        self._stats["messages"] += 1
+        try:
+            return await self._run(user_id, queries, search_log)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("Быстрый путь для user %d не удался: %s", user_id, e)
+            return None
+
+    async def _run(
+        self,
+        user_id: int,
+        queries: list[str],
+        search_log: dict[str, set[int]],
+    ) -> FastPathOutcome:
+        te = self._te
+        outcome = FastPathOutcome()
+
+        search_args = await te.preprocess_args("products_search_batch", {"queries": queries}, {})
+        found = await te.execute("products_search_batch", search_args, user_id)
+        found = await te.postprocess_result(
+            "products_search_batch", search_args, found, {}, search_log, user_id=user_id
+        )
+        outcome.messages += tool_messages("products_search_batch", search_args, found)
+
+        products = self._pick_products(found)
+        if products is None:
+            self._stats["low_confidence"] += 1
+            logger.info("Быстрый путь: низкая уверенность поиска для user %d", user_id)
+            return outcome
+
+        cart_args = await te.preprocess_args(
+            "vkusvill_cart_link_create", {"products": products}, {}
+        )
+        cart = await te.execute("vkusvill_cart_link_create", cart_args, user_id)
+        cart = await te.postprocess_result(
+            "vkusvill_cart_link_create", cart_args, cart, {}, search_log, user_id=user_id
+        )
+        outcome.messages += tool_messages("vkusvill_cart_link_create", cart_args, cart)
+
+        answer = render_cart_answer(cart)
+        if answer is None:
+            # Корзина не создана (лимит, ошибка MCP) — объяснит LLM
+            self._stats["low_confidence"] += 1
+            return outcome
+
+        self._stats["served"] += 1
+        outcome.messages.append(Messages(role=MessagesRole.ASSISTANT, content=answer))
+        outcome.answer = answer
+        logger.info(
+            "Быстрый путь: корзина из %d позиций для user %d без LLM", len(products), user_id
+        )
+        return outcome
+
+    @staticmethod
+    def _pick_products(batch_result: str) -> list[dict] | None:
+        """Лучший товар на каждую позицию или None, если хоть одна сомнительна."""
+        try:
+            data = json.loads(batch_result)
+        except (json.JSONDecodeError, TypeError):
+            return None
+        if not isinstance(data, dict) or not data.get("ok") or data.get("not_found"):
+            return None
+
+        products: list[dict] = []
+        for entry in data.get("results", []):
+            if entry.get("error") or entry.get("relevance_warning"):
+                return None
+            top = next(
+                (i for i in entry.get("items", []) if isinstance(i.get("xml_id"), int)),
+                None,
+            )
+            if top is None:
+                return None
+            if all(p["xml_id"] != top["xml_id"] for p in products):
+                products.append({"xml_id": top["xml_id"], "q": 1})
+        return products or None
@@ -0,0 +1,172 @@
+"""Мониторинг event loop: задержка (lag) и детектор медленных callback.
+
+Весь бот работает в одном asyncio-цикле: синхронная работа в нём
+(``S3LogHandler.emit``, большой ``json.dumps``, ``mask_pii`` на длинном
+результате инструмента, сборка pydantic-сообщений) задерживает всех
+пользователей сразу.
+
+- Задержка цикла: фоновая задача спит ``interval`` и измеряет, насколько
+  позже проснулась, — гистограмма ``vkuswill_event_loop_lag_seconds``
+  в ``/metrics``, последнее и максимальное значение — в ``/health``.
+- Детектор медленных callback (опционально, ``slow_callback_ms`` > 0):
+  сторожевой поток ставит в цикл пустой callback через
+  ``call_soon_threadsafe`` и, если цикл не выполнил его за порог,
+  снимает стек потока цикла (``sys._current_frames``) и пишет его в лог —
+  видно, какой код держит цикл. В отличие от debug-режима asyncio
+  (``loop.slow_callback_duration``) не замедляет сам цикл.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from vkuswill_bot.services.metrics import LOOP_LAG, LOOP_SLOW_CALLBACKS
+
+logger = logging.getLogger(__name__)
+
+# Период замера задержки (секунды)
+DEFAULT_INTERVAL = 0.5
+
+# Глубина стека в логе медленного callback (кадров)
+STACK_LIMIT = 25
+
+# Не больше стеков в лог за минуту (защита лога при деградации)
+MAX_STACKS_PER_MINUTE = 6
+
+
+class LoopMonitor:
+    """Замер задержки event loop и детектор медленных callback."""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        slow_callback_ms: int = 0,
+    ) -> None:
+        self._interval = interval
+        self._slow_threshold = slow_callback_ms / 1000
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._stack_times: list[float] = []
+        self._stats: dict[str, float] = {
+            "samples": 0,
+            "lag_last": 0.0,
+            "lag_max": 0.0,
+            "slow_callbacks": 0,
+            "slow_callback_max": 0.0,
+        }
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Замеры задержки и медленные callback (секунды)."""
+        return dict(self._stats)
+
+    def health(self) -> dict[str, float]:
+        """Сводка для /health (миллисекунды)."""
+        return {
+            "lag_ms": round(self._stats["lag_last"] * 1000, 1),
+            "lag_max_ms": round(self._stats["lag_max"] * 1000, 1),
+            "slow_callbacks": int(self._stats["slow_callbacks"]),
+        }
+
+    # ---- Задержка цикла ----
+
+    def record_lag(self, lag: float) -> None:
+        """Учесть замер задержки."""
+        lag = max(0.0, lag)
+        LOOP_LAG.observe(lag)
+        self._stats["samples"] += 1
+        self._stats["lag_last"] = lag
+        self._stats["lag_max"] = max(self._stats["lag_max"], lag)
+
+    async def _loop(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.record_lag(time.perf_counter() - start - self._interval)
+
+    # ---- Медленные callback ----
+
+    def record_slow_callback(self, blocked: float, stack: str | None) -> None:
+        """Учесть блокировку цикла дольше порога (стек — если снят)."""
+        LOOP_SLOW_CALLBACKS.inc()
+        self._stats["slow_callbacks"] += 1
+        self._stats["slow_callback_max"] = max(self._stats["slow_callback_max"], blocked)
+        if stack is None:
+            return
+        now = time.monotonic()
+        self._stack_times = [t for t in self._stack_times if now - t < 60]
+        if len(self._stack_times) >= MAX_STACKS_PER_MINUTE:
+            return
+        self._stack_times.append(now)
+        logger.warning(
+            "Event loop заблокирован %.0f мс (порог %.0f мс), стек в момент блокировки:\n%s",
+            blocked * 1000,
+            self._slow_threshold * 1000,
+            stack,
+        )
+
+    def _watch(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int) -> None:
+        """Сторожевой поток: пинг цикла и снимок стека при блокировке."""
+        while not self._stop_event.wait(self._slow_threshold):
+            answered = threading.Event()
+            sent = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                return  # цикл закрыт
+            if answered.wait(self._slow_threshold):
+                continue
+            frame = sys._current_frames().get(loop_thread_id)
+            stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT)) if frame else None
+            # Ждём разблокировки, чтобы записать полную длительность
+            while not answered.wait(1.0):
+                if self._stop_event.is_set():
+                    return
+            # Запись — в потоке цикла: реестр метрик и _stats без блокировок
+            # читаются /metrics из event loop, цикл к этому моменту уже свободен
+            try:
+                loop.call_soon_threadsafe(
+                    self.record_slow_callback, time.perf_counter() - sent, stack
+                )
+            except RuntimeError:
+                return  # цикл закрыт
+
+    # ---- Жизненный цикл ----
+
+    def start(self) -> None:
+        """Запустить замер задержки (и сторожевой поток, если задан порог)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+        if self._slow_threshold > 0 and self._watchdog is None:
+            self._stop_event.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch,
+                args=(asyncio.get_running_loop(), threading.get_ident()),
+                name="loop-watchdog",
+                daemon=True,
+            )
+            self._watchdog.start()
+        logger.info(
+            "LoopMonitor: замер задержки каждые %.1f с, медленные callback: %s",
+            self._interval,
+            f"> {self._slow_threshold * 1000:.0f} мс" if self._slow_threshold > 0 else "выкл",
+        )
+
+    async def stop(self) -> None:
+        """Остановить замер и сторожевой поток."""
+        self._stop_event.set()
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, 2.0)
+            self._watchdog = None
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        logger.info("LoopMonitor: остановлен (%s)", self.stats)
@@ -9,11 +9,14 @@ import asyncio
 import importlib.metadata
 import json
 import logging
+import time
 import traceback
 from typing import Any
 
 import httpx
 
+from vkuswill_bot.services.metrics import ERRORS, MCP_DURATION, RATE_LIMITED, RETRIES
+
 logger = logging.getLogger(__name__)
 
 
@@ -199,20 +202,27 @@ class VkusvillMCPClient:
 
         # Инициализация
         logger.info("MCP: инициализация сессии...")
-        result = await self._rpc_call(
-            client,
-            "initialize",
-            {
-                "protocolVersion": MCP_PROTOCOL_VERSION,
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "vkuswill-bot",
-                    "version": _get_package_version(),
+        try:
+            result = await self._rpc_call(
+                client,
+                "initialize",
+                {
+                    "protocolVersion": MCP_PROTOCOL_VERSION,
+                    "capabilities": {},
+                    "clientInfo": {
+                        "name": "vkuswill-bot",
+                        "version": _get_package_version(),
+                    },
                 },
-            },
-        )
-        logger.debug("MCP initialize result: %s", result)
-        await self._rpc_notify(client, "notifications/initialized")
+            )
+            logger.debug("MCP initialize result: %s", result)
+            await self._rpc_notify(client, "notifications/initialized")
+        except BaseException:
+            # session-id приходит с ответом initialize: без notifications/initialized
+            # (ошибка или отмена по таймауту) сессия непригодна — следующий вызов
+            # инициализирует её заново, а не пойдёт с полуоткрытой
+            self._session_id = None
+            raise
         logger.info("MCP: сессия инициализирована (sid=%s)", self._session_id)
 
         return client
@@ -228,6 +238,14 @@ class VkusvillMCPClient:
         """Закрыть клиент."""
         await self._reset_session()
 
+    async def warm_up(self) -> None:
+        """Заранее открыть соединение и инициализировать MCP-сессию.
+
+        Первый вызов инструмента после этого не платит за TLS-рукопожатие
+        и ``initialize`` (холодный старт функции Алисы).
+        """
+        await self._ensure_initialized()
+
     async def get_tools(self) -> list[dict]:
         """Получить список инструментов с MCP-сервера.
 
@@ -309,8 +327,11 @@ class VkusvillMCPClient:
         """
         logger.info("MCP вызов: %s(%s)", name, arguments)
 
+        start = time.perf_counter()
         last_error: Exception | None = None
         for attempt in range(MAX_RETRIES):
+            if attempt:
+                RETRIES.inc("mcp")
             try:
                 client = await self._ensure_initialized()
                 result = await self._rpc_call(
@@ -319,6 +340,7 @@ class VkusvillMCPClient:
                     {"name": name, "arguments": arguments},
                 )
 
+                MCP_DURATION.observe(time.perf_counter() - start, name, "ok")
                 if result is None:
                     return ""
 
@@ -334,6 +356,8 @@ class VkusvillMCPClient:
 
             except Exception as e:
                 last_error = e
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+                    RATE_LIMITED.inc("mcp")
                 logger.warning(
                     "MCP call_tool %s попытка %d/%d: %r",
                     name,
@@ -347,4 +371,6 @@ class VkusvillMCPClient:
                 if attempt < MAX_RETRIES - 1:
                     await asyncio.sleep(RETRY_DELAY * (attempt + 1))
 
+        MCP_DURATION.observe(time.perf_counter() - start, name, "error")
+        ERRORS.inc("mcp")
         raise last_error or RuntimeError(f"MCP call_tool {name} failed")
@@ -0,0 +1,125 @@
+"""Тайминги этапов обработки сообщения — всегда включены, без Langfuse.
+
+Langfuse-спаны пишутся только при включённой трассировке и стоят
+сетевых вызовов. Здесь — счётчики в памяти на одно сообщение:
+суммарное время каждого этапа, число вызовов LLM и инструментов,
+токены. По завершении сообщения — одно структурированное событие
+``llm_timing`` в лог и гистограммы ``/metrics`` по этапам.
+
+Этапы (секунды, сумма за сообщение):
+
+- ``history_load`` / ``history_save`` — история диалога;
+- ``fast_path`` — быстрый путь без LLM;
+- ``semaphore_wait`` — ожидание слота семафора GigaChat;
+- ``gigachat`` — запросы к GigaChat (все попытки);
+- ``retry_backoff`` — пауза перед повтором после 429;
+- ``preprocess`` / ``tool`` / ``postprocess`` — аргументы, вызов
+  инструмента, обработка результата.
+
+Время вне этапов (прогресс в Telegram, сборка сообщений, Langfuse) —
+``other_ms`` события.
+
+Коллектор текущего сообщения — в contextvar: его видят и
+``_call_gigachat_with_fc``, и цикл function calling без передачи
+через аргументы.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from vkuswill_bot.services.metrics import (
+    ERRORS,
+    LLM_TOKENS,
+    MESSAGE_DURATION,
+    MESSAGE_STAGE_DURATION,
+    MESSAGE_STEPS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Токены из usage_details (_extract_usage) → метка метрики
+_TOKEN_KINDS = {"input": "prompt", "output": "completion", "precached_tokens": "precached"}
+
+
+@dataclass(slots=True)
+class MessageTiming:
+    """Тайминги одного сообщения."""
+
+    started: float = field(default_factory=time.perf_counter)
+    stages: dict[str, float] = field(default_factory=dict)
+    tools: dict[str, float] = field(default_factory=dict)
+    llm_calls: int = 0
+    tool_calls: int = 0
+    tokens: dict[str, int] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Добавить время этапа."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_tool(self, name: str, seconds: float) -> None:
+        """Добавить время вызова инструмента (этап ``tool`` + разбивка по имени)."""
+        self.add("tool", seconds)
+        self.tools[name] = self.tools.get(name, 0.0) + seconds
+        self.tool_calls += 1
+
+    def add_usage(self, usage: dict[str, int] | None) -> None:
+        """Учесть токены ответа GigaChat (usage_details из _extract_usage)."""
+        for key, value in (usage or {}).items():
+            self.tokens[key] = self.tokens.get(key, 0) + value
+
+    def event(self, user_id: int, outcome: str, total: float) -> dict:
+        """Событие ``llm_timing`` (миллисекунды)."""
+        staged = sum(self.stages.values())
+        return {
+            "event": "llm_timing",
+            "user_id": user_id,
+            "outcome": outcome,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+            "other_ms": round(max(0.0, total - staged) * 1000, 1),
+            "tools_ms": {k: round(v * 1000, 1) for k, v in self.tools.items()},
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "tokens": self.tokens,
+        }
+
+    def finish(self, user_id: int, outcome: str) -> float:
+        """Записать метрики и событие ``llm_timing``; вернуть общее время."""
+        total = time.perf_counter() - self.started
+        MESSAGE_DURATION.observe(total, outcome)
+        MESSAGE_STEPS.observe(self.llm_calls)
+        for stage, seconds in self.stages.items():
+            MESSAGE_STAGE_DURATION.observe(seconds, stage)
+        for key, kind in _TOKEN_KINDS.items():
+            if key in self.tokens:
+                LLM_TOKENS.inc(kind, amount=self.tokens[key])
+        if outcome != "ok":
+            ERRORS.inc("message")
+        logger.info(
+            "LLM timing: %s",
+            json.dumps(self.event(user_id, outcome, total), ensure_ascii=False),
+        )
+        return total
+
+
+_current: ContextVar[MessageTiming | None] = ContextVar("message_timing", default=None)
+
+
+def start_timing() -> tuple[MessageTiming, object]:
+    """Начать тайминги сообщения; токен — для ``reset_timing``."""
+    timing = MessageTiming()
+    return timing, _current.set(timing)
+
+
+def reset_timing(token: object) -> None:
+    _current.reset(token)  # type: ignore[arg-type]
+
+
+def current_timing() -> MessageTiming | None:
+    """Тайминги обрабатываемого сообщения (None вне process_message)."""
+    return _current.get()
@@ -0,0 +1,422 @@
+"""Метрики Prometheus: счётчики и гистограммы задержек по этапам.
+
+Собственный минимальный реестр вместо prometheus_client: запись —
+несколько микросекунд (bisect по границам корзин + инкремент в dict),
+без блокировок — метрики пишутся из event loop. Модуль импортируют
+mcp_client и redis_client, которые входят в ZIP функции навыка Алисы:
+без внешней зависимости холодный старт функции не платит за её импорт.
+Формат вывода — Prometheus text exposition 0.0.4 (эндпоинт ``/metrics``
+webhook-режима).
+
+Кардинальность ограничена: у каждой метрики не больше ``max_series``
+наборов меток (плюс ``other``) — новые сверх лимита схлопываются в ``other``
+(имя инструмента приходит от модели и может быть любым).
+
+Счётчики существующих кешей и фоновых задач (свойство ``stats``)
+не дублируются в горячем пути, а читаются при запросе ``/metrics``
+через ``register_stats``.
+
+Использование:
+    start = time.perf_counter()
+    ...
+    MCP_DURATION.observe(time.perf_counter() - start, name, "ok")
+    ERRORS.inc("mcp")
+"""
+
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Предел наборов меток на метрику (защита от взрыва кардинальности)
+DEFAULT_MAX_SERIES = 64
+
+# Метка, в которую схлопываются серии сверх лимита
+OVERFLOW_LABEL = "other"
+
+# Границы корзин задержек (секунды): от операций Redis до ответа LLM
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Границы корзин шагов function calling на сообщение
+STEP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    """Общая часть метрик: имя, описание, метки, лимит серий."""
+
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        max_series: int = DEFAULT_MAX_SERIES,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.max_series = max_series
+        self._series: dict[tuple[str, ...], Any] = {}
+        self._overflow = (OVERFLOW_LABEL,) * len(labels)
+
+    def _key(self, values: tuple[str, ...]) -> tuple[str, ...]:
+        if len(values) != len(self.labels):
+            msg = f"{self.name}: ожидались метки {self.labels}, получено {values}"
+            raise ValueError(msg)
+        if values in self._series or len(self._series) < self.max_series:
+            return values
+        return self._overflow
+
+    def clear(self) -> None:
+        """Сбросить все серии (тесты)."""
+        self._series.clear()
+
+    @property
+    def family(self) -> str:
+        """Имя метрики в строках HELP/TYPE."""
+        return self.name
+
+    def _header(self) -> list[str]:
+        return [
+            f"# HELP {self.family} {self.documentation}",
+            f"# TYPE {self.family} {self.kind}",
+        ]
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        """Строки text exposition: заголовок и все серии."""
+
+
+class Counter(_Metric):
+    """Монотонный счётчик."""
+
+    kind = "counter"
+
+    @property
+    def family(self) -> str:
+        # Сэмплы счётчика — ``<name>_total``; TYPE должен называть то же имя,
+        # иначе Prometheus (формат 0.0.4) считает их нетипизированными
+        return f"{self.name}_total"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Увеличить счётчик для набора меток."""
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._series.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for values, total in self._series.items():
+            lines.append(
+                f"{self.family}{_format_labels(self.labels, values)} {_format_value(total)}"
+            )
+        return lines
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин.
+
+    Серия хранит счётчики по корзинам (не кумулятивные — запись
+    дешевле), сумму и количество; кумулятивные значения ``le``
+    считаются при выводе.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+        max_series: int = DEFAULT_MAX_SERIES,
+    ) -> None:
+        super().__init__(name, documentation, labels, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Записать наблюдение."""
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [счётчики корзин + +Inf, сумма]
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def sum(self, *labels: str) -> float:
+        series = self._series.get(labels)
+        return series[1] if series else 0.0
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        bounds = [*self.buckets, float("inf")]
+        for values, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts, strict=True):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Реестр метрик и источников ``stats``, читаемых при выводе."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._stats_sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def counter(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def _add(self, metric: Any) -> Any:
+        if metric.name in self._metrics:
+            msg = f"Метрика {metric.name} уже зарегистрирована"
+            raise ValueError(msg)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_stats(self, component: str, source: Any) -> None:
+        """Публиковать ``source.stats`` (dict чисел) компонента при выводе.
+
+        Повторная регистрация компонента заменяет источник.
+        """
+        self._stats_sources[component] = lambda: source.stats
+
+    def unregister_stats(self, component: str) -> None:
+        self._stats_sources.pop(component, None)
+
+    def clear(self) -> None:
+        """Сбросить значения метрик и источники stats (тесты)."""
+        for metric in self._metrics.values():
+            metric.clear()
+        self._stats_sources.clear()
+
+    def _render_stats(self) -> list[str]:
+        gauges: list[str] = []
+        hits: list[str] = []
+        misses: list[str] = []
+        for component, read in sorted(self._stats_sources.items()):
+            try:
+                stats = read()
+            except Exception as e:
+                logger.debug("Метрики: stats %s недоступны: %s", component, e)
+                continue
+            for key, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, int | float):
+                    continue
+                labels = _format_labels(("component", "stat"), (component, key))
+                gauges.append(f"vkuswill_component_stat{labels} {_format_value(value)}")
+            if "hits" in stats and "misses" in stats:
+                label = _format_labels(("cache",), (component,))
+                hits.append(f"vkuswill_cache_hits_total{label} {_format_value(stats['hits'])}")
+                misses.append(
+                    f"vkuswill_cache_misses_total{label} {_format_value(stats['misses'])}"
+                )
+        lines: list[str] = []
+        if hits:
+            lines += [
+                "# HELP vkuswill_cache_hits_total Попадания в кеш",
+                "# TYPE vkuswill_cache_hits_total counter",
+                *hits,
+                "# HELP vkuswill_cache_misses_total Промахи кеша",
+                "# TYPE vkuswill_cache_misses_total counter",
+                *misses,
+            ]
+        if gauges:
+            lines += [
+                "# HELP vkuswill_component_stat Счётчики компонентов (свойство stats)",
+                "# TYPE vkuswill_component_stat gauge",
+                *gauges,
+            ]
+        return lines
+
+    def render(self) -> str:
+        """Все метрики в формате Prometheus text exposition."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        lines += self._render_stats()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---- Сообщение целиком ----
+
+MESSAGE_DURATION = REGISTRY.histogram(
+    "vkuswill_message_duration_seconds",
+    "Время обработки сообщения от получения до ответа",
+    ("outcome",),
+)
+MESSAGE_STAGE_DURATION = REGISTRY.histogram(
+    "vkuswill_message_stage_duration_seconds",
+    "Время этапа обработки сообщения (сумма за сообщение, см. message_timing)",
+    ("stage",),
+)
+MESSAGE_STEPS = REGISTRY.histogram(
+    "vkuswill_message_steps",
+    "Шагов function calling (вызовов GigaChat) на сообщение",
+    buckets=STEP_BUCKETS,
+)
+
+# ---- GigaChat ----
+
+GIGACHAT_DURATION = REGISTRY.histogram(
+    "vkuswill_gigachat_request_duration_seconds",
+    "Время запроса к GigaChat (одна попытка, без ожидания семафора)",
+    ("outcome",),
+)
+GIGACHAT_SEMAPHORE_WAIT = REGISTRY.histogram(
+    "vkuswill_gigachat_semaphore_wait_seconds",
+    "Ожидание слота семафора параллельных запросов к GigaChat",
+)
+
+LLM_TOKENS = REGISTRY.counter(
+    "vkuswill_llm_tokens",
+    "Токены GigaChat по типу (prompt, completion, precached)",
+    ("kind",),
+)
+
+# ---- MCP ----
+
+MCP_DURATION = REGISTRY.histogram(
+    "vkuswill_mcp_call_duration_seconds",
+    "Время вызова инструмента MCP (все попытки)",
+    ("tool", "outcome"),
+)
+
+# ---- Хранилища ----
+
+REDIS_DURATION = REGISTRY.histogram(
+    "vkuswill_redis_command_duration_seconds",
+    "Время команды Redis (PIPELINE — пакет целиком; XREAD включает блокирующее ожидание)",
+    ("command",),
+)
+POSTGRES_DURATION = REGISTRY.histogram(
+    "vkuswill_postgres_query_duration_seconds",
+    "Время запроса PostgreSQL по типу SQL-команды",
+    ("verb",),
+)
+
+# ---- Event loop ----
+
+LOOP_LAG = REGISTRY.histogram(
+    "vkuswill_event_loop_lag_seconds",
+    "Задержка event loop: насколько позже срока просыпается таймер",
+)
+LOOP_SLOW_CALLBACKS = REGISTRY.counter(
+    "vkuswill_event_loop_slow_callbacks",
+    "Блокировки event loop дольше порога детектора медленных callback",
+)
+
+# ---- Счётчики ----
+
+RATE_LIMITED = REGISTRY.counter(
+    "vkuswill_rate_limited",
+    "Ответы 429 (rate limit) от внешних API",
+    ("component",),
+)
+RETRIES = REGISTRY.counter(
+    "vkuswill_retries",
+    "Повторные попытки вызовов внешних API",
+    ("component",),
+)
+ERRORS = REGISTRY.counter(
+    "vkuswill_errors",
+    "Ошибки вызовов внешних API и обработки сообщений",
+    ("component",),
+)
+
+
+def _sql_verb(query: str) -> str:
+    # Сброс соединения при возврате в пул (Connection.get_reset_query)
+    # начинается с SELECT — выделяем его, чтобы не искажать SELECT
+    if query.endswith("RESET ALL;"):
+        return "RESET"
+    words = query.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _observe_postgres_query(record: Any) -> None:
+    """Query logger asyncpg: ``LoggedQuery`` → гистограмма по типу команды."""
+    POSTGRES_DURATION.observe(record.elapsed, _sql_verb(record.query))
+
+
+async def instrument_postgres(conn: Any) -> None:
+    """Callback ``init`` пула asyncpg: замер каждого запроса соединения."""
+    conn.add_query_logger(_observe_postgres_query)
+
+
+def register_stats(component: str, source: Any) -> None:
+    """Публиковать ``source.stats`` в ``/metrics`` (см. Registry.register_stats)."""
+    REGISTRY.register_stats(component, source)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,231 @@
+"""Нормализация русских слов: стемминг Snowball и опциональная лемматизация.
+
+Используется для проверки релевантности поиска и для запросов к локальному
+индексу каталога: "яйца" и "яйцо", "курицы" и "курица" должны совпадать.
+
+По умолчанию — чистый Python (алгоритм Snowball Russian), без зависимостей.
+Если установлен ``pymorphy3`` (ставится отдельно), ``use_pymorphy()``
+переключает ``normalize()`` на лемматизацию. ``stem()`` всегда остаётся
+стеммером: его результат — префикс слова, что нужно для prefix-поиска FTS5.
+
+Нормализованные формы кешируются (LRU): словарь запросов и названий
+товаров небольшой, а одни и те же слова встречаются постоянно.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections.abc import Callable
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Размер LRU-кеша нормализованных форм
+NORMALIZE_CACHE_SIZE = 16384
+
+_TOKEN_RE = re.compile(r"\w+")
+
+_VOWELS = frozenset("аеиоуыэюя")
+
+
+def _by_length(*endings: str) -> tuple[str, ...]:
+    """Окончания по убыванию длины (Snowball выбирает самое длинное)."""
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+# Окончания, требующие предшествующей "а"/"я" (группа 1), и остальные (группа 2)
+_PERFECTIVE_GERUND_1 = _by_length("в", "вши", "вшись")
+_PERFECTIVE_GERUND_2 = _by_length("ив", "ивши", "ившись", "ыв", "ывши", "ывшись")
+_ADJECTIVE = _by_length(
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым",
+    "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)  # fmt: skip
+_PARTICIPLE_1 = _by_length("ем", "нн", "вш", "ющ", "щ")
+_PARTICIPLE_2 = _by_length("ивш", "ывш", "ующ")
+_REFLEXIVE = _by_length("ся", "сь")
+_VERB_1 = _by_length(
+    "ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют",
+    "ны", "ть", "ешь", "нно",
+)  # fmt: skip
+_VERB_2 = _by_length(
+    "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил",
+    "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт",
+    "ены", "ить", "ыть", "ишь", "ую", "ю",
+)  # fmt: skip
+_NOUN = _by_length(
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и",
+    "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о", "у",
+    "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)  # fmt: skip
+_SUPERLATIVE = _by_length("ейш", "ейше")
+_DERIVATIONAL = _by_length("ост", "ость")
+
+
+def _regions(word: str) -> tuple[int, int]:
+    """Вычислить начала областей RV и R2 (индексы в слове)."""
+    n = len(word)
+    rv = n
+    for i, ch in enumerate(word):
+        if ch in _VOWELS:
+            rv = i + 1
+            break
+    r1 = n
+    for i in range(1, n):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r1 = i + 1
+            break
+    r2 = n
+    for i in range(r1 + 1, n):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip_grouped(
+    word: str,
+    start: int,
+    group1: tuple[str, ...],
+    group2: tuple[str, ...],
+) -> str | None:
+    """Удалить самое длинное окончание из двух групп в области ``word[start:]``.
+
+    Окончание группы 1 удаляется, только если перед ним "а" или "я"
+    (тоже внутри области). Как в Snowball: выбирается самое длинное
+    совпадение, при невыполнении условия более короткие не пробуются.
+    """
+    best = ""
+    best_group = 0
+    for ending in group1:
+        if len(ending) > len(best) and word.endswith(ending):
+            best, best_group = ending, 1
+            break
+    for ending in group2:
+        if len(ending) > len(best) and word.endswith(ending):
+            best, best_group = ending, 2
+            break
+    if not best or len(word) - len(best) < start:
+        return None
+    cut = len(word) - len(best)
+    if best_group == 1 and (cut - 1 < start or word[cut - 1] not in "ая"):
+        return None
+    return word[:cut]
+
+
+def _strip(word: str, start: int, endings: tuple[str, ...]) -> str | None:
+    """Удалить самое длинное окончание из ``endings`` в области ``word[start:]``."""
+    for ending in endings:
+        if word.endswith(ending):
+            if len(word) - len(ending) < start:
+                return None
+            return word[: -len(ending)]
+    return None
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def stem(word: str) -> str:
+    """Основа слова по алгоритму Snowball Russian.
+
+    Результат всегда является префиксом слова (после ``ё`` → ``е``).
+
+    Примеры:
+        "яйца" → "яйц", "курицы" → "куриц", "молока" → "молок"
+    """
+    word = word.lower().replace("ё", "е")
+    rv, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+
+    # Шаг 1: деепричастие, иначе (возвратность +) прилагательное / глагол / сущ.
+    stripped = _strip_grouped(word, rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if stripped is not None:
+        word = stripped
+    else:
+        word = _strip(word, rv, _REFLEXIVE) or word
+        adjective = _strip(word, rv, _ADJECTIVE)
+        if adjective is not None:
+            word = _strip_grouped(adjective, rv, _PARTICIPLE_1, _PARTICIPLE_2) or adjective
+        else:
+            word = _strip_grouped(word, rv, _VERB_1, _VERB_2) or _strip(word, rv, _NOUN) or word
+
+    # Шаг 2: конечная "и"
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Шаг 3: словообразовательный суффикс в R2
+    word = _strip(word, r2, _DERIVATIONAL) or word
+
+    # Шаг 4: превосходная степень, удвоенная "н", мягкий знак
+    superlative = _strip(word, rv, _SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    double_n = word.endswith("нн") and len(word) - 2 >= rv
+    soft_sign = superlative is None and word.endswith("ь") and len(word) - 1 >= rv
+    if double_n or soft_sign:
+        word = word[:-1]
+    return word
+
+
+# ---- Подключаемый нормализатор (стеммер или лемматизатор) ----
+
+_normalizer: Callable[[str], str] = stem
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize(word: str) -> str:
+    """Нормальная форма слова текущим бэкендом (по умолчанию — основа Snowball)."""
+    return _normalizer(word.lower().replace("ё", "е"))
+
+
+def set_normalizer(func: Callable[[str], str] | None) -> None:
+    """Подключить свою функцию нормализации (None — вернуть стеммер).
+
+    Сбрасывает кеши нормализованных форм.
+    """
+    global _normalizer
+    _normalizer = func if func is not None else stem
+    normalize.cache_clear()
+    name_terms.cache_clear()
+
+
+def use_pymorphy() -> bool:
+    """Переключить ``normalize()`` на лемматизацию pymorphy3.
+
+    Returns:
+        True если pymorphy3 установлен и подключён, иначе False (остаётся стеммер).
+    """
+    try:
+        import pymorphy3
+    except ImportError:
+        logger.warning("pymorphy3 не установлен, остаётся стеммер Snowball")
+        return False
+
+    analyzer = pymorphy3.MorphAnalyzer()
+
+    def _lemma(word: str) -> str:
+        return analyzer.parse(word)[0].normal_form.replace("ё", "е")
+
+    set_normalizer(_lemma)
+    logger.info("Нормализация слов: лемматизация pymorphy3")
+    return True
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбить текст на слова в нижнем регистре (ё → е)."""
+    return _TOKEN_RE.findall(text.lower().replace("ё", "е"))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def name_terms(name: str, min_prefix: int = 3) -> frozenset[str]:
+    """Множество термов названия товара для O(1)-проверки слов запроса.
+
+    Содержит нормальные формы слов и их префиксы длиной от ``min_prefix``:
+    так "шоколад" находит "шоколадный", а "яйца" — "яйцо" (общая основа).
+    """
+    terms: set[str] = set()
+    for token in tokenize(name):
+        terms.add(token)
+        terms.add(normalize(token))
+        terms.update(token[:i] for i in range(min_prefix, len(token) + 1))
+    return frozenset(terms)
@@ -0,0 +1,113 @@
+"""Кеш результатов Open Food Facts (SQLite).
+
+Хранит отфильтрованные продукты (только с КБЖУ) по нормализованному
+запросу ``nutrition_lookup``. КБЖУ продуктов меняются редко, поэтому
+TTL длинный; пустой результат тоже кешируется (negative caching),
+но на короткий срок — база Open Food Facts пополняется.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+# TTL найденных КБЖУ (30 дней)
+DEFAULT_TTL = 30 * 86400
+
+# TTL пустого результата (1 сутки)
+DEFAULT_NEGATIVE_TTL = 86400
+
+_CREATE_TABLE_SQL = """\
+CREATE TABLE IF NOT EXISTS nutrition_cache (
+    query       TEXT    NOT NULL PRIMARY KEY,
+    products    TEXT    NOT NULL,
+    found       INTEGER NOT NULL,
+    fetched_at  REAL    NOT NULL
+)
+"""
+
+_UPSERT_SQL = """\
+INSERT INTO nutrition_cache (query, products, found, fetched_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(query) DO UPDATE SET
+    products   = excluded.products,
+    found      = excluded.found,
+    fetched_at = excluded.fetched_at
+"""
+
+
+class NutritionCache:
+    """Async-кеш результатов поиска КБЖУ на базе SQLite."""
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+    ) -> None:
+        self._db_path = db_path
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._db: aiosqlite.Connection | None = None
+
+    async def _ensure_db(self) -> aiosqlite.Connection:
+        """Открыть или переиспользовать соединение с БД."""
+        if self._db is None:
+            db_dir = os.path.dirname(self._db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._db = await aiosqlite.connect(self._db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute(_CREATE_TABLE_SQL)
+            await self._db.commit()
+            logger.info("SQLite кеш КБЖУ открыт: %s", self._db_path)
+        return self._db
+
+    async def get(self, query: str) -> list[dict[str, Any]] | None:
+        """Найти продукты по нормализованному запросу.
+
+        Returns:
+            Список продуктов ([] — закешированный пустой результат)
+            или None, если записи нет или она устарела.
+        """
+        db = await self._ensure_db()
+        cursor = await db.execute(
+            "SELECT products, found, fetched_at FROM nutrition_cache WHERE query = ?",
+            (query,),
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        products_json, found, fetched_at = row
+        ttl = self._ttl if found else self._negative_ttl
+        if time.time() - fetched_at > ttl:
+            return None
+        try:
+            products = json.loads(products_json)
+        except json.JSONDecodeError:
+            logger.warning("Повреждённая запись кеша КБЖУ для %r", query)
+            return None
+        return products if isinstance(products, list) else None
+
+    async def set(self, query: str, products: list[dict[str, Any]]) -> None:
+        """Сохранить продукты (пустой список — negative cache)."""
+        db = await self._ensure_db()
+        await db.execute(
+            _UPSERT_SQL,
+            (query, json.dumps(products, ensure_ascii=False), int(bool(products)), time.time()),
+        )
+        await db.commit()
+
+    async def close(self) -> None:
+        """Закрыть соединение с БД."""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+            logger.info("SQLite кеш КБЖУ закрыт.")
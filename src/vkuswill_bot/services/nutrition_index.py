@@ -0,0 +1,376 @@
+"""Офлайн-индекс КБЖУ из дампа Open Food Facts (memory-mapped).
+
+Импорт (``build_index``) читает CSV- или JSONL-дамп Open Food Facts
+(можно .gz), оставляет российские продукты с калорийностью и пишет
+компактный бинарный файл. ``NutritionIndex`` открывает его через mmap
+и отвечает на запросы без сети: NutritionService идёт в API только
+при промахе индекса.
+
+Формат файла (little-endian):
+
+- заголовок ``_HEADER``: магия, версия, число продуктов и токенов,
+  смещения секций;
+- строки: UTF-8 названия, бренды, порции и токены подряд;
+- продукты: записи ``_PRODUCT`` фиксированной длины — смещения строк,
+  Nutri-Score и упакованный массив 7 нутриентов (float32, NaN — нет данных);
+  упорядочены по длине названия, так что номер продукта — его ранг;
+- токены: записи ``_TOKEN``, отсортированные по байтам токена
+  (бинарный поиск прямо по mmap);
+- postings: номера продуктов (uint32) для каждого токена.
+
+Токены — основы слов по стеммеру Snowball (``morphology.stem``), а не
+``morphology.normalize``: индекс собирается заранее, и его термы не должны
+зависеть от бэкенда нормализации, выбранного при запуске бота.
+"""
+
+from __future__ import annotations
+
+import array
+import csv
+import gzip
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Iterator
+from typing import IO, Any
+
+from vkuswill_bot.services import morphology
+
+logger = logging.getLogger(__name__)
+
+# Магия и версия формата файла
+_MAGIC = b"VVOFFIX1"
+_VERSION = 1
+
+# Страна по умолчанию при импорте (тег Open Food Facts)
+DEFAULT_COUNTRY = "en:russia"
+
+# Нутриенты в порядке упаковки (ключи Open Food Facts)
+NUTRIENT_FIELDS = (
+    "energy-kcal_100g",
+    "proteins_100g",
+    "fat_100g",
+    "carbohydrates_100g",
+    "fiber_100g",
+    "sugars_100g",
+    "salt_100g",
+)
+
+# Минимальная длина слова для индексации
+_MIN_TOKEN_LEN = 2
+
+_HEADER = struct.Struct("<8sIIIIIII")
+# name_off, name_len, brand_off, brand_len, serving_off, serving_len, grade, nutrients
+_PRODUCT = struct.Struct(f"<IHIHIH2s{len(NUTRIENT_FIELDS)}f")
+# token_off, token_len, postings_off (в элементах uint32), postings_count
+_TOKEN = struct.Struct("<IHII")
+
+# Ограничение длины строк в записи (uint16)
+_MAX_STR_BYTES = 0xFFFF
+
+
+def _terms(text: str) -> set[str]:
+    """Термы названия/запроса: основы слов без чисел и однобуквенных токенов."""
+    return {
+        morphology.stem(token)
+        for token in morphology.tokenize(text)
+        if len(token) >= _MIN_TOKEN_LEN and not token.isdigit()
+    }
+
+
+def _to_float(value: object) -> float | None:
+    """Число из значения дампа (строка CSV или число JSON), иначе None."""
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+# ---- Чтение дампа ----
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def _iter_jsonl(path: str) -> Iterator[dict[str, Any]]:
+    with _open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                product = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(product, dict):
+                continue
+            nutriments = product.get("nutriments")
+            if not isinstance(nutriments, dict):
+                nutriments = {}
+            countries = product.get("countries_tags") or []
+            yield {
+                "name": product.get("product_name_ru") or product.get("product_name") or "",
+                "brand": product.get("brands") or "",
+                "serving": product.get("serving_size") or "",
+                "grade": product.get("nutrition_grades") or "",
+                "countries": countries if isinstance(countries, list) else [],
+                "nutriments": nutriments,
+            }
+
+
+def _iter_csv(path: str) -> Iterator[dict[str, Any]]:
+    # Выгрузка Open Food Facts — TSV без кавычек, с очень длинными полями
+    csv.field_size_limit(sys.maxsize)
+    with _open_text(path) as f:
+        reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        for row in reader:
+            yield {
+                "name": row.get("product_name_ru") or row.get("product_name") or "",
+                "brand": row.get("brands") or "",
+                "serving": row.get("serving_size") or "",
+                "grade": row.get("nutriscore_grade") or row.get("nutrition_grade_fr") or "",
+                "countries": (row.get("countries_tags") or "").split(","),
+                "nutriments": row,
+            }
+
+
+def iter_dump(path: str) -> Iterator[dict[str, Any]]:
+    """Продукты из дампа Open Food Facts (JSONL или CSV/TSV, можно .gz)."""
+    base = path.removesuffix(".gz")
+    if base.endswith((".jsonl", ".json", ".ndjson")):
+        return _iter_jsonl(path)
+    return _iter_csv(path)
+
+
+# ---- Сборка индекса ----
+
+
+def build_index(
+    dump_path: str,
+    out_path: str,
+    country: str | None = DEFAULT_COUNTRY,
+) -> dict[str, float]:
+    """Собрать индекс из дампа Open Food Facts.
+
+    Берутся продукты с названием и калорийностью; при ``country`` —
+    только с этим тегом страны (None — все страны).
+
+    Returns:
+        Сводка: products, tokens, bytes, seconds.
+    """
+    start = time.monotonic()
+    strings = bytearray()
+    string_offsets: dict[str, tuple[int, int]] = {}
+
+    def add_string(text: str) -> tuple[int, int]:
+        cached = string_offsets.get(text)
+        if cached is None:
+            data = text.encode("utf-8")[:_MAX_STR_BYTES]
+            cached = string_offsets[text] = (len(strings), len(data))
+            strings.extend(data)
+        return cached
+
+    entries: list[tuple[bytes, set[str]]] = []
+    for product in iter_dump(dump_path):
+        name = str(product["name"]).strip()
+        if not name or (country and country not in product["countries"]):
+            continue
+        nutriments = product["nutriments"]
+        values = [_to_float(nutriments.get(field)) for field in NUTRIENT_FIELDS]
+        if values[0] is None:
+            continue
+        terms = _terms(name)
+        if not terms:
+            continue
+
+        grade = str(product["grade"]).strip().lower()
+        record = _PRODUCT.pack(
+            *add_string(name),
+            *add_string(str(product["brand"]).strip()),
+            *add_string(str(product["serving"]).strip()),
+            grade.encode("ascii", "ignore")[:2],
+            *(math.nan if v is None else v for v in values),
+        )
+        entries.append((record, terms))
+
+    # Номер продукта = ранг: короткие названия первыми. Тогда postings уже
+    # отсортированы по релевантности, и поиску хватает первых ``limit`` совпадений.
+    entries.sort(key=lambda entry: _PRODUCT.unpack_from(entry[0])[1])
+    products = bytearray()
+    postings: dict[str, list[int]] = {}
+    for product_id, (record, terms) in enumerate(entries):
+        products.extend(record)
+        for term in terms:
+            postings.setdefault(term, []).append(product_id)
+    count = len(entries)
+
+    tokens = bytearray()
+    postings_data = array.array("I")
+    for term in sorted(postings, key=lambda t: t.encode("utf-8")):
+        ids = postings[term]
+        tokens.extend(_TOKEN.pack(*add_string(term), len(postings_data), len(ids)))
+        postings_data.extend(ids)
+    if sys.byteorder != "little":
+        postings_data.byteswap()
+
+    strings_off = _HEADER.size
+    products_off = strings_off + len(strings)
+    tokens_off = products_off + len(products)
+    postings_off = tokens_off + len(tokens)
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        count,
+        len(postings),
+        strings_off,
+        products_off,
+        tokens_off,
+        postings_off,
+    )
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(strings)
+        f.write(products)
+        f.write(tokens)
+        f.write(postings_data.tobytes())
+    os.replace(tmp_path, out_path)
+
+    summary = {
+        "products": count,
+        "tokens": len(postings),
+        "bytes": os.path.getsize(out_path),
+        "seconds": time.monotonic() - start,
+    }
+    logger.info(
+        "Индекс КБЖУ собран: %d продуктов, %d токенов, %.1f МБ за %.1f с",
+        count,
+        len(postings),
+        summary["bytes"] / 1e6,
+        summary["seconds"],
+    )
+    return summary
+
+
+# ---- Чтение индекса ----
+
+
+class NutritionIndex:
+    """Индекс КБЖУ, открытый через mmap (только чтение).
+
+    ``search`` возвращает продукты в формате Open Food Facts
+    (product_name, brands, nutriments, ...), как ``NutritionService._search``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self._count,
+            self._token_count,
+            self._strings_off,
+            self._products_off,
+            self._tokens_off,
+            self._postings_off,
+        ) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._mm.close()
+            raise ValueError(f"{path}: не индекс КБЖУ (или несовместимая версия)")
+        logger.info("Индекс КБЖУ открыт: %s (%d продуктов)", path, self._count)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_off + offset
+        return self._mm[start : start + length].decode("utf-8", "replace")
+
+    def _postings(self, term: str) -> array.array | None:
+        """Номера продуктов с термом (бинарный поиск по таблице токенов)."""
+        key = term.encode("utf-8")
+        lo, hi = 0, self._token_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            tok_off, tok_len, post_off, post_count = _TOKEN.unpack_from(
+                self._mm, self._tokens_off + mid * _TOKEN.size
+            )
+            start = self._strings_off + tok_off
+            token = self._mm[start : start + tok_len]
+            if token < key:
+                lo = mid + 1
+            elif token > key:
+                hi = mid
+            else:
+                ids = array.array("I")
+                begin = self._postings_off + post_off * ids.itemsize
+                ids.frombytes(self._mm[begin : begin + post_count * ids.itemsize])
+                if sys.byteorder != "little":
+                    ids.byteswap()
+                return ids
+        return None
+
+    def _product(self, product_id: int) -> dict[str, Any]:
+        record = _PRODUCT.unpack_from(self._mm, self._products_off + product_id * _PRODUCT.size)
+        name_off, name_len, brand_off, brand_len, serving_off, serving_len, grade = record[:7]
+        nutriments = {
+            field: round(value, 2)
+            for field, value in zip(NUTRIENT_FIELDS, record[7:], strict=True)
+            if not math.isnan(value)
+        }
+        return {
+            "product_name": self._string(name_off, name_len),
+            "brands": self._string(brand_off, brand_len),
+            "serving_size": self._string(serving_off, serving_len),
+            "nutrition_grades": grade.rstrip(b"\0").decode("ascii"),
+            "nutriments": nutriments,
+        }
+
+    def search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
+        """Продукты, в названии которых есть все слова запроса.
+
+        Короткие названия (точнее соответствующие запросу) — первыми;
+        этот порядок заложен в номера продуктов при сборке.
+
+        Returns:
+            До ``limit`` продуктов; [] — промах (нужен API).
+        """
+        terms = _terms(query)
+        if not terms or limit <= 0:
+            return []
+        lists = []
+        for term in terms:
+            ids = self._postings(term)
+            if ids is None:
+                return []
+            lists.append(ids)
+        # Номера продуктов упорядочены по длине названия, postings — по номеру:
+        # наименьшие общие номера и есть лучшие совпадения.
+        if len(lists) == 1:
+            found = lists[0][:limit]
+        else:
+            lists.sort(key=len)
+            found = sorted(set(lists[0]).intersection(*lists[1:]))[:limit]
+        return [self._product(product_id) for product_id in found]
+
+    def close(self) -> None:
+        """Закрыть mmap."""
+        if not self._mm.closed:
+            self._mm.close()
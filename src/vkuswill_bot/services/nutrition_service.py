@@ -8,18 +8,30 @@ Open Food Facts API: https://openfoodfacts.github.io/openfoodfacts-server/api/
 - Доступен из РФ
 - ~30 000 русских продуктов (включая ВкусВилл)
 - Рекомендуемый rate limit: не более 10 запросов/минуту
+
+Перед API стоят:
+- офлайн-индекс дампа Open Food Facts (NutritionIndex, mmap) — без сети;
+- персистентный кеш (NutritionCache, SQLite) с negative caching;
+- объединение одновременных запросов (один поход в API на запрос);
+- token bucket, не дающий превысить rate limit.
 """
 
 from __future__ import annotations
 
+import asyncio
 import html
 import json
 import logging
 import re
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
+if TYPE_CHECKING:
+    from vkuswill_bot.services.nutrition_cache import NutritionCache
+    from vkuswill_bot.services.nutrition_index import NutritionIndex
+
 logger = logging.getLogger(__name__)
 
 # Open Food Facts Search API
@@ -57,16 +69,92 @@ _NUTRIENT_KEYS = {
 # User-Agent (рекомендация Open Food Facts)
 USER_AGENT = "VkusVillBot/1.0 (Telegram bot; contact@example.com)"
 
+# Rate limit Open Food Facts (запросов в минуту)
+DEFAULT_RATE_PER_MINUTE = 10
+
+# Ёмкость token bucket: пара запросов (РФ + глобальный fallback) без ожидания
+DEFAULT_BURST = 2
+
+# Максимальное ожидание ответа пользователем (секунды). Запрос к API при
+# этом не отменяется и наполнит кеш для следующих обращений.
+MAX_LOOKUP_WAIT = 25.0
+
+# Логировать статистику каждые N обращений
+_STATS_LOG_EVERY = 50
+
+# Счётчики, из которых складывается число обращений
+_LOOKUP_KEYS = ("index_hits", "hits", "negative_hits", "misses")
+
+
+class TokenBucket:
+    """Async token bucket: не более ``rate_per_minute`` запросов в минуту.
+
+    Ожидающие обслуживаются по очереди (FIFO через asyncio.Lock).
+    ``rate_per_minute <= 0`` — без ограничений.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int = DEFAULT_BURST) -> None:
+        self._rate = rate_per_minute / 60
+        self._capacity = max(1, capacity)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Дождаться токена.
+
+        Returns:
+            Время ожидания в очереди (секунды).
+        """
+        if self._rate <= 0:
+            return 0.0
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity, self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return time.monotonic() - start
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
 
 class NutritionService:
     """Сервис КБЖУ на базе Open Food Facts.
 
     Принимает название продукта (на русском или английском),
     ищет в Open Food Facts, возвращает КБЖУ на 100 г.
+
+    С ``index`` сначала ищет в офлайн-индексе дампа, API — только при промахе.
+    Без ``cache`` результаты не сохраняются между вызовами,
+    но rate limit и объединение запросов работают всегда.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache: NutritionCache | None = None,
+        rate_per_minute: float = DEFAULT_RATE_PER_MINUTE,
+        burst: int = DEFAULT_BURST,
+        index: NutritionIndex | None = None,
+    ) -> None:
         self._client: httpx.AsyncClient | None = None
+        self._cache = cache
+        self._index = index
+        self._bucket = TokenBucket(rate_per_minute, burst)
+        self._inflight: dict[str, asyncio.Task[list[dict[str, Any]]]] = {}
+        self._stats: dict[str, float] = {
+            "index_hits": 0,
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "upstream_requests": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+        }
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Получить или создать HTTP-клиент с keep-alive."""
@@ -79,10 +167,44 @@ class NutritionService:
         return self._client
 
     async def close(self) -> None:
-        """Закрыть HTTP-клиент."""
+        """Закрыть HTTP-клиент, кеш и индекс."""
         if self._client and not self._client.is_closed:
             await self._client.aclose()
             self._client = None
+        if self._cache is not None:
+            await self._cache.close()
+        if self._index is not None:
+            self._index.close()
+
+    # ---- Статистика ----
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Hit rate индекса и кеша, объединённые запросы, запросы к API и очередь."""
+        s = self._stats
+        local = s["index_hits"] + s["hits"] + s["negative_hits"]
+        lookups = local + s["misses"]
+        requests = s["upstream_requests"]
+        return {
+            **s,
+            "hit_rate": local / lookups if lookups else 0.0,
+            "queue_wait_avg": s["queue_wait_total"] / requests if requests else 0.0,
+        }
+
+    def _record(self, key: str) -> None:
+        self._stats[key] += 1
+        lookups = sum(self._stats[k] for k in _LOOKUP_KEYS)
+        if key in _LOOKUP_KEYS and lookups % _STATS_LOG_EVERY == 0:
+            stats = self.stats
+            logger.info(
+                "КБЖУ: hit rate %.1f%%, запросов к API %d, объединено %d, "
+                "ожидание в очереди avg %.2f с / max %.2f с",
+                stats["hit_rate"] * 100,
+                stats["upstream_requests"],
+                stats["coalesced"],
+                stats["queue_wait_avg"],
+                stats["queue_wait_max"],
+            )
 
     @staticmethod
     def _normalize_query(raw: str) -> str:
@@ -124,16 +246,26 @@ class NutritionService:
             query = raw_query  # fallback если нормализация съела всё
 
         try:
-            results = await self._search(query)
+            valid = await self._get_products(query)
         except (httpx.HTTPError, httpx.TimeoutException) as e:
             logger.error("Open Food Facts API error: %s", e)
             return json.dumps(
                 {"ok": False, "error": f"Ошибка Open Food Facts API: {e}"},
                 ensure_ascii=False,
             )
+        except TimeoutError:
+            logger.warning("КБЖУ: ожидание очереди к Open Food Facts для %r превышено", query)
+            return json.dumps(
+                {
+                    "ok": False,
+                    "error": (
+                        "Open Food Facts сейчас перегружен запросами. "
+                        "Попробуй повторить через минуту."
+                    ),
+                },
+                ensure_ascii=False,
+            )
 
-        # Фильтруем продукты без КБЖУ
-        valid = [r for r in results if self._has_nutrition(r)]
         if not valid:
             return json.dumps(
                 {
@@ -185,6 +317,74 @@ class NutritionService:
             ensure_ascii=False,
         )
 
+    async def _get_products(self, query: str) -> list[dict[str, Any]]:
+        """Продукты с КБЖУ: офлайн-индекс → кеш → объединённый запрос к API.
+
+        Одновременные запросы с одинаковым ключом ждут один поход в API.
+        """
+        if self._index is not None:
+            try:
+                local = self._index.search(query, SEARCH_PAGE_SIZE)
+            except Exception as e:
+                logger.warning("Ошибка поиска в индексе КБЖУ: %s", e)
+                local = []
+            if local:
+                self._record("index_hits")
+                return local
+
+        key = query.lower()
+        if self._cache is not None:
+            try:
+                cached = await self._cache.get(key)
+            except Exception as e:
+                logger.warning("Ошибка чтения кеша КБЖУ: %s", e)
+                cached = None
+            if cached is not None:
+                self._record("hits" if cached else "negative_hits")
+                return cached
+
+        self._record("misses")
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, query))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self._stats["coalesced"] += 1
+        # shield: таймаут одного пользователя не отменяет общий запрос
+        return await asyncio.wait_for(asyncio.shield(task), MAX_LOOKUP_WAIT)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Убрать завершённый запрос из объединяемых.
+
+        Исключение забирается здесь: если все ожидающие ушли по таймауту,
+        asyncio не должен ругаться на «never retrieved».
+        """
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("КБЖУ: запрос %r завершился ошибкой: %s", key, task.exception())
+
+    async def _fetch(self, key: str, query: str) -> list[dict[str, Any]]:
+        """Запросить API, отфильтровать продукты без КБЖУ и сохранить в кеш."""
+        results = await self._search(query)
+        valid = [r for r in results if self._has_nutrition(r)]
+        if self._cache is not None:
+            try:
+                await self._cache.set(key, valid)
+            except Exception as e:
+                logger.warning("Ошибка записи кеша КБЖУ: %s", e)
+        return valid
+
+    async def _throttled_get(
+        self, client: httpx.AsyncClient, params: dict[str, str | int]
+    ) -> httpx.Response:
+        """GET к Open Food Facts через token bucket (с учётом ожидания)."""
+        waited = await self._bucket.acquire()
+        self._stats["upstream_requests"] += 1
+        self._stats["queue_wait_total"] += waited
+        self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], waited)
+        return await client.get(OFF_SEARCH_URL, params=params)
+
     async def _search(self, query: str) -> list[dict[str, Any]]:
         """Поиск продуктов в Open Food Facts.
 
@@ -206,7 +406,7 @@ class NutritionService:
             "lc": "ru",
             "cc": "ru",
         }
-        response = await client.get(OFF_SEARCH_URL, params=params)
+        response = await self._throttled_get(client, params)
         response.raise_for_status()
         data = response.json()
         products = data.get("products", [])
@@ -214,7 +414,7 @@ class NutritionService:
         # Fallback: если среди РФ-продуктов нет КБЖУ — ищем глобально
         if not any(self._has_nutrition(p) for p in products):
             params.pop("cc", None)
-            response = await client.get(OFF_SEARCH_URL, params=params)
+            response = await self._throttled_get(client, params)
             response.raise_for_status()
             data = response.json()
             products = data.get("products", [])
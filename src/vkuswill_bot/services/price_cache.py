@@ -6,12 +6,22 @@
 Архитектура:
 - PriceCache — in-memory async-кэш (L1), FIFO-вытеснение.
 - TwoLevelPriceCache — L1 (in-memory) + L2 (Redis), async get/set.
+- PriceTracker — наблюдатель обращений и записей (PriceRefresher).
+
+Согласованность L1 между подами: при ``publish_invalidations=True``
+TwoLevelPriceCache.set() увеличивает версию цены (счётчик
+``price:version:{xml_id}`` без TTL — версия не начинается заново, когда
+хеш цены истекает) и пишет ``(xml_id, version)`` в поток
+PRICE_INVALIDATION_STREAM; PriceInvalidationSubscriber каждого пода
+сбрасывает устаревшие записи своего L1 (apply_invalidation).
 """
 
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+import re
+import time
+from typing import TYPE_CHECKING, Protocol
 
 if TYPE_CHECKING:
     from redis.asyncio import Redis
@@ -23,11 +33,20 @@ MAX_PRICE_CACHE_SIZE = 5000
 # TTL для Redis L2 (1 час — цены обновляются часто)
 DEFAULT_PRICE_TTL = 3600
 
+# Поток инвалидаций L1 (Redis Stream) и его примерная длина
+PRICE_INVALIDATION_STREAM = "price:invalidations"
+PRICE_INVALIDATION_MAXLEN = 10000
+
+# Счётчик версий цены товара (без TTL, в отличие от хеша price:{xml_id})
+PRICE_VERSION_KEY = "price:version:{}"
+
+_WORD_RE = re.compile(r"\w+")
+
 
 class PriceInfo:
     """Кэшированная информация о цене товара."""
 
-    __slots__ = ("name", "price", "unit", "weight_unit", "weight_value")
+    __slots__ = ("_name_words", "name", "price", "unit", "weight_unit", "weight_value")
 
     def __init__(
         self,
@@ -42,6 +61,7 @@ class PriceInfo:
         self.unit = unit
         self.weight_value = weight_value
         self.weight_unit = weight_unit
+        self._name_words: frozenset[str] | None = None
 
     def __getitem__(self, key: str) -> str | float:
         """Совместимость с dict-API: info['name'], info['price'], info['unit']."""
@@ -51,6 +71,13 @@ class PriceInfo:
         """Совместимость с dict-API: info.get('unit', 'шт')."""
         return getattr(self, key, default)
 
+    @property
+    def name_words(self) -> frozenset[str]:
+        """Слова названия в нижнем регистре (разбираются один раз на запись кэша)."""
+        if self._name_words is None:
+            self._name_words = frozenset(_WORD_RE.findall(self.name.lower()))
+        return self._name_words
+
     @property
     def weight_grams(self) -> float | None:
         """Вес одной единицы товара в граммах (None если неизвестен).
@@ -89,17 +116,35 @@ class PriceInfo:
         return parts + ")"
 
 
+class PriceTracker(Protocol):
+    """Наблюдатель кэша цен: какие товары читают и когда цены обновляются."""
+
+    def record_access(self, xml_id: int) -> None:
+        """Цену товара запросили (async get/get_many)."""
+
+    def record_store(self, xml_id: int) -> None:
+        """Цена товара записана в кэш."""
+
+
 class PriceCache:
     """Кэш цен товаров ВкусВилл (xml_id → PriceInfo).
 
     Async-интерфейс: get() и set() — корутины.
     FIFO-вытеснение при превышении лимита.
     Sync dict-API (__setitem__, __getitem__) работает через _set_sync/_get_sync.
+    Время записи каждой цены хранится отдельно: get_many(max_age=...) считает
+    более старые записи промахами.
+    Счётчики ``hits``/``misses`` и ``tracker`` учитывают только async get()/get_many().
     """
 
     def __init__(self, max_size: int = MAX_PRICE_CACHE_SIZE) -> None:
         self._max_size = max_size
         self._data: dict[int, PriceInfo] = {}
+        # Время записи цен (unix time) — для get_many(max_age=...)
+        self._stored_at: dict[int, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.tracker: PriceTracker | None = None
 
     # ---- Internal sync methods (для dict-API и подклассов) ----
 
@@ -114,12 +159,19 @@ class PriceCache:
     ) -> None:
         """Синхронная запись в L1 (in-memory)."""
         self._data[xml_id] = PriceInfo(name, price, unit, weight_value, weight_unit)
+        self._stored_at[xml_id] = time.time()
         self._evict_if_needed()
+        if self.tracker is not None:
+            self.tracker.record_store(xml_id)
 
     def _get_sync(self, xml_id: int) -> PriceInfo | None:
         """Синхронное чтение из L1 (in-memory)."""
         return self._data.get(xml_id)
 
+    def _is_fresh(self, xml_id: int, max_age: float | None) -> bool:
+        """Запись L1 не старше ``max_age`` секунд (None — без ограничения)."""
+        return max_age is None or time.time() - self._stored_at.get(xml_id, 0.0) <= max_age
+
     # ---- Public async API ----
 
     async def set(
@@ -134,9 +186,40 @@ class PriceCache:
         """Сохранить информацию о цене товара (async)."""
         self._set_sync(xml_id, name, price, unit, weight_value, weight_unit)
 
+    def _track_access(self, xml_ids: list[int]) -> None:
+        if self.tracker is not None:
+            for xml_id in xml_ids:
+                self.tracker.record_access(xml_id)
+
     async def get(self, xml_id: int) -> PriceInfo | None:
         """Получить информацию о цене товара (async, или None)."""
-        return self._get_sync(xml_id)
+        self._track_access([xml_id])
+        result = self._get_sync(xml_id)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def get_many(
+        self, xml_ids: list[int], max_age: float | None = None
+    ) -> dict[int, PriceInfo]:
+        """Цены нескольких товаров одним запросом (только найденные).
+
+        Args:
+            xml_ids: Товары.
+            max_age: Записи старше (секунды) считаются промахами.
+        """
+        self._track_access(xml_ids)
+        found: dict[int, PriceInfo] = {}
+        for xml_id in xml_ids:
+            info = self._get_sync(xml_id)
+            if info is None or not self._is_fresh(xml_id, max_age):
+                self.misses += 1
+            else:
+                self.hits += 1
+                found[xml_id] = info
+        return found
 
     # ---- Sync dict-compatible API ----
 
@@ -179,6 +262,7 @@ class PriceCache:
             keys = list(self._data.keys())[: self._max_size // 2]
             for k in keys:
                 del self._data[k]
+                self._stored_at.pop(k, None)
             logger.info("PriceCache: evicted %d entries", len(keys))
 
 
@@ -198,40 +282,152 @@ class TwoLevelPriceCache(PriceCache):
         redis: Redis,
         ttl: int = DEFAULT_PRICE_TTL,
         max_size: int = MAX_PRICE_CACHE_SIZE,
+        publish_invalidations: bool = False,
     ) -> None:
         super().__init__(max_size=max_size)
         self._redis = redis
         self._ttl = ttl
+        self._publish_invalidations = publish_invalidations
+        # Версии цен в L1 (из Redis) — чтобы не сбрасывать более свежую запись
+        self._versions: dict[int, int] = {}
+        self.invalidations = 0
 
     async def get(self, xml_id: int) -> PriceInfo | None:
         """L1 → L2 fallthrough с автоматическим promote."""
+        self._track_access([xml_id])
         # L1 (fast path)
         result = self._get_sync(xml_id)
         if result is not None:
+            self.hits += 1
             return result
         # L2 (Redis)
         try:
-            data = await self._redis.hgetall(f"price:{xml_id}")
+            if self._publish_invalidations:
+                ((data, version),) = await self._read_l2([xml_id])
+            else:
+                data, version = await self._redis.hgetall(f"price:{xml_id}"), None
             if data:
-                weight_value = None
-                weight_unit = None
-                if b"weight_value" in data:
-                    weight_value = float(data[b"weight_value"])
-                if b"weight_unit" in data:
-                    weight_unit = data[b"weight_unit"].decode()
-                info = PriceInfo(
-                    name=data[b"name"].decode(),
-                    price=float(data[b"price"]),
-                    unit=data[b"unit"].decode(),
-                    weight_value=weight_value,
-                    weight_unit=weight_unit,
-                )
-                self._data[xml_id] = info  # promote to L1
+                info = self._from_redis(data)
+                self._promote(xml_id, info, data, version)
+                self.hits += 1
                 return info
         except Exception as e:
             logger.warning("Redis L2 get error for price:%d: %s", xml_id, e)
+        self.misses += 1
         return None
 
+    async def get_many(
+        self, xml_ids: list[int], max_age: float | None = None
+    ) -> dict[int, PriceInfo]:
+        """L1, затем промахи — одним pipeline в Redis (с promote в L1).
+
+        С ``max_age`` устаревшие записи L1 перечитываются из L2, а
+        устаревшие записи L2 считаются промахами.
+        """
+        self._track_access(xml_ids)
+        found: dict[int, PriceInfo] = {}
+        missing: list[int] = []
+        for xml_id in xml_ids:
+            info = self._get_sync(xml_id)
+            if info is None or not self._is_fresh(xml_id, max_age):
+                missing.append(xml_id)
+            else:
+                found[xml_id] = info
+        if missing:
+            try:
+                rows = await self._read_l2(missing)
+                for xml_id, (data, version) in zip(missing, rows, strict=True):
+                    if data and self._is_fresh_l2(data, max_age):
+                        info = self._from_redis(data)
+                        self._promote(xml_id, info, data, version)
+                        found[xml_id] = info
+            except Exception as e:
+                logger.warning("Redis L2 get_many error (%d ids): %s", len(missing), e)
+        self.hits += len(found)
+        self.misses += len(xml_ids) - len(found)
+        return found
+
+    async def _read_l2(self, xml_ids: list[int]) -> list[tuple[dict[bytes, bytes], int | None]]:
+        """Хеши цен из L2 одним pipeline, с версиями при ``publish_invalidations``.
+
+        Версии читаются раньше хешей: запись между чтениями даст версию
+        старше цены (лишний сброс L1), но не наоборот — иначе L1 пропустил
+        бы инвалидацию и остался с устаревшей ценой.
+        """
+        pipe = self._redis.pipeline(transaction=False)
+        if self._publish_invalidations:
+            for xml_id in xml_ids:
+                pipe.get(PRICE_VERSION_KEY.format(xml_id))
+        for xml_id in xml_ids:
+            pipe.hgetall(f"price:{xml_id}")
+        results = await pipe.execute()
+        hashes = results[-len(xml_ids) :]
+        if not self._publish_invalidations:
+            return [(data, None) for data in hashes]
+        versions = [int(v) if v is not None else 0 for v in results[: len(xml_ids)]]
+        return list(zip(hashes, versions, strict=True))
+
+    def _promote(
+        self, xml_id: int, info: PriceInfo, data: dict[bytes, bytes], version: int | None
+    ) -> None:
+        """Поднять запись из L2 в L1 вместе с её версией."""
+        self._data[xml_id] = info
+        # Запись без времени (до появления поля) считается сколь угодно старой
+        self._stored_at[xml_id] = float(data.get(b"updated_at", 0.0))
+        if version is not None:
+            self._versions[xml_id] = version
+        self._evict_if_needed()
+
+    @staticmethod
+    def _is_fresh_l2(data: dict[bytes, bytes], max_age: float | None) -> bool:
+        """Запись L2 не старше ``max_age`` секунд (по полю ``updated_at``)."""
+        if max_age is None:
+            return True
+        return time.time() - float(data.get(b"updated_at", 0.0)) <= max_age
+
+    def _evict_if_needed(self) -> None:
+        """FIFO-вытеснение L1; версии вытесненных записей забываются."""
+        super()._evict_if_needed()
+        if len(self._versions) > len(self._data):
+            self._versions = {k: v for k, v in self._versions.items() if k in self._data}
+
+    def apply_invalidation(self, xml_id: int, version: int) -> bool:
+        """Сбросить запись L1, если в L2 записана более новая версия цены.
+
+        Returns:
+            True, если запись L1 сброшена (следующий get() прочитает L2).
+        """
+        if xml_id not in self._data or self._versions.get(xml_id, 0) >= version:
+            return False
+        del self._data[xml_id]
+        self._stored_at.pop(xml_id, None)
+        self._versions.pop(xml_id, None)
+        self.invalidations += 1
+        return True
+
+    def clear_local(self) -> None:
+        """Сбросить весь L1 (пропущены инвалидации — L1 мог устареть)."""
+        self._data.clear()
+        self._stored_at.clear()
+        self._versions.clear()
+
+    @staticmethod
+    def _from_redis(data: dict[bytes, bytes]) -> PriceInfo:
+        """PriceInfo из хеша price:{xml_id}."""
+        weight_value = None
+        weight_unit = None
+        if b"weight_value" in data:
+            weight_value = float(data[b"weight_value"])
+        if b"weight_unit" in data:
+            weight_unit = data[b"weight_unit"].decode()
+        return PriceInfo(
+            name=data[b"name"].decode(),
+            price=float(data[b"price"]),
+            unit=data[b"unit"].decode(),
+            weight_value=weight_value,
+            weight_unit=weight_unit,
+        )
+
     async def set(
         self,
         xml_id: int,
@@ -251,12 +447,30 @@ class TwoLevelPriceCache(PriceCache):
                 "name": name,
                 "price": str(price),
                 "unit": unit,
+                "updated_at": str(self._stored_at[xml_id]),
             }
             if weight_value is not None:
                 mapping["weight_value"] = str(weight_value)
             if weight_unit is not None:
                 mapping["weight_unit"] = weight_unit
-            await self._redis.hset(key, mapping=mapping)
-            await self._redis.expire(key, self._ttl)
+            # Цена и её версия меняются одной транзакцией: при одновременной
+            # записи двумя подами старшая версия всегда у последней цены.
+            # Счётчик версий живёт отдельно от хеша: истёкший по TTL хеш не
+            # сбрасывает версию, и L1 других подов не отбрасывает новые инвалидации
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, self._ttl)
+            if self._publish_invalidations:
+                pipe.incr(PRICE_VERSION_KEY.format(xml_id))
+            results = await pipe.execute()
+            if self._publish_invalidations:
+                version = int(results[-1])
+                self._versions[xml_id] = version
+                await self._redis.xadd(
+                    PRICE_INVALIDATION_STREAM,
+                    {"xml_id": str(xml_id), "version": str(version)},
+                    maxlen=PRICE_INVALIDATION_MAXLEN,
+                    approximate=True,
+                )
         except Exception as e:
             logger.warning("Redis L2 set error for price:%d: %s", xml_id, e)
@@ -0,0 +1,154 @@
+"""Согласованность L1 кеша цен между подами.
+
+TwoLevelPriceCache одного пода пишет новую цену в Redis и публикует
+``(xml_id, version)`` в поток PRICE_INVALIDATION_STREAM. Подписчик
+каждого пода читает поток и сбрасывает свою запись L1, если она старше
+опубликованной версии: следующий get() прочитает свежую цену из L2.
+Так L1 остаётся быстрым (без похода в Redis на каждое чтение), но не
+отдаёт цену, которую другой под уже обновил.
+
+Redis Stream, а не pub/sub: после обрыва соединения подписчик дочитывает
+пропущенное с последнего обработанного id (backfill). Если поток успели
+обрезать (MAXLEN) и последний id исчез — часть инвалидаций потеряна,
+и L1 сбрасывается целиком.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING
+
+from vkuswill_bot.services.price_cache import PRICE_INVALIDATION_STREAM
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+    from vkuswill_bot.services.price_cache import TwoLevelPriceCache
+
+logger = logging.getLogger(__name__)
+
+# Блокирующее ожидание новых записей потока (мс). Должно быть заметно меньше
+# socket_timeout общего клиента (create_redis_client, 5 с): иначе пустой ответ
+# сервера гонится с таймаутом чтения, и тихий поток выглядит как обрыв
+_BLOCK_MS = 2000
+
+# Записей за одно чтение
+_BATCH = 500
+
+# Пауза перед переподключением: от _RETRY_MIN до _RETRY_MAX (секунды), удваивается
+_RETRY_MIN = 0.5
+_RETRY_MAX = 30.0
+
+# Id «до начала потока»
+_START_ID = "0-0"
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class PriceInvalidationSubscriber:
+    """Фоновое чтение потока инвалидаций цен в L1 своего пода."""
+
+    def __init__(
+        self,
+        cache: TwoLevelPriceCache,
+        redis: Redis,
+        stream: str = PRICE_INVALIDATION_STREAM,
+    ) -> None:
+        self._cache = cache
+        self._redis = redis
+        self._stream = stream
+        self._last_id: str | None = None
+        self._task: asyncio.Task | None = None
+        self._stats: dict[str, int] = {
+            "messages": 0,
+            "invalidated": 0,
+            "reconnects": 0,
+            "resyncs": 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Прочитано записей, сброшено записей L1, переподключений, полных сбросов L1."""
+        return dict(self._stats)
+
+    async def _init_position(self) -> None:
+        """Начать с текущего конца потока: до старта L1 пода был пуст."""
+        last = await self._redis.xrevrange(self._stream, count=1)
+        self._last_id = _decode(last[0][0]) if last else _START_ID
+
+    async def _check_gap(self) -> None:
+        """После обрыва: если последний прочитанный id обрезан — сбросить L1."""
+        if self._last_id is None or self._last_id == _START_ID:
+            return
+        kept = await self._redis.xrange(self._stream, min=self._last_id, max=self._last_id)
+        if not kept:
+            self._cache.clear_local()
+            self._stats["resyncs"] += 1
+            logger.warning("Поток инвалидаций цен обрезан после обрыва — L1 сброшен")
+
+    def _apply(self, entries: list) -> None:
+        for entry_id, fields in entries:
+            self._last_id = _decode(entry_id)
+            self._stats["messages"] += 1
+            try:
+                xml_id = int(fields[b"xml_id"])
+                version = int(fields[b"version"])
+            except (KeyError, ValueError):
+                logger.debug("Некорректная запись потока инвалидаций: %s", fields)
+                continue
+            if self._cache.apply_invalidation(xml_id, version):
+                self._stats["invalidated"] += 1
+
+    async def poll_once(self, block_ms: int | None = _BLOCK_MS) -> int:
+        """Прочитать и применить новые записи потока.
+
+        Returns:
+            Сколько записей прочитано.
+        """
+        if self._last_id is None:
+            await self._init_position()
+        response = await self._redis.xread(
+            {self._stream: self._last_id}, count=_BATCH, block=block_ms
+        )
+        # Пустой ответ (None или []) — просто нет новых записей за block_ms
+        read = 0
+        for _stream, entries in response or []:
+            self._apply(entries)
+            read += len(entries)
+        return read
+
+    async def _loop(self) -> None:
+        delay = _RETRY_MIN
+        while True:
+            try:
+                await self.poll_once()
+                delay = _RETRY_MIN
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["reconnects"] += 1
+                logger.warning(
+                    "Поток инвалидаций цен недоступен (%s), повтор через %.1f с", e, delay
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _RETRY_MAX)
+                with contextlib.suppress(Exception):
+                    await self._check_gap()
+
+    def start(self) -> None:
+        """Запустить фоновую задачу."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info("Инвалидация L1 цен между подами включена (%s)", self._stream)
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            logger.info("Инвалидация L1 цен остановлена (%s)", self._stats)
@@ -0,0 +1,244 @@
+"""Фоновое обновление цен популярных товаров (refresh-ahead).
+
+Цена в Redis живёт DEFAULT_PRICE_TTL (1 час). После этого корзина с
+популярным товаром получает «цена неизвестна» в ``calc_total`` или
+заставляет LLM искать товар заново. PriceRefresher следит за обращениями
+к кешу цен (PriceCache.tracker) и раз в ``interval`` обновляет цены самых
+востребованных товаров, которые прожили больше ``refresh_ahead`` от TTL:
+
+- поиск MCP по названию товара — один ответ обновляет цены всех найденных
+  товаров, поэтому соседние горячие товары часто обновляются «бесплатно»;
+- если товара нет в выдаче — ``vkusvill_product_details`` по xml_id.
+
+Бюджет — не больше ``calls_per_minute`` вызовов MCP за минуту; обновление
+уступает живому трафику (ждёт паузы в обращениях к кешу цен). Счётчики
+обращений затухают вдвое за каждый проход, поэтому «горячесть» отражает
+недавний спрос.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from vkuswill_bot.services.price_cache import DEFAULT_PRICE_TTL
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT
+
+if TYPE_CHECKING:
+    from vkuswill_bot.services.mcp_client import VkusvillMCPClient
+    from vkuswill_bot.services.price_cache import PriceCache
+    from vkuswill_bot.services.search_processor import SearchProcessor
+
+logger = logging.getLogger(__name__)
+
+# Доля TTL цены, после которой горячий товар обновляется
+DEFAULT_REFRESH_AHEAD = 0.75
+
+# Обращений (с учётом затухания), после которых товар считается горячим
+DEFAULT_MIN_HITS = 2.0
+
+# Бюджет вызовов MCP в минуту
+DEFAULT_CALLS_PER_MINUTE = 30
+
+# Затухание счётчиков обращений за один проход
+_DECAY = 0.5
+
+# Счётчики ниже порога забываются
+_FORGET_BELOW = 0.1
+
+# Живой трафик считается активным, если последнее обращение было не раньше (секунды)
+_LIVE_IDLE_GAP = 2.0
+
+# Шаг ожидания паузы в живом трафике (секунды)
+_YIELD_STEP = 0.5
+
+# Максимальное ожидание паузы на один вызов (секунды)
+_MAX_YIELD = 10.0
+
+
+class PriceRefresher:
+    """Refresh-ahead цен горячих товаров в пределах бюджета вызовов MCP."""
+
+    def __init__(
+        self,
+        mcp_client: VkusvillMCPClient,
+        search_processor: SearchProcessor,
+        price_cache: PriceCache,
+        ttl: float = DEFAULT_PRICE_TTL,
+        refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+        calls_per_minute: int = DEFAULT_CALLS_PER_MINUTE,
+        min_hits: float = DEFAULT_MIN_HITS,
+        interval: float = 60.0,
+    ) -> None:
+        self._mcp_client = mcp_client
+        self._search_processor = search_processor
+        self._price_cache = price_cache
+        self._ttl = ttl
+        self._refresh_ahead = refresh_ahead
+        self._budget = max(1, int(calls_per_minute * interval / 60))
+        self._min_hits = min_hits
+        self._interval = interval
+        self._hits: dict[int, float] = {}
+        self._stored_at: dict[int, float] = {}
+        self._expired_seen: set[int] = set()
+        self._last_live = 0.0
+        self._task: asyncio.Task | None = None
+        self._stats: dict[str, int] = {
+            "refreshed": 0,
+            "expired": 0,
+            "mcp_calls": 0,
+            "errors": 0,
+        }
+        price_cache.tracker = self
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Обновлённые и истёкшие горячие цены, вызовы MCP, ошибки, отслеживаемые товары."""
+        return {**self._stats, "tracked": len(self._hits)}
+
+    # ---- PriceTracker ----
+
+    def record_access(self, xml_id: int) -> None:
+        """Обращение к цене товара (живой трафик)."""
+        self._hits[xml_id] = self._hits.get(xml_id, 0.0) + 1
+        self._last_live = time.monotonic()
+
+    def record_store(self, xml_id: int) -> None:
+        """Цена товара записана — отсчёт TTL заново."""
+        self._stored_at[xml_id] = time.monotonic()
+        self._expired_seen.discard(xml_id)
+
+    # ---- Отбор ----
+
+    def due(self) -> list[int]:
+        """Горячие товары, чьи цены пора обновить (самые востребованные первыми).
+
+        Товары без известного времени записи (подняты из Redis после
+        рестарта) считаются устаревшими. Горячие товары, пережившие TTL,
+        учитываются в ``stats["expired"]``.
+        """
+        now = time.monotonic()
+        threshold = self._ttl * self._refresh_ahead
+        due: list[int] = []
+        for xml_id, hits in self._hits.items():
+            if hits < self._min_hits or xml_id not in self._price_cache:
+                continue
+            stored_at = self._stored_at.get(xml_id)
+            age = now - stored_at if stored_at is not None else self._ttl
+            if age < threshold:
+                continue
+            if stored_at is not None and age >= self._ttl and xml_id not in self._expired_seen:
+                self._expired_seen.add(xml_id)
+                self._stats["expired"] += 1
+            due.append(xml_id)
+        due.sort(key=lambda x: self._hits[x], reverse=True)
+        return due
+
+    def _decay(self) -> None:
+        """Затухание счётчиков и забывание давно не нужных товаров."""
+        self._hits = {x: h * _DECAY for x, h in self._hits.items() if h * _DECAY >= _FORGET_BELOW}
+        cutoff = time.monotonic() - 2 * self._ttl
+        self._stored_at = {x: t for x, t in self._stored_at.items() if t >= cutoff}
+        self._expired_seen &= self._hits.keys()
+
+    # ---- Обновление ----
+
+    async def _wait_for_idle(self) -> None:
+        """Дождаться паузы в живом трафике (не дольше _MAX_YIELD)."""
+        waited = 0.0
+        while time.monotonic() - self._last_live < _LIVE_IDLE_GAP and waited < _MAX_YIELD:
+            await asyncio.sleep(_YIELD_STEP)
+            waited += _YIELD_STEP
+
+    async def _call(self, tool_name: str, args: dict) -> str:
+        await self._wait_for_idle()
+        self._stats["mcp_calls"] += 1
+        return await self._mcp_client.call_tool(tool_name, args)
+
+    async def _refresh_item(self, xml_id: int, budget: int) -> int:
+        """Обновить цену товара. Returns: потрачено вызовов MCP."""
+        before = self._stored_at.get(xml_id)
+        name = self._price_cache[xml_id].name
+        query = self._search_processor.clean_search_query(name)
+        raw = await self._call("vkusvill_products_search", {"q": query, "limit": SEARCH_LIMIT})
+        await self._search_processor.cache_prices(raw)
+        if self._stored_at.get(xml_id) != before:
+            return 1
+        if budget < 2:
+            return 1
+        raw = await self._call("vkusvill_product_details", {"xml_id": xml_id})
+        data = json.loads(raw).get("data")
+        if isinstance(data, dict):
+            await self._search_processor.cache_item({**data, "xml_id": xml_id})
+        return 2
+
+    async def refresh_once(self) -> dict[str, int]:
+        """Один проход: обновить горячие цены в пределах бюджета.
+
+        Returns:
+            Сводка прохода: обновлено, вызовов MCP, ошибок, отложено.
+        """
+        due = self.due()
+        stored_before = {x: self._stored_at.get(x) for x in due}
+        budget = self._budget
+        summary = {"refreshed": 0, "mcp_calls": 0, "errors": 0, "deferred": 0}
+        for i, xml_id in enumerate(due):
+            if budget <= 0:
+                summary["deferred"] = len(due) - i
+                break
+            if self._stored_at.get(xml_id) != stored_before[xml_id]:
+                continue  # обновился попутно — поиском соседнего товара
+            try:
+                spent = await self._refresh_item(xml_id, budget)
+            except Exception as e:
+                spent = 1
+                summary["errors"] += 1
+                logger.debug("PriceRefresher: цена xml_id=%d не обновлена: %s", xml_id, e)
+            budget -= spent
+            summary["mcp_calls"] += spent
+        summary["refreshed"] = sum(self._stored_at.get(x) != stored_before[x] for x in due)
+        self._stats["refreshed"] += summary["refreshed"]
+        self._stats["errors"] += summary["errors"]
+        self._decay()
+        if due:
+            logger.info(
+                "PriceRefresher: обновлено %d/%d горячих цен, вызовов MCP %d, "
+                "ошибок %d, отложено %d",
+                summary["refreshed"],
+                len(due),
+                summary["mcp_calls"],
+                summary["errors"],
+                summary["deferred"],
+            )
+        return summary
+
+    # ---- Фоновая задача ----
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                logger.warning("PriceRefresher: проход не выполнен: %s", e)
+
+    def start(self) -> None:
+        """Запустить фоновую задачу."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                "PriceRefresher: фоновая задача запущена (до %d вызовов MCP за проход)",
+                self._budget,
+            )
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            logger.info("PriceRefresher: фоновая задача остановлена (%s)", self.stats)
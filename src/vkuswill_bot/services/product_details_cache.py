@@ -0,0 +1,352 @@
+"""Долгоживущий кеш карточек товаров (``vkusvill_product_details``).
+
+Состав, КБЖУ, вес и описание товара меняются редко, а каждый вызов
+``vkusvill_product_details`` — поход в MCP (READ_TIMEOUT до 120 с).
+ProductDetailsCache хранит карточку по xml_id сутками, отдельно от
+короткоживущего кеша цен: цена из карточки не сохраняется, к ответу из
+кеша её дописывает ToolExecutor по PriceCache.
+
+Уровни: L1 (in-memory, LRU + TTL) и L2 — Redis (общий для подов), если
+он есть, иначе SQLite (переживает рестарт пода).
+
+Refresh-ahead: если «горячая» карточка (не меньше ``hot_hits`` попаданий)
+прожила больше ``refresh_ahead`` от TTL, она отдаётся из кеша, а в фоне
+запрашивается заново — популярные товары не ждут MCP после истечения TTL.
+
+Карточки обрезаются (trim_details) так же, как результаты поиска:
+тяжёлые для LLM поля (картинки, ссылки, отзывы) отбрасываются, длинные
+тексты укорачиваются.
+
+Redis-структура:
+    product_details:{xml_id} → {"data": {...}, "fetched_at": unix_ts}, TTL = ttl
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+import aiosqlite
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+logger = logging.getLogger(__name__)
+
+# TTL карточки товара (3 суток — состав и КБЖУ почти не меняются)
+DETAILS_TTL = 3 * 86400
+
+# Доля TTL, после которой горячая карточка обновляется в фоне (0 — без refresh-ahead)
+DEFAULT_REFRESH_AHEAD = 0.8
+
+# Сколько попаданий делает карточку «горячей»
+DEFAULT_HOT_HITS = 2
+
+# Макс. карточек в L1
+MAX_LOCAL_DETAILS = 1000
+
+# Поля карточки, бесполезные для ответа и дорогие по токенам
+_HEAVY_FIELDS = frozenset(
+    {
+        "images",
+        "image",
+        "photos",
+        "gallery",
+        "url",
+        "link",
+        "slug",
+        "seo",
+        "breadcrumbs",
+        "reviews",
+        "similar",
+        "recommendations",
+    }
+)
+
+# Длинные тексты (описание, состав) обрезаются до N символов
+MAX_TEXT_LENGTH = 500
+
+# Логировать статистику каждые N попаданий
+_STATS_LOG_EVERY = 50
+
+_KEY_PREFIX = "product_details:"
+
+_CREATE_TABLE_SQL = """\
+CREATE TABLE IF NOT EXISTS product_details (
+    xml_id      INTEGER NOT NULL PRIMARY KEY,
+    data        TEXT    NOT NULL,
+    fetched_at  REAL    NOT NULL
+)
+"""
+
+_UPSERT_SQL = """\
+INSERT INTO product_details (xml_id, data, fetched_at)
+VALUES (?, ?, ?)
+ON CONFLICT(xml_id) DO UPDATE SET
+    data       = excluded.data,
+    fetched_at = excluded.fetched_at
+"""
+
+
+def trim_details(value: Any) -> Any:
+    """Обрезать карточку товара для LLM.
+
+    Отбрасывает тяжёлые поля (_HEAVY_FIELDS) на любом уровне вложенности,
+    price сводит к текущей цене, строки длиннее MAX_TEXT_LENGTH укорачивает.
+    """
+    if isinstance(value, dict):
+        trimmed = {k: trim_details(v) for k, v in value.items() if k not in _HEAVY_FIELDS}
+        price = trimmed.get("price")
+        if isinstance(price, dict):
+            trimmed["price"] = price.get("current")
+        return trimmed
+    if isinstance(value, list):
+        return [trim_details(v) for v in value]
+    if isinstance(value, str) and len(value) > MAX_TEXT_LENGTH:
+        return value[:MAX_TEXT_LENGTH].rstrip() + "…"
+    return value
+
+
+def parse_details(result: str) -> dict | None:
+    """Карточка из ответа MCP (``data`` при ok: true) или None."""
+    try:
+        parsed = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(parsed, dict) or not parsed.get("ok"):
+        return None
+    data = parsed.get("data")
+    return data if isinstance(data, dict) else None
+
+
+class _Entry:
+    """Карточка в L1: время загрузки из MCP и число попаданий."""
+
+    __slots__ = ("data", "fetched_at", "hits")
+
+    def __init__(self, data: dict, fetched_at: float) -> None:
+        self.data = data
+        self.fetched_at = fetched_at
+        self.hits = 0
+
+
+class ProductDetailsCache:
+    """Карточки ``vkusvill_product_details`` по xml_id.
+
+    Кешируются только успешные ответы (ok: true), без цены. Ошибки
+    Redis/SQLite не мешают работе — кеш деградирует до L1.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        db_path: str = "",
+        ttl: float = DETAILS_TTL,
+        refresh_ahead: float = DEFAULT_REFRESH_AHEAD,
+        hot_hits: int = DEFAULT_HOT_HITS,
+        max_size: int = MAX_LOCAL_DETAILS,
+    ) -> None:
+        self._redis = redis
+        self._db_path = db_path
+        self._db: aiosqlite.Connection | None = None
+        self._ttl = ttl
+        self._refresh_ahead = refresh_ahead
+        self._hot_hits = hot_hits
+        self._max_size = max_size
+        self._local: OrderedDict[int, _Entry] = OrderedDict()
+        self._refreshing: dict[int, asyncio.Task] = {}
+        self._stats: dict[str, float] = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "mcp_calls": 0,
+            "mcp_seconds": 0.0,
+            "saved_seconds": 0.0,
+        }
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Попадания, промахи, hit rate, фоновые обновления и сэкономленное время MCP."""
+        s = self._stats
+        total = s["hits"] + s["misses"]
+        return {**s, "hit_rate": s["hits"] / total if total else 0.0}
+
+    def _avg_latency(self) -> float:
+        calls = self._stats["mcp_calls"]
+        return self._stats["mcp_seconds"] / calls if calls else 0.0
+
+    async def get_or_fetch(self, xml_id: int, fetch: Callable[[], Awaitable[str]]) -> str:
+        """Карточка товара из кеша или через ``fetch`` (вызов MCP).
+
+        Args:
+            xml_id: ID товара.
+            fetch: Корутина-фабрика, возвращающая ответ MCP (JSON-строка).
+
+        Returns:
+            ``{"ok": true, "data": {...}}`` из кеша (обрезанная карточка
+            без цены) или ответ MCP как есть при промахе.
+        """
+        entry = await self._get(xml_id)
+        if entry is None:
+            self._stats["misses"] += 1
+            return await self._fetch(xml_id, fetch)
+
+        entry.hits += 1
+        self._stats["hits"] += 1
+        self._stats["saved_seconds"] += self._avg_latency()
+        if self._stats["hits"] % _STATS_LOG_EVERY == 0:
+            stats = self.stats
+            logger.info(
+                "Кеш карточек товаров: hit rate %.1f%%, попаданий %d, "
+                "фоновых обновлений %d, сэкономлено ~%.1f с MCP",
+                stats["hit_rate"] * 100,
+                stats["hits"],
+                stats["refreshes"],
+                stats["saved_seconds"],
+            )
+        if self._is_due(entry) and xml_id not in self._refreshing:
+            task = asyncio.create_task(self._refresh(xml_id, fetch))
+            self._refreshing[xml_id] = task
+        return json.dumps({"ok": True, "data": entry.data}, ensure_ascii=False)
+
+    async def store(self, xml_id: int, result: str, latency: float) -> None:
+        """Сохранить ответ MCP (если успешный) и учесть задержку вызова.
+
+        Args:
+            xml_id: ID товара.
+            result: Ответ ``vkusvill_product_details``.
+            latency: Время вызова MCP, с.
+        """
+        self._stats["mcp_calls"] += 1
+        self._stats["mcp_seconds"] += latency
+        data = parse_details(result)
+        if data is None:
+            return
+        data = trim_details(data)
+        data.pop("price", None)
+        fetched_at = time.time()
+        self._set_local(xml_id, _Entry(data, fetched_at))
+        await self._l2_set(xml_id, data, fetched_at)
+
+    async def close(self) -> None:
+        """Отменить фоновые обновления и закрыть SQLite."""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshing.clear()
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+            logger.info("SQLite кеш карточек товаров закрыт.")
+
+    # ---- Refresh-ahead ----
+
+    def _is_due(self, entry: _Entry) -> bool:
+        """Горячая карточка прожила больше refresh_ahead от TTL."""
+        if self._refresh_ahead <= 0 or entry.hits < self._hot_hits:
+            return False
+        return time.time() - entry.fetched_at >= self._ttl * self._refresh_ahead
+
+    async def _fetch(self, xml_id: int, fetch: Callable[[], Awaitable[str]]) -> str:
+        start = time.perf_counter()
+        result = await fetch()
+        await self.store(xml_id, result, time.perf_counter() - start)
+        return result
+
+    async def _refresh(self, xml_id: int, fetch: Callable[[], Awaitable[str]]) -> None:
+        try:
+            await self._fetch(xml_id, fetch)
+            self._stats["refreshes"] += 1
+            logger.debug("Карточка xml_id=%d обновлена в фоне", xml_id)
+        except Exception as e:
+            logger.warning("Фоновое обновление карточки xml_id=%d: %s", xml_id, e)
+        finally:
+            self._refreshing.pop(xml_id, None)
+
+    # ---- L1 ----
+
+    async def _get(self, xml_id: int) -> _Entry | None:
+        entry = self._local.get(xml_id)
+        if entry is not None and entry.fetched_at + self._ttl > time.time():
+            self._local.move_to_end(xml_id)
+            return entry
+        if entry is not None:
+            del self._local[xml_id]
+        loaded = await self._l2_get(xml_id)
+        if loaded is None:
+            return None
+        data, fetched_at = loaded
+        if fetched_at + self._ttl <= time.time():
+            return None
+        entry = _Entry(data, fetched_at)
+        self._set_local(xml_id, entry)
+        return entry
+
+    def _set_local(self, xml_id: int, entry: _Entry) -> None:
+        old = self._local.get(xml_id)
+        if old is not None:
+            # Обновлённая карточка остаётся горячей
+            entry.hits = old.hits
+        self._local[xml_id] = entry
+        self._local.move_to_end(xml_id)
+        while len(self._local) > self._max_size:
+            self._local.popitem(last=False)
+
+    # ---- L2: Redis или SQLite ----
+
+    async def _ensure_db(self) -> aiosqlite.Connection:
+        """Открыть или переиспользовать соединение с БД."""
+        if self._db is None:
+            db_dir = os.path.dirname(self._db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._db = await aiosqlite.connect(self._db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute(_CREATE_TABLE_SQL)
+            await self._db.commit()
+            logger.info("SQLite кеш карточек товаров открыт: %s", self._db_path)
+        return self._db
+
+    async def _l2_get(self, xml_id: int) -> tuple[dict, float] | None:
+        try:
+            if self._redis is not None:
+                raw = await self._redis.get(f"{_KEY_PREFIX}{xml_id}")
+                if raw is None:
+                    return None
+                stored = json.loads(raw)
+                return stored["data"], float(stored["fetched_at"])
+            if self._db_path:
+                db = await self._ensure_db()
+                cursor = await db.execute(
+                    "SELECT data, fetched_at FROM product_details WHERE xml_id = ?",
+                    (xml_id,),
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    return None
+                return json.loads(row[0]), float(row[1])
+        except Exception as e:
+            logger.warning("Ошибка чтения карточки xml_id=%d из L2: %s", xml_id, e)
+        return None
+
+    async def _l2_set(self, xml_id: int, data: dict, fetched_at: float) -> None:
+        payload = json.dumps({"data": data, "fetched_at": fetched_at}, ensure_ascii=False)
+        try:
+            if self._redis is not None:
+                await self._redis.set(f"{_KEY_PREFIX}{xml_id}", payload, ex=int(self._ttl))
+            elif self._db_path:
+                db = await self._ensure_db()
+                await db.execute(
+                    _UPSERT_SQL,
+                    (xml_id, json.dumps(data, ensure_ascii=False), fetched_at),
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Ошибка записи карточки xml_id=%d в L2: %s", xml_id, e)
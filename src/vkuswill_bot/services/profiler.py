@@ -0,0 +1,241 @@
+"""Профилирование работающего бота по команде администратора.
+
+- SamplingProfiler — статистический профайлер потока event loop:
+  отдельный поток раз в ``interval`` снимает стек цикла
+  (``sys._current_frames``) в течение ограниченного времени. Результат —
+  collapsed stacks (формат flamegraph.pl / speedscope / inferno:
+  ``кадр;кадр;кадр число``) и топ функций по собственным сэмплам.
+- MemoryTracker — снимки ``tracemalloc``: базовый снимок по ``start``,
+  разница с ним по строкам кода по ``diff`` и размеры отслеживаемых
+  контейнеров (диалоги, search_log, кеш цен, throttling) на оба момента.
+
+Пока команда не вызвана, накладных расходов нет: поток профайлера
+не запущен, tracemalloc выключен.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Sized
+from dataclasses import dataclass, field
+from types import FrameType
+
+logger = logging.getLogger(__name__)
+
+# Период сэмплирования стека (секунды)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Длительность записи профиля по умолчанию и предел (секунды)
+DEFAULT_PROFILE_SECONDS = 10
+MAX_PROFILE_SECONDS = 60
+
+# Глубина стека tracemalloc (кадров на аллокацию)
+TRACEMALLOC_FRAMES = 10
+
+# Строк в отчётах
+TOP_LINES = 15
+
+# Кадры ожидания в селекторе — цикл простаивает
+_IDLE_FUNCTIONS = frozenset({"select", "poll"})
+
+
+def _frame_label(frame: FrameType) -> str:
+    """``функция (путь:строка)`` с путём от пакета, без префикса окружения."""
+    filename = frame.f_code.co_filename
+    for marker in ("site-packages" + os.sep, "src" + os.sep):
+        _, found, rest = filename.rpartition(marker)
+        if found:
+            filename = rest
+            break
+    else:
+        filename = os.path.basename(filename)
+    return f"{frame.f_code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def _collapse(frame: FrameType | None) -> str:
+    labels: list[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+@dataclass(slots=True)
+class ProfileResult:
+    """Результат записи профиля."""
+
+    seconds: float
+    samples: int
+    stacks: Counter[str] = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        """Collapsed stacks: ``кадр;кадр число`` — по строке на стек."""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def idle_share(self) -> float:
+        """Доля сэмплов, в которых цикл ждал событий в селекторе."""
+        if not self.samples:
+            return 0.0
+        idle = sum(
+            n
+            for stack, n in self.stacks.items()
+            if stack.rsplit(";", 1)[-1].split(" ", 1)[0] in _IDLE_FUNCTIONS
+        )
+        return idle / self.samples
+
+    def top_functions(self, limit: int = TOP_LINES) -> list[tuple[str, float]]:
+        """Функции с наибольшей долей собственных сэмплов (без простоя)."""
+        own: Counter[str] = Counter()
+        for stack, n in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            if leaf.split(" ", 1)[0] not in _IDLE_FUNCTIONS:
+                own[leaf] += n
+        total = self.samples or 1
+        return [(leaf, n / total) for leaf, n in own.most_common(limit)]
+
+
+class SamplingProfiler:
+    """Статистический профайлер потока event loop (одна запись за раз)."""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self._interval = interval
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _sample(self, thread_id: int, seconds: float) -> ProfileResult:
+        result = ProfileResult(seconds=seconds, samples=0)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            result.stacks[_collapse(frame)] += 1
+            result.samples += 1
+            del frame
+            time.sleep(self._interval)
+        return result
+
+    async def capture(self, seconds: float = DEFAULT_PROFILE_SECONDS) -> ProfileResult:
+        """Записать профиль потока текущего event loop.
+
+        Raises:
+            RuntimeError: Запись уже идёт.
+        """
+        if self._lock.locked():
+            raise RuntimeError("Профилирование уже запущено")
+        seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+        async with self._lock:
+            logger.warning("Профилирование event loop: %d с", seconds)
+            # Отдельный поток, а не to_thread: не занимаем пул воркеров на время записи
+            loop = asyncio.get_running_loop()
+            done: asyncio.Future[ProfileResult] = loop.create_future()
+            thread_id = threading.get_ident()
+
+            def run() -> None:
+                result = self._sample(thread_id, seconds)
+                loop.call_soon_threadsafe(done.set_result, result)
+
+            threading.Thread(target=run, name="loop-profiler", daemon=True).start()
+            result = await done
+            logger.warning(
+                "Профилирование завершено: %d сэмплов, простой %.0f%%",
+                result.samples,
+                result.idle_share() * 100,
+            )
+            return result
+
+
+@dataclass(slots=True)
+class MemoryReport:
+    """Разница снимков tracemalloc и размеры контейнеров."""
+
+    seconds: float
+    traced_current: int
+    traced_peak: int
+    top: list[str]
+    sizes: dict[str, tuple[int, int]]
+
+
+class MemoryTracker:
+    """Снимки tracemalloc по команде и размеры отслеживаемых контейнеров."""
+
+    def __init__(self) -> None:
+        self._tracked: dict[str, Sized | Callable[[], int]] = {}
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._baseline_at = 0.0
+        self._baseline_sizes: dict[str, int] = {}
+        self._owns_tracing = False
+
+    def track(self, name: str, container: Sized | Callable[[], int]) -> None:
+        """Отслеживать размер контейнера в отчётах.
+
+        ``container`` — объект с ``len`` или функция размера: для внутренних
+        словарей сервисов передаётся их аксессор (``lock_count`` и т. п.),
+        чтобы не держать ссылку на приватный атрибут, который владелец
+        может заменить.
+        """
+        self._tracked[name] = container
+
+    @property
+    def active(self) -> bool:
+        return self._baseline is not None
+
+    def sizes(self) -> dict[str, int]:
+        return {
+            name: container() if callable(container) else len(container)
+            for name, container in self._tracked.items()
+        }
+
+    def start(self, frames: int = TRACEMALLOC_FRAMES) -> None:
+        """Включить tracemalloc и снять базовый снимок (повторно — новый базовый)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._owns_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+        self._baseline_at = time.monotonic()
+        self._baseline_sizes = self.sizes()
+        logger.warning("tracemalloc: базовый снимок снят (%d кадров)", frames)
+
+    def diff(self, limit: int = TOP_LINES) -> MemoryReport:
+        """Рост памяти по строкам кода относительно базового снимка.
+
+        Raises:
+            RuntimeError: Базовый снимок не снят (нет ``start``).
+        """
+        if self._baseline is None:
+            raise RuntimeError("Нет базового снимка: сначала start")
+        snapshot = tracemalloc.take_snapshot()
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        stats = snapshot.filter_traces(filters).compare_to(
+            self._baseline.filter_traces(filters), "lineno"
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        sizes = self.sizes()
+        return MemoryReport(
+            seconds=time.monotonic() - self._baseline_at,
+            traced_current=current,
+            traced_peak=peak,
+            top=[str(s) for s in stats[:limit]],
+            sizes={name: (self._baseline_sizes.get(name, 0), size) for name, size in sizes.items()},
+        )
+
+    def stop(self) -> None:
+        """Сбросить снимок и выключить tracemalloc (если включал он)."""
+        self._baseline = None
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._owns_tracing = False
+        logger.warning("tracemalloc: выключен")
@@ -11,7 +11,9 @@ _DEFAULT_SYSTEM_PROMPT = """\
 он хочет ПОЛНОЦЕННЫЙ НАБОР продуктов, а не одну категорию. \
 Например, "паста на ужин" = макароны + соус + сыр (пармезан или другой). \
 "Завтрак" = яйца + хлеб + масло + сыр/колбаса + напиток. \
-Раздели запрос на отдельные позиции и ищи каждую.
+Раздели запрос на отдельные позиции и ищи каждую. \
+Если позиций несколько — ищи их ОДНИМ вызовом products_search_batch \
+(список queries), а не отдельным vkusvill_products_search на каждую.
 
 ## Готовое блюдо vs приготовить самому (ВАЖНО!)
 Если пользователь называет конкретное БЛЮДО (роллы, суши, пицца, салат, \
@@ -52,6 +54,12 @@ _DEFAULT_SYSTEM_PROMPT = """\
 - «на семью» / «на 4 человека» → servings=4; \
 - если не ясно — по умолчанию 2 (не 4!).
 
+Если блюд НЕСКОЛЬКО (меню, «план питания на 3 дня», «ужины на неделю») — \
+вызови ОДИН раз recipes_plan(dishes=[{dish, servings}, ...]) вместо \
+recipe_ingredients и recipe_search для каждого блюда. Он вернёт товары \
+сразу для всех блюд (одинаковые ингредиенты уже сложены) — \
+переходи к шагам 2-3 ниже.
+
 ПОСЛЕ recipe_ingredients:
 1. Вызови recipe_search и передай ВЕСЬ массив ingredients из recipe_ingredients. \
 Инструмент сделает пакетный поиск по всем ингредиентам.
@@ -443,6 +451,62 @@ RECIPE_SEARCH_TOOL: dict = {
     },
 }
 
+RECIPES_PLAN_TOOL: dict = {
+    "name": "recipes_plan",
+    "description": (
+        "План питания из нескольких блюд за один вызов: получает рецепты всех блюд, "
+        "складывает одинаковые ингредиенты и ищет товары для них. "
+        "Вызывай вместо recipe_ingredients + recipe_search, когда блюд больше одного. "
+        "Возвращает best_match, alternatives и suggested_q для каждого ингредиента."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "dishes": {
+                "type": "array",
+                "description": "Блюда плана с количеством порций",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "dish": {"type": "string", "description": "Название блюда"},
+                        "servings": {
+                            "type": "integer",
+                            "description": "Количество порций (по умолчанию 2)",
+                        },
+                    },
+                    "required": ["dish"],
+                },
+            },
+        },
+        "required": ["dishes"],
+    },
+}
+
+PRODUCTS_SEARCH_BATCH_TOOL: dict = {
+    "name": "products_search_batch",
+    "description": (
+        "Пакетный поиск товаров по списку покупок: один вызов вместо "
+        "vkusvill_products_search для каждого продукта. "
+        "Вызывай, когда нужно найти НЕСКОЛЬКО разных продуктов. "
+        "Возвращает для каждого запроса товары (xml_id, name, price, unit) "
+        "и not_found — запросы без результатов."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "queries": {
+                "type": "array",
+                "description": (
+                    "Поисковые запросы, по одному на продукт (1-3 слова, без количеств): "
+                    "молоко, хлеб бородинский, сыр твёрдый"
+                ),
+                "items": {"type": "string"},
+            },
+        },
+        "required": ["queries"],
+    },
+}
+
 CART_PREVIOUS_TOOL: dict = {
     "name": "get_previous_cart",
     "description": (
@@ -510,3 +574,10 @@ ERROR_GIGACHAT = (
 ERROR_TOO_MANY_STEPS = (
     "Обработка заняла слишком много шагов. Попробуйте упростить запрос или начните заново: /reset"
 )
+
+# Дисклеймер ответа с корзиной (тот же текст просит системный промпт)
+CART_DISCLAIMER = (
+    "Наличие и точное количество товаров будет проверено при открытии "
+    "ссылки на корзину. ВкусВилл может скорректировать заказ в зависимости "
+    "от наличия. Цены и состав уточняйте на сайте."
+)
@@ -8,11 +8,14 @@ import json
 import logging
 import math
 from collections.abc import Callable, Coroutine
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from vkuswill_bot.services.mcp_client import VkusvillMCPClient
 from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
 
+if TYPE_CHECKING:
+    from vkuswill_bot.services.catalog_index import CatalogIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,10 +59,12 @@ class RecipeSearchService:
         mcp_client: VkusvillMCPClient,
         search_processor: SearchProcessor,
         max_concurrency: int = 5,
+        catalog_index: CatalogIndex | None = None,
     ) -> None:
         self._mcp_client = mcp_client
         self._search_processor = search_processor
         self._max_concurrency = max(1, max_concurrency)
+        self._catalog_index = catalog_index
 
     async def search_ingredients(
         self,
@@ -147,6 +152,8 @@ class RecipeSearchService:
 
         # Сохраняем в кэш цен и триммим тяжёлые поля.
         await self._search_processor.cache_prices(raw)
+        if self._catalog_index is not None:
+            self._catalog_index.submit(raw)
         trimmed = self._search_processor.trim_search_result(raw)
         parsed = self._search_processor.parse_search_items(trimmed)
         if parsed is None:
@@ -5,10 +5,12 @@
 - Кэширование через RecipeStore
 - Обогащение весами (_enrich_with_kg)
 - Масштабирование порций
+- План питания: рецепты нескольких блюд и сводный список ингредиентов
 - Форматирование результата для function calling
 """
 
 import asyncio
+import contextlib
 import json
 import logging
 import math
@@ -16,6 +18,7 @@ import math
 from gigachat import GigaChat
 from gigachat.models import Chat, Messages, MessagesRole
 
+from vkuswill_bot.services import morphology
 from vkuswill_bot.services.prompts import RECIPE_EXTRACTION_PROMPT
 from vkuswill_bot.services.recipe_store import RecipeStore
 
@@ -81,6 +84,12 @@ PIECE_WEIGHT_KG: dict[str, float] = {
     "кабачок": 0.3,
 }
 
+# Макс. блюд в одном плане питания (recipes_plan)
+MAX_PLAN_DISHES = 10
+
+# Поля, которые _enrich_with_kg пересчитывает после сложения количеств
+_EQUIVALENT_FIELDS = ("kg_equivalent", "l_equivalent", "pack_equivalent", "pack_note")
+
 
 class RecipeService:
     """Извлечение и кэширование рецептов.
@@ -97,9 +106,13 @@ class RecipeService:
         self,
         gigachat_client: GigaChat,
         recipe_store: RecipeStore,
+        llm_semaphore: asyncio.Semaphore | None = None,
     ) -> None:
         self._client = gigachat_client
         self._recipe_store = recipe_store
+        # Общий с GigaChatService лимит параллельных запросов к API:
+        # план питания извлекает рецепты нескольких блюд одновременно.
+        self._llm_semaphore = llm_semaphore
 
     @staticmethod
     def is_fermented_product(dish: str) -> bool:
@@ -151,6 +164,42 @@ class RecipeService:
         if not isinstance(servings, int) or servings <= 0:
             servings = 2
 
+        try:
+            ingredients, cached = await self._resolve(dish, servings)
+        except Exception as e:
+            logger.error(
+                "Ошибка извлечения рецепта '%s': %s",
+                dish,
+                e,
+                exc_info=True,
+            )
+            return json.dumps(
+                {
+                    "ok": False,
+                    "error": (
+                        f"Не удалось получить рецепт для «{dish}». "
+                        "Составь список ингредиентов самостоятельно."
+                    ),
+                },
+                ensure_ascii=False,
+            )
+
+        return self._format_result(
+            dish,
+            servings,
+            ingredients,
+            cached=cached,
+        )
+
+    async def _resolve(self, dish: str, servings: int) -> tuple[list[dict], bool]:
+        """Ингредиенты блюда на servings порций: кеш → LLM → кеш.
+
+        Returns:
+            Кортеж (ингредиенты с kg/l/pack-эквивалентами, из кеша ли).
+
+        Raises:
+            Exception: ошибка извлечения через GigaChat.
+        """
         # 1. Проверяем кеш (с проверкой prompt_version)
         cached = await self._recipe_store.get(
             dish,
@@ -172,34 +221,10 @@ class RecipeService:
                 len(ingredients),
             )
             # Обогащаем ингредиенты эквивалентом в кг
-            ingredients = self._enrich_with_kg(ingredients, PIECE_WEIGHT_KG)
-            return self._format_result(
-                dish,
-                servings,
-                ingredients,
-                cached=True,
-            )
+            return self._enrich_with_kg(ingredients, PIECE_WEIGHT_KG), True
 
         # 2. Извлекаем через GigaChat
-        try:
-            ingredients = await self._extract_from_llm(dish, servings)
-        except Exception as e:
-            logger.error(
-                "Ошибка извлечения рецепта '%s': %s",
-                dish,
-                e,
-                exc_info=True,
-            )
-            return json.dumps(
-                {
-                    "ok": False,
-                    "error": (
-                        f"Не удалось получить рецепт для «{dish}». "
-                        "Составь список ингредиентов самостоятельно."
-                    ),
-                },
-                ensure_ascii=False,
-            )
+        ingredients = await self._extract_from_llm(dish, servings)
 
         # 3. Сохраняем в кеш (с prompt_version)
         try:
@@ -213,12 +238,139 @@ class RecipeService:
             logger.warning("Не удалось закешировать рецепт '%s': %s", dish, e)
 
         # Обогащаем ингредиенты эквивалентом в кг
-        ingredients = self._enrich_with_kg(ingredients, PIECE_WEIGHT_KG)
-        return self._format_result(
-            dish,
-            servings,
-            ingredients,
-            cached=False,
+        return self._enrich_with_kg(ingredients, PIECE_WEIGHT_KG), False
+
+    async def resolve_plan(self, dishes: list) -> dict:
+        """Рецепты нескольких блюд параллельно + сводный список ингредиентов.
+
+        Повторяющиеся блюда объединяются (порции складываются), кеш
+        проверяется для всех блюд сразу, промахи извлекаются через GigaChat
+        параллельно (под llm_semaphore).
+
+        Args:
+            dishes: [{dish, servings}] или список названий блюд.
+
+        Returns:
+            {"dishes": [{dish, servings, cached, ingredients_count} | {dish, error}],
+             "ingredients": сводные ингредиенты с полем dishes}.
+        """
+        servings_by_dish: dict[str, int] = {}
+        names: dict[str, str] = {}
+        for entry in dishes if isinstance(dishes, list) else []:
+            if isinstance(entry, str):
+                entry = {"dish": entry}
+            if not isinstance(entry, dict):
+                continue
+            dish = str(entry.get("dish", "")).strip()
+            if not dish:
+                continue
+            servings = entry.get("servings", 2)
+            if not isinstance(servings, int) or servings <= 0:
+                servings = 2
+            key = dish.lower()
+            if key not in names and len(names) >= MAX_PLAN_DISHES:
+                logger.info("План питания: блюдо %r сверх лимита %d", dish, MAX_PLAN_DISHES)
+                continue
+            names.setdefault(key, dish)
+            servings_by_dish[key] = servings_by_dish.get(key, 0) + servings
+
+        plan = [(names[key], servings) for key, servings in servings_by_dish.items()]
+        outcomes = await asyncio.gather(
+            *(self._resolve_plan_dish(dish, servings) for dish, servings in plan)
+        )
+
+        summary: list[dict] = []
+        recipes: list[tuple[str, list[dict]]] = []
+        for (dish, servings), outcome in zip(plan, outcomes, strict=True):
+            if isinstance(outcome, str):
+                summary.append({"dish": dish, "error": outcome})
+                continue
+            ingredients, cached = outcome
+            summary.append(
+                {
+                    "dish": dish,
+                    "servings": servings,
+                    "cached": cached,
+                    "ingredients_count": len(ingredients),
+                }
+            )
+            recipes.append((dish, ingredients))
+
+        return {"dishes": summary, "ingredients": self.merge_ingredients(recipes)}
+
+    async def _resolve_plan_dish(self, dish: str, servings: int) -> tuple[list[dict], bool] | str:
+        """Ингредиенты одного блюда плана или текст ошибки."""
+        if self.is_fermented_product(dish):
+            return (
+                f"«{dish}» — готовый ферментированный/консервированный продукт: "
+                "ищи его как готовый товар"
+            )
+        try:
+            return await self._resolve(dish, servings)
+        except Exception as e:
+            logger.error("Ошибка извлечения рецепта '%s' для плана: %s", dish, e)
+            return f"Не удалось получить рецепт для «{dish}»"
+
+    @classmethod
+    def merge_ingredients(cls, recipes: list[tuple[str, list[dict]]]) -> list[dict]:
+        """Свести ингредиенты нескольких блюд в один список без повторов.
+
+        Ингредиенты совпадают по нормальным формам слов search_query
+        («Лук репчатый» и «лука репчатого» — один). Количества в одной
+        единице складываются; в разных — через kg/l-эквивалент, а если его
+        нет, остаток попадает в also_needed. Эквиваленты пересчитываются
+        по итоговому количеству.
+        """
+        merged: dict[str, dict] = {}
+        for dish, ingredients in recipes:
+            for item in ingredients:
+                if not isinstance(item, dict):
+                    continue
+                query = str(item.get("search_query") or item.get("name") or "").strip()
+                key = " ".join(
+                    sorted({morphology.normalize(w) for w in morphology.tokenize(query)})
+                )
+                if not key:
+                    continue
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = {**item, "search_query": query, "dishes": [dish]}
+                    continue
+                if dish not in current["dishes"]:
+                    current["dishes"].append(dish)
+                cls._add_quantity(current, item)
+
+        result = list(merged.values())
+        for item in result:
+            for field in _EQUIVALENT_FIELDS:
+                item.pop(field, None)
+        return cls._enrich_with_kg(result, PIECE_WEIGHT_KG)
+
+    @staticmethod
+    def _add_quantity(current: dict, item: dict) -> None:
+        """Прибавить количество item к current (единицы могут различаться)."""
+
+        def number(value: object) -> float:
+            return float(value) if isinstance(value, (int, float)) else 0.0
+
+        def base(entry: dict, field: str, unit: str) -> float:
+            if entry.get("unit") == unit:
+                return number(entry.get("quantity"))
+            return number(entry.get(field))
+
+        if current.get("unit") == item.get("unit"):
+            current["quantity"] = round(
+                number(current.get("quantity")) + number(item.get("quantity")), 3
+            )
+            return
+        for field, unit in (("kg_equivalent", "кг"), ("l_equivalent", "л")):
+            total, extra = base(current, field, unit), base(item, field, unit)
+            if total > 0 and extra > 0:
+                current["quantity"] = round(total + extra, 3)
+                current["unit"] = unit
+                return
+        current.setdefault("also_needed", []).append(
+            f"{item.get('quantity', '')} {item.get('unit', '')}".strip()
         )
 
     async def _extract_from_llm(
@@ -239,12 +391,9 @@ class RecipeService:
         prompt = RECIPE_EXTRACTION_PROMPT.format(dish=dish, servings=servings)
         logger.info("Извлечение рецепта: %s на %d порций", dish, servings)
 
-        response = await asyncio.to_thread(
-            self._client.chat,
-            Chat(
-                messages=[Messages(role=MessagesRole.USER, content=prompt)],
-            ),
-        )
+        request = Chat(messages=[Messages(role=MessagesRole.USER, content=prompt)])
+        async with self._llm_semaphore or contextlib.nullcontext():
+            response = await asyncio.to_thread(self._client.chat, request)
 
         content = response.choices[0].message.content or ""
         ingredients = self._parse_json(content)
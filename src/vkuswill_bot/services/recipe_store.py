@@ -2,17 +2,56 @@
 
 Хранит список ингредиентов для блюд, чтобы не запрашивать
 у GigaChat повторно. Рецепты глобальные (не привязаны к пользователю).
+
+Архитектура:
+- RecipeStore — SQLite-кеш одного пода, ключ — ``dish_name.strip().lower()``.
+- TieredRecipeStore — L1 (in-memory LRU) + SQLite + общий Redis-уровень
+  и нечёткий поиск по названию блюда ("Блины" ≈ "блинчики").
 """
 
+from __future__ import annotations
+
 import contextlib
 import json
 import logging
 import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
 
 import aiosqlite
 
+from vkuswill_bot.services import morphology
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
 logger = logging.getLogger(__name__)
 
+# Размер in-memory LRU рецептов
+DEFAULT_RECIPE_L1_SIZE = 256
+
+# Порог сходства названий (коэффициент Дайса по триграммам); 0 — без нечёткого поиска
+DEFAULT_FUZZY_THRESHOLD = 0.6
+
+# TTL рецепта в Redis (30 дней — рецепты почти не меняются)
+DEFAULT_RECIPE_TTL = 30 * 86400
+
+# Минимальное сходство названий целиком (коэффициент Дайса по всем триграммам):
+# отсекает совпадение одного общего слова в длинных названиях
+_MIN_KEY_DICE = 0.5
+
+# Интервал обновления списка ключей Redis для нечёткого поиска (секунды)
+_KEYS_REFRESH_INTERVAL = 60.0
+
+# Логировать статистику кеша каждые N обращений
+_STATS_LOG_EVERY = 100
+
+_REDIS_KEY_PREFIX = "recipe:"
+# Индекс ключей для нечёткого поиска: ZSET, score — время записи (unix);
+# члены старше TTL рецепта обрезаются при каждой записи
+_REDIS_KEYS_ZSET = "recipe:keys"
+
 _CREATE_TABLE_SQL = """\
 CREATE TABLE IF NOT EXISTS recipes (
     dish_name       TEXT    NOT NULL PRIMARY KEY,
@@ -159,6 +198,12 @@ class RecipeStore:
             prompt_version,
         )
 
+    async def list_dish_names(self) -> list[str]:
+        """Все названия блюд в кеше (нормализованные)."""
+        db = await self._ensure_db()
+        cursor = await db.execute("SELECT dish_name FROM recipes")
+        return [row["dish_name"] for row in await cursor.fetchall()]
+
     async def delete(self, dish_name: str) -> bool:
         """Удалить рецепт из кеша.
 
@@ -182,3 +227,357 @@ class RecipeStore:
             await self._db.close()
             self._db = None
             logger.info("SQLite кеш рецептов закрыт.")
+
+
+def _word_trigrams(key: str) -> tuple[frozenset[str], ...]:
+    """Триграммы каждого слова ключа (слово дополняется пробелами, как в pg_trgm)."""
+    grams = []
+    for word in key.split():
+        padded = f"  {word} "
+        grams.append(frozenset(padded[i : i + 3] for i in range(len(padded) - 2)))
+    return tuple(grams)
+
+
+def _dice(a: frozenset[str], b: frozenset[str]) -> float:
+    """Коэффициент Дайса двух множеств триграмм."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _similarity(query: tuple[frozenset[str], ...], candidate: tuple[frozenset[str], ...]) -> float:
+    """Насколько запрос покрывает название кешированного блюда.
+
+    Каждое слово кандидата сопоставляется с ближайшим словом запроса;
+    итог — худшее из сопоставлений. Сравнение направленное: уточнённый
+    запрос находит общее блюдо ("борщ украинский" → "борщ"), но общий
+    запрос не находит частное ("салат" ↛ "салат оливье") — иначе вместо
+    салата вернулись бы ингредиенты оливье. Замена ингредиента
+    ("котлеты куриные" → "котлеты рыбные") тоже не совпадает. Названия,
+    похожие целиком меньше чем на ``_MIN_KEY_DICE``, не сравниваются.
+    """
+    if not query or not candidate:
+        return 0.0
+    if _dice(frozenset().union(*query), frozenset().union(*candidate)) < _MIN_KEY_DICE:
+        return 0.0
+    return min(max(_dice(word, other) for other in query) for word in candidate)
+
+
+class TieredRecipeStore(RecipeStore):
+    """Многоуровневый кеш рецептов: L1 (LRU) → SQLite → Redis (общий для подов).
+
+    - get(): точный ключ по уровням, затем нечёткий поиск по известным блюдам.
+      Находка на нижнем уровне поднимается в верхние.
+    - save(): запись во все уровни.
+    - Ошибки Redis — graceful fallback на L1 + SQLite.
+
+    Ключ блюда — отсортированные нормальные формы слов (``dish_key``):
+    "Блины", "блинов" и "блины" совпадают, "борщ украинский" = "украинский борщ".
+    Нечёткий поиск сравнивает слова ключей по триграммам (коэффициент Дайса)
+    с порогом ``fuzzy_threshold``: "борщик" и "борщ украинский" находят "борщ".
+
+    Каждое попадание — сэкономленный вызов GigaChat (``stats``).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        redis: Redis | None = None,
+        l1_size: int = DEFAULT_RECIPE_L1_SIZE,
+        fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+        ttl: int = DEFAULT_RECIPE_TTL,
+    ) -> None:
+        super().__init__(db_path)
+        self._redis = redis
+        self._l1_size = max(1, l1_size)
+        self._fuzzy_threshold = fuzzy_threshold
+        self._ttl = ttl
+        self._l1: OrderedDict[str, dict] = OrderedDict()
+        # Известные блюда для нечёткого поиска: ключ → название в SQLite (или None)
+        self._known: dict[str, str | None] | None = None
+        self._known_trigrams: dict[str, tuple[frozenset[str], ...]] = {}
+        self._keys_refreshed_at = 0.0
+        self._stats: dict[str, int] = {
+            "l1": 0,
+            "sqlite": 0,
+            "redis": 0,
+            "fuzzy": 0,
+            "misses": 0,
+        }
+
+    @staticmethod
+    def dish_key(dish_name: str) -> str:
+        """Ключ блюда: отсортированные нормальные формы слов названия."""
+        return " ".join(sorted({morphology.normalize(t) for t in morphology.tokenize(dish_name)}))
+
+    # ---- Статистика ----
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Попадания по уровням, промахи, hit rate и сэкономленные вызовы LLM."""
+        hits = sum(v for k, v in self._stats.items() if k != "misses")
+        total = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": hits / total if total else 0.0,
+            "llm_calls_saved": hits,
+        }
+
+    def _record(self, tier: str) -> None:
+        self._stats[tier] += 1
+        total = sum(self._stats.values())
+        if total % _STATS_LOG_EVERY == 0:
+            stats = self.stats
+            logger.info(
+                "Кеш рецептов: hit rate %.1f%%, сэкономлено вызовов LLM: %d (%s)",
+                stats["hit_rate"] * 100,
+                stats["llm_calls_saved"],
+                self._stats,
+            )
+
+    # ---- L1 ----
+
+    def _l1_get(self, key: str, prompt_version: str) -> dict | None:
+        entry = self._l1.get(key)
+        if entry is None:
+            return None
+        if prompt_version and entry["prompt_version"] != prompt_version:
+            del self._l1[key]
+            return None
+        self._l1.move_to_end(key)
+        return {k: entry[k] for k in ("dish_name", "servings", "ingredients")}
+
+    def _l1_put(self, key: str, recipe: dict, prompt_version: str) -> None:
+        self._l1[key] = {**recipe, "prompt_version": prompt_version}
+        self._l1.move_to_end(key)
+        while len(self._l1) > self._l1_size:
+            self._l1.popitem(last=False)
+
+    # ---- Redis ----
+
+    async def _redis_get(self, key: str, prompt_version: str) -> dict | None:
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(f"{_REDIS_KEY_PREFIX}{key}")
+            if not raw:
+                return None
+            data = json.loads(raw)
+            if prompt_version and data.get("prompt_version") != prompt_version:
+                return None
+            return {
+                "dish_name": data["dish_name"],
+                "servings": int(data["servings"]),
+                "ingredients": data["ingredients"],
+            }
+        except Exception as e:
+            logger.warning("Redis get error for recipe %r: %s", key, e)
+            return None
+
+    async def _redis_set(self, key: str, recipe: dict, prompt_version: str) -> None:
+        if self._redis is None:
+            return
+        try:
+            payload = json.dumps({**recipe, "prompt_version": prompt_version}, ensure_ascii=False)
+            now = time.time()
+            pipe = self._redis.pipeline(transaction=True)
+            pipe.set(f"{_REDIS_KEY_PREFIX}{key}", payload, ex=self._ttl)
+            pipe.zadd(_REDIS_KEYS_ZSET, {key: now})
+            # Ключи, не обновлявшиеся дольше TTL, уже истекли — индекс не растёт
+            pipe.zremrangebyscore(_REDIS_KEYS_ZSET, "-inf", now - self._ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Redis set error for recipe %r: %s", key, e)
+
+    # ---- Точный поиск по уровням ----
+
+    async def _get_exact(
+        self, dish_name: str, key: str, prompt_version: str
+    ) -> tuple[dict | None, str]:
+        """Найти рецепт по ключу: L1 → SQLite → Redis (с promote наверх).
+
+        Returns:
+            (рецепт или None, уровень попадания).
+        """
+        recipe = self._l1_get(key, prompt_version)
+        if recipe is not None:
+            return recipe, "l1"
+
+        names = [dish_name]
+        known_name = (self._known or {}).get(key)
+        if known_name and known_name != self.normalize_dish_name(dish_name):
+            names.append(known_name)
+        for name in names:
+            recipe = await super().get(name, prompt_version=prompt_version)
+            if recipe is not None:
+                self._l1_put(key, recipe, prompt_version)
+                return recipe, "sqlite"
+
+        recipe = await self._redis_get(key, prompt_version)
+        if recipe is not None:
+            self._l1_put(key, recipe, prompt_version)
+            try:
+                await super().save(
+                    recipe["dish_name"],
+                    recipe["servings"],
+                    recipe["ingredients"],
+                    prompt_version=prompt_version,
+                )
+            except Exception as e:
+                logger.warning("Не удалось сохранить рецепт из Redis в SQLite: %s", e)
+            self._remember(key, recipe["dish_name"])
+            return recipe, "redis"
+        return None, "misses"
+
+    # ---- Нечёткий поиск ----
+
+    def _remember(self, key: str, dish_name: str | None) -> None:
+        if self._known is not None and key:
+            self._known[key] = (
+                self.normalize_dish_name(dish_name) if dish_name else self._known.get(key)
+            )
+
+    async def _forget(self, key: str) -> None:
+        """Убрать ключ без рецепта из известных блюд и индекса Redis."""
+        if self._known is not None:
+            self._known.pop(key, None)
+        self._known_trigrams.pop(key, None)
+        if self._redis is not None:
+            try:
+                await self._redis.zrem(_REDIS_KEYS_ZSET, key)
+            except Exception as e:
+                logger.warning("Redis zrem error for %s: %s", _REDIS_KEYS_ZSET, e)
+
+    async def _load_known(self) -> dict[str, str | None]:
+        """Собрать известные блюда: SQLite (один раз) + ключи Redis (с интервалом)."""
+        if self._known is None:
+            self._known = {}
+            try:
+                for name in await self.list_dish_names():
+                    self._known[self.dish_key(name)] = name
+            except Exception as e:
+                logger.warning("Не удалось прочитать блюда из SQLite: %s", e)
+        now = time.monotonic()
+        if self._redis is not None and now - self._keys_refreshed_at >= _KEYS_REFRESH_INTERVAL:
+            self._keys_refreshed_at = now
+            try:
+                live = await self._redis.zrangebyscore(
+                    _REDIS_KEYS_ZSET, time.time() - self._ttl, "+inf"
+                )
+                for raw in live:
+                    key = raw.decode() if isinstance(raw, bytes) else str(raw)
+                    self._known.setdefault(key, None)
+            except Exception as e:
+                logger.warning("Redis zrangebyscore error for %s: %s", _REDIS_KEYS_ZSET, e)
+        return self._known
+
+    async def _best_fuzzy_key(self, key: str) -> str | None:
+        """Ближайший известный ключ блюда со сходством не ниже порога."""
+        known = await self._load_known()
+        query = _word_trigrams(key)
+        best_key, best_score = None, 0.0
+        for candidate in known:
+            if candidate == key:
+                continue
+            grams = self._known_trigrams.get(candidate)
+            if grams is None:
+                grams = self._known_trigrams[candidate] = _word_trigrams(candidate)
+            score = _similarity(query, grams)
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is not None and best_score >= self._fuzzy_threshold:
+            logger.info("Нечёткий поиск рецепта: %r ≈ %r (%.2f)", key, best_key, best_score)
+            return best_key
+        return None
+
+    # ---- Публичный API ----
+
+    async def get(
+        self,
+        dish_name: str,
+        prompt_version: str = "",
+    ) -> dict | None:
+        """Найти рецепт: точный ключ по уровням, затем нечёткий поиск.
+
+        Returns:
+            Словарь {dish_name, servings, ingredients} или None.
+        """
+        recipe, tier = await self._lookup(dish_name, prompt_version)
+        self._record(tier)
+        return recipe
+
+    async def preload(self, dish_name: str, prompt_version: str = "") -> bool:
+        """Поднять рецепт в L1, не учитывая обращение в статистике.
+
+        Для прогрева кеша: иначе hit rate и ``llm_calls_saved`` завышаются
+        обращениями, за которыми не стоит ни одного запроса пользователя.
+
+        Returns:
+            True если рецепт найден.
+        """
+        recipe, _ = await self._lookup(dish_name, prompt_version)
+        return recipe is not None
+
+    async def _lookup(self, dish_name: str, prompt_version: str) -> tuple[dict | None, str]:
+        """Точный ключ по уровням, затем нечёткий поиск (без учёта в статистике).
+
+        Returns:
+            (рецепт или None, уровень попадания).
+        """
+        key = self.dish_key(dish_name)
+        recipe, tier = await self._get_exact(dish_name, key, prompt_version)
+        if recipe is None and self._fuzzy_threshold > 0 and key:
+            match = await self._best_fuzzy_key(key)
+            if match is not None:
+                known_name = (self._known or {}).get(match) or match
+                recipe, _ = await self._get_exact(known_name, match, prompt_version)
+                if recipe is not None:
+                    # Алиас в L1: следующий такой же запрос — сразу из памяти
+                    self._l1_put(key, recipe, prompt_version)
+                    tier = "fuzzy"
+                else:
+                    # Рецепт истёк или устарел — ключ больше не кандидат
+                    await self._forget(match)
+        return recipe, tier
+
+    async def save(
+        self,
+        dish_name: str,
+        servings: int,
+        ingredients: list[dict],
+        prompt_version: str = "",
+    ) -> None:
+        """Сохранить рецепт во все уровни."""
+        await super().save(dish_name, servings, ingredients, prompt_version=prompt_version)
+        key = self.dish_key(dish_name)
+        recipe = {
+            "dish_name": self.normalize_dish_name(dish_name),
+            "servings": servings,
+            "ingredients": ingredients,
+        }
+        self._l1_put(key, recipe, prompt_version)
+        self._remember(key, dish_name)
+        await self._redis_set(key, recipe, prompt_version)
+
+    async def delete(self, dish_name: str) -> bool:
+        """Удалить рецепт из всех уровней (вместе с нечёткими алиасами в L1)."""
+        deleted = await super().delete(dish_name)
+        key = self.dish_key(dish_name)
+        if self._l1.pop(key, None) is not None:
+            deleted = True
+        # Алиасы нечёткого поиска лежат в L1 под ключами запросов — ищем по названию
+        name = self.normalize_dish_name(dish_name)
+        aliases = [k for k, entry in self._l1.items() if entry["dish_name"] == name]
+        for alias in aliases:
+            del self._l1[alias]
+            deleted = True
+        if self._known is not None:
+            self._known.pop(key, None)
+        if self._redis is not None:
+            try:
+                removed = await self._redis.delete(f"{_REDIS_KEY_PREFIX}{key}")
+                await self._redis.zrem(_REDIS_KEYS_ZSET, key)
+                deleted = deleted or bool(removed)
+            except Exception as e:
+                logger.warning("Redis delete error for recipe %r: %s", key, e)
+        return deleted
@@ -5,13 +5,45 @@
 """
 
 import logging
+import time
+from typing import Any
 
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
 from redis.exceptions import RedisError
 
+from vkuswill_bot.services.metrics import REDIS_DURATION
+
 logger = logging.getLogger(__name__)
 
 
+class InstrumentedPipeline(Pipeline):
+    """Pipeline с замером времени пакета (метка команды ``PIPELINE``)."""
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_DURATION.observe(time.perf_counter() - start, "PIPELINE")
+
+
+class InstrumentedRedis(Redis):
+    """Redis-клиент с замером времени команд для /metrics (метка — имя команды)."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_DURATION.observe(time.perf_counter() - start, str(args[0]).upper())
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
 async def create_redis_client(
     redis_url: str,
     *,
@@ -33,7 +65,7 @@ async def create_redis_client(
     Raises:
         RedisError: Если Redis недоступен.
     """
-    client = Redis.from_url(
+    client = InstrumentedRedis.from_url(
         redis_url,
         decode_responses=decode_responses,
         socket_connect_timeout=socket_connect_timeout,
@@ -71,6 +71,10 @@ class RedisDialogManager:
         self._locks[user_id] = lock
         return lock
 
+    def lock_count(self) -> int:
+        """Число per-user lock в памяти (диагностика утечек)."""
+        return len(self._locks)
+
     # ---- Async API ----
 
     async def aget_history(self, user_id: int) -> list[Messages]:
@@ -0,0 +1,201 @@
+"""Спекулятивный префетч поиска по списку покупок из сообщения.
+
+Сообщение вида «молоко, хлеб, сыр и масло» GigaChat разбирает за несколько
+шагов: каждый ``vkusvill_products_search`` — отдельный круг LLM + MCP,
+строго последовательно. SearchPrefetcher при получении сообщения разбирает
+из текста список покупок и запускает поиски параллельно, пока идёт первый
+вызов LLM. Когда модель вызывает поиск с тем же (очищенным) запросом,
+ToolExecutor берёт готовый ответ вместо нового похода в MCP.
+
+Ключ совпадения — нормальные формы слов запроса без учёта порядка и
+регистра: «Молоко» и «молока» попадают в один префетч. Поиски, которые
+модель так и не запросила к концу сообщения, отменяются и считаются
+лишними (wasted).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Callable
+
+from vkuswill_bot.services import morphology
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
+
+logger = logging.getLogger(__name__)
+
+# Функция поиска: аргументы vkusvill_products_search → ответ (JSON-строка)
+SearchFunc = Callable[[dict], Awaitable[str]]
+
+# Макс. запросов, префетчимых из одного сообщения
+MAX_PREFETCH_QUERIES = 8
+
+# Меньше позиций — не список покупок (одиночный запрос модель ищет сама)
+_MIN_ITEMS = 2
+
+# Позиция длиннее — фраза, а не название продукта: префетч не запускаем
+_MAX_ITEM_WORDS = 4
+
+# Логировать статистику каждые N сообщений с префетчем
+_STATS_LOG_EVERY = 50
+
+# Аргументы поиска, при которых ответ префетча эквивалентен живому вызову
+_PREFETCH_ARGS = frozenset({"q", "limit"})
+
+_SPLIT_RE = re.compile(r"[,;\n]|\s+и\s+")
+_FILLER_RE = re.compile(
+    r"\b(?:закажи|заказать|добавь|добавить|купи|купить|возьми|положи|собери|"
+    r"нужен|нужна|нужно|нужны|хочу|мне|еще|пожалуйста|плиз)\b"
+)
+_BULLET_CHARS = " \t-*•.!?"
+_SKIP_ITEMS = frozenset({"привет", "здравствуйте", "спасибо", "корзину", "корзина"})
+
+
+def extract_queries(text: str) -> list[str]:
+    """Извлечь список покупок из сообщения.
+
+    Та же идея, что ``AliceOrderOrchestrator.extract_product_queries``,
+    но строже: префетч — ставка, и фразы (рецепты, вопросы) в него не идут.
+
+    Примеры:
+        "молоко, хлеб, сыр и масло" → ["молоко", "хлеб", "сыр", "масло"]
+        "Собери корзину: творог 5% 400 гр; кефир" → ["творог", "кефир"]
+        "хочу приготовить борщ на четверых" → []
+
+    Returns:
+        Очищенные запросы (без количеств и единиц) или [], если это не список.
+    """
+    text = text.lower().replace("ё", "е")
+    # «Собери корзину: молоко, хлеб» — список после двоеточия
+    _, colon, tail = text.partition(":")
+    if colon:
+        text = tail
+    text = _FILLER_RE.sub(" ", text)
+
+    items: list[str] = []
+    for raw in _SPLIT_RE.split(text):
+        item = " ".join(raw.strip(_BULLET_CHARS).split())
+        if not item:
+            continue
+        item = SearchProcessor.clean_search_query(item)
+        words = morphology.tokenize(item)
+        if not any(word.isalpha() for word in words) or item in _SKIP_ITEMS:
+            continue
+        if len(words) > _MAX_ITEM_WORDS:
+            return []
+        items.append(item)
+
+    if len(items) < _MIN_ITEMS:
+        return []
+    return list(dict.fromkeys(items))
+
+
+def query_key(query: str) -> str:
+    """Ключ запроса: нормальные формы слов без учёта порядка."""
+    return " ".join(sorted({morphology.normalize(w) for w in morphology.tokenize(query)}))
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    """Забрать исключение невостребованной задачи (без warning в логе asyncio)."""
+    if not task.cancelled():
+        task.exception()
+
+
+class SearchPrefetcher:
+    """Параллельный префетч поисков по списку покупок, по сессии на пользователя.
+
+    Сессия живёт одно сообщение: ``start`` при получении, ``finish`` после
+    ответа (сообщения одного пользователя обрабатываются под per-user lock).
+    """
+
+    def __init__(self, max_queries: int = MAX_PREFETCH_QUERIES) -> None:
+        self._max_queries = max_queries
+        self._sessions: dict[int, dict[str, asyncio.Task[str]]] = {}
+        self._stats: dict[str, int] = {
+            "messages": 0,
+            "prefetched": 0,
+            "hits": 0,
+            "wasted": 0,
+            "failed": 0,
+        }
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """Счётчики и hit rate (доля префетчей, которые запросила модель)."""
+        s = self._stats
+        return {
+            **s,
+            "hit_rate": s["hits"] / s["prefetched"] if s["prefetched"] else 0.0,
+        }
+
+    def start(self, user_id: int, text: str, search: SearchFunc) -> int:
+        """Запустить префетч поисков для сообщения.
+
+        Returns:
+            Число запущенных поисков (0 — сообщение не список покупок).
+        """
+        self.finish(user_id)
+        queries = extract_queries(text)[: self._max_queries]
+        tasks: dict[str, asyncio.Task[str]] = {}
+        for query in queries:
+            key = query_key(query)
+            if key and key not in tasks:
+                task = asyncio.create_task(search({"q": query, "limit": SEARCH_LIMIT}))
+                task.add_done_callback(_consume_exception)
+                tasks[key] = task
+        if not tasks:
+            return 0
+
+        self._sessions[user_id] = tasks
+        self._stats["messages"] += 1
+        self._stats["prefetched"] += len(tasks)
+        logger.info("Префетч поиска для user %d: %s", user_id, list(tasks))
+        return len(tasks)
+
+    async def take(self, user_id: int, args: dict) -> str | None:
+        """Ответ префетча для вызова поиска (дождаться, если ещё в полёте).
+
+        Returns:
+            Ответ поиска или None — префетча нет, аргументы другие или он упал.
+        """
+        tasks = self._sessions.get(user_id)
+        if not tasks or not _PREFETCH_ARGS.issuperset(args):
+            return None
+        if args.get("limit", SEARCH_LIMIT) != SEARCH_LIMIT:
+            return None
+        task = tasks.pop(query_key(str(args.get("q", ""))), None)
+        if task is None:
+            return None
+        try:
+            result = await task
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.debug("Префетч %r не удался: %s", args.get("q"), e)
+            return None
+        self._stats["hits"] += 1
+        logger.info("Поиск %r: ответ из префетча", args.get("q"))
+        return result
+
+    def finish(self, user_id: int) -> None:
+        """Завершить сессию: невостребованные поиски отменяются (wasted)."""
+        tasks = self._sessions.pop(user_id, None)
+        if not tasks:
+            return
+        for task in tasks.values():
+            task.cancel()
+        self._stats["wasted"] += len(tasks)
+        if self._stats["messages"] % _STATS_LOG_EVERY == 0:
+            stats = self.stats
+            logger.info(
+                "Префетч поиска: hit rate %.1f%%, запущено %d, использовано %d, лишних %d",
+                stats["hit_rate"] * 100,
+                stats["prefetched"],
+                stats["hits"],
+                stats["wasted"],
+            )
+
+    def close(self) -> None:
+        """Отменить все незавершённые префетчи."""
+        for user_id in list(self._sessions):
+            self.finish(user_id)
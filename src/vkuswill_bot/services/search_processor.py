@@ -4,6 +4,7 @@ import json
 import logging
 import re
 
+from vkuswill_bot.services import morphology
 from vkuswill_bot.services.price_cache import PriceCache
 
 logger = logging.getLogger(__name__)
@@ -164,6 +165,11 @@ class SearchProcessor:
 
         Токенизирует запрос на значимые слова (длиннее 2 символов, не стоп-слова)
         и проверяет, встречается ли каждое слово хотя бы в одном названии товара.
+        Сравнение учитывает морфологию: "яйца" находит "Яйцо куриное",
+        "курицы" — "Курица". Названия товаров разбираются в множества термов
+        один раз (LRU-кеш ``morphology.name_terms``), проверка слова — O(1).
+        Слово без совпадения по термам ищется подстрокой в названиях
+        ("кефир" находит "Биокефир").
 
         Args:
             query: Поисковый запрос пользователя.
@@ -185,13 +191,31 @@ class SearchProcessor:
         if not words:
             return []
 
-        # Собираем все названия товаров в одну строку (lower)
+        # Термы всех названий: нормальные формы слов + их префиксы
+        terms: set[str] = set()
+        for item in items:
+            if isinstance(item, dict):
+                terms |= morphology.name_terms(str(item.get("name", "")))
+
+        # Слово найдено, если каждая его часть ("фуа-гра" → фуа, гра)
+        # совпала с термом как есть или в нормальной форме
+        missing = [
+            word
+            for word in words
+            if not all(
+                part in terms or morphology.normalize(part) in terms
+                for part in morphology.tokenize(word)
+            )
+        ]
+        if not missing:
+            return []
+
+        # Запасной путь — подстрока внутри длинного слова названия
+        # ("кефир" в "Биокефир"): строка названий собирается только здесь
         all_names = " ".join(
-            item.get("name", "").lower() for item in items if isinstance(item, dict)
+            str(item.get("name", "")).lower() for item in items if isinstance(item, dict)
         )
-
-        # Проверяем каждое слово: есть ли оно (как подстрока) хотя бы в одном названии
-        return [word for word in words if word not in all_names]
+        return [word for word in missing if word not in all_names]
 
     def trim_search_result(self, result_text: str) -> str:
         """Обрезать результат поиска, оставив только нужные поля.
@@ -257,23 +281,33 @@ class SearchProcessor:
             return
         _, items = parsed
         for item in items:
-            xml_id = item.get("xml_id")
-            price_info = item.get("price", {})
-            if not isinstance(price_info, dict):
-                continue
-            price = price_info.get("current")
-            if xml_id is not None and price is not None:
-                weight = item.get("weight", {}) or {}
-                weight_value = weight.get("value") if isinstance(weight, dict) else None
-                weight_unit = weight.get("unit") if isinstance(weight, dict) else None
-                await self.price_cache.set(
-                    xml_id,
-                    name=item.get("name", ""),
-                    price=price,
-                    unit=item.get("unit", "шт"),
-                    weight_value=weight_value,
-                    weight_unit=weight_unit,
-                )
+            await self.cache_item(item)
+
+    async def cache_item(self, item: dict) -> bool:
+        """Закешировать цену одного товара (поля как в ответе MCP).
+
+        Returns:
+            True, если у товара есть xml_id и цена.
+        """
+        xml_id = item.get("xml_id")
+        price_info = item.get("price", {})
+        if not isinstance(price_info, dict):
+            return False
+        price = price_info.get("current")
+        if xml_id is None or price is None:
+            return False
+        weight = item.get("weight", {}) or {}
+        weight_value = weight.get("value") if isinstance(weight, dict) else None
+        weight_unit = weight.get("unit") if isinstance(weight, dict) else None
+        await self.price_cache.set(
+            xml_id,
+            name=item.get("name", ""),
+            price=price,
+            unit=item.get("unit", "шт"),
+            weight_value=weight_value,
+            weight_unit=weight_unit,
+        )
+        return True
 
     def extract_xml_ids(self, result_text: str) -> set[int]:
         """Извлечь xml_id из результата поиска."""
@@ -10,23 +10,33 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
 from collections.abc import Callable, Coroutine
 from typing import TYPE_CHECKING, Any
 
 from gigachat.models import Messages, MessagesRole
 
 if TYPE_CHECKING:
+    from vkuswill_bot.services.cache_warmer import CacheWarmer
+    from vkuswill_bot.services.cart_link_cache import CartLinkCache
+    from vkuswill_bot.services.catalog_index import CatalogIndex
+    from vkuswill_bot.services.price_cache import PriceInfo
+    from vkuswill_bot.services.product_details_cache import ProductDetailsCache
     from vkuswill_bot.services.recipe_search import RecipeSearchService
+    from vkuswill_bot.services.search_prefetcher import SearchPrefetcher
     from vkuswill_bot.services.user_store import UserStore
 
 from vkuswill_bot.services.cart_processor import CartProcessor
 from vkuswill_bot.services.cart_snapshot_store import CartSnapshotStore
+from vkuswill_bot.services.catalog_index import MODE_FIRST
 from vkuswill_bot.services.mcp_client import VkusvillMCPClient
 from vkuswill_bot.services.nutrition_service import NutritionService
 from vkuswill_bot.services.preferences_store import PreferencesStore
-from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.product_details_cache import parse_details, trim_details
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +52,14 @@ MAX_IDENTICAL_TOOL_CALLS = 2
 # Макс. последовательных ошибок от одного инструмента (с любыми аргументами)
 MAX_CONSECUTIVE_ERRORS_PER_TOOL = 2
 
+# products_search_batch: макс. запросов в одном вызове и параллельных поисков
+MAX_BATCH_QUERIES = 15
+BATCH_SEARCH_CONCURRENCY = 5
+
+# refresh_prices: цены в кеше старше (секунды) перепроверяются через MCP —
+# иначе снятый с продажи товар считается доступным по старой цене
+REFRESH_PRICES_MAX_AGE = 15 * 60
+
 # Имена локальных инструментов (для маршрутизации)
 LOCAL_TOOL_NAMES = frozenset(
     {
@@ -50,8 +68,10 @@ LOCAL_TOOL_NAMES = frozenset(
         "user_preferences_delete",
         "recipe_ingredients",
         "recipe_search",
+        "recipes_plan",
         "get_previous_cart",
         "nutrition_lookup",
+        "products_search_batch",
     }
 )
 
@@ -109,6 +129,11 @@ class ToolExecutor:
         nutrition_service: NutritionService | None = None,
         recipe_search_service: RecipeSearchService | None = None,
         user_store: UserStore | None = None,
+        catalog_index: CatalogIndex | None = None,
+        cache_warmer: CacheWarmer | None = None,
+        search_prefetcher: SearchPrefetcher | None = None,
+        cart_link_cache: CartLinkCache | None = None,
+        product_details_cache: ProductDetailsCache | None = None,
     ) -> None:
         self._mcp_client = mcp_client
         self._search_processor = search_processor
@@ -118,6 +143,11 @@ class ToolExecutor:
         self._nutrition_service = nutrition_service
         self._recipe_search_service = recipe_search_service
         self._user_store = user_store
+        self._catalog_index = catalog_index
+        self._cache_warmer = cache_warmer
+        self._search_prefetcher = search_prefetcher
+        self._cart_link_cache = cart_link_cache
+        self._product_details_cache = product_details_cache
 
     # ---- Публичные свойства для доступа к процессорам (DI) ----
 
@@ -142,6 +172,50 @@ class ToolExecutor:
             return None
         return await self._cart_snapshot_store.get(user_id)
 
+    async def get_cart_history(self, user_id: int) -> list[dict[str, Any]]:
+        """Последние корзины пользователя (новые первыми)."""
+        if self._cart_snapshot_store is None:
+            return []
+        return await self._cart_snapshot_store.history(user_id)
+
+    async def refresh_prices(self, xml_ids: list[int]) -> dict[int, PriceInfo]:
+        """Актуальные цены товаров: пакетно из кеша, промахи — через MCP.
+
+        Из кеша берутся только цены не старше REFRESH_PRICES_MAX_AGE.
+        Промахи запрашиваются ``vkusvill_product_details`` параллельно
+        (не больше BATCH_SEARCH_CONCURRENCY одновременно). Товары, которых
+        нет в ответе (сняты с продажи, нет цены), в результат не попадают.
+        """
+        price_cache = self._cart_processor.price_cache
+        prices = await price_cache.get_many(xml_ids, max_age=REFRESH_PRICES_MAX_AGE)
+        missing = [xml_id for xml_id in xml_ids if xml_id not in prices]
+        if not missing:
+            return prices
+
+        sem = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
+
+        async def fetch(xml_id: int) -> None:
+            async with sem:
+                start = time.perf_counter()
+                raw = await self._mcp_client.call_tool(
+                    "vkusvill_product_details", {"xml_id": xml_id}
+                )
+            if self._product_details_cache is not None:
+                await self._product_details_cache.store(xml_id, raw, time.perf_counter() - start)
+            data = json.loads(raw).get("data")
+            if isinstance(data, dict) and await self._search_processor.cache_item(
+                {**data, "xml_id": xml_id}
+            ):
+                info = await price_cache.get(xml_id)
+                if info is not None:
+                    prices[xml_id] = info
+
+        outcomes = await asyncio.gather(*(fetch(x) for x in missing), return_exceptions=True)
+        for xml_id, outcome in zip(missing, outcomes, strict=True):
+            if isinstance(outcome, Exception):
+                logger.warning("Цена xml_id=%d не обновлена: %s", xml_id, outcome)
+        return prices
+
     # ---- Парсинг аргументов ----
 
     @staticmethod
@@ -181,6 +255,24 @@ class ToolExecutor:
             assistant_msg.functions_state_id = msg.functions_state_id
         history.append(assistant_msg)
 
+    async def load_preferences(self, user_id: int) -> dict[str, str]:
+        """Сохранённые предпочтения пользователя {категория: предпочтение}."""
+        if self._prefs_store is None:
+            return {}
+        return self._parse_preferences(await self._prefs_store.get_formatted(user_id))
+
+    # ---- Префетч поиска ----
+
+    def start_prefetch(self, user_id: int, text: str) -> None:
+        """Запустить префетч поисков по списку покупок из сообщения."""
+        if self._search_prefetcher is not None:
+            self._search_prefetcher.start(user_id, text, self._search_products)
+
+    def finish_prefetch(self, user_id: int) -> None:
+        """Завершить префетч сообщения (невостребованные поиски отменяются)."""
+        if self._search_prefetcher is not None:
+            self._search_prefetcher.finish(user_id)
+
     # ---- Предобработка аргументов ----
 
     async def preprocess_args(
@@ -193,6 +285,7 @@ class ToolExecutor:
 
         - Корзина: исправляет дубли xml_id, добавляет q=1, округляет q для шт.
         - Поиск: очищает запрос от цифр/единиц, подставляет предпочтения, добавляет limit.
+        - Пакетный поиск: то же для каждого запроса, дубли убираются.
         """
         if tool_name == "vkusvill_cart_link_create":
             args = self._cart_processor.fix_cart_args(args)
@@ -219,11 +312,28 @@ class ToolExecutor:
                     args = {**args, "q": enhanced_q}
 
             # Ограничение результатов поиска
-            from vkuswill_bot.services.search_processor import SEARCH_LIMIT
-
             if "limit" not in args:
                 args = {**args, "limit": SEARCH_LIMIT}
 
+        if tool_name == "products_search_batch":
+            queries = args.get("queries")
+            if isinstance(queries, list):
+                # Та же очистка и подстановка предпочтений, что у одиночного поиска
+                cleaned: list[str] = []
+                for raw in queries:
+                    q = self._search_processor.clean_search_query(str(raw).strip())
+                    if q and user_prefs:
+                        q = self._apply_preferences_to_query(q, user_prefs)
+                    if q and q not in cleaned:
+                        cleaned.append(q)
+                if len(cleaned) > MAX_BATCH_QUERIES:
+                    logger.warning(
+                        "products_search_batch: %d запросов, обрезано до %d",
+                        len(cleaned),
+                        MAX_BATCH_QUERIES,
+                    )
+                args = {**args, "queries": cleaned[:MAX_BATCH_QUERIES]}
+
         return args
 
     # ---- Детекция зацикливания ----
@@ -311,6 +421,10 @@ class ToolExecutor:
         Returns:
             Строковый результат вызова (JSON).
         """
+        # Прогрев кешей уступает живому трафику
+        if self._cache_warmer is not None:
+            self._cache_warmer.mark_live()
+
         # --- Freemium: проверка лимита корзин ---
         if tool_name == "vkusvill_cart_link_create" and self._user_store is not None:
             try:
@@ -378,6 +492,16 @@ class ToolExecutor:
                     user_id,
                     on_ingredient_found=on_ingredient_found,
                 )
+            if tool_name == "vkusvill_products_search":
+                if self._search_prefetcher is not None:
+                    prefetched = await self._search_prefetcher.take(user_id, args)
+                    if prefetched is not None:
+                        return prefetched
+                return await self._search_products(args)
+            if tool_name == "vkusvill_cart_link_create" and self._cart_link_cache is not None:
+                return await self._create_cart_link(self._cart_link_cache, args)
+            if tool_name == "vkusvill_product_details" and self._product_details_cache is not None:
+                return await self._product_details(self._product_details_cache, args)
             return await self._mcp_client.call_tool(tool_name, args)
         except Exception as e:
             logger.error("Ошибка %s: %s", tool_name, e, exc_info=True)
@@ -386,6 +510,148 @@ class ToolExecutor:
                 ensure_ascii=False,
             )
 
+    async def _create_cart_link(self, cache: CartLinkCache, args: dict) -> str:
+        """Ссылка на корзину: из кеша по содержимому или через MCP."""
+        products = args.get("products") or []
+        cached = await cache.get(products)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        result = await self._mcp_client.call_tool("vkusvill_cart_link_create", args)
+        if self._is_cart_success(result):
+            await cache.set(products, result, time.perf_counter() - start)
+        return result
+
+    async def _product_details(self, cache: ProductDetailsCache, args: dict) -> str:
+        """Карточка товара: из долгоживущего кеша или через MCP."""
+        xml_id = args.get("xml_id")
+        if not isinstance(xml_id, int):
+            return await self._mcp_client.call_tool("vkusvill_product_details", args)
+        return await cache.get_or_fetch(
+            xml_id,
+            lambda: self._mcp_client.call_tool("vkusvill_product_details", {"xml_id": xml_id}),
+        )
+
+    async def _search_products(self, args: dict) -> str:
+        """Поиск товаров: через локальный индекс каталога (если включён) или MCP."""
+        if self._catalog_index is not None:
+            return await self._search_with_catalog(self._catalog_index, args)
+        return await self._mcp_client.call_tool("vkusvill_products_search", args)
+
+    async def _search_with_catalog(self, index: CatalogIndex, args: dict) -> str:
+        """Поиск товаров с локальным индексом каталога.
+
+        Режим ``first``: сначала индекс, MCP — если свежих совпадений мало.
+        Режим ``fallback``: MCP, а при ошибке/таймауте — ответ из индекса.
+        Если индекс ничего не нашёл — пробрасывает исходную ошибку MCP.
+        """
+        query = str(args.get("q", ""))
+        limit = args.get("limit", SEARCH_LIMIT)
+        if not isinstance(limit, int) or limit <= 0:
+            limit = SEARCH_LIMIT
+
+        if index.mode == MODE_FIRST:
+            local = await index.search_result(query, limit, min_hits=index.min_hits)
+            if local is not None:
+                logger.info("Поиск %r: ответ из локального каталога", query)
+                return local
+
+        try:
+            call = self._mcp_client.call_tool("vkusvill_products_search", args)
+            if index.mcp_timeout > 0:
+                return await asyncio.wait_for(call, timeout=index.mcp_timeout)
+            return await call
+        except Exception as e:
+            local = await index.search_result(query, limit)
+            if local is None:
+                raise
+            logger.warning(
+                "MCP поиск недоступен (%r), ответ из локального каталога: %r",
+                e,
+                query,
+            )
+            return local
+
+    async def _search_batch(self, queries: list[str], user_id: int) -> str:
+        """Найти товары по списку запросов параллельно (products_search_batch).
+
+        Ответы проходят ту же обработку, что и vkusvill_products_search:
+        кеш цен, индекс каталога, обрезка полей и проверка релевантности.
+        """
+        sem = asyncio.Semaphore(BATCH_SEARCH_CONCURRENCY)
+
+        async def search_one(query: str) -> str:
+            args = {"q": query, "limit": SEARCH_LIMIT}
+            if self._search_prefetcher is not None:
+                prefetched = await self._search_prefetcher.take(user_id, args)
+                if prefetched is not None:
+                    return prefetched
+            async with sem:
+                return await self._search_products(args)
+
+        outcomes = await asyncio.gather(
+            *(search_one(q) for q in queries),
+            return_exceptions=True,
+        )
+
+        results: list[dict] = []
+        not_found: list[str] = []
+        search_log: dict[str, list[int]] = {}
+        for query, raw in zip(queries, outcomes, strict=True):
+            if isinstance(raw, Exception):
+                logger.warning("Ошибка products_search_batch для %r: %s", query, raw)
+                results.append({"query": query, "items": [], "error": str(raw)})
+                not_found.append(query)
+                continue
+
+            await self._absorb_search_result(raw)
+            parsed = self._search_processor.parse_search_items(
+                self._search_processor.trim_search_result(raw)
+            )
+            if parsed is None:
+                results.append({"query": query, "items": []})
+                not_found.append(query)
+                continue
+
+            data, items = parsed
+            entry: dict[str, Any] = {"query": query, "items": items}
+            warning = data.get("data", {}).get("relevance_warning")
+            if warning:
+                entry["relevance_warning"] = warning
+            results.append(entry)
+            found_ids = [
+                item["xml_id"]
+                for item in items
+                if isinstance(item, dict) and isinstance(item.get("xml_id"), int)
+            ]
+            if found_ids:
+                search_log[query] = found_ids
+
+        return json.dumps(
+            {
+                "ok": True,
+                "results": results,
+                "not_found": not_found,
+                "search_log": search_log,
+            },
+            ensure_ascii=False,
+        )
+
+    async def _absorb_search_result(self, result: str) -> None:
+        """Цены ответа поиска — в кеш, товары — в индекс каталога.
+
+        Ответ локального индекса пропускается: его цены пришли из PriceCache,
+        повторная запись продлила бы TTL в Redis, разослала инвалидации
+        и засчитала спрос PriceRefresher — популярная цена в режиме
+        ``first`` так и не обновилась бы из MCP.
+        """
+        index = self._catalog_index
+        if index is not None and index.is_local_result(result):
+            return
+        await self._search_processor.cache_prices(result)
+        if index is not None:
+            index.submit(result)
+
     # ---- Постобработка результата ----
 
     async def postprocess_result(
@@ -423,29 +689,31 @@ class ToolExecutor:
                 )
 
         elif tool_name == "vkusvill_products_search":
-            await self._search_processor.cache_prices(result)
+            await self._absorb_search_result(result)
             query = args.get("q", "")
             found_ids = self._search_processor.extract_xml_ids(result)
             if query and found_ids:
                 search_log[query] = found_ids
-            if self._user_store is not None and user_id is not None:
-                try:
-                    await self._user_store.log_event(
-                        user_id,
-                        "product_search",
-                        {
-                            "query": args.get("q", "")[:100],
-                            "results_count": len(found_ids),
-                            "had_results": bool(found_ids),
-                        },
-                    )
-                except Exception:
-                    logger.debug("Ошибка логирования product_search")
+            await self._log_product_search(user_id, query, len(found_ids))
             result = self._search_processor.trim_search_result(result)
 
-        elif tool_name == "recipe_search":
-            # recipe_search уже обновляет price_cache, здесь синхронизируем search_log
+        elif tool_name == "vkusvill_product_details":
+            result = await self._postprocess_details(args, result)
+
+        elif tool_name == "recipe_ingredients":
+            # Популярные блюда — источник для прогрева кеша рецептов (CacheWarmer)
+            dish = str(args.get("dish", "")).strip()
+            try:
+                parsed = json.loads(result)
+            except (json.JSONDecodeError, TypeError):
+                parsed = None
+            if dish and isinstance(parsed, dict) and parsed.get("ok"):
+                await self._log_recipe_request(user_id, dish, bool(parsed.get("cached")))
+
+        elif tool_name in ("recipe_search", "products_search_batch", "recipes_plan"):
+            # Пакетные поиски уже обновили price_cache, здесь синхронизируем search_log
             # для последующей верификации корзины.
+            parsed = None
             try:
                 parsed = json.loads(result)
                 recipe_log = parsed.get("search_log", {}) if isinstance(parsed, dict) else {}
@@ -461,7 +729,16 @@ class ToolExecutor:
                         if valid_ids:
                             search_log[query] = valid_ids
             except (json.JSONDecodeError, TypeError, ValueError):
-                logger.debug("Не удалось синхронизировать search_log из recipe_search")
+                logger.debug("Не удалось синхронизировать search_log из %s", tool_name)
+            if tool_name == "products_search_batch":
+                for query in args.get("queries") or []:
+                    await self._log_product_search(user_id, query, len(search_log.get(query, ())))
+            if tool_name == "recipes_plan" and isinstance(parsed, dict):
+                for dish in parsed.get("dishes") or []:
+                    if isinstance(dish, dict) and dish.get("dish") and "error" not in dish:
+                        await self._log_recipe_request(
+                            user_id, str(dish["dish"]), bool(dish.get("cached"))
+                        )
 
         elif tool_name == "vkusvill_cart_link_create":
             # Если были неизвестные xml_id — добавляем подсказку в ошибку
@@ -505,6 +782,58 @@ class ToolExecutor:
 
         return result
 
+    async def _postprocess_details(self, args: dict, result: str) -> str:
+        """Кешировать цену из карточки и обрезать карточку для LLM.
+
+        В карточке из кеша цены нет — дописывается текущая из PriceCache.
+        """
+        data = parse_details(result)
+        xml_id = args.get("xml_id")
+        if data is None or not isinstance(xml_id, int):
+            return result
+        if "price" in data:
+            await self._search_processor.cache_item({**data, "xml_id": xml_id})
+        else:
+            info = await self._cart_processor.price_cache.get(xml_id)
+            if info is not None:
+                data["price"] = info.price
+        return json.dumps({"ok": True, "data": trim_details(data)}, ensure_ascii=False)
+
+    async def _log_product_search(
+        self,
+        user_id: int | None,
+        query: str,
+        results_count: int,
+    ) -> None:
+        """Записать событие product_search (спрос для аналитики и CacheWarmer)."""
+        if self._user_store is None or user_id is None:
+            return
+        try:
+            await self._user_store.log_event(
+                user_id,
+                "product_search",
+                {
+                    "query": query[:100],
+                    "results_count": results_count,
+                    "had_results": bool(results_count),
+                },
+            )
+        except Exception:
+            logger.debug("Ошибка логирования product_search")
+
+    async def _log_recipe_request(self, user_id: int | None, dish: str, cached: bool) -> None:
+        """Записать событие recipe_request (популярные блюда для CacheWarmer)."""
+        if self._user_store is None or user_id is None:
+            return
+        try:
+            await self._user_store.log_event(
+                user_id,
+                "recipe_request",
+                {"dish": dish[:100], "cached": cached},
+            )
+        except Exception:
+            logger.debug("Ошибка логирования recipe_request")
+
     async def _handle_cart_created_freemium(
         self,
         user_id: int,
@@ -747,7 +1076,7 @@ class ToolExecutor:
 
         Рецепты обрабатываются через RecipeService (вне ToolExecutor).
         """
-        if tool_name == "recipe_ingredients":
+        if tool_name in ("recipe_ingredients", "recipes_plan"):
             # Этот путь используется только когда RecipeService не установлен.
             # В нормальном режиме GigaChatService перенаправляет на RecipeService.
             return json.dumps(
@@ -772,6 +1101,15 @@ class ToolExecutor:
                 on_found=on_ingredient_found,
             )
 
+        if tool_name == "products_search_batch":
+            queries = args.get("queries")
+            if not isinstance(queries, list) or not queries:
+                return json.dumps(
+                    {"ok": False, "error": "Не указан массив queries"},
+                    ensure_ascii=False,
+                )
+            return await self._search_batch(queries, user_id)
+
         if tool_name == "nutrition_lookup":
             if self._nutrition_service is None:
                 return json.dumps(
@@ -270,6 +270,33 @@ class UserStore:
         async with self._pool.acquire() as conn:
             await conn.execute(sql, user_id, event_type, meta_json)
 
+    async def top_event_values(
+        self,
+        event_type: str,
+        field: str,
+        days: int = 7,
+        limit: int = 50,
+    ) -> list[str]:
+        """Самые частые значения поля metadata у событий за последние ``days`` дней.
+
+        Используется для прогрева кешей (популярные запросы поиска, блюда).
+        Значения приводятся к нижнему регистру, пустые пропускаются.
+        """
+        await self.ensure_schema()
+        sql = """
+            SELECT LOWER(TRIM(metadata->>$2)) AS value, COUNT(*) AS cnt
+            FROM user_events
+            WHERE event_type = $1
+              AND created_at >= NOW() - ($3::integer || ' days')::interval
+              AND COALESCE(TRIM(metadata->>$2), '') != ''
+            GROUP BY value
+            ORDER BY cnt DESC
+            LIMIT $4
+        """
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(sql, event_type, field, days, limit)
+        return [row["value"] for row in rows]
+
     async def get_stats(self, user_id: int) -> dict[str, Any] | None:
         """Получить статистику пользователя.
 
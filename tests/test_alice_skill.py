@@ -5,13 +5,19 @@ from __future__ import annotations
 import asyncio
 import importlib
 import json
+import logging
+import subprocess
+import sys
+import time
 
 import httpx
 import pytest
+from redis.exceptions import NoScriptError
 
 from vkuswill_bot.alice_skill.account_linking import (
     HttpAccountLinkStore,
     InMemoryAccountLinkStore,
+    PostgresAccountLinkStore,
     UnavailableAccountLinkStore,
 )
 from vkuswill_bot.alice_skill.delivery import AliceAppDeliveryAdapter
@@ -20,6 +26,10 @@ from vkuswill_bot.alice_skill.idempotency import RedisIdempotencyStore
 from vkuswill_bot.alice_skill.models import DeliveryResult, VoiceOrderResult
 from vkuswill_bot.alice_skill.orchestrator import AliceOrderOrchestrator
 from vkuswill_bot.alice_skill.rate_limit import InMemoryRateLimiter
+from vkuswill_bot.alice_skill.rate_limit import RedisRateLimiter
+from vkuswill_bot.alice_skill.redis_scripts import IDEMPOTENCY_BEGIN
+from vkuswill_bot.alice_skill.redis_scripts import SLIDING_WINDOW_ALLOW
+from vkuswill_bot.alice_skill.redis_scripts import load_scripts
 from vkuswill_bot.alice_skill.voice_order_client import HttpVoiceOrderClient
 
 
@@ -154,6 +164,46 @@ class DummyBrokenRedis:
         raise RuntimeError("redis unavailable")
 
 
+class DummyScriptRedis(DummyRedis):
+    """DummyRedis с EVALSHA: Python-эмуляция Lua-скриптов Alice-канала."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scripts: set[str] = set()
+        self.calls: list[str] = []
+        self.now_ms = 1_000_000
+        self.zsets: dict[str, dict[str, int]] = {}
+        self.ttl_ms: dict[str, int] = {}
+
+    async def script_load(self, source: str) -> str:
+        self.calls.append("SCRIPT LOAD")
+        script = next(s for s in (IDEMPOTENCY_BEGIN, SLIDING_WINDOW_ALLOW) if s.source == source)
+        self.scripts.add(script.sha)
+        return script.sha
+
+    async def evalsha(self, sha: str, numkeys: int, *args):
+        self.calls.append("EVALSHA")
+        if sha not in self.scripts:
+            raise NoScriptError("NOSCRIPT No matching script")
+        keys, argv = args[:numkeys], args[numkeys:]
+        if sha == IDEMPOTENCY_BEGIN.sha:
+            current = self.data.get(keys[0])
+            if current is not None:
+                return current.encode()
+            self.data[keys[0]] = argv[0]
+            return 1
+        limit, window_ms, suffix = argv
+        entries = self.zsets.setdefault(keys[0], {})
+        for member, score in list(entries.items()):
+            if score <= self.now_ms - window_ms:
+                del entries[member]
+        if len(entries) >= limit:
+            return 0
+        entries[f"{self.now_ms}:{suffix}"] = self.now_ms
+        self.ttl_ms[keys[0]] = window_ms
+        return 1
+
+
 class CountingLinkStore(InMemoryAccountLinkStore):
     def __init__(self) -> None:
         super().__init__(links={}, codes={})
@@ -315,6 +365,65 @@ async def test_redis_idempotency_store_fallbacks_to_memory_on_errors():
     assert loaded == expected
 
 
+@pytest.mark.asyncio
+async def test_redis_idempotency_get_done_or_start_single_round_trip():
+    redis = DummyScriptRedis()
+    await load_scripts(redis)
+    redis.calls.clear()
+    store = RedisIdempotencyStore(redis)
+
+    assert await store.get_done_or_start("k-lua", ttl_seconds=30) == (None, True)
+    assert await store.get_done_or_start("k-lua", ttl_seconds=30) == (None, False)
+    assert redis.calls == ["EVALSHA", "EVALSHA"]
+
+    expected = VoiceOrderResult(ok=True, voice_text="OK", items_count=1)
+    await store.mark_done("k-lua", expected, ttl_seconds=30)
+    assert await store.get_done_or_start("k-lua", ttl_seconds=30) == (expected, False)
+
+
+@pytest.mark.asyncio
+async def test_redis_script_reloaded_on_noscript():
+    redis = DummyScriptRedis()
+    store = RedisIdempotencyStore(redis)
+
+    assert await store.get_done_or_start("k-noscript", ttl_seconds=30) == (None, True)
+    assert redis.calls == ["EVALSHA", "SCRIPT LOAD", "EVALSHA"]
+
+
+@pytest.mark.asyncio
+async def test_redis_idempotency_get_done_or_start_fallbacks_to_memory():
+    store = RedisIdempotencyStore(DummyBrokenRedis())
+    assert await store.get_done_or_start("k-broken", ttl_seconds=30) == (None, True)
+    assert await store.get_done_or_start("k-broken", ttl_seconds=30) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_sliding_window():
+    redis = DummyScriptRedis()
+    await load_scripts(redis)
+    redis.calls.clear()
+    limiter = RedisRateLimiter(redis)
+
+    assert await limiter.allow("order:u1", limit=2, window_seconds=60) is True
+    redis.now_ms += 30_000
+    assert await limiter.allow("order:u1", limit=2, window_seconds=60) is True
+    assert await limiter.allow("order:u1", limit=2, window_seconds=60) is False
+    assert redis.calls == ["EVALSHA"] * 3
+    assert redis.ttl_ms["alice:rl:order:u1"] == 60_000
+
+    # Окно скользит: через 60 с после первой попытки освобождается одно место
+    redis.now_ms += 30_000
+    assert await limiter.allow("order:u1", limit=2, window_seconds=60) is True
+    assert await limiter.allow("order:u1", limit=2, window_seconds=60) is False
+
+
+@pytest.mark.asyncio
+async def test_redis_rate_limiter_fallbacks_to_memory():
+    limiter = RedisRateLimiter(DummyBrokenRedis())
+    assert await limiter.allow("order:u2", limit=1, window_seconds=60) is True
+    assert await limiter.allow("order:u2", limit=1, window_seconds=60) is False
+
+
 @pytest.mark.asyncio
 async def test_orchestrator_success():
     mcp = FakeMCPClient()
@@ -1281,6 +1390,198 @@ async def test_runtime_reads_async_order_flags(monkeypatch):
     module._RUNTIME = None
 
 
+def test_handler_import_defers_heavy_backends():
+    code = (
+        "import sys, vkuswill_bot.alice_skill.handler as h; "
+        "print('asyncpg' in sys.modules, 'redis' in sys.modules)"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+@pytest.mark.asyncio
+async def test_runtime_initializes_backends_concurrently(monkeypatch):
+    module = importlib.import_module("vkuswill_bot.alice_skill.handler")
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    warmed: list[bool] = []
+
+    class DummyMCPClient:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        async def warm_up(self) -> None:
+            await asyncio.sleep(0.2)
+            warmed.append(True)
+
+    async def slow_create_pool(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return object()
+
+    async def slow_create_redis_client(*args, **kwargs):
+        await asyncio.sleep(0.2)
+        return object()
+
+    monkeypatch.setattr(module, "VkusvillMCPClient", DummyMCPClient)
+    monkeypatch.setattr(module.asyncpg, "create_pool", slow_create_pool)
+    monkeypatch.setattr(module, "create_redis_client", slow_create_redis_client)
+    monkeypatch.setenv("ALICE_DATABASE_URL", "postgresql://x:y@db:6432/vkuswill")
+    monkeypatch.setenv("ALICE_REDIS_URL", "redis://localhost:6379/0")
+
+    started = time.perf_counter()
+    runtime = await module._get_runtime()
+    elapsed = time.perf_counter() - started
+
+    assert isinstance(runtime.orchestrator._account_links, PostgresAccountLinkStore)
+    assert isinstance(runtime.orchestrator._idempotency_store, RedisIdempotencyStore)
+    assert warmed == [True]
+    assert elapsed < 0.5  # параллельно, а не 3 x 0.2 с
+    assert runtime.init_seconds == pytest.approx(elapsed, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_runtime_mcp_prewarm_disabled_and_failing(monkeypatch):
+    module = importlib.import_module("vkuswill_bot.alice_skill.handler")
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    calls: list[str] = []
+
+    class DummyMCPClient:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        async def warm_up(self) -> None:
+            calls.append("warm_up")
+            raise ConnectionError("mcp down")
+
+    monkeypatch.setattr(module, "VkusvillMCPClient", DummyMCPClient)
+    await module._get_runtime()  # сбой прогрева не ломает сборку runtime
+    assert calls == ["warm_up"]
+
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    monkeypatch.setenv("ALICE_MCP_PREWARM", "false")
+    await module._get_runtime()
+    assert calls == ["warm_up"]
+
+
+@pytest.mark.asyncio
+async def test_runtime_timeout_closes_created_backends(monkeypatch):
+    module = importlib.import_module("vkuswill_bot.alice_skill.handler")
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    closed: list[str] = []
+
+    class DummyMCPClient:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        async def warm_up(self) -> None:
+            return None
+
+        async def close(self) -> None:
+            closed.append("mcp")
+
+    class DummyPool:
+        async def close(self) -> None:
+            closed.append("postgres")
+
+    class DummyRedisClient:
+        async def aclose(self) -> None:
+            closed.append("redis")
+
+    async def create_pool(*args, **kwargs):
+        return DummyPool()
+
+    async def create_redis_client(*args, **kwargs):
+        return DummyRedisClient()
+
+    async def hanging_load_scripts(redis):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(module, "VkusvillMCPClient", DummyMCPClient)
+    monkeypatch.setattr(module.asyncpg, "create_pool", create_pool)
+    monkeypatch.setattr(module, "create_redis_client", create_redis_client)
+    monkeypatch.setattr(module, "load_scripts", hanging_load_scripts)
+    monkeypatch.setenv("ALICE_DATABASE_URL", "postgresql://x:y@db:6432/vkuswill")
+    monkeypatch.setenv("ALICE_REDIS_URL", "redis://localhost:6379/0")
+
+    with pytest.raises(TimeoutError):
+        await asyncio.wait_for(module._get_runtime(), timeout=0.1)
+
+    assert sorted(closed) == ["mcp", "postgres", "redis"]
+    assert module._RUNTIME is None
+
+
+def test_cloud_function_logs_cold_and_warm_invocations(monkeypatch, caplog):
+    module = importlib.import_module("vkuswill_bot.alice_skill.handler")
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    monkeypatch.setattr(module, "_INVOCATIONS", 0)
+
+    class DummyMCPClient:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        async def warm_up(self) -> None:
+            return None
+
+    monkeypatch.setattr(module, "VkusvillMCPClient", DummyMCPClient)
+    event = {
+        "version": "1.0",
+        "session": {"user": {"user_id": "alice-user-cold"}},
+        "request": {"command": ""},
+    }
+    with caplog.at_level(logging.INFO, logger="vkuswill_bot.alice_skill.handler"):
+        module.handler(event, None)
+        module.handler(event, None)
+
+    prefix = "Alice invocation: "
+    cold, warm = (
+        json.loads(r.getMessage()[len(prefix) :])
+        for r in caplog.records
+        if r.getMessage().startswith(prefix)
+    )
+    assert cold["cold"] is True
+    assert cold["runtime_init_ms"] > 0
+    assert cold["prewarm_ms"] == 0.0
+    assert "import_ms" in cold
+    assert warm["cold"] is False
+    assert warm["runtime_init_ms"] == 0.0
+    assert "import_ms" not in warm
+
+
+def test_prewarm_builds_runtime_before_first_request(monkeypatch, caplog):
+    module = importlib.import_module("vkuswill_bot.alice_skill.handler")
+    monkeypatch.setattr(module, "_RUNTIME", None)
+    monkeypatch.setattr(module, "_INVOCATIONS", 0)
+
+    class DummyMCPClient:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        async def warm_up(self) -> None:
+            return None
+
+    monkeypatch.setattr(module, "VkusvillMCPClient", DummyMCPClient)
+    module._prewarm_runtime()
+    assert module._RUNTIME is not None
+
+    event = {
+        "version": "1.0",
+        "session": {"user": {"user_id": "alice-user-prewarm"}},
+        "request": {"command": ""},
+    }
+    with caplog.at_level(logging.INFO, logger="vkuswill_bot.alice_skill.handler"):
+        module.handler(event, None)
+
+    (record,) = [r for r in caplog.records if r.getMessage().startswith("Alice invocation: ")]
+    payload = json.loads(record.getMessage().split(": ", 1)[1])
+    assert payload["cold"] is True
+    assert payload["runtime_init_ms"] == 0.0
+    assert payload["prewarm_ms"] > 0
+
+
 @pytest.mark.asyncio
 async def test_http_account_link_store_resolve_success():
     def handler(request: httpx.Request) -> httpx.Response:
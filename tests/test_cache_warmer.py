@@ -0,0 +1,262 @@
+"""Тесты CacheWarmer (прогрев кешей по историческому спросу).
+
+Тестируем:
+- Прогрев цен через MCP-поиск популярных запросов
+- Подъём популярных рецептов в L1 без вызова LLM
+- Передачу ответов поиска в индекс каталога
+- Ограничение параллелизма
+- Уступку живому трафику (проверка паузы под семафором)
+- Прогрев рецептов не влияет на статистику кеша
+- Устойчивость к ошибкам MCP и БД
+- Hit rate после прогрева
+- Запуск/остановку фоновой задачи
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from vkuswill_bot.services import cache_warmer as warmer_module
+from vkuswill_bot.services.cache_warmer import CacheWarmer
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.recipe_service import RecipeService
+from vkuswill_bot.services.recipe_store import TieredRecipeStore
+from vkuswill_bot.services.search_processor import SearchProcessor
+
+
+def _search_result(query: str) -> str:
+    xml_id = sum(map(ord, query))
+    return json.dumps(
+        {
+            "ok": True,
+            "data": {
+                "items": [{"xml_id": xml_id, "name": query.title(), "price": {"current": 100}}]
+            },
+        },
+        ensure_ascii=False,
+    )
+
+
+@pytest.fixture
+def user_store():
+    store = AsyncMock()
+
+    async def top_event_values(event_type, field, days=7, limit=50):
+        if event_type == "product_search":
+            return ["молоко", "яйца", "хлеб"][:limit]
+        return ["борщ"][:limit]
+
+    store.top_event_values = AsyncMock(side_effect=top_event_values)
+    return store
+
+
+@pytest.fixture
+def mcp_client():
+    client = AsyncMock()
+    client.call_tool = AsyncMock(side_effect=lambda name, args: _search_result(args["q"]))
+    return client
+
+
+@pytest.fixture
+def price_cache():
+    return PriceCache()
+
+
+@pytest.fixture
+async def recipe_store(tmp_path):
+    store = TieredRecipeStore(str(tmp_path / "recipes.db"))
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def warmer(user_store, mcp_client, price_cache, recipe_store):
+    return CacheWarmer(
+        user_store=user_store,
+        mcp_client=mcp_client,
+        search_processor=SearchProcessor(price_cache),
+        price_cache=price_cache,
+        recipe_store=recipe_store,
+    )
+
+
+class TestWarmUp:
+    """Один проход прогрева."""
+
+    async def test_prices_warmed(self, warmer, price_cache, mcp_client):
+        summary = await warmer.warm_up()
+        assert summary["queries"] == 3
+        assert mcp_client.call_tool.call_count == 3
+        assert len(price_cache) == 3
+
+    async def test_recipe_promoted_without_llm(self, warmer, recipe_store):
+        await recipe_store.save("борщ", 4, [], prompt_version=RecipeService._PROMPT_VERSION)
+        recipe_store._l1.clear()
+
+        summary = await warmer.warm_up()
+
+        assert summary["dishes"] == 1
+        assert "борщ" in recipe_store._l1
+
+    async def test_recipe_stats_untouched(self, warmer, recipe_store):
+        await recipe_store.save("борщ", 4, [], prompt_version=RecipeService._PROMPT_VERSION)
+        recipe_store._l1.clear()
+
+        await warmer.warm_up()
+
+        assert recipe_store.stats["llm_calls_saved"] == 0
+        assert recipe_store.stats["misses"] == 0
+
+    async def test_missing_recipe_not_counted(self, warmer):
+        summary = await warmer.warm_up()
+        assert summary["dishes"] == 0
+
+    async def test_reads_top_values(self, user_store, mcp_client, price_cache, recipe_store):
+        warmer = CacheWarmer(
+            user_store=user_store,
+            mcp_client=mcp_client,
+            search_processor=SearchProcessor(price_cache),
+            price_cache=price_cache,
+            recipe_store=recipe_store,
+            top_queries=2,
+            top_dishes=1,
+            lookback_days=3,
+        )
+        await warmer.warm_up()
+        user_store.top_event_values.assert_any_call("product_search", "query", days=3, limit=2)
+        user_store.top_event_values.assert_any_call("recipe_request", "dish", days=3, limit=1)
+        assert mcp_client.call_tool.call_count == 2
+
+    async def test_catalog_index_receives_results(
+        self, user_store, mcp_client, price_cache, recipe_store
+    ):
+        catalog_index = MagicMock()
+        warmer = CacheWarmer(
+            user_store=user_store,
+            mcp_client=mcp_client,
+            search_processor=SearchProcessor(price_cache),
+            price_cache=price_cache,
+            recipe_store=recipe_store,
+            catalog_index=catalog_index,
+        )
+        await warmer.warm_up()
+        assert catalog_index.submit.call_count == 3
+
+    async def test_mcp_errors_counted(self, warmer, mcp_client):
+        mcp_client.call_tool.side_effect = ConnectionError("MCP down")
+        summary = await warmer.warm_up()
+        assert summary["queries"] == 0
+        assert summary["errors"] == 3
+
+    async def test_concurrency_bounded(self, user_store, price_cache, recipe_store):
+        active = 0
+        peak = 0
+
+        async def call_tool(name, args):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return _search_result(args["q"])
+
+        mcp_client = AsyncMock()
+        mcp_client.call_tool = AsyncMock(side_effect=call_tool)
+        warmer = CacheWarmer(
+            user_store=user_store,
+            mcp_client=mcp_client,
+            search_processor=SearchProcessor(price_cache),
+            price_cache=price_cache,
+            recipe_store=recipe_store,
+            concurrency=1,
+        )
+        await warmer.warm_up()
+        assert peak == 1
+
+
+class TestYieldToLiveTraffic:
+    """Прогрев уступает живому трафику."""
+
+    async def test_waits_while_live(self, warmer, monkeypatch):
+        monkeypatch.setattr(warmer_module, "_YIELD_STEP", 0.01)
+        monkeypatch.setattr(warmer_module, "_LIVE_IDLE_GAP", 0.05)
+        warmer.mark_live()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await warmer._wait_for_idle()
+        assert loop.time() - start >= 0.04
+
+    async def test_wait_is_bounded(self, warmer, monkeypatch):
+        monkeypatch.setattr(warmer_module, "_YIELD_STEP", 0.01)
+        monkeypatch.setattr(warmer_module, "_MAX_YIELD", 0.03)
+        monkeypatch.setattr(warmer_module, "_LIVE_IDLE_GAP", 100.0)
+        warmer.mark_live()
+        await asyncio.wait_for(warmer._wait_for_idle(), timeout=1)
+
+    async def test_no_wait_when_idle(self, warmer):
+        await asyncio.wait_for(warmer._wait_for_idle(), timeout=0.1)
+
+    async def test_live_traffic_during_warmup_delays_next_call(
+        self, user_store, price_cache, recipe_store, monkeypatch
+    ):
+        monkeypatch.setattr(warmer_module, "_YIELD_STEP", 0.01)
+        monkeypatch.setattr(warmer_module, "_LIVE_IDLE_GAP", 0.05)
+        loop = asyncio.get_running_loop()
+        called_at: list[float] = []
+
+        async def call_tool(name, args):
+            called_at.append(loop.time())
+            if len(called_at) == 1:
+                # Остальные элементы уже ждут семафор, когда приходит пользователь
+                await asyncio.sleep(0.01)
+                warmer.mark_live()
+            return _search_result(args["q"])
+
+        mcp_client = AsyncMock()
+        mcp_client.call_tool = AsyncMock(side_effect=call_tool)
+        warmer = CacheWarmer(
+            user_store=user_store,
+            mcp_client=mcp_client,
+            search_processor=SearchProcessor(price_cache),
+            price_cache=price_cache,
+            recipe_store=recipe_store,
+            concurrency=1,
+        )
+        await warmer.warm_up()
+
+        assert called_at[1] - called_at[0] >= 0.04
+
+
+class TestHitRate:
+    """Эффект прогрева."""
+
+    async def test_hit_rate_since_baseline(self, warmer, price_cache, recipe_store):
+        await price_cache.set(1, "Молоко", 90)
+        baseline = warmer._snapshot()
+        await price_cache.get(1)
+        await price_cache.get(2)
+        await recipe_store.save("борщ", 4, [])
+        await recipe_store.get("борщ")
+
+        rates = warmer.log_hit_rate(baseline)
+
+        assert rates == {"prices": 0.5, "recipes": 1.0}
+
+    async def test_no_lookups(self, warmer):
+        assert warmer.log_hit_rate(warmer._snapshot()) == {}
+
+
+class TestLifecycle:
+    """Фоновая задача."""
+
+    async def test_start_stop(self, warmer, user_store):
+        warmer.start()
+        await asyncio.sleep(0.05)
+        await warmer.stop()
+        assert user_store.top_event_values.called
+
+    async def test_db_error_does_not_crash(self, warmer, user_store):
+        user_store.top_event_values.side_effect = OSError("db down")
+        await warmer._run_safely()
@@ -0,0 +1,152 @@
+"""Тесты CartLinkCache (кеш ссылок на корзину по содержимому).
+
+Тестируем:
+- Ключ корзины: порядок позиций и запись количества не важны
+- L1: попадание, TTL, вытеснение
+- L2 (Redis): promote с остатком TTL, ошибки Redis
+- Статистику попаданий и сэкономленного времени MCP
+- Интеграцию с ToolExecutor: один вызов MCP на одинаковые корзины
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from vkuswill_bot.services.cart_link_cache import CartLinkCache, cart_key
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+_OK = json.dumps({"ok": True, "data": {"link": "https://vkusvill.ru/?share_basket=1"}})
+_CART = [{"xml_id": 1, "q": 2}, {"xml_id": 2, "q": 1}]
+
+
+class TestCartKey:
+    """Канонический ключ содержимого корзины."""
+
+    def test_order_and_number_format(self) -> None:
+        assert cart_key(_CART) == cart_key([{"xml_id": 2, "q": 1.0}, {"xml_id": 1, "q": 2}])
+
+    def test_quantity_matters(self) -> None:
+        assert cart_key(_CART) != cart_key([{"xml_id": 1, "q": 3}, {"xml_id": 2, "q": 1}])
+
+    @pytest.mark.parametrize(
+        "products",
+        [[], [{"xml_id": "1", "q": 1}], [{"xml_id": 1, "q": "2"}], ["x"]],
+    )
+    def test_invalid(self, products) -> None:
+        assert cart_key(products) is None
+
+
+class TestLocal:
+    """L1 без Redis."""
+
+    async def test_hit_and_stats(self) -> None:
+        cache = CartLinkCache()
+        assert await cache.get(_CART) is None
+        await cache.set(_CART, _OK, latency=0.8)
+
+        assert await cache.get(list(reversed(_CART))) == _OK
+        stats = cache.stats
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["saved_seconds"] == pytest.approx(0.8)
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    async def test_ttl(self) -> None:
+        cache = CartLinkCache(ttl=10)
+        with patch("vkuswill_bot.services.cart_link_cache.time.monotonic", return_value=100.0):
+            await cache.set(_CART, _OK, latency=0.1)
+        with patch("vkuswill_bot.services.cart_link_cache.time.monotonic", return_value=111.0):
+            assert await cache.get(_CART) is None
+
+    async def test_lru_eviction(self) -> None:
+        cache = CartLinkCache(max_size=2)
+        for xml_id in (1, 2, 3):
+            await cache.set([{"xml_id": xml_id, "q": 1}], _OK, latency=0.1)
+
+        assert await cache.get([{"xml_id": 1, "q": 1}]) is None
+        assert await cache.get([{"xml_id": 3, "q": 1}]) == _OK
+
+
+class TestRedis:
+    """L2 в Redis — общий для подов."""
+
+    @pytest.fixture
+    def redis(self):
+        redis = MagicMock()
+        redis.set = AsyncMock()
+        redis.pipeline.return_value.execute = AsyncMock(return_value=[None, -2])
+        return redis
+
+    async def test_set_writes_with_ttl(self, redis) -> None:
+        cache = CartLinkCache(redis=redis, ttl=600)
+        await cache.set(_CART, _OK, latency=0.1)
+        redis.set.assert_awaited_once_with(f"cart_link:{cart_key(_CART)}", _OK, ex=600)
+
+    async def test_l2_hit_promoted_with_remaining_ttl(self, redis) -> None:
+        redis.pipeline.return_value.execute.return_value = [_OK.encode(), 5]
+        cache = CartLinkCache(redis=redis, ttl=600)
+
+        with patch("vkuswill_bot.services.cart_link_cache.time.monotonic", return_value=0.0):
+            assert await cache.get(_CART) == _OK
+        # L1 держит ссылку не дольше, чем осталось в Redis
+        redis.pipeline.return_value.execute.return_value = [None, -2]
+        with patch("vkuswill_bot.services.cart_link_cache.time.monotonic", return_value=6.0):
+            assert await cache.get(_CART) is None
+
+    async def test_redis_errors_degrade_to_l1(self, redis) -> None:
+        redis.set.side_effect = ConnectionError("down")
+        redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        cache = CartLinkCache(redis=redis)
+
+        assert await cache.get(_CART) is None
+        await cache.set(_CART, _OK, latency=0.1)
+        assert await cache.get(_CART) == _OK
+
+
+class TestToolExecutor:
+    """ToolExecutor отдаёт ссылку из кеша, price_summary считается заново."""
+
+    @pytest.fixture
+    def mcp_client(self):
+        client = AsyncMock()
+        client.call_tool = AsyncMock(return_value=_OK)
+        return client
+
+    @pytest.fixture
+    def executor(self, mcp_client):
+        search_processor = SearchProcessor()
+        search_processor.price_cache[1] = {"name": "Молоко", "price": 90, "unit": "шт"}
+        search_processor.price_cache[2] = {"name": "Хлеб", "price": 50, "unit": "шт"}
+        return ToolExecutor(
+            mcp_client=mcp_client,
+            search_processor=search_processor,
+            cart_processor=CartProcessor(search_processor.price_cache),
+            cart_link_cache=CartLinkCache(),
+        )
+
+    async def _create(self, executor, products: list[dict]) -> dict:
+        args = await executor.preprocess_args(
+            "vkusvill_cart_link_create", {"products": products}, {}
+        )
+        raw = await executor.execute("vkusvill_cart_link_create", args, 1)
+        result = await executor.postprocess_result("vkusvill_cart_link_create", args, raw, {}, {})
+        return json.loads(result)
+
+    async def test_same_cart_one_mcp_call(self, executor, mcp_client) -> None:
+        await self._create(executor, [{"xml_id": 1, "q": 2}, {"xml_id": 2}])
+        # те же товары в другом порядке и с дублем, который сложит fix_cart_args
+        executor.cart_processor.price_cache[1] = {"name": "Молоко", "price": 100, "unit": "шт"}
+        again = await self._create(executor, [{"xml_id": 2, "q": 1}, {"xml_id": 1}, {"xml_id": 1}])
+
+        assert mcp_client.call_tool.call_count == 1
+        assert again["data"]["link"].endswith("share_basket=1")
+        # итог — по текущим ценам, а не из кеша
+        assert again["data"]["price_summary"]["total"] == 250
+
+    async def test_failed_cart_not_cached(self, executor, mcp_client) -> None:
+        mcp_client.call_tool.return_value = json.dumps({"ok": False, "error": "bad xml_id"})
+        await self._create(executor, _CART)
+        await self._create(executor, _CART)
+        assert mcp_client.call_tool.call_count == 2
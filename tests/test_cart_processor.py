@@ -9,6 +9,8 @@
 """
 
 import json
+import random
+import re
 
 import pytest
 
@@ -845,6 +847,46 @@ class TestDetectSimilarItems:
         duplicates = await processor.detect_similar_items(args)
         assert duplicates == []
 
+    async def test_pairs_in_cart_order(self, processor, price_cache):
+        """Несколько пар возвращаются в порядке корзины (как при попарном обходе)."""
+        await price_cache.set(1, name="Сыр Гауда нарезка", price=200, unit="шт")
+        await price_cache.set(2, name="Молоко пастеризованное 3,2%", price=79, unit="шт")
+        await price_cache.set(3, name="Сыр Гауда кусок", price=300, unit="шт")
+        await price_cache.set(4, name="Молоко пастеризованное 2,5%", price=75, unit="шт")
+        await price_cache.set(5, name="Сыр Гауда выдержанный", price=400, unit="шт")
+
+        args = {"products": [{"xml_id": i, "q": 1} for i in range(1, 6)]}
+        duplicates = await processor.detect_similar_items(args)
+        assert duplicates == [
+            ("Сыр Гауда нарезка", "Сыр Гауда кусок"),
+            ("Сыр Гауда нарезка", "Сыр Гауда выдержанный"),
+            ("Молоко пастеризованное 3,2%", "Молоко пастеризованное 2,5%"),
+            ("Сыр Гауда кусок", "Сыр Гауда выдержанный"),
+        ]
+
+    async def test_matches_pairwise_reference(self, processor, price_cache):
+        """Инвертированный индекс даёт тот же результат, что попарное сравнение."""
+        rng = random.Random(7)  # noqa: S311
+        vocab = ["сыр", "молоко", "гауда", "охл", "зам", "стейк", "форель", "хлеб", "ржаной"]
+        for xml_id in range(60):
+            name = " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 4)))
+            await price_cache.set(xml_id, name=name, price=100, unit="шт")
+        products = [{"xml_id": rng.randrange(70), "q": 1} for _ in range(40)]
+
+        expected = []
+        infos = [await price_cache.get(p["xml_id"]) for p in products]
+        infos = [i for i in infos if i]
+        words = [
+            frozenset(w for w in re.findall(r"\w+", i.name.lower()) if len(w) >= _MIN_WORD_LEN)
+            for i in infos
+        ]
+        for a in range(len(infos)):
+            for b in range(a + 1, len(infos)):
+                if len(words[a] & words[b]) >= _MIN_NAME_OVERLAP:
+                    expected.append((infos[a].name, infos[b].name))
+
+        assert await processor.detect_similar_items({"products": products}) == expected
+
     async def test_constants_exported(self):
         """Константы экспортируются и имеют ожидаемые значения."""
         assert _MIN_NAME_OVERLAP == 2
@@ -0,0 +1,227 @@
+"""Тесты «Повторить корзину» (CartRepeater, GigaChatService.repeat_cart).
+
+Тестируем:
+- Описание корзины для кнопки
+- Обновление цен: пакетно из кеша, промахи и устаревшие цены через vkusvill_product_details
+- Повтор корзины: один вызов MCP, изменения цен, недоступные товары, лимит
+- GigaChatService.repeat_cart: без LLM, история диалога
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from helpers import make_text_response
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.cart_repeat import CartRepeater, describe_cart
+from vkuswill_bot.services.cart_snapshot_store import InMemoryCartSnapshotStore
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import REFRESH_PRICES_MAX_AGE, ToolExecutor
+
+_LINK = "https://vkusvill.ru/?share_basket=7"
+
+# Карточки товаров MCP (vkusvill_product_details)
+_DETAILS = {
+    1: {"name": "Молоко 3,2%", "price": {"current": 95}, "unit": "шт"},
+    2: {"name": "Хлеб бородинский", "price": {"current": 60}, "unit": "шт"},
+}
+
+
+def _call_tool(name: str, args: dict) -> str:
+    if name == "vkusvill_cart_link_create":
+        return json.dumps({"ok": True, "data": {"link": _LINK}})
+    details = _DETAILS.get(args["xml_id"])
+    if details is None:
+        return json.dumps({"ok": False, "error": "not found"})
+    return json.dumps({"ok": True, "data": details}, ensure_ascii=False)
+
+
+@pytest.fixture
+def mcp_client():
+    client = AsyncMock()
+    client.get_tools.return_value = [
+        {"name": "vkusvill_cart_link_create", "description": "Корзина", "parameters": {}},
+    ]
+    client.call_tool = AsyncMock(side_effect=_call_tool)
+    return client
+
+
+@pytest.fixture
+def snapshots():
+    return InMemoryCartSnapshotStore()
+
+
+@pytest.fixture
+def executor(mcp_client, snapshots):
+    search_processor = SearchProcessor()
+    return ToolExecutor(
+        mcp_client=mcp_client,
+        search_processor=search_processor,
+        cart_processor=CartProcessor(search_processor.price_cache),
+        cart_snapshot_store=snapshots,
+    )
+
+
+def _mcp_tools(mcp_client) -> list[str]:
+    return [c.args[0] for c in mcp_client.call_tool.call_args_list]
+
+
+class TestDescribeCart:
+    """Подпись кнопки выбора корзины."""
+
+    def test_full(self) -> None:
+        snapshot = {
+            "products": [{"xml_id": 1, "q": 1}, {"xml_id": 2, "q": 2}],
+            "total": 1234.4,
+            "created_at": "2026-10-12T09:30:00+00:00",
+        }
+        assert describe_cart(snapshot) == "12.10 · 2 поз. · 1234 руб"
+
+    def test_without_total_and_date(self) -> None:
+        assert describe_cart({"products": [{"xml_id": 1, "q": 1}]}) == "1 поз."
+
+
+class TestRefreshPrices:
+    """ToolExecutor.refresh_prices."""
+
+    async def test_cache_hits_skip_mcp(self, executor, mcp_client) -> None:
+        executor.cart_processor.price_cache[1] = {"name": "Молоко", "price": 89}
+
+        prices = await executor.refresh_prices([1])
+
+        assert prices[1].price == 89
+        mcp_client.call_tool.assert_not_called()
+
+    async def test_misses_fetched_and_cached(self, executor, mcp_client) -> None:
+        prices = await executor.refresh_prices([1, 2, 99])
+
+        assert {x: p.price for x, p in prices.items()} == {1: 95, 2: 60}
+        assert _mcp_tools(mcp_client) == ["vkusvill_product_details"] * 3
+        assert 2 in executor.cart_processor.price_cache
+
+    async def test_stale_cache_confirmed_via_mcp(self, executor, mcp_client) -> None:
+        price_cache = executor.cart_processor.price_cache
+        price_cache[1] = {"name": "Молоко", "price": 89}
+        price_cache[99] = {"name": "Снято с продажи", "price": 10}
+        for xml_id in (1, 99):
+            price_cache._stored_at[xml_id] -= REFRESH_PRICES_MAX_AGE + 1
+
+        prices = await executor.refresh_prices([1, 99])
+
+        assert {x: p.price for x, p in prices.items()} == {1: 95}
+        assert _mcp_tools(mcp_client) == ["vkusvill_product_details"] * 2
+
+    async def test_mcp_error_is_unavailable(self, executor, mcp_client) -> None:
+        mcp_client.call_tool.side_effect = ConnectionError("MCP down")
+        assert await executor.refresh_prices([1]) == {}
+
+
+class TestRepeat:
+    """CartRepeater.repeat."""
+
+    async def test_repeats_last_cart(self, executor, snapshots, mcp_client) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 2}, {"xml_id": 2, "q": 1}], "old", 250.0)
+
+        outcome = await CartRepeater(executor).repeat(1)
+
+        assert _mcp_tools(mcp_client).count("vkusvill_cart_link_create") == 1
+        assert "Повторил корзину от" in outcome.answer
+        assert "<b>Итого: 250.00 руб</b>" in outcome.answer
+        assert "Цены изменились" not in outcome.answer
+        assert _LINK in outcome.answer
+        roles = [m.role for m in outcome.messages]
+        assert roles == ["user", "assistant", "function", "assistant"]
+
+    async def test_price_change_and_unavailable(self, executor, snapshots) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}, {"xml_id": 99, "q": 1}], "old", 80.0)
+
+        outcome = await CartRepeater(executor).repeat(1)
+
+        assert "сейчас на 15.00 руб дороже" in outcome.answer
+        assert "Нет в продаже: 1 поз." in outcome.answer
+        cart = json.loads(outcome.messages[2].content)
+        assert cart["data"]["price_summary"]["total"] == 95
+
+    async def test_older_cart(self, executor, snapshots, mcp_client) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}], "a", 95.0)
+        older_id = (await snapshots.history(1))[0]["id"]
+        await snapshots.save(1, [{"xml_id": 2, "q": 1}], "b", 60.0)
+
+        await CartRepeater(executor).repeat(1, older_id)
+
+        cart_args = mcp_client.call_tool.call_args_list[-1].args[1]
+        assert cart_args["products"] == [{"xml_id": 1, "q": 1}]
+
+    async def test_unknown_cart_id(self, executor, snapshots, mcp_client) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}], "a", 95.0)
+
+        outcome = await CartRepeater(executor).repeat(1, "deadbeef00")
+
+        assert "Не нашёл сохранённой корзины" in outcome.answer
+        assert "vkusvill_cart_link_create" not in _mcp_tools(mcp_client)
+
+    async def test_nothing_available(self, executor, snapshots, mcp_client) -> None:
+        await snapshots.save(1, [{"xml_id": 99, "q": 1}], "old", 10.0)
+
+        outcome = await CartRepeater(executor).repeat(1)
+
+        assert "нет в продаже" in outcome.answer
+        assert "vkusvill_cart_link_create" not in _mcp_tools(mcp_client)
+
+    async def test_no_history(self, executor) -> None:
+        outcome = await CartRepeater(executor).repeat(1)
+        assert "Не нашёл сохранённой корзины" in outcome.answer
+        assert outcome.messages == []
+
+    async def test_cart_limit_message(self, executor, snapshots, mcp_client) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}], "old", 95.0)
+        limit = json.dumps({"error": "cart_limit_reached", "message": "Лимит корзин исчерпан"})
+
+        with patch.object(executor, "execute", AsyncMock(return_value=limit)):
+            outcome = await CartRepeater(executor).repeat(1)
+
+        assert outcome.answer == "Лимит корзин исчерпан"
+
+
+class TestGigaChatRepeatCart:
+    """GigaChatService.repeat_cart."""
+
+    @pytest.fixture
+    def service(self, mcp_client, executor):
+        return GigaChatService(
+            credentials="test-creds",
+            model="GigaChat",
+            scope="GIGACHAT_API_PERS",
+            mcp_client=mcp_client,
+            tool_executor=executor,
+            max_tool_calls=5,
+            max_history=20,
+        )
+
+    async def test_no_llm_and_history(self, service, snapshots) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}], "old", 95.0)
+
+        with patch.object(service._client, "chat") as chat:
+            answer = await service.repeat_cart(1)
+
+        chat.assert_not_called()
+        assert _LINK in answer
+        history = service._dialog_manager.get_history(1)
+        assert history[-1].content == answer
+        assert any(m.name == "vkusvill_cart_link_create" for m in history)
+        # повтор сохранил новый снимок, история не дублирует ту же корзину
+        assert len(await service.get_cart_history(1)) == 1
+
+    async def test_follow_up_goes_to_llm(self, service, snapshots) -> None:
+        await snapshots.save(1, [{"xml_id": 1, "q": 1}], "old", 95.0)
+        await service.repeat_cart(1)
+
+        with patch.object(
+            service._client, "chat", return_value=make_text_response("Добавил хлеб")
+        ) as chat:
+            await service.process_message(1, "добавь хлеб")
+
+        sent = chat.call_args.args[0].messages
+        assert any(m.name == "vkusvill_cart_link_create" for m in sent)
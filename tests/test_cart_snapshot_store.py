@@ -9,11 +9,13 @@
 """
 
 import json
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from vkuswill_bot.services.cart_snapshot_store import (
+    CART_HISTORY_SIZE,
+    CART_HISTORY_TTL,
     CART_SNAPSHOT_TTL,
     CartSnapshotStore,
     InMemoryCartSnapshotStore,
@@ -27,9 +29,18 @@ def mock_redis():
     redis.set = AsyncMock()
     redis.get = AsyncMock(return_value=None)
     redis.delete = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, 1, True, True])
+    redis.pipeline = MagicMock(return_value=pipe)
     return redis
 
 
+@pytest.fixture
+def pipe(mock_redis) -> MagicMock:
+    """Pipeline, через который save() пишет снимок и историю."""
+    return mock_redis.pipeline.return_value
+
+
 @pytest.fixture
 def store(mock_redis) -> CartSnapshotStore:
     """Экземпляр CartSnapshotStore с мок-Redis."""
@@ -39,8 +50,8 @@ def store(mock_redis) -> CartSnapshotStore:
 class TestSave:
     """Тесты save: сохранение снимка корзины."""
 
-    async def test_saves_snapshot(self, store, mock_redis):
-        """Сохраняет снимок корзины в Redis с TTL."""
+    async def test_saves_snapshot(self, store, mock_redis, pipe):
+        """Сохраняет снимок корзины в Redis с TTL одной транзакцией."""
         products = [{"xml_id": 100, "q": 2}]
         await store.save(
             user_id=42,
@@ -49,8 +60,10 @@ class TestSave:
             total=158.0,
         )
 
-        mock_redis.set.assert_called_once()
-        call_args = mock_redis.set.call_args
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        pipe.execute.assert_awaited_once()
+        pipe.set.assert_called_once()
+        call_args = pipe.set.call_args
         assert call_args[0][0] == "cart:42"
         data = json.loads(call_args[0][1])
         assert data["products"] == products
@@ -59,16 +72,16 @@ class TestSave:
         assert "created_at" in data
         assert call_args[1]["ex"] == CART_SNAPSHOT_TTL
 
-    async def test_saves_without_total(self, store, mock_redis):
+    async def test_saves_without_total(self, store, pipe):
         """Сохраняет снимок без total (None)."""
         await store.save(user_id=42, products=[], link="", total=None)
 
-        data = json.loads(mock_redis.set.call_args[0][1])
+        data = json.loads(pipe.set.call_args[0][1])
         assert data["total"] is None
 
-    async def test_redis_error_graceful(self, store, mock_redis):
+    async def test_redis_error_graceful(self, store, pipe):
         """Ошибка Redis при сохранении не крашит."""
-        mock_redis.set.side_effect = Exception("connection lost")
+        pipe.execute.side_effect = Exception("connection lost")
         # Не должно поднимать исключение
         await store.save(user_id=42, products=[], link="", total=None)
 
@@ -137,10 +150,11 @@ class TestCustomTTL:
 
     async def test_custom_ttl_applied(self):
         """Кастомный TTL передаётся в Redis."""
-        redis = AsyncMock()
+        redis = MagicMock()
+        redis.pipeline.return_value.execute = AsyncMock()
         store = CartSnapshotStore(redis=redis, ttl=3600)
         await store.save(user_id=1, products=[], link="", total=None)
-        assert redis.set.call_args[1]["ex"] == 3600
+        assert redis.pipeline.return_value.set.call_args[1]["ex"] == 3600
 
 
 # ============================================================================
@@ -198,3 +212,63 @@ class TestInMemoryCartSnapshotStore:
         r2 = await mem_store.get(user_id=2)
         assert r1["products"][0]["xml_id"] == 10
         assert r2["products"][0]["xml_id"] == 20
+
+
+class TestHistory:
+    """История последних корзин для «Повторить корзину»."""
+
+    async def test_redis_push_trim_expire(self, store, pipe):
+        """save() кладёт компактную запись в список и обрезает его в той же транзакции."""
+        await store.save(user_id=42, products=[{"xml_id": 100, "q": 2}], link="x", total=158.0)
+
+        key, raw = pipe.lpush.call_args[0]
+        assert key == "cart_history:42"
+        entry = json.loads(raw)
+        assert entry["items"] == [[100, 2]]
+        assert entry["total"] == 158.0
+        pipe.ltrim.assert_called_once_with("cart_history:42", 0, CART_HISTORY_SIZE - 1)
+        pipe.expire.assert_called_once_with("cart_history:42", CART_HISTORY_TTL)
+        pipe.execute.assert_awaited_once()
+
+    async def test_redis_read_dedups(self, store, mock_redis):
+        """Повторы одной корзины схлопываются, новые первыми."""
+        mock_redis.lrange = AsyncMock(
+            return_value=[
+                json.dumps({"items": [[1, 1]], "total": 90.0, "created_at": "c"}),
+                json.dumps({"items": [[2, 1]], "total": 50.0, "created_at": "b"}),
+                json.dumps({"items": [[1, 1]], "total": 80.0, "created_at": "a"}),
+            ]
+        )
+
+        history = await store.history(user_id=42)
+
+        assert [h["created_at"] for h in history] == ["c", "b"]
+        assert history[0]["products"] == [{"xml_id": 1, "q": 1}]
+
+    async def test_cart_id_stable(self):
+        """id корзины зависит от состава, а не от позиции в истории."""
+        mem_store = InMemoryCartSnapshotStore()
+        await mem_store.save(user_id=1, products=[{"xml_id": 1, "q": 1}], link="")
+        first_id = (await mem_store.history(user_id=1))[0]["id"]
+
+        await mem_store.save(user_id=1, products=[{"xml_id": 2, "q": 1}], link="")
+        history = await mem_store.history(user_id=1)
+
+        assert history[1]["id"] == first_id
+        assert history[0]["id"] != first_id
+
+    async def test_redis_error_graceful(self, store, mock_redis):
+        """Ошибка Redis при чтении истории → []."""
+        mock_redis.lrange = AsyncMock(side_effect=Exception("connection lost"))
+        assert await store.history(user_id=42) == []
+
+    async def test_in_memory_size_limit(self):
+        """In-memory хранит не больше history_size корзин."""
+        mem_store = InMemoryCartSnapshotStore(history_size=2)
+        for xml_id in (1, 2, 3):
+            await mem_store.save(user_id=1, products=[{"xml_id": xml_id, "q": 1}], link="")
+
+        history = await mem_store.history(user_id=1)
+
+        assert [h["products"][0]["xml_id"] for h in history] == [3, 2]
+        assert await mem_store.history(user_id=2) == []
@@ -0,0 +1,310 @@
+"""Тесты CatalogIndex и поиска через локальный каталог в ToolExecutor.
+
+Тестируем:
+- Индексация товаров из ответа поиска (upsert, ё → е)
+- Построение FTS5-запроса
+- Поиск с учётом свежести цен (PriceCache) и возраста записей
+- Фоновая очередь индексации (submit/start/stop)
+- Режимы ToolExecutor: fallback при ошибке/таймауте MCP и first
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.catalog_index import (
+    LOCAL_SOURCE,
+    MODE_FIRST,
+    CatalogIndex,
+)
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+
+def _search_response(items: list[dict], query: str = "молоко") -> str:
+    return json.dumps(
+        {"ok": True, "data": {"meta": {"q": query}, "items": items}},
+        ensure_ascii=False,
+    )
+
+
+MILK_ITEMS = [
+    {
+        "xml_id": 100,
+        "name": "Молоко 3,2% 1 л",
+        "price": {"current": 99, "currency": "RUB"},
+        "unit": "шт",
+        "weight": {"value": 1000, "unit": "мл"},
+        "rating": 4.9,
+        "description": "Длинное описание",
+    },
+    {
+        "xml_id": 101,
+        "name": "Молоко безлактозное",
+        "price": {"current": 120},
+        "unit": "шт",
+        "rating": 4.5,
+    },
+    {
+        "xml_id": 200,
+        "name": "Ёжики мясные",
+        "price": {"current": 300},
+        "unit": "шт",
+    },
+]
+
+
+# ---- Фикстуры ----
+
+
+@pytest.fixture
+def price_cache() -> PriceCache:
+    return PriceCache()
+
+
+@pytest.fixture
+async def index(tmp_path, price_cache):
+    """CatalogIndex с временной БД."""
+    idx = CatalogIndex(str(tmp_path / "catalog.db"), price_cache)
+    yield idx
+    await idx.close()
+
+
+async def _fill(index: CatalogIndex, price_cache: PriceCache) -> None:
+    """Проиндексировать MILK_ITEMS и положить цены в кеш."""
+    raw = _search_response(MILK_ITEMS)
+    await SearchProcessor(price_cache).cache_prices(raw)
+    await index.index_results([raw])
+
+
+# ============================================================================
+# Индексация и поиск
+# ============================================================================
+
+
+class TestIndexing:
+    """Запись товаров в индекс."""
+
+    async def test_index_results_counts_items(self, index):
+        count = await index.index_results([_search_response(MILK_ITEMS)])
+        assert count == 3
+        assert await index.count() == 3
+
+    async def test_upsert_updates_existing(self, index):
+        await index.index_results([_search_response(MILK_ITEMS)])
+        renamed = [{**MILK_ITEMS[0], "name": "Кефир 1%"}]
+        await index.index_results([_search_response(renamed)])
+
+        assert await index.count() == 3
+        assert [r["xml_id"] for r in await index.search("кефир")] == [100]
+        assert all(r["xml_id"] != 100 for r in await index.search("молоко"))
+
+    async def test_skips_local_results(self, index):
+        """Ответы самого индекса повторно не индексируются."""
+        local = json.dumps(
+            {"ok": True, "data": {"meta": {"source": LOCAL_SOURCE}, "items": MILK_ITEMS}}
+        )
+        assert await index.index_results([local]) == 0
+
+    async def test_invalid_payloads_ignored(self, index):
+        bad = _search_response([{"name": "Без id"}, "строка", {"xml_id": 1}])
+        assert await index.index_results(["не json", bad]) == 0
+
+
+class TestSearch:
+    """Поиск по индексу."""
+
+    def test_build_match_query(self):
+        assert CatalogIndex.build_match_query("Молока 2 л") == '"молок"*'
+        assert CatalogIndex.build_match_query("сыр ёлка") == '"сыр"* "елк"*'
+        assert CatalogIndex.build_match_query("чай") == '"чай"*'
+        assert CatalogIndex.build_match_query("!!") == ""
+
+    async def test_inflected_query_matches(self, index, price_cache):
+        await _fill(index, price_cache)
+        rows = await index.search("молока")
+        assert {r["xml_id"] for r in rows} == {100, 101}
+
+    async def test_yo_folding(self, index, price_cache):
+        await _fill(index, price_cache)
+        rows = await index.search("ежики")
+        assert [r["xml_id"] for r in rows] == [200]
+
+    async def test_all_words_required(self, index, price_cache):
+        await _fill(index, price_cache)
+        rows = await index.search("молоко безлактозное")
+        assert [r["xml_id"] for r in rows] == [101]
+
+    async def test_expired_rows_not_returned(self, tmp_path, price_cache):
+        idx = CatalogIndex(str(tmp_path / "c.db"), price_cache, max_age=-1)
+        try:
+            await _fill(idx, price_cache)
+            assert await idx.search("молоко") == []
+        finally:
+            await idx.close()
+
+
+class TestSearchResult:
+    """Сборка ответа в формате MCP."""
+
+    async def test_prices_from_price_cache(self, index, price_cache):
+        await _fill(index, price_cache)
+        await price_cache.set(100, name="Молоко 3,2% 1 л", price=89, unit="шт")
+
+        result = json.loads(await index.search_result("молоко", limit=5))
+        items = {i["xml_id"]: i for i in result["data"]["items"]}
+        assert items[100]["price"] == {"current": 89}
+        assert items[100]["weight"] == {"value": 1000, "unit": "мл"}
+        assert result["data"]["meta"] == {"q": "молоко", "source": LOCAL_SOURCE}
+
+    async def test_items_without_fresh_price_skipped(self, index):
+        """Без цены в PriceCache товар не отдаётся."""
+        await index.index_results([_search_response(MILK_ITEMS)])
+        assert await index.search_result("молоко") is None
+        assert index.local_misses == 1
+
+    async def test_min_hits(self, index, price_cache):
+        await _fill(index, price_cache)
+        assert await index.search_result("молоко", min_hits=3) is None
+        assert await index.search_result("молоко", min_hits=2) is not None
+        assert index.local_hits == 1
+
+    def test_unknown_mode_rejected(self, tmp_path, price_cache):
+        with pytest.raises(ValueError):
+            CatalogIndex(str(tmp_path / "c.db"), price_cache, mode="never")
+
+
+class TestBackgroundIndexing:
+    """Фоновая очередь индексации."""
+
+    async def test_submit_and_stop_flushes(self, index):
+        index.start()
+        index.submit(_search_response(MILK_ITEMS))
+        await asyncio.sleep(0.05)
+        index.submit(_search_response([{"xml_id": 5, "name": "Хлеб"}]))
+        await index.stop()
+        assert await index.count() == 4
+
+
+# ============================================================================
+# Интеграция с ToolExecutor
+# ============================================================================
+
+
+def _executor(mcp_client: AsyncMock, price_cache: PriceCache, index: CatalogIndex):
+    return ToolExecutor(
+        mcp_client=mcp_client,
+        search_processor=SearchProcessor(price_cache),
+        cart_processor=CartProcessor(price_cache),
+        catalog_index=index,
+    )
+
+
+class TestToolExecutorCatalog:
+    """Поиск через ToolExecutor с локальным каталогом."""
+
+    async def test_fallback_on_mcp_error(self, index, price_cache):
+        await _fill(index, price_cache)
+        mcp = AsyncMock()
+        mcp.call_tool.side_effect = RuntimeError("MCP down")
+        executor = _executor(mcp, price_cache, index)
+
+        result = json.loads(
+            await executor.execute("vkusvill_products_search", {"q": "молоко"}, user_id=1)
+        )
+        assert result["data"]["meta"]["source"] == LOCAL_SOURCE
+        assert {i["xml_id"] for i in result["data"]["items"]} == {100, 101}
+
+    async def test_error_when_index_empty(self, index):
+        mcp = AsyncMock()
+        mcp.call_tool.side_effect = RuntimeError("MCP down")
+        executor = _executor(mcp, index._price_cache, index)
+
+        result = json.loads(
+            await executor.execute("vkusvill_products_search", {"q": "молоко"}, user_id=1)
+        )
+        assert "error" in result
+
+    async def test_fallback_on_timeout(self, tmp_path, price_cache):
+        idx = CatalogIndex(str(tmp_path / "c.db"), price_cache, mcp_timeout=0.01)
+        try:
+            await _fill(idx, price_cache)
+
+            async def slow(*_args, **_kwargs):
+                await asyncio.sleep(1)
+                return _search_response([])
+
+            mcp = AsyncMock()
+            mcp.call_tool.side_effect = slow
+            result = json.loads(
+                await _executor(mcp, price_cache, idx).execute(
+                    "vkusvill_products_search", {"q": "молоко"}, user_id=1
+                )
+            )
+            assert result["data"]["meta"]["source"] == LOCAL_SOURCE
+        finally:
+            await idx.close()
+
+    async def test_mcp_used_when_available(self, index, price_cache):
+        await _fill(index, price_cache)
+        mcp = AsyncMock()
+        mcp.call_tool.return_value = _search_response(MILK_ITEMS[:1])
+        executor = _executor(mcp, price_cache, index)
+
+        result = await executor.execute("vkusvill_products_search", {"q": "молоко"}, user_id=1)
+        assert LOCAL_SOURCE not in result
+        mcp.call_tool.assert_awaited_once()
+
+    async def test_first_mode_skips_mcp(self, tmp_path, price_cache):
+        idx = CatalogIndex(str(tmp_path / "c.db"), price_cache, mode=MODE_FIRST, min_hits=2)
+        try:
+            await _fill(idx, price_cache)
+            mcp = AsyncMock()
+            result = json.loads(
+                await _executor(mcp, price_cache, idx).execute(
+                    "vkusvill_products_search", {"q": "молоко", "limit": 5}, user_id=1
+                )
+            )
+            assert result["data"]["meta"]["source"] == LOCAL_SOURCE
+            mcp.call_tool.assert_not_awaited()
+        finally:
+            await idx.close()
+
+    async def test_local_result_not_cached_back(self, tmp_path, price_cache):
+        """Ответ индекса не пишет цены в кеш и не уходит в индекс (поиск и пакет)."""
+        idx = CatalogIndex(str(tmp_path / "c.db"), price_cache, mode=MODE_FIRST, min_hits=1)
+        try:
+            await _fill(idx, price_cache)
+            executor = _executor(AsyncMock(), price_cache, idx)
+            local = await executor.execute("vkusvill_products_search", {"q": "молоко"}, user_id=1)
+            assert idx.is_local_result(local)
+
+            with (
+                patch.object(executor._search_processor, "cache_prices") as cache_prices,
+                patch.object(idx, "submit") as submit,
+            ):
+                await executor.postprocess_result(
+                    "vkusvill_products_search", {"q": "молоко"}, local, {}, {}
+                )
+                await executor.execute("products_search_batch", {"queries": ["молоко"]}, 1)
+
+            cache_prices.assert_not_called()
+            submit.assert_not_called()
+        finally:
+            await idx.close()
+
+    def test_mcp_result_not_local(self):
+        assert not CatalogIndex.is_local_result(_search_response(MILK_ITEMS))
+
+    async def test_postprocess_submits_to_index(self, index, price_cache):
+        mcp = AsyncMock()
+        executor = _executor(mcp, price_cache, index)
+        raw = _search_response(MILK_ITEMS)
+
+        await executor.postprocess_result("vkusvill_products_search", {"q": "молоко"}, raw, {}, {})
+        await index.stop()
+        assert await index.count() == 3
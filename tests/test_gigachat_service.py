@@ -13,6 +13,7 @@
 - Закрытие сервиса
 - Маршрутизация локальных tool-вызовов (предпочтения)
 - Инструмент recipe_ingredients (кеш рецептов)
+- План питания recipes_plan
 """
 
 import json
@@ -33,6 +34,7 @@ from vkuswill_bot.services.gigachat_service import (
     MAX_USER_MESSAGE_LENGTH,
 )
 from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.recipe_search import RecipeSearchService
 from vkuswill_bot.services.search_processor import SearchProcessor
 from vkuswill_bot.services.tool_executor import ToolExecutor
 from helpers import make_text_response, make_function_call_response
@@ -690,6 +692,11 @@ class TestGetFunctions:
         assert "get_previous_cart" in names
         mock_mcp_client.get_tools.assert_called_once()
 
+    async def test_includes_batch_search(self, service):
+        """Пакетный поиск доступен всегда."""
+        names = [f["name"] for f in await service._get_functions()]
+        assert "products_search_batch" in names
+
     async def test_caches_result(self, service, mock_mcp_client):
         """Повторный вызов не обращается к MCP."""
         await service._get_functions()
@@ -1437,6 +1444,120 @@ class TestRecipeToolRouting:
         mock_mcp_client.call_tool.assert_not_called()
 
 
+# ============================================================================
+# recipes_plan: план питания из нескольких блюд
+# ============================================================================
+
+_PLAN_RECIPES = {
+    "омлет": {
+        "servings": 2,
+        "ingredients": [
+            {"name": "яйца", "quantity": 4, "unit": "шт", "search_query": "яйца"},
+            {"name": "молоко", "quantity": 100, "unit": "мл", "search_query": "молоко"},
+        ],
+    },
+    "блины": {
+        "servings": 2,
+        "ingredients": [
+            {"name": "молоко", "quantity": 500, "unit": "мл", "search_query": "молоко"},
+            {"name": "мука", "quantity": 200, "unit": "г", "search_query": "мука пшеничная"},
+        ],
+    },
+}
+
+
+class TestRecipesPlan:
+    """recipes_plan: рецепты всех блюд и один пакетный поиск ингредиентов."""
+
+    @pytest.fixture
+    def plan_service(self, mock_mcp_client, mock_recipe_store) -> GigaChatService:
+        mock_recipe_store.get.side_effect = lambda dish, **kw: _PLAN_RECIPES.get(dish)
+
+        def call_tool(name, args):
+            item = {
+                "xml_id": len(args["q"]),
+                "name": args["q"],
+                "price": {"current": 100},
+                "unit": "л",
+            }
+            return json.dumps(
+                {"ok": True, "data": {"meta": {"q": args["q"]}, "items": [item]}},
+                ensure_ascii=False,
+            )
+
+        mock_mcp_client.call_tool = AsyncMock(side_effect=call_tool)
+        search_processor = SearchProcessor()
+        executor = ToolExecutor(
+            mcp_client=mock_mcp_client,
+            search_processor=search_processor,
+            cart_processor=CartProcessor(search_processor.price_cache),
+            recipe_search_service=RecipeSearchService(mock_mcp_client, search_processor),
+        )
+        return GigaChatService(
+            credentials="test-creds",
+            model="GigaChat",
+            scope="GIGACHAT_API_PERS",
+            mcp_client=mock_mcp_client,
+            recipe_store=mock_recipe_store,
+            tool_executor=executor,
+            max_tool_calls=5,
+            max_history=10,
+        )
+
+    async def test_tool_registered(self, service_with_recipes, service):
+        names = [f["name"] for f in await service_with_recipes._get_functions()]
+        assert "recipes_plan" in names
+        assert "recipes_plan" not in [f["name"] for f in await service._get_functions()]
+
+    async def test_single_step_plan(self, plan_service, mock_mcp_client):
+        plan_args = {"dishes": [{"dish": "омлет", "servings": 2}, {"dish": "блины"}]}
+        chats: list = []
+
+        def mock_chat(chat):
+            chats.append(chat)
+            if len(chats) == 1:
+                return make_function_call_response("recipes_plan", plan_args)
+            return make_text_response("План готов")
+
+        with patch.object(plan_service._client, "chat", side_effect=mock_chat):
+            answer = await plan_service.process_message(user_id=1, text="Меню на 2 дня")
+
+        assert answer == "План готов"
+        assert len(chats) == 2
+        # молоко из двух блюд — один поиск: всего 3 ингредиента
+        assert mock_mcp_client.call_tool.call_count == 3
+        result = json.loads(chats[1].messages[-1].content)
+        assert result["ok"] is True
+        assert [d["dish"] for d in result["dishes"]] == ["омлет", "блины"]
+        milk = next(r for r in result["results"] if r["search_query"] == "молоко")
+        assert milk["dishes"] == ["омлет", "блины"]
+        assert milk["best_match"]["suggested_q"] == 0.6
+        assert plan_service._get_search_log(1)["молоко"] == {len("молоко")}
+
+    async def test_without_recipe_search(self, service_with_recipes, mock_recipe_store):
+        mock_recipe_store.get.side_effect = lambda dish, **kw: _PLAN_RECIPES.get(dish)
+
+        result = json.loads(
+            await service_with_recipes._handle_recipes_plan(
+                {"dishes": ["омлет", "блины"]}, 1, AsyncMock()
+            )
+        )
+
+        assert result["ok"] is True
+        assert len(result["ingredients"]) == 3
+        assert "products_search_batch" in result["hint"]
+
+    async def test_no_recipes(self, plan_service, mock_mcp_client):
+        with patch.object(plan_service._client, "chat", side_effect=RuntimeError("down")):
+            result = json.loads(
+                await plan_service._handle_recipes_plan({"dishes": ["жаркое"]}, 1, AsyncMock())
+            )
+
+        assert result["ok"] is False
+        assert "error" in result["dishes"][0]
+        mock_mcp_client.call_tool.assert_not_called()
+
+
 # ============================================================================
 # recipe_ingredients: дополнительные edge-cases
 # ============================================================================
@@ -2,12 +2,12 @@
 
 Тестируем:
 - _split_message: разбивка длинных сообщений
-- Команды /start, /help, /reset
+- Команды /start, /help, /reset, /repeat
 - handle_text: основной обработчик с моком GigaChatService
 - _send_typing_periodically: периодический typing indicator
 - Deep-link парсинг в /start
 - Survey flow (cmd_survey, callbacks)
-- Admin-команды: analytics, funnel, grant_carts, survey_stats
+- Admin-команды: analytics, funnel, grant_carts, survey_stats, profile, memory
 """
 
 import asyncio
@@ -23,10 +23,12 @@ from vkuswill_bot.bot.handlers import (
     cart_feedback_negative,
     cart_feedback_positive,
     cart_feedback_reason,
+    cart_repeat_callback,
     cmd_help,
     cmd_link_voice,
     cmd_unlink_voice,
     cmd_privacy,
+    cmd_repeat,
     cmd_reset,
     cmd_start,
     cmd_survey,
@@ -34,6 +36,8 @@ from vkuswill_bot.bot.handlers import (
     cmd_admin_cart_feedback,
     cmd_admin_funnel,
     cmd_admin_grant_carts,
+    cmd_admin_memory,
+    cmd_admin_profile,
     cmd_admin_reset_carts,
     cmd_admin_survey_stats,
     consent_accept_callback,
@@ -1827,3 +1831,163 @@ class TestExtractCartLinkWithFeedback:
         """Без ссылки на корзину — keyboard=None."""
         _text, keyboard = _extract_cart_link("Просто текст")
         assert keyboard is None
+
+
+# ============================================================================
+# «Повторить корзину»
+# ============================================================================
+
+
+class TestRepeatCart:
+    """/repeat, кнопки выбора корзины и «повтори корзину» текстом."""
+
+    _ANSWER = (
+        'Повторил корзину\n\n<a href="https://vkusvill.ru/?share_basket=1">Открыть корзину</a>'
+    )
+
+    def _service(self, carts: list[dict]) -> MagicMock:
+        service = MagicMock()
+        service.get_cart_history = AsyncMock(return_value=carts)
+        service.repeat_cart = AsyncMock(return_value=self._ANSWER)
+        service.process_message = AsyncMock()
+        return service
+
+    async def test_no_carts(self):
+        msg = make_message("/repeat", user_id=42)
+        service = self._service([])
+
+        await cmd_repeat(msg, gigachat_service=service)
+
+        service.repeat_cart.assert_not_called()
+        assert "нет" in msg.answer.call_args[0][0]
+
+    async def test_single_cart_repeated_at_once(self):
+        msg = make_message("/repeat", user_id=42)
+        service = self._service([{"id": "a1", "products": [{"xml_id": 1, "q": 1}]}])
+
+        await cmd_repeat(msg, gigachat_service=service)
+
+        service.repeat_cart.assert_awaited_once_with(42, None)
+        # ссылка ушла в inline-кнопку
+        assert msg.answer.call_args[1]["reply_markup"] is not None
+
+    async def test_several_carts_picker(self):
+        msg = make_message("/repeat", user_id=42)
+        carts = [
+            {"id": "a1", "products": [{"xml_id": 1, "q": 1}], "total": 100.0},
+            {"id": "b2", "products": [{"xml_id": 2, "q": 1}], "total": 50.0},
+        ]
+        service = self._service(carts)
+
+        await cmd_repeat(msg, gigachat_service=service)
+
+        service.repeat_cart.assert_not_called()
+        keyboard = msg.answer.call_args[1]["reply_markup"]
+        data = [row[0].callback_data for row in keyboard.inline_keyboard]
+        assert data == ["cart_repeat_a1", "cart_repeat_b2"]
+
+    async def test_callback_repeats_chosen_cart(self):
+        callback = _make_callback_query("cart_repeat_b2")
+        callback.message.edit_reply_markup = AsyncMock()
+        callback.message.answer = AsyncMock()
+        service = self._service([])
+
+        await cart_repeat_callback(callback, gigachat_service=service)
+
+        service.repeat_cart.assert_awaited_once_with(42, "b2")
+        callback.answer.assert_awaited_once()
+        callback.message.answer.assert_awaited_once()
+
+    async def test_text_command_skips_llm(self):
+        msg = make_message("Повтори последнюю корзину!", user_id=42)
+        service = self._service([])
+
+        await handle_text(msg, gigachat_service=service)
+
+        service.repeat_cart.assert_awaited_once_with(42, None)
+        service.process_message.assert_not_called()
+
+    async def test_repeat_error_reported(self):
+        msg = make_message("/repeat", user_id=42)
+        service = self._service([{"id": "a1", "products": [{"xml_id": 1, "q": 1}]}])
+        service.repeat_cart.side_effect = RuntimeError("boom")
+
+        await cmd_repeat(msg, gigachat_service=service)
+
+        assert "Не получилось" in msg.answer.call_args[0][0]
+
+
+# ============================================================================
+# /admin_profile, /admin_memory
+# ============================================================================
+
+
+class TestAdminProfiling:
+    """Профиль event loop и снимки tracemalloc по команде администратора."""
+
+    async def test_profile_sends_collapsed_stacks(self):
+        from collections import Counter
+
+        from vkuswill_bot.services.profiler import ProfileResult
+
+        msg = make_message("/admin_profile 3", user_id=1)
+        msg.answer_document = AsyncMock()
+        profiler = MagicMock(running=False)
+        profiler.capture = AsyncMock(
+            return_value=ProfileResult(
+                seconds=3,
+                samples=4,
+                stacks=Counter(
+                    {"main (a.py:1);<lambda> (b.py:2)": 3, "select (selectors.py:1)": 1}
+                ),
+            )
+        )
+
+        await cmd_admin_profile(msg, profiler=profiler)
+
+        profiler.capture.assert_awaited_once_with(3)
+        document = msg.answer_document.call_args[0][0]
+        assert document.filename.endswith(".collapsed")
+        assert b"main (a.py:1);<lambda> (b.py:2) 3" in document.data
+        assert "простой: 25%" in msg.answer_document.call_args.kwargs["caption"]
+        assert "&lt;lambda&gt;" in msg.answer.call_args[0][0]
+
+    async def test_profile_already_running(self):
+        msg = make_message("/admin_profile", user_id=1)
+        profiler = MagicMock(running=True)
+        profiler.capture = AsyncMock()
+
+        await cmd_admin_profile(msg, profiler=profiler)
+
+        profiler.capture.assert_not_called()
+        assert "уже запущено" in msg.answer.call_args[0][0]
+
+    async def test_memory_flow(self):
+        from vkuswill_bot.services.profiler import MemoryTracker
+
+        tracker = MemoryTracker()
+        cache: list[str] = []
+        tracker.track("price_cache", cache)
+
+        await cmd_admin_memory(make_message("/admin_memory start"), memory_tracker=tracker)
+        cache.extend(["x" * 100] * 50)
+        msg = make_message("/admin_memory diff")
+        await cmd_admin_memory(msg, memory_tracker=tracker)
+        await cmd_admin_memory(make_message("/admin_memory stop"), memory_tracker=tracker)
+
+        text = msg.answer.call_args[0][0]
+        assert "price_cache: 0 → 50" in text
+        assert "Рост по строкам" in text
+        assert not tracker.active
+
+    async def test_memory_diff_without_start(self):
+        msg = make_message("/admin_memory diff")
+        await cmd_admin_memory(
+            msg, memory_tracker=MagicMock(diff=MagicMock(side_effect=RuntimeError))
+        )
+        assert "/admin_memory start" in msg.answer.call_args[0][0]
+
+    async def test_memory_usage(self):
+        msg = make_message("/admin_memory")
+        await cmd_admin_memory(msg, memory_tracker=MagicMock())
+        assert "Использование" in msg.answer.call_args[0][0]
@@ -0,0 +1,231 @@
+"""Тесты ListFastPath (корзина по простому списку покупок без LLM).
+
+Тестируем:
+- Разбор однозначных списков и отказ для сложных сообщений
+- Ответ по шаблону из price_summary
+- Выбор лучшего товара и низкую уверенность
+- Интеграцию с GigaChatService: ответ без LLM, fallback, история
+"""
+
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from helpers import make_text_response
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.list_fast_path import (
+    ListFastPath,
+    parse_list,
+    render_cart_answer,
+)
+from vkuswill_bot.services.prompts import CART_DISCLAIMER
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+_CATALOG = {
+    "молоко": [{"xml_id": 1, "name": "Молоко 3,2%", "price": {"current": 89}, "unit": "шт"}],
+    "хлеб": [{"xml_id": 2, "name": "Хлеб бородинский", "price": {"current": 55}, "unit": "шт"}],
+    "сыр": [{"xml_id": 3, "name": "Сыр российский", "price": {"current": 250}, "unit": "шт"}],
+}
+
+_LINK = "https://vkusvill.ru/?share_basket=42"
+
+
+def _call_tool(name: str, args: dict) -> str:
+    if name == "vkusvill_cart_link_create":
+        return json.dumps({"ok": True, "data": {"link": _LINK}})
+    return json.dumps(
+        {"ok": True, "data": {"meta": {"q": args["q"]}, "items": _CATALOG.get(args["q"], [])}},
+        ensure_ascii=False,
+    )
+
+
+@pytest.fixture
+def mcp_client():
+    client = AsyncMock()
+    client.get_tools.return_value = [
+        {"name": "vkusvill_products_search", "description": "Поиск", "parameters": {}},
+        {"name": "vkusvill_cart_link_create", "description": "Корзина", "parameters": {}},
+    ]
+    client.call_tool = AsyncMock(side_effect=_call_tool)
+    return client
+
+
+@pytest.fixture
+def executor(mcp_client):
+    search_processor = SearchProcessor()
+    return ToolExecutor(
+        mcp_client=mcp_client,
+        search_processor=search_processor,
+        cart_processor=CartProcessor(search_processor.price_cache),
+    )
+
+
+@pytest.fixture
+def service(mcp_client, executor):
+    return GigaChatService(
+        credentials="test-creds",
+        model="GigaChat",
+        scope="GIGACHAT_API_PERS",
+        mcp_client=mcp_client,
+        tool_executor=executor,
+        max_tool_calls=5,
+        max_history=20,
+        fast_path=ListFastPath(executor),
+    )
+
+
+def _cart_result(**data) -> str:
+    return json.dumps({"ok": True, "data": data}, ensure_ascii=False)
+
+
+_SUMMARY = {
+    "items": ["  - Молоко: 89 руб/шт x 1 = 89.00 руб"],
+    "total": 89.0,
+    "total_text": "Итого: 89.00 руб",
+}
+
+
+class TestParseList:
+    """Отбор сообщений для быстрого пути."""
+
+    def test_simple_list(self) -> None:
+        assert parse_list("молоко, хлеб и сыр") == ["молоко", "хлеб", "сыр"]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "молоко 2 литра, хлеб",
+            "молоко и хлеб?",
+            "добавь еще молоко и хлеб",
+            "убери молоко и хлеб",
+            "продукты для борща и салата",
+            "молоко, хлеб без глютена",
+            "привет",
+        ],
+    )
+    def test_needs_llm(self, text) -> None:
+        assert parse_list(text) == []
+
+    def test_max_items(self) -> None:
+        assert parse_list("молоко, хлеб, сыр", max_items=2) == []
+
+
+class TestRenderCartAnswer:
+    """Ответ по шаблону системного промпта."""
+
+    def test_template(self) -> None:
+        answer = render_cart_answer(_cart_result(link=_LINK, price_summary=_SUMMARY))
+
+        assert answer is not None
+        assert "1. Молоко: 89 руб/шт x 1 = 89.00 руб" in answer
+        assert "<b>Итого: 89.00 руб</b>" in answer
+        assert f'<a href="{_LINK}">' in answer
+        assert CART_DISCLAIMER in answer
+
+    @pytest.mark.parametrize(
+        "result",
+        [
+            _cart_result(link=_LINK),
+            _cart_result(price_summary=_SUMMARY),
+            _cart_result(
+                link=_LINK,
+                price_summary={"items": ["  - xml_id=1: цена неизвестна"], "total_text": "-"},
+            ),
+            _cart_result(link=_LINK, price_summary=_SUMMARY, duplicate_warning="похожие"),
+            json.dumps({"ok": False, "error": "limit"}),
+            "не JSON",
+        ],
+    )
+    def test_left_to_llm(self, result) -> None:
+        assert render_cart_answer(result) is None
+
+
+class TestRun:
+    """Запуск быстрого пути поверх ToolExecutor."""
+
+    async def test_served(self, executor, mcp_client) -> None:
+        fast_path = ListFastPath(executor)
+        search_log: dict[str, set[int]] = {}
+
+        outcome = await fast_path.run(1, "молоко, хлеб и сыр", search_log)
+
+        assert outcome is not None and outcome.answer is not None
+        assert "Итого: 394.00 руб" in outcome.answer
+        cart_call = mcp_client.call_tool.call_args_list[-1]
+        assert cart_call.args[0] == "vkusvill_cart_link_create"
+        assert [p["xml_id"] for p in cart_call.args[1]["products"]] == [1, 2, 3]
+        assert search_log == {"молоко": {1}, "хлеб": {2}, "сыр": {3}}
+        assert fast_path.stats["served"] == 1
+
+    async def test_not_found_low_confidence(self, executor, mcp_client) -> None:
+        fast_path = ListFastPath(executor)
+
+        outcome = await fast_path.run(1, "молоко, хлеб и авокадо", {})
+
+        assert outcome is not None and outcome.answer is None
+        assert [m.function_call.name for m in outcome.messages if m.function_call] == [
+            "products_search_batch"
+        ]
+        assert all(
+            c.args[0] != "vkusvill_cart_link_create" for c in mcp_client.call_tool.mock_calls
+        )
+        assert fast_path.stats["low_confidence"] == 1
+
+    async def test_preferences_go_to_llm(self, executor, mcp_client) -> None:
+        fast_path = ListFastPath(executor)
+
+        with patch.object(executor, "load_preferences", AsyncMock(return_value={"молоко": "2,5%"})):
+            assert await fast_path.run(1, "молоко и хлеб", {}) is None
+        mcp_client.call_tool.assert_not_called()
+
+    async def test_error_goes_to_llm(self, executor, mcp_client) -> None:
+        mcp_client.call_tool.side_effect = ConnectionError("MCP down")
+        fast_path = ListFastPath(executor)
+
+        outcome = await fast_path.run(1, "молоко и хлеб", {})
+
+        # упавшие поиски — не найдено, решение за LLM
+        assert outcome is not None and outcome.answer is None
+
+
+class TestGigaChatIntegration:
+    """GigaChatService отвечает без LLM и пишет связную историю."""
+
+    async def test_no_llm_calls(self, service) -> None:
+        with patch.object(service._client, "chat") as chat:
+            answer = await service.process_message(user_id=1, text="молоко, хлеб и сыр")
+
+        chat.assert_not_called()
+        assert _LINK in answer
+        history = service._dialog_manager.get_history(1)
+        roles = [m.role for m in history[1:]]
+        assert roles == ["user", "assistant", "function", "assistant", "function", "assistant"]
+        assert history[-1].content == answer
+
+    async def test_follow_up_uses_llm_with_history(self, service) -> None:
+        with patch.object(service._client, "chat"):
+            await service.process_message(user_id=1, text="молоко, хлеб и сыр")
+
+        with patch.object(
+            service._client, "chat", return_value=make_text_response("Убрал сыр")
+        ) as chat:
+            answer = await service.process_message(user_id=1, text="убери сыр")
+
+        assert answer == "Убрал сыр"
+        sent = chat.call_args.args[0].messages
+        assert any(m.name == "vkusvill_cart_link_create" for m in sent)
+
+    async def test_low_confidence_falls_back(self, service, mcp_client) -> None:
+        with patch.object(
+            service._client, "chat", return_value=make_text_response("Авокадо нет")
+        ) as chat:
+            answer = await service.process_message(user_id=1, text="молоко, хлеб и авокадо")
+
+        assert answer == "Авокадо нет"
+        # модель видит готовый пакетный поиск и не повторяет его
+        sent = chat.call_args.args[0].messages
+        assert sent[-1].name == "products_search_batch"
+        assert chat.call_count == 1
@@ -0,0 +1,128 @@
+"""Тесты мониторинга event loop.
+
+Тестируем:
+- Замер задержки цикла (stats, гистограмма)
+- Детектор медленных callback: стек блокирующего кода в логе
+- Запись блокировки — в потоке event loop, не в сторожевом потоке
+- Ограничение числа стеков в логе
+- Сводку в /health
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from vkuswill_bot.services import metrics
+from vkuswill_bot.services.loop_monitor import MAX_STACKS_PER_MINUTE, LoopMonitor
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+def _blocking_work(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class TestLag:
+    def test_record_lag(self) -> None:
+        monitor = LoopMonitor()
+        monitor.record_lag(0.002)
+        monitor.record_lag(0.05)
+        monitor.record_lag(-0.001)  # таймер не опаздывает «в минус»
+        assert monitor.stats["samples"] == 3
+        assert monitor.stats["lag_last"] == 0.0
+        assert monitor.stats["lag_max"] == 0.05
+        assert metrics.LOOP_LAG.count() == 3
+        assert monitor.health() == {"lag_ms": 0.0, "lag_max_ms": 50.0, "slow_callbacks": 0}
+
+    async def test_blocked_loop_measured(self) -> None:
+        monitor = LoopMonitor(interval=0.01)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.03)
+            _blocking_work(0.1)
+            await _wait_for(lambda: monitor.stats["lag_max"] >= 0.05)
+        finally:
+            await monitor.stop()
+        assert monitor.stats["lag_max"] >= 0.05
+        assert monitor.stats["slow_callbacks"] == 0  # детектор выключен
+
+
+class TestSlowCallbacks:
+    async def test_stack_of_blocking_code_logged(self, caplog) -> None:
+        monitor = LoopMonitor(interval=1.0, slow_callback_ms=20)
+        with caplog.at_level(logging.WARNING, logger="vkuswill_bot.services.loop_monitor"):
+            monitor.start()
+            try:
+                await asyncio.sleep(0.05)
+                _blocking_work(0.2)
+                await _wait_for(lambda: monitor.stats["slow_callbacks"] >= 1)
+            finally:
+                await monitor.stop()
+
+        assert monitor.stats["slow_callbacks"] >= 1
+        assert monitor.stats["slow_callback_max"] >= 0.1
+        assert metrics.LOOP_SLOW_CALLBACKS.value() >= 1
+        assert any("_blocking_work" in r.getMessage() for r in caplog.records)
+
+    async def test_recorded_on_loop_thread(self) -> None:
+        """Метрики и stats без блокировок пишутся только из потока цикла."""
+        monitor = LoopMonitor(interval=1.0, slow_callback_ms=20)
+        threads: list[int] = []
+        record = monitor.record_slow_callback
+
+        def spy(blocked: float, stack: str | None) -> None:
+            threads.append(threading.get_ident())
+            record(blocked, stack)
+
+        monitor.record_slow_callback = spy
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            _blocking_work(0.2)
+            await _wait_for(lambda: bool(threads))
+        finally:
+            await monitor.stop()
+
+        assert threads
+        assert set(threads) == {threading.get_ident()}
+        assert monitor.stats["slow_callbacks"] >= 1
+
+    def test_stacks_rate_limited(self, caplog) -> None:
+        monitor = LoopMonitor(slow_callback_ms=50)
+        with caplog.at_level(logging.WARNING, logger="vkuswill_bot.services.loop_monitor"):
+            for _ in range(MAX_STACKS_PER_MINUTE + 3):
+                monitor.record_slow_callback(0.1, "stack")
+            monitor.record_slow_callback(0.3, None)
+        assert len(caplog.records) == MAX_STACKS_PER_MINUTE
+        assert monitor.stats["slow_callbacks"] == MAX_STACKS_PER_MINUTE + 4
+        assert monitor.stats["slow_callback_max"] == 0.3
+
+
+class TestHealth:
+    async def test_health_includes_event_loop(self) -> None:
+        from vkuswill_bot.__main__ import _health_handler
+
+        monitor = LoopMonitor()
+        monitor.record_lag(0.012)
+        request = MagicMock()
+        request.app = {"loop_monitor": monitor}
+        response = await _health_handler(request)
+        body = json.loads(response.body)
+        assert response.status == 200
+        assert body["event_loop"]["lag_ms"] == 12.0
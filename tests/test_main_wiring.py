@@ -0,0 +1,73 @@
+"""Тесты сборки зависимостей в ``__main__.main``.
+
+Тестируем:
+- SearchPrefetcher передаётся в ToolExecutor при SEARCH_PREFETCH_ENABLED=true
+- Без флага префетчер не создаётся
+"""
+
+import pytest
+
+import vkuswill_bot.__main__ as main_module
+from vkuswill_bot.services.search_prefetcher import SearchPrefetcher
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+
+class _Built(Exception):
+    """Останавливает main() сразу после сборки ToolExecutor."""
+
+
+@pytest.fixture
+def built_executor(monkeypatch, tmp_path):
+    """Запустить main() до создания ToolExecutor и вернуть созданный экземпляр."""
+    cfg = main_module.config
+    overrides = {
+        "bot_token": "123456:TEST-token",
+        "telegram_api_server": "",
+        "database_url": "",
+        "storage_backend": "memory",
+        "loop_monitor_enabled": False,
+        "catalog_index_enabled": False,
+        "cache_warmup_enabled": False,
+        "price_refresh_enabled": False,
+        "product_details_cache_ttl_hours": 0,
+        "nutrition_index_path": "",
+        "database_path": str(tmp_path / "preferences.db"),
+        "recipe_database_path": str(tmp_path / "recipes.db"),
+        "nutrition_database_path": str(tmp_path / "nutrition.db"),
+    }
+    for name, value in overrides.items():
+        monkeypatch.setattr(cfg, name, value)
+    # Роутеры — модульные синглтоны: каждый запуск main() подключает их к новому Dispatcher
+    for router in (main_module.router, main_module.admin_router):
+        monkeypatch.setattr(router, "_parent_router", None)
+
+    built: list[ToolExecutor] = []
+
+    def _capture(**kwargs):
+        built.append(ToolExecutor(**kwargs))
+        raise _Built
+
+    monkeypatch.setattr(main_module, "ToolExecutor", _capture)
+
+    async def _run() -> ToolExecutor:
+        with pytest.raises(_Built):
+            await main_module.main()
+        return built[0]
+
+    return _run
+
+
+async def test_prefetcher_wired_when_enabled(monkeypatch, built_executor):
+    monkeypatch.setattr(main_module.config, "search_prefetch_enabled", True)
+
+    executor = await built_executor()
+
+    assert isinstance(executor._search_prefetcher, SearchPrefetcher)
+
+
+async def test_prefetcher_absent_when_disabled(monkeypatch, built_executor):
+    monkeypatch.setattr(main_module.config, "search_prefetch_enabled", False)
+
+    executor = await built_executor()
+
+    assert executor._search_prefetcher is None
@@ -8,6 +8,7 @@
 - Инициализацию и сброс сессии
 """
 
+import asyncio
 import json
 
 import httpx
@@ -775,6 +776,52 @@ class TestSessionManagement:
         assert mcp_client._session_id is None
         assert mcp_client._client is None
 
+    async def test_warm_up_initializes_session(self, mcp_client):
+        """warm_up() заранее открывает сессию — первый вызов её переиспользует."""
+        with respx.mock:
+            _mock_init_and_notify(respx)
+            await mcp_client.warm_up()
+            call_count = respx.calls.call_count
+            await mcp_client.warm_up()
+            assert respx.calls.call_count == call_count
+
+        assert mcp_client._session_id is not None
+        await mcp_client.close()
+
+    async def test_warm_up_timeout_before_notify_drops_session(self, mcp_client, monkeypatch):
+        """Таймаут между initialize и notifications/initialized не оставляет полусессию."""
+
+        async def slow_notify(*args, **kwargs):
+            await asyncio.sleep(1)
+
+        monkeypatch.setattr(mcp_client, "_rpc_notify", slow_notify)
+        with respx.mock:
+            _mock_init_and_notify(respx)
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(mcp_client.warm_up(), timeout=0.05)
+
+        assert mcp_client._session_id is None
+        await mcp_client.close()
+
+    async def test_notify_error_drops_session(self, mcp_client):
+        """Ошибка notifications/initialized — следующий вызов инициализирует заново."""
+        with respx.mock:
+            respx.post(MCP_URL).mock(
+                side_effect=[
+                    httpx.Response(
+                        200,
+                        json=INIT_RESPONSE_JSON,
+                        headers={"mcp-session-id": "half-sid"},
+                    ),
+                    httpx.Response(500),
+                ]
+            )
+            with pytest.raises(httpx.HTTPStatusError):
+                await mcp_client.warm_up()
+
+        assert mcp_client._session_id is None
+        await mcp_client.close()
+
     async def test_close(self, mcp_client):
         """close() корректно очищает ресурсы."""
         with respx.mock:
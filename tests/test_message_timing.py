@@ -0,0 +1,164 @@
+"""Тесты таймингов этапов сообщения (llm_timing).
+
+Тестируем:
+- Накопление этапов, инструментов и токенов
+- Событие llm_timing: миллисекунды, время вне этапов
+- Метрики при завершении сообщения
+- Этапы цикла function calling в GigaChatService
+"""
+
+import json
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from vkuswill_bot.services import metrics
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.message_timing import (
+    MessageTiming,
+    current_timing,
+    reset_timing,
+    start_timing,
+)
+from helpers import make_function_call_response, make_text_response
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+def _timing_events(caplog) -> list[dict]:
+    prefix = "LLM timing: "
+    return [
+        json.loads(r.getMessage()[len(prefix) :])
+        for r in caplog.records
+        if r.getMessage().startswith(prefix)
+    ]
+
+
+class TestMessageTiming:
+    def test_accumulates(self) -> None:
+        timing = MessageTiming()
+        timing.add("gigachat", 0.5)
+        timing.add("gigachat", 0.25)
+        timing.add_tool("vkusvill_products_search", 0.1)
+        timing.add_tool("vkusvill_products_search", 0.2)
+        timing.add_usage({"input": 100, "output": 20})
+        timing.add_usage({"input": 50, "output": 10, "precached_tokens": 40})
+        timing.add_usage(None)
+
+        assert timing.stages == {"gigachat": 0.75, "tool": pytest.approx(0.3)}
+        assert timing.tools == {"vkusvill_products_search": pytest.approx(0.3)}
+        assert timing.tool_calls == 2
+        assert timing.tokens == {"input": 150, "output": 30, "precached_tokens": 40}
+
+    def test_event(self) -> None:
+        timing = MessageTiming()
+        timing.add("gigachat", 1.2)
+        timing.add("tool", 0.3)
+        timing.llm_calls = 2
+        event = timing.event(user_id=7, outcome="ok", total=2.0)
+        assert event["event"] == "llm_timing"
+        assert event["total_ms"] == 2000.0
+        assert event["stages_ms"] == {"gigachat": 1200.0, "tool": 300.0}
+        assert event["other_ms"] == 500.0
+        assert event["llm_calls"] == 2
+
+    def test_finish_records_metrics(self, caplog) -> None:
+        timing = MessageTiming()
+        timing.add("gigachat", 0.4)
+        timing.llm_calls = 1
+        timing.add_usage({"input": 100, "output": 20, "total": 120})
+        with caplog.at_level(logging.INFO, logger="vkuswill_bot.services.message_timing"):
+            timing.finish(user_id=1, outcome="ok")
+
+        assert metrics.MESSAGE_DURATION.count("ok") == 1
+        assert metrics.MESSAGE_STAGE_DURATION.count("gigachat") == 1
+        assert metrics.MESSAGE_STEPS.sum() == 1
+        assert metrics.LLM_TOKENS.value("prompt") == 100
+        assert metrics.LLM_TOKENS.value("completion") == 20
+        assert metrics.ERRORS.value("message") == 0
+        (event,) = _timing_events(caplog)
+        assert event["tokens"]["total"] == 120
+
+    def test_context(self) -> None:
+        assert current_timing() is None
+        timing, token = start_timing()
+        assert current_timing() is timing
+        reset_timing(token)
+        assert current_timing() is None
+
+
+class TestGigaChatStages:
+    @pytest.fixture
+    def service(self) -> GigaChatService:
+        mcp_client = AsyncMock()
+        mcp_client.get_tools.return_value = [
+            {
+                "name": "vkusvill_products_search",
+                "description": "Поиск товаров",
+                "parameters": {"type": "object", "properties": {"q": {"type": "string"}}},
+            },
+        ]
+        mcp_client.call_tool.return_value = '{"ok": true, "data": {"items": []}}'
+        return GigaChatService(
+            credentials="test-creds",
+            model="GigaChat",
+            scope="GIGACHAT_API_PERS",
+            mcp_client=mcp_client,
+            max_tool_calls=5,
+            max_history=10,
+        )
+
+    async def test_stages_of_tool_loop(self, service, caplog) -> None:
+        responses = [
+            make_function_call_response("vkusvill_products_search", {"q": "молоко"}),
+            make_text_response("Нашёл молоко"),
+        ]
+        with (
+            patch.object(service._client, "chat", side_effect=responses),
+            caplog.at_level(logging.INFO, logger="vkuswill_bot.services.message_timing"),
+        ):
+            await service.process_message(1, "Найди молоко")
+
+        (event,) = _timing_events(caplog)
+        assert event["outcome"] == "ok"
+        assert event["llm_calls"] == 2
+        assert event["tool_calls"] == 1
+        assert set(event["stages_ms"]) >= {
+            "history_load",
+            "semaphore_wait",
+            "gigachat",
+            "preprocess",
+            "tool",
+            "postprocess",
+            "history_save",
+        }
+        assert list(event["tools_ms"]) == ["vkusvill_products_search"]
+        assert event["tokens"] == {"input": 20, "output": 10, "total": 30}
+        assert current_timing() is None
+
+    async def test_retry_backoff_stage(self, service, caplog) -> None:
+        calls = 0
+
+        def chat(_request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("HTTP 429 Too Many Requests")
+            return make_text_response("Привет")
+
+        with (
+            patch.object(service._client, "chat", side_effect=chat),
+            patch("vkuswill_bot.services.gigachat_service.asyncio.sleep"),
+            caplog.at_level(logging.INFO, logger="vkuswill_bot.services.message_timing"),
+        ):
+            await service.process_message(1, "Привет")
+
+        (event,) = _timing_events(caplog)
+        assert event["stages_ms"]["retry_backoff"] == 1000.0
+        assert event["llm_calls"] == 1
@@ -0,0 +1,321 @@
+"""Тесты метрик Prometheus.
+
+Тестируем:
+- Counter и Histogram: запись, кумулятивные корзины, формат вывода
+- Ограничение кардинальности (схлопывание в ``other``)
+- Публикацию ``stats`` компонентов (попадания/промахи кешей)
+- Тип SQL-команды для query logger asyncpg
+- Замер команд Redis и pipeline
+- Инструментацию GigaChatService и MCP-клиента
+- Эндпоинт /metrics
+"""
+
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from vkuswill_bot.services import metrics
+from vkuswill_bot.services.gigachat_service import GIGACHAT_MAX_RETRIES, GigaChatService
+from vkuswill_bot.services.metrics import Counter, Histogram, Registry
+from vkuswill_bot.services.prompts import ERROR_GIGACHAT
+from vkuswill_bot.services.redis_client import InstrumentedRedis
+from helpers import make_function_call_response, make_text_response
+
+
+@pytest.fixture(autouse=True)
+def _clean_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+class _Source:
+    def __init__(self, stats: dict) -> None:
+        self.stats = stats
+
+
+# ============================================================================
+# Counter / Histogram
+# ============================================================================
+
+
+class TestCounter:
+    def test_inc_and_render(self) -> None:
+        c = Counter("t_events", "События", ("kind",))
+        c.inc("a")
+        c.inc("a", amount=2)
+        c.inc("b")
+        assert c.value("a") == 3
+        lines = c.render()
+        assert "# HELP t_events_total События" in lines
+        assert "# TYPE t_events_total counter" in lines
+        assert 't_events_total{kind="a"} 3' in lines
+        assert 't_events_total{kind="b"} 1' in lines
+
+    def test_wrong_label_count(self) -> None:
+        c = Counter("t_events", "События", ("kind",))
+        with pytest.raises(ValueError, match="метки"):
+            c.inc()
+
+    def test_label_escaping(self) -> None:
+        c = Counter("t_events", "События", ("kind",))
+        c.inc('a"b\\c\nd')
+        assert 't_events_total{kind="a\\"b\\\\c\\nd"} 1' in c.render()
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self) -> None:
+        h = Histogram("t_seconds", "Время", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value)
+        lines = h.render()
+        assert 't_seconds_bucket{le="0.1"} 2' in lines  # граница включительно
+        assert 't_seconds_bucket{le="1"} 3' in lines
+        assert 't_seconds_bucket{le="+Inf"} 4' in lines
+        assert "t_seconds_count 4" in lines
+        assert h.count() == 4
+        assert h.sum() == pytest.approx(3.65)
+
+    def test_labels_in_bucket_lines(self) -> None:
+        h = Histogram("t_seconds", "Время", ("tool",), buckets=(1.0,))
+        h.observe(0.5, "search")
+        lines = h.render()
+        assert 't_seconds_bucket{tool="search",le="1"} 1' in lines
+        assert 't_seconds_sum{tool="search"} 0.5' in lines
+
+    def test_cardinality_capped(self) -> None:
+        h = Histogram("t_seconds", "Время", ("tool",))
+        h.max_series = 3
+        for i in range(10):
+            h.observe(0.01, f"tool_{i}")
+        assert h.count("tool_0") == 1
+        assert h.count("tool_2") == 1
+        assert h.count("other") == 7
+        assert h.count("tool_9") == 0
+
+    def test_observe_cost(self) -> None:
+        """Запись — единицы микросекунд (с запасом для медленного CI)."""
+        h = Histogram("t_seconds", "Время", ("tool",))
+        n = 20_000
+        start = time.perf_counter()
+        for i in range(n):
+            h.observe(i * 1e-4, "search")
+        per_call = (time.perf_counter() - start) / n
+        assert per_call < 20e-6
+
+
+class TestRegistry:
+    def test_duplicate_name_rejected(self) -> None:
+        registry = Registry()
+        registry.counter("t_x", "X")
+        with pytest.raises(ValueError, match="уже зарегистрирована"):
+            registry.histogram("t_x", "X")
+
+    def test_stats_published(self) -> None:
+        registry = Registry()
+        registry.register_stats(
+            "cart_link_cache",
+            _Source({"hits": 3, "misses": 1, "hit_rate": 0.75, "mode": "l1", "ok": True}),
+        )
+        registry.register_stats("fast_path", _Source({"served": 2}))
+        text = registry.render()
+        assert 'vkuswill_cache_hits_total{cache="cart_link_cache"} 3' in text
+        assert 'vkuswill_cache_misses_total{cache="cart_link_cache"} 1' in text
+        assert 'vkuswill_component_stat{component="cart_link_cache",stat="hit_rate"} 0.75' in text
+        assert 'vkuswill_component_stat{component="fast_path",stat="served"} 2' in text
+        assert "mode" not in text  # нечисловые и bool — пропускаются
+        assert 'stat="ok"' not in text
+        assert 'cache="fast_path"' not in text
+
+    def test_stats_source_error_skipped(self) -> None:
+        class _Broken:
+            @property
+            def stats(self) -> dict:
+                raise RuntimeError("boom")
+
+        registry = Registry()
+        registry.register_stats("broken", _Broken())
+        registry.register_stats("ok", _Source({"served": 1}))
+        text = registry.render()
+        assert 'component="ok"' in text
+        assert "broken" not in text
+
+    def test_render_ends_with_newline(self) -> None:
+        metrics.ERRORS.inc("mcp")
+        text = metrics.render()
+        assert text.endswith("\n")
+        assert 'vkuswill_errors_total{component="mcp"} 1' in text
+
+    def test_samples_match_type_lines(self) -> None:
+        """Каждый сэмпл относится к семейству из предшествующей строки TYPE."""
+        metrics.ERRORS.inc("mcp")
+        metrics.MCP_DURATION.observe(0.1, "search", "ok")
+        family = ""
+        for line in metrics.render().splitlines():
+            if line.startswith("# TYPE "):
+                family = line.split()[2]
+            elif not line.startswith("#"):
+                name = line.split("{")[0].split()[0]
+                assert name in (family, f"{family}_bucket", f"{family}_sum", f"{family}_count")
+
+    def test_metric_base_is_abstract(self) -> None:
+        with pytest.raises(TypeError):
+            metrics._Metric("t", "doc")
+
+
+# ============================================================================
+# PostgreSQL / Redis
+# ============================================================================
+
+
+class TestPostgres:
+    @pytest.mark.parametrize(
+        ("query", "verb"),
+        [
+            ("select 1", "SELECT"),
+            ("\n  INSERT INTO users VALUES ($1)", "INSERT"),
+            ("SELECT pg_advisory_unlock_all();\nCLOSE ALL;\nUNLISTEN *;\nRESET ALL;", "RESET"),
+            ("", "EMPTY"),
+        ],
+    )
+    def test_sql_verb(self, query: str, verb: str) -> None:
+        assert metrics._sql_verb(query) == verb
+
+    async def test_query_logger_registered(self) -> None:
+        conn = MagicMock()
+        await metrics.instrument_postgres(conn)
+        (callback,) = conn.add_query_logger.call_args.args
+        callback(MagicMock(query="UPDATE users SET x = 1", elapsed=0.004))
+        assert metrics.POSTGRES_DURATION.count("UPDATE") == 1
+        assert metrics.POSTGRES_DURATION.sum("UPDATE") == pytest.approx(0.004)
+
+
+class TestRedis:
+    async def test_command_observed(self) -> None:
+        client = InstrumentedRedis()
+        with patch.object(Redis, "execute_command", AsyncMock(return_value=True)):
+            await client.ping()
+            await client.get("key")
+        assert metrics.REDIS_DURATION.count("PING") == 1
+        assert metrics.REDIS_DURATION.count("GET") == 1
+
+    async def test_failed_command_observed(self) -> None:
+        client = InstrumentedRedis()
+        with (
+            patch.object(Redis, "execute_command", AsyncMock(side_effect=ConnectionError)),
+            pytest.raises(ConnectionError),
+        ):
+            await client.get("key")
+        assert metrics.REDIS_DURATION.count("GET") == 1
+
+    async def test_pipeline_observed(self) -> None:
+        client = InstrumentedRedis()
+        pipe = client.pipeline(transaction=False)
+        with patch.object(Pipeline, "execute", AsyncMock(return_value=[None])):
+            await pipe.execute()
+        assert metrics.REDIS_DURATION.count("PIPELINE") == 1
+
+
+# ============================================================================
+# GigaChat / MCP
+# ============================================================================
+
+
+@pytest.fixture
+def service() -> GigaChatService:
+    mcp_client = AsyncMock()
+    mcp_client.get_tools.return_value = [
+        {
+            "name": "vkusvill_products_search",
+            "description": "Поиск товаров",
+            "parameters": {"type": "object", "properties": {"q": {"type": "string"}}},
+        },
+    ]
+    mcp_client.call_tool.return_value = '{"ok": true, "data": {"items": []}}'
+    return GigaChatService(
+        credentials="test-creds",
+        model="GigaChat",
+        scope="GIGACHAT_API_PERS",
+        mcp_client=mcp_client,
+        max_tool_calls=5,
+        max_history=10,
+    )
+
+
+class TestGigaChatMetrics:
+    async def test_message_duration_and_steps(self, service) -> None:
+        responses = [
+            make_function_call_response("vkusvill_products_search", {"q": "молоко"}),
+            make_text_response("Нашёл молоко"),
+        ]
+        with patch.object(service._client, "chat", side_effect=responses):
+            await service.process_message(1, "Найди молоко")
+
+        assert metrics.MESSAGE_DURATION.count("ok") == 1
+        assert metrics.MESSAGE_STEPS.sum() == 2
+        assert metrics.GIGACHAT_DURATION.count("ok") == 2
+        assert metrics.GIGACHAT_SEMAPHORE_WAIT.count() == 2
+
+    async def test_gigachat_error_outcome(self, service) -> None:
+        with patch.object(service._client, "chat", side_effect=RuntimeError("down")):
+            assert await service.process_message(1, "Привет") == ERROR_GIGACHAT
+
+        assert metrics.MESSAGE_DURATION.count("gigachat_error") == 1
+        assert metrics.GIGACHAT_DURATION.count("error") == 1
+        assert metrics.ERRORS.value("gigachat") == 1
+        assert metrics.ERRORS.value("message") == 1
+
+    async def test_rate_limit_counters(self, service) -> None:
+        with (
+            patch.object(service._client, "chat", side_effect=RuntimeError("HTTP 429")),
+            patch("vkuswill_bot.services.gigachat_service.asyncio.sleep"),
+            pytest.raises(RuntimeError),
+        ):
+            await service._call_gigachat(history=[], functions=[])
+
+        assert metrics.RATE_LIMITED.value("gigachat") == GIGACHAT_MAX_RETRIES
+        assert metrics.RETRIES.value("gigachat") == GIGACHAT_MAX_RETRIES - 1
+        assert metrics.ERRORS.value("gigachat") == 1
+
+
+class TestMCPMetrics:
+    async def test_call_observed_per_tool(self, mcp_client) -> None:
+        result = {"content": [{"type": "text", "text": "{}"}]}
+        with (
+            patch.object(mcp_client, "_ensure_initialized", AsyncMock()),
+            patch.object(mcp_client, "_rpc_call", AsyncMock(return_value=result)),
+        ):
+            await mcp_client.call_tool("vkusvill_products_search", {"q": "молоко"})
+        assert metrics.MCP_DURATION.count("vkusvill_products_search", "ok") == 1
+
+    async def test_retries_and_error(self, mcp_client) -> None:
+        with (
+            patch.object(mcp_client, "_ensure_initialized", AsyncMock()),
+            patch.object(mcp_client, "_rpc_call", AsyncMock(side_effect=RuntimeError("x"))),
+            patch.object(mcp_client, "_reset_session", AsyncMock()),
+            patch("vkuswill_bot.services.mcp_client.asyncio.sleep"),
+            pytest.raises(RuntimeError),
+        ):
+            await mcp_client.call_tool("vkusvill_cart_link_create", {})
+        assert metrics.MCP_DURATION.count("vkusvill_cart_link_create", "error") == 1
+        assert metrics.RETRIES.value("mcp") == 2
+        assert metrics.ERRORS.value("mcp") == 1
+
+
+# ============================================================================
+# /metrics
+# ============================================================================
+
+
+class TestEndpoint:
+    async def test_metrics_handler(self) -> None:
+        from vkuswill_bot.__main__ import _metrics_handler
+
+        metrics.MESSAGE_DURATION.observe(0.2, "ok")
+        response = await _metrics_handler(MagicMock())
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert b'vkuswill_message_duration_seconds_count{outcome="ok"} 1' in response.body
@@ -0,0 +1,100 @@
+"""Тесты нормализации русских слов (morphology).
+
+Тестируем:
+- Стеммер Snowball Russian на эталонных словах
+- Нормализацию ё → е
+- Термы названий товаров (нормальные формы + префиксы)
+- Подключаемый нормализатор и сброс кешей
+"""
+
+import pytest
+
+from vkuswill_bot.services import morphology
+
+
+@pytest.fixture(autouse=True)
+def _reset_normalizer():
+    """Каждый тест начинает со стеммера по умолчанию."""
+    morphology.set_normalizer(None)
+    yield
+    morphology.set_normalizer(None)
+
+
+class TestStem:
+    """Стеммер Snowball Russian."""
+
+    @pytest.mark.parametrize(
+        ("word", "expected"),
+        [
+            ("яйца", "яйц"),
+            ("яйцо", "яйц"),
+            ("курицы", "куриц"),
+            ("курица", "куриц"),
+            ("молока", "молок"),
+            ("помидоры", "помидор"),
+            ("важнейшие", "важн"),
+            ("вагонов", "вагон"),
+            ("бесконечностью", "бесконечн"),
+            ("вернувшись", "вернувш"),
+            ("картофель", "картофел"),
+        ],
+    )
+    def test_reference_words(self, word, expected):
+        assert morphology.stem(word) == expected
+
+    def test_yo_replaced(self):
+        assert morphology.stem("вишнёвый") == "вишнев"
+
+    def test_stem_is_prefix(self):
+        for word in ("огурцы", "сметаны", "творожный", "гречневая"):
+            assert word.startswith(morphology.stem(word))
+
+    def test_no_vowels_unchanged(self):
+        assert morphology.stem("шт") == "шт"
+
+
+class TestNameTerms:
+    """Термы названий товаров."""
+
+    def test_contains_stems_and_prefixes(self):
+        terms = morphology.name_terms("Яйцо куриное С0")
+        assert "яйц" in terms
+        assert "кур" in terms
+        assert "куриное" in terms
+        assert "с0" in terms
+
+    def test_short_tokens_kept_whole(self):
+        assert "3" in morphology.name_terms("Молоко 3,2%")
+
+    def test_tokenize_yo(self):
+        assert morphology.tokenize("Ёжики, мясные!") == ["ежики", "мясные"]
+
+
+class TestPluggableNormalizer:
+    """Подключаемый нормализатор."""
+
+    def test_custom_normalizer(self):
+        morphology.set_normalizer(lambda w: {"яйца": "яйцо"}.get(w, w))
+        assert morphology.normalize("Яйца") == "яйцо"
+        assert "яйцо" in morphology.name_terms("Яйцо")
+
+    def test_reset_clears_cache(self):
+        morphology.set_normalizer(lambda w: "x")
+        assert morphology.normalize("молоко") == "x"
+        morphology.set_normalizer(None)
+        assert morphology.normalize("молоко") == "молок"
+
+    def test_use_pymorphy_without_package(self, monkeypatch):
+        """Без pymorphy3 остаётся стеммер."""
+        import builtins
+
+        real_import = builtins.__import__
+
+        def fake_import(name, *args, **kwargs):
+            if name == "pymorphy3":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "__import__", fake_import)
+        assert morphology.use_pymorphy() is False
+        assert morphology.normalize("яйца") == "яйц"
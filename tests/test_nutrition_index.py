@@ -0,0 +1,180 @@
+"""Тесты офлайн-индекса КБЖУ (дамп Open Food Facts → mmap-индекс).
+
+Тестируем:
+- Импорт JSONL и CSV (в т.ч. .gz) с фильтром по стране и калорийности
+- Поиск: все слова запроса, морфология, порядок результатов
+- Формат продуктов, совместимый с NutritionService
+- Отказ открывать чужой файл
+- NutritionService: индекс → API только при промахе
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import shutil
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+from vkuswill_bot.services.nutrition_index import NutritionIndex, build_index
+from vkuswill_bot.services.nutrition_service import NutritionService
+
+FIXTURES = Path(__file__).parent / "fixtures"
+JSONL_DUMP = FIXTURES / "off_dump.jsonl"
+CSV_DUMP = FIXTURES / "off_dump.csv"
+
+
+@pytest.fixture
+def index_path(tmp_path) -> str:
+    path = str(tmp_path / "nutrition.idx")
+    build_index(str(JSONL_DUMP), path)
+    return path
+
+
+@pytest.fixture
+def index(index_path):
+    idx = NutritionIndex(index_path)
+    yield idx
+    idx.close()
+
+
+class TestBuild:
+    """Импорт дампа."""
+
+    def test_filters_country_and_calories(self, tmp_path) -> None:
+        summary = build_index(str(JSONL_DUMP), str(tmp_path / "i.idx"))
+        # без английского молока, хлеба без калорий и продукта без названия
+        assert summary["products"] == 7
+        assert summary["tokens"] > 0
+        assert summary["bytes"] == (tmp_path / "i.idx").stat().st_size
+
+    def test_all_countries(self, tmp_path) -> None:
+        summary = build_index(str(JSONL_DUMP), str(tmp_path / "i.idx"), country=None)
+        assert summary["products"] == 8
+
+    def test_csv_same_as_jsonl(self, tmp_path) -> None:
+        jsonl = build_index(str(JSONL_DUMP), str(tmp_path / "a.idx"))
+        csv = build_index(str(CSV_DUMP), str(tmp_path / "b.idx"))
+        assert (jsonl["products"], jsonl["tokens"]) == (csv["products"], csv["tokens"])
+
+        a, b = NutritionIndex(str(tmp_path / "a.idx")), NutritionIndex(str(tmp_path / "b.idx"))
+        assert a.search("творог") == b.search("творог")
+        a.close()
+        b.close()
+
+    def test_gzip_dump(self, tmp_path) -> None:
+        gz_path = tmp_path / "dump.csv.gz"
+        with open(CSV_DUMP, "rb") as src, gzip.open(gz_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        assert build_index(str(gz_path), str(tmp_path / "i.idx"))["products"] == 7
+
+    def test_empty_dump(self, tmp_path) -> None:
+        dump = tmp_path / "empty.jsonl"
+        dump.write_text("")
+        build_index(str(dump), str(tmp_path / "i.idx"))
+        idx = NutritionIndex(str(tmp_path / "i.idx"))
+        assert len(idx) == 0
+        assert idx.search("молоко") == []
+        idx.close()
+
+
+class TestSearch:
+    """Поиск по индексу."""
+
+    def test_product_format(self, index: NutritionIndex) -> None:
+        [product] = index.search("гречка")
+        assert product["product_name"] == "Гречка ядрица"
+        assert product["brands"] == "Мистраль"
+        assert product["serving_size"] == "60 g"
+        assert product["nutrition_grades"] == "a"
+        assert product["nutriments"]["energy-kcal_100g"] == 313
+        assert product["nutriments"]["fiber_100g"] == pytest.approx(11.3)
+        # нет данных — нет ключа
+        assert "salt_100g" not in product["nutriments"]
+
+    def test_all_words_required(self, index: NutritionIndex) -> None:
+        names = [p["product_name"] for p in index.search("молоко сгущённое")]
+        assert names == ["Молоко сгущённое"]
+
+    def test_short_names_first(self, index: NutritionIndex) -> None:
+        names = [p["product_name"] for p in index.search("молоко")]
+        assert names[0] == "Молоко 3,2%"
+        assert len(names) == 3
+
+    def test_word_forms(self, index: NutritionIndex) -> None:
+        assert index.search("молока")[0]["product_name"] == "Молоко 3,2%"
+        assert index.search("сыра")[0]["product_name"] == "Сыр Российский"
+
+    def test_limit(self, index: NutritionIndex) -> None:
+        assert len(index.search("молоко", limit=2)) == 2
+
+    def test_miss(self, index: NutritionIndex) -> None:
+        assert index.search("авокадо") == []
+        assert index.search("молоко авокадо") == []
+        assert index.search("") == []
+        assert index.search("200 г") == []
+
+    def test_filtered_products_absent(self, index: NutritionIndex) -> None:
+        assert index.search("milk") == []
+        assert index.search("хлеб") == []
+
+
+class TestOpen:
+    """Открытие файла индекса."""
+
+    def test_rejects_foreign_file(self, tmp_path) -> None:
+        path = tmp_path / "garbage.idx"
+        path.write_bytes(b"not an index at all, definitely not" * 2)
+        with pytest.raises(ValueError):
+            NutritionIndex(str(path))
+
+    def test_missing_file(self, tmp_path) -> None:
+        with pytest.raises(OSError):
+            NutritionIndex(str(tmp_path / "nope.idx"))
+
+    def test_close_idempotent(self, index_path) -> None:
+        idx = NutritionIndex(index_path)
+        idx.close()
+        idx.close()
+
+
+class TestServiceWithIndex:
+    """NutritionService отвечает из индекса, API — только при промахе."""
+
+    @pytest.mark.asyncio
+    async def test_hit_without_network(self, index_path) -> None:
+        service = NutritionService(rate_per_minute=0, index=NutritionIndex(index_path))
+        search = AsyncMock(return_value=[])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(service, "_search", search)
+            result = json.loads(await service.lookup({"query": "творог 5%, 200 г"}))
+
+        search.assert_not_called()
+        assert result["data"]["found"] is True
+        assert result["data"]["items"][0]["nutrients_per_100g"]["protein"] == 17.0
+        assert service.stats["index_hits"] == 1
+        assert service.stats["hit_rate"] == 1.0
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_miss_goes_to_api(self, index_path) -> None:
+        service = NutritionService(rate_per_minute=0, index=NutritionIndex(index_path))
+        product = {"product_name": "Авокадо", "nutriments": {"energy-kcal_100g": 160}}
+        search = AsyncMock(return_value=[product])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(service, "_search", search)
+            result = json.loads(await service.lookup({"query": "авокадо"}))
+
+        search.assert_called_once()
+        assert result["data"]["items"][0]["name"] == "Авокадо"
+        assert service.stats["misses"] == 1
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_close_closes_index(self, index_path) -> None:
+        index = NutritionIndex(index_path)
+        service = NutritionService(index=index)
+        await service.close()
+        assert index._mm.closed
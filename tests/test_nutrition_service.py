@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock
 
 import httpx
 import pytest
 
+from vkuswill_bot.services import nutrition_service as nutrition_module
+from vkuswill_bot.services.nutrition_cache import NutritionCache
 from vkuswill_bot.services.nutrition_service import (
     NutritionService,
     OFF_FIELDS,
     OFF_SEARCH_URL,
     SEARCH_PAGE_SIZE,
+    TokenBucket,
     _NUTRIENT_KEYS,
 )
 
@@ -546,3 +550,169 @@ class TestServiceLifecycle:
         """Сервис создаётся без параметров (API key не нужен)."""
         svc = NutritionService()
         assert svc._client is None
+
+
+# ---- Тесты кеша, объединения запросов и rate limit ----
+
+
+def _product(name: str, kcal: float = 100) -> dict:
+    return {"product_name": name, "nutriments": {"energy-kcal_100g": kcal}}
+
+
+@pytest.fixture
+async def cached_service(tmp_path):
+    """NutritionService с SQLite-кешем и без ограничения частоты."""
+    svc = NutritionService(
+        cache=NutritionCache(str(tmp_path / "nutrition.db")),
+        rate_per_minute=0,
+    )
+    yield svc
+    await svc.close()
+
+
+class TestPersistentCache:
+    """Персистентный кеш результатов Open Food Facts."""
+
+    @pytest.mark.asyncio
+    async def test_second_lookup_from_cache(self, cached_service: NutritionService) -> None:
+        search = AsyncMock(return_value=[_product("Борщ")])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(cached_service, "_search", search)
+            first = json.loads(await cached_service.lookup({"query": "Борщ"}))
+            second = json.loads(await cached_service.lookup({"query": "борщ, 300 г"}))
+
+        search.assert_called_once()
+        assert first["data"]["items"] == second["data"]["items"]
+        assert cached_service.stats["hits"] == 1
+        assert cached_service.stats["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_negative_cache(self, cached_service: NutritionService) -> None:
+        search = AsyncMock(return_value=[{"product_name": "X", "nutriments": {}}])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(cached_service, "_search", search)
+            await cached_service.lookup({"query": "инопланетная еда"})
+            result = json.loads(await cached_service.lookup({"query": "инопланетная еда"}))
+
+        search.assert_called_once()
+        assert result["data"]["found"] is False
+        assert cached_service.stats["negative_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_not_cached(self, cached_service: NutritionService) -> None:
+        search = AsyncMock(side_effect=[httpx.HTTPError("down"), [_product("Рис")]])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(cached_service, "_search", search)
+            first = json.loads(await cached_service.lookup({"query": "рис"}))
+            second = json.loads(await cached_service.lookup({"query": "рис"}))
+
+        assert first["ok"] is False
+        assert second["data"]["found"] is True
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self, tmp_path) -> None:
+        cache = NutritionCache(str(tmp_path / "n.db"), ttl=-1, negative_ttl=-1)
+        await cache.set("борщ", [_product("Борщ")])
+        assert await cache.get("борщ") is None
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_persists_across_instances(self, tmp_path) -> None:
+        db_path = str(tmp_path / "n.db")
+        cache = NutritionCache(db_path)
+        await cache.set("борщ", [_product("Борщ")])
+        await cache.set("пусто", [])
+        await cache.close()
+
+        cache = NutritionCache(db_path)
+        assert (await cache.get("борщ"))[0]["product_name"] == "Борщ"
+        assert await cache.get("пусто") == []
+        assert await cache.get("нет") is None
+        await cache.close()
+
+
+class TestCoalescing:
+    """Одновременные запросы объединяются в один поход в API."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_share_one_request(self, cached_service: NutritionService) -> None:
+        calls = 0
+
+        async def slow_search(query: str) -> list[dict]:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return [_product("Гречка")]
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(cached_service, "_search", slow_search)
+            results = await asyncio.gather(
+                *(cached_service.lookup({"query": "Гречка"}) for _ in range(5))
+            )
+
+        assert calls == 1
+        assert all(json.loads(r)["data"]["found"] for r in results)
+        assert cached_service.stats["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_works_without_cache(self, service: NutritionService) -> None:
+        search = AsyncMock(return_value=[_product("Гречка")])
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(service, "_search", search)
+            await asyncio.gather(*(service.lookup({"query": "гречка"}) for _ in range(3)))
+        search.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout(self, service: NutritionService) -> None:
+        async def hanging_search(query: str) -> list[dict]:
+            await asyncio.sleep(10)
+            return []
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(service, "_search", hanging_search)
+            mp.setattr(nutrition_module, "MAX_LOOKUP_WAIT", 0.01)
+            result = json.loads(await service.lookup({"query": "рис"}))
+            assert result["ok"] is False
+            assert "перегружен" in result["error"]
+            for task in list(service._inflight.values()):
+                task.cancel()
+
+
+class TestTokenBucket:
+    """Ограничение частоты запросов к Open Food Facts."""
+
+    @pytest.mark.asyncio
+    async def test_burst_without_wait(self) -> None:
+        bucket = TokenBucket(rate_per_minute=10, capacity=2)
+        assert await bucket.acquire() == pytest.approx(0, abs=0.01)
+        assert await bucket.acquire() == pytest.approx(0, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_waits_for_refill(self) -> None:
+        bucket = TokenBucket(rate_per_minute=600, capacity=1)  # 10 токенов/с
+        await bucket.acquire()
+        waited = await bucket.acquire()
+        assert 0.05 <= waited <= 0.5
+
+    @pytest.mark.asyncio
+    async def test_unlimited(self) -> None:
+        bucket = TokenBucket(rate_per_minute=0)
+        for _ in range(100):
+            assert await bucket.acquire() == 0.0
+
+    @pytest.mark.asyncio
+    async def test_search_requests_throttled(self, service: NutritionService) -> None:
+        """Каждый HTTP-запрос проходит через bucket и учитывается в статистике."""
+        resp = MagicMock()
+        resp.json.return_value = {"products": [{"product_name": "X", "nutriments": {}}]}
+        resp.raise_for_status = MagicMock()
+        mock_client = AsyncMock(spec=httpx.AsyncClient)
+        mock_client.is_closed = False
+        mock_client.get.return_value = resp
+        service._client = mock_client
+        service._bucket = TokenBucket(rate_per_minute=600, capacity=1)
+
+        await service._search("картофель")  # РФ + глобальный fallback
+
+        assert service.stats["upstream_requests"] == 2
+        assert service.stats["queue_wait_max"] > 0
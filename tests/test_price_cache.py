@@ -54,6 +54,13 @@ class TestPriceInfo:
         with pytest.raises(AttributeError):
             info.extra = "nope"  # type: ignore[attr-defined]
 
+    def test_name_words_memoized(self):
+        """Слова названия разбираются один раз и переиспользуются."""
+        info = PriceInfo("Форель радужная стейк охл.", 1240.0)
+        words = info.name_words
+        assert words == frozenset({"форель", "радужная", "стейк", "охл"})
+        assert info.name_words is words
+
     def test_dict_getitem(self):
         """PriceInfo поддерживает info['name'], info['price'], info['unit']."""
         info = PriceInfo("Молоко", 79.0, "шт")
@@ -346,3 +353,40 @@ class TestPriceCacheEviction:
             if await cache.get(i) is None:
                 evicted += 1
         assert evicted == 5
+
+
+class TestPriceCacheCounters:
+    """Счётчики попаданий (для оценки прогрева кешей)."""
+
+    async def test_hits_and_misses(self):
+        cache = PriceCache()
+        await cache.set(1, "Молоко", 79.0)
+        await cache.get(1)
+        await cache.get(2)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_dict_api_not_counted(self):
+        cache = PriceCache()
+        cache[1] = {"name": "Молоко", "price": 79.0}
+        _ = cache[1]
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    async def test_get_many(self):
+        cache = PriceCache()
+        await cache.set(1, "Молоко", 79.0)
+
+        found = await cache.get_many([1, 2])
+
+        assert list(found) == [1]
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    async def test_get_many_max_age(self):
+        cache = PriceCache()
+        await cache.set(1, "Молоко", 79.0)
+        await cache.set(2, "Хлеб", 55.0)
+        cache._stored_at[1] -= 120
+
+        found = await cache.get_many([1, 2], max_age=60)
+
+        assert list(found) == [2]
+        assert (cache.hits, cache.misses) == (1, 1)
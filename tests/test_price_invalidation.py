@@ -0,0 +1,258 @@
+"""Тесты согласованности L1 кеша цен между подами.
+
+Два TwoLevelPriceCache («пода») над одним in-memory Redis с потоками.
+
+Тестируем:
+- Запись цены одним подом сбрасывает устаревший L1 другого
+- Собственные записи и более свежие версии не сбрасываются
+- Версия цены пишется в одной транзакции с ценой и публикуется она же
+- Версия не начинается заново после истечения хеша цены по TTL
+- Пустой ответ xread — не ошибка; блокировка короче таймаута сокета
+- Backfill после обрыва соединения
+- Полный сброс L1, если поток обрезан за время обрыва
+"""
+
+import asyncio
+import inspect
+import itertools
+from unittest.mock import AsyncMock
+
+import pytest
+
+from vkuswill_bot.services.price_cache import PRICE_INVALIDATION_STREAM, TwoLevelPriceCache
+from vkuswill_bot.services.price_invalidation import _BLOCK_MS, PriceInvalidationSubscriber
+from vkuswill_bot.services.redis_client import create_redis_client
+
+
+class _StreamRedis:
+    """Минимальный in-memory Redis: строки, хеши и потоки (как fakeredis, без сети)."""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.streams: dict[str, list[tuple[bytes, dict[bytes, bytes]]]] = {}
+        self._seq = itertools.count(1)
+        self.down = False
+        self.transactions: list[bool] = []
+
+    def _check(self) -> None:
+        if self.down:
+            raise ConnectionError("Redis down")
+
+    async def hset(self, key: str, mapping: dict[str, str]) -> None:
+        self._check()
+        self.hashes.setdefault(key, {}).update(
+            {k.encode(): str(v).encode() for k, v in mapping.items()}
+        )
+
+    async def hgetall(self, key: str) -> dict[bytes, bytes]:
+        self._check()
+        return dict(self.hashes.get(key, {}))
+
+    async def get(self, key: str) -> bytes | None:
+        self._check()
+        return self.strings.get(key)
+
+    async def incr(self, key: str) -> int:
+        self._check()
+        value = int(self.strings.get(key, b"0")) + 1
+        self.strings[key] = str(value).encode()
+        return value
+
+    async def expire(self, key: str, ttl: int) -> None:
+        self._check()
+
+    async def xadd(self, name: str, fields: dict, maxlen: int, approximate: bool) -> bytes:
+        self._check()
+        entry_id = f"{next(self._seq)}-0".encode()
+        entries = self.streams.setdefault(name, [])
+        entries.append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        del entries[:-maxlen]
+        return entry_id
+
+    @staticmethod
+    def _num(entry_id: bytes | str) -> int:
+        raw = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        return int(raw.split("-")[0])
+
+    async def xrevrange(self, name: str, count: int) -> list:
+        self._check()
+        return list(reversed(self.streams.get(name, [])))[:count]
+
+    async def xrange(self, name: str, min: str, max: str) -> list:
+        self._check()
+        lo, hi = self._num(min), self._num(max)
+        return [e for e in self.streams.get(name, []) if lo <= self._num(e[0]) <= hi]
+
+    async def xread(self, streams: dict[str, str], count: int, block: int | None) -> list:
+        self._check()
+        ((name, last_id),) = streams.items()
+        new = [e for e in self.streams.get(name, []) if self._num(e[0]) > self._num(last_id)]
+        return [(name.encode(), new[:count])] if new else []
+
+    def pipeline(self, transaction: bool = True) -> "_Pipeline":
+        self.transactions.append(transaction)
+        return _Pipeline(self)
+
+    def trim(self, name: str, keep: int) -> None:
+        del self.streams[name][:-keep]
+
+
+class _Pipeline:
+    """Pipeline стенда: команды копятся и выполняются в execute() подряд."""
+
+    def __init__(self, redis: _StreamRedis) -> None:
+        self._redis = redis
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs) -> None:
+            self._commands.append((name, args, kwargs))
+
+        return queue
+
+    async def execute(self) -> list:
+        return [
+            await getattr(self._redis, name)(*args, **kwargs)
+            for name, args, kwargs in self._commands
+        ]
+
+
+@pytest.fixture
+def redis():
+    return _StreamRedis()
+
+
+@pytest.fixture
+async def pods(redis):
+    """Два пода: кеш + подписчик, позиция в потоке — текущий конец."""
+    caches = [TwoLevelPriceCache(redis=redis, publish_invalidations=True) for _ in range(2)]
+    subscribers = [PriceInvalidationSubscriber(c, redis) for c in caches]
+    for sub in subscribers:
+        await sub.poll_once(block_ms=None)
+    return caches, subscribers
+
+
+class TestInvalidation:
+    """Запись одного пода → L1 другого."""
+
+    async def test_other_pod_sees_new_price(self, pods) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        assert (await b.get(1)).price == 90.0  # L2 → L1 пода B
+
+        await a.set(1, "Молоко", 99.0)
+        # без инвалидации B отдаёт старую цену из L1
+        assert (await b.get(1)).price == 90.0
+
+        await sub_b.poll_once(block_ms=None)
+        assert (await b.get(1)).price == 99.0
+        assert sub_b.stats["invalidated"] == 1
+
+    async def test_own_write_not_dropped(self, pods) -> None:
+        (a, _), (sub_a, _) = pods
+        await a.set(1, "Молоко", 90.0)
+        await sub_a.poll_once(block_ms=None)
+        assert 1 in a
+        assert sub_a.stats == {"messages": 1, "invalidated": 0, "reconnects": 0, "resyncs": 0}
+
+    async def test_newer_local_version_kept(self, pods) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        await b.set(1, "Молоко", 95.0)  # версия 2 — свежее записи A
+        await sub_b.poll_once(block_ms=None)
+        assert (await b.get(1)).price == 95.0
+
+
+class TestVersion:
+    """Версия цены в L2."""
+
+    async def test_version_written_with_price(self, pods, redis) -> None:
+        (a, _), _ = pods
+        await a.set(1, "Молоко", 90.0)
+        await a.set(1, "Молоко", 95.0)
+
+        assert redis.transactions == [True, True]
+        assert redis.hashes["price:1"][b"price"] == b"95.0"
+        _, fields = redis.streams[PRICE_INVALIDATION_STREAM][-1]
+        assert fields[b"version"] == redis.strings["price:version:1"] == b"2"
+
+    async def test_version_survives_hash_expiry(self, pods, redis) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        await a.set(1, "Молоко", 95.0)
+        assert (await b.get(1)).price == 95.0  # L1 пода B с версией 2
+        await sub_b.poll_once(block_ms=None)
+
+        del redis.hashes["price:1"]  # хеш цены истёк по TTL
+        await a.set(1, "Молоко", 99.0)
+        await sub_b.poll_once(block_ms=None)
+
+        assert (await b.get(1)).price == 99.0
+        assert sub_b.stats["invalidated"] == 1
+
+    async def test_promoted_with_version(self, pods) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        await a.set(1, "Молоко", 95.0)
+        await b.get(1)
+
+        await sub_b.poll_once(block_ms=None)  # версии 1 и 2 не новее L1 пода B
+
+        assert sub_b.stats["invalidated"] == 0
+
+
+class TestQuietStream:
+    """Тихий поток: пустой ответ xread."""
+
+    def test_block_shorter_than_socket_timeout(self) -> None:
+        socket_timeout = inspect.signature(create_redis_client).parameters["socket_timeout"]
+        block_seconds = _BLOCK_MS / 1000
+        assert block_seconds * 2 < socket_timeout.default
+
+    @pytest.mark.parametrize("empty", [None, []])
+    async def test_empty_read_is_not_error(self, pods, redis, empty) -> None:
+        _, (sub, _) = pods
+        redis.xread = AsyncMock(side_effect=[empty, empty, asyncio.CancelledError])
+
+        with pytest.raises(asyncio.CancelledError):
+            await sub._loop()
+
+        assert redis.xread.await_count == 3
+        assert redis.xread.await_args.kwargs["block"] == _BLOCK_MS
+        assert sub.stats["reconnects"] == 0
+        assert sub.stats["messages"] == 0
+
+
+class TestReconnect:
+    """Обрыв соединения: backfill и полный сброс."""
+
+    async def test_backfill_after_outage(self, pods, redis) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        await b.get(1)
+        redis.down = True
+        with pytest.raises(ConnectionError):
+            await sub_b.poll_once(block_ms=None)
+        redis.down = False
+
+        await a.set(1, "Молоко", 99.0)
+        await sub_b._check_gap()
+        await sub_b.poll_once(block_ms=None)
+        assert (await b.get(1)).price == 99.0
+        assert sub_b.stats["resyncs"] == 0
+
+    async def test_trimmed_stream_resyncs(self, pods, redis) -> None:
+        (a, b), (_, sub_b) = pods
+        await a.set(1, "Молоко", 90.0)
+        await a.set(2, "Хлеб", 50.0)
+        assert len(await b.get_many([1, 2])) == 2
+        await sub_b.poll_once(block_ms=None)
+        for price in (91.0, 92.0, 93.0):
+            await a.set(3, "Сыр", price)
+        redis.trim(PRICE_INVALIDATION_STREAM, keep=1)
+
+        await sub_b._check_gap()
+
+        assert len(b) == 0
+        assert sub_b.stats["resyncs"] == 1
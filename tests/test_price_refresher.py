@@ -0,0 +1,201 @@
+"""Тесты PriceRefresher (refresh-ahead цен горячих товаров).
+
+Тестируем:
+- Учёт обращений через PriceCache.tracker
+- Отбор: только горячие и постаревшие цены, самые востребованные первыми
+- Обновление поиском по названию, попутное обновление соседей
+- Фолбэк на vkusvill_product_details и бюджет вызовов MCP
+- Метрики обновлённых и истёкших цен, затухание счётчиков
+- Запуск/остановку фоновой задачи
+"""
+
+import json
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from vkuswill_bot.services import price_refresher as refresher_module
+from vkuswill_bot.services.price_cache import PriceCache
+from vkuswill_bot.services.price_refresher import PriceRefresher
+from vkuswill_bot.services.search_processor import SearchProcessor
+
+_TTL = 3600
+
+# Каталог MCP: xml_id → (название, цена)
+_CATALOG = {
+    1: ("Молоко 3,2%", 99),
+    2: ("Молоко 2,5%", 89),
+    3: ("Хлеб бородинский", 60),
+}
+
+
+def _call_tool(name: str, args: dict) -> str:
+    if name == "vkusvill_product_details":
+        title, price = _CATALOG[args["xml_id"]]
+        data = {"name": title, "price": {"current": price}, "unit": "шт"}
+        return json.dumps({"ok": True, "data": data}, ensure_ascii=False)
+    word = args["q"].split()[0].lower()
+    items = [
+        {"xml_id": x, "name": title, "price": {"current": price}, "unit": "шт"}
+        for x, (title, price) in _CATALOG.items()
+        if word in title.lower() and x != 3  # хлеба нет в выдаче поиска
+    ]
+    return json.dumps({"ok": True, "data": {"items": items}}, ensure_ascii=False)
+
+
+@pytest.fixture(autouse=True)
+def _no_live_traffic(monkeypatch):
+    """Обращения в тестах не считаются живым трафиком — без ожидания паузы."""
+    monkeypatch.setattr(refresher_module, "_LIVE_IDLE_GAP", 0.0)
+
+
+@pytest.fixture
+def mcp_client():
+    client = AsyncMock()
+    client.call_tool = AsyncMock(side_effect=_call_tool)
+    return client
+
+
+@pytest.fixture
+def price_cache():
+    return PriceCache()
+
+
+@pytest.fixture
+def refresher(mcp_client, price_cache):
+    return PriceRefresher(
+        mcp_client=mcp_client,
+        search_processor=SearchProcessor(price_cache),
+        price_cache=price_cache,
+        ttl=_TTL,
+        calls_per_minute=10,
+    )
+
+
+async def _seed(price_cache: PriceCache, refresher: PriceRefresher, age: float) -> None:
+    """Старые цены всех товаров каталога."""
+    for xml_id, (title, _) in _CATALOG.items():
+        await price_cache.set(xml_id, title, 1.0)
+        refresher._stored_at[xml_id] = time.monotonic() - age
+
+
+async def _hit(price_cache: PriceCache, xml_id: int, times: int) -> None:
+    for _ in range(times):
+        await price_cache.get(xml_id)
+
+
+class TestDue:
+    """Отбор товаров для обновления."""
+
+    async def test_tracker_counts_access(self, refresher, price_cache) -> None:
+        await price_cache.get_many([1, 2])
+        await price_cache.get(1)
+        assert refresher._hits == {1: 2, 2: 1}
+        await price_cache.set(1, "Молоко", 99)
+        assert 1 in refresher._stored_at
+
+    async def test_only_hot_and_old(self, refresher, price_cache) -> None:
+        await _seed(price_cache, refresher, age=0.8 * _TTL)
+        await _hit(price_cache, 1, 1)
+        await _hit(price_cache, 2, 3)
+        await _hit(price_cache, 3, 2)
+        refresher._stored_at[3] = time.monotonic()  # свежая цена
+
+        assert refresher.due() == [2]
+        assert refresher.stats["expired"] == 0
+
+    async def test_expired_counted_once(self, refresher, price_cache) -> None:
+        await _seed(price_cache, refresher, age=_TTL + 1)
+        await _hit(price_cache, 1, 2)
+
+        assert refresher.due() == [1]
+        refresher.due()
+        assert refresher.stats["expired"] == 1
+
+
+class TestRefresh:
+    """Проход обновления."""
+
+    async def test_search_refreshes_neighbours(self, refresher, price_cache, mcp_client) -> None:
+        await _seed(price_cache, refresher, age=0.8 * _TTL)
+        await _hit(price_cache, 1, 3)
+        await _hit(price_cache, 2, 2)
+
+        summary = await refresher.refresh_once()
+
+        # один поиск «молоко» обновил оба горячих товара
+        assert mcp_client.call_tool.await_count == 1
+        assert summary["refreshed"] == 2
+        assert price_cache[1].price == 99
+        assert price_cache[2].price == 89
+        assert refresher.due() == []
+
+    async def test_details_fallback(self, refresher, price_cache, mcp_client) -> None:
+        await _seed(price_cache, refresher, age=0.8 * _TTL)
+        await _hit(price_cache, 3, 2)
+
+        await refresher.refresh_once()
+
+        tools = [c.args[0] for c in mcp_client.call_tool.await_args_list]
+        assert tools == ["vkusvill_products_search", "vkusvill_product_details"]
+        assert price_cache[3].price == 60
+
+    async def test_budget(self, mcp_client, price_cache) -> None:
+        refresher = PriceRefresher(
+            mcp_client=mcp_client,
+            search_processor=SearchProcessor(price_cache),
+            price_cache=price_cache,
+            ttl=_TTL,
+            calls_per_minute=1,
+        )
+        await _seed(price_cache, refresher, age=0.8 * _TTL)
+        await _hit(price_cache, 3, 3)
+        await _hit(price_cache, 1, 2)
+
+        summary = await refresher.refresh_once()
+
+        # хлеб: поиск без результата, на детали бюджета нет; молоко отложено
+        assert mcp_client.call_tool.await_count == 1
+        assert summary["deferred"] == 1
+        assert summary["refreshed"] == 0
+
+    async def test_mcp_error(self, refresher, price_cache, mcp_client) -> None:
+        await _seed(price_cache, refresher, age=0.8 * _TTL)
+        await _hit(price_cache, 1, 2)
+        mcp_client.call_tool.side_effect = ConnectionError("MCP down")
+
+        summary = await refresher.refresh_once()
+
+        assert summary["errors"] == 1
+        assert refresher.stats["errors"] == 1
+
+    async def test_decay_forgets_cold_items(self, refresher, price_cache) -> None:
+        await _hit(price_cache, 1, 2)
+        for _ in range(5):
+            await refresher.refresh_once()
+        assert refresher.stats["tracked"] == 0
+
+
+class TestLiveTraffic:
+    """Обновление уступает живому трафику."""
+
+    async def test_waits_for_idle(self, refresher, monkeypatch) -> None:
+        monkeypatch.setattr(refresher_module, "_LIVE_IDLE_GAP", 1.0)
+        monkeypatch.setattr(refresher_module, "_YIELD_STEP", 0.01)
+        monkeypatch.setattr(refresher_module, "_MAX_YIELD", 0.05)
+        refresher.record_access(1)
+
+        start = time.monotonic()
+        await refresher._wait_for_idle()
+        assert time.monotonic() - start >= 0.05
+
+
+class TestBackgroundTask:
+    """Запуск и остановка."""
+
+    async def test_start_stop(self, refresher) -> None:
+        refresher.start()
+        assert refresher._task is not None
+        await refresher.stop()
+        assert refresher._task.done()
@@ -0,0 +1,220 @@
+"""Тесты ProductDetailsCache (долгоживущий кеш карточек товаров).
+
+Тестируем:
+- Обрезку карточки для LLM
+- L1: попадание, TTL, вытеснение, ошибки не кешируются
+- L2: Redis и SQLite (переживает новый экземпляр кеша)
+- Refresh-ahead горячих карточек
+- Интеграцию с ToolExecutor: цена из PriceCache, refresh_prices наполняет кеш
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.product_details_cache import (
+    MAX_TEXT_LENGTH,
+    ProductDetailsCache,
+    trim_details,
+)
+from vkuswill_bot.services.search_processor import SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+_TIME = "vkuswill_bot.services.product_details_cache.time.time"
+
+_DETAILS = {
+    "xml_id": 1,
+    "name": "Молоко 3,2%",
+    "price": {"current": 95, "old": 110},
+    "unit": "шт",
+    "composition": "молоко нормализованное",
+    "images": ["https://img.vkusvill.ru/1.jpg"] * 5,
+    "url": "https://vkusvill.ru/goods/1.html",
+}
+_OK = json.dumps({"ok": True, "data": _DETAILS}, ensure_ascii=False)
+
+
+def _fetcher(result: str = _OK) -> AsyncMock:
+    return AsyncMock(return_value=result)
+
+
+class TestTrimDetails:
+    """Обрезка карточки."""
+
+    def test_heavy_fields_and_price(self) -> None:
+        trimmed = trim_details(_DETAILS)
+        assert "images" not in trimmed
+        assert "url" not in trimmed
+        assert trimmed["price"] == 95
+        assert trimmed["composition"] == "молоко нормализованное"
+
+    def test_nested_and_long_text(self) -> None:
+        trimmed = trim_details({"props": [{"photos": [], "text": "а" * 2000}]})
+        prop = trimmed["props"][0]
+        assert "photos" not in prop
+        assert len(prop["text"]) == MAX_TEXT_LENGTH + 1
+
+
+class TestLocal:
+    """L1 без L2."""
+
+    async def test_hit_without_price_and_stats(self) -> None:
+        cache = ProductDetailsCache()
+        fetch = _fetcher()
+        assert await cache.get_or_fetch(1, fetch) == _OK
+
+        cached = json.loads(await cache.get_or_fetch(1, fetch))
+        assert fetch.await_count == 1
+        assert cached["ok"] is True
+        assert "price" not in cached["data"]
+        assert "images" not in cached["data"]
+        stats = cache.stats
+        assert (stats["hits"], stats["misses"], stats["mcp_calls"]) == (1, 1, 1)
+        assert stats["hit_rate"] == pytest.approx(0.5)
+
+    async def test_errors_not_cached(self) -> None:
+        cache = ProductDetailsCache()
+        fetch = _fetcher(json.dumps({"ok": False, "error": "not found"}))
+        await cache.get_or_fetch(1, fetch)
+        await cache.get_or_fetch(1, fetch)
+        assert fetch.await_count == 2
+
+    async def test_ttl(self) -> None:
+        cache = ProductDetailsCache(ttl=10, refresh_ahead=0)
+        fetch = _fetcher()
+        with patch(_TIME, return_value=100.0):
+            await cache.get_or_fetch(1, fetch)
+        with patch(_TIME, return_value=111.0):
+            await cache.get_or_fetch(1, fetch)
+        assert fetch.await_count == 2
+
+    async def test_lru_eviction(self) -> None:
+        cache = ProductDetailsCache(max_size=2)
+        fetch = _fetcher()
+        for xml_id in (1, 2, 3):
+            await cache.get_or_fetch(xml_id, fetch)
+        await cache.get_or_fetch(1, fetch)
+        assert fetch.await_count == 4
+
+
+class TestL2:
+    """L2: Redis (общий для подов) или SQLite."""
+
+    async def test_redis_set_and_get(self) -> None:
+        redis = MagicMock()
+        redis.get = AsyncMock(return_value=None)
+        redis.set = AsyncMock()
+        cache = ProductDetailsCache(redis=redis, ttl=600)
+        await cache.get_or_fetch(1, _fetcher())
+
+        key, payload = redis.set.await_args.args
+        assert key == "product_details:1"
+        assert redis.set.await_args.kwargs == {"ex": 600}
+
+        # Другой под читает карточку из Redis
+        redis.get.return_value = payload
+        other = ProductDetailsCache(redis=redis, ttl=600)
+        fetch = _fetcher()
+        cached = json.loads(await other.get_or_fetch(1, fetch))
+        fetch.assert_not_awaited()
+        assert cached["data"]["name"] == "Молоко 3,2%"
+
+    async def test_redis_errors_degrade_to_l1(self) -> None:
+        redis = MagicMock()
+        redis.get = AsyncMock(side_effect=ConnectionError("down"))
+        redis.set = AsyncMock(side_effect=ConnectionError("down"))
+        cache = ProductDetailsCache(redis=redis)
+        fetch = _fetcher()
+        await cache.get_or_fetch(1, fetch)
+        await cache.get_or_fetch(1, fetch)
+        assert fetch.await_count == 1
+
+    async def test_sqlite_survives_restart(self, tmp_path) -> None:
+        db_path = str(tmp_path / "details.db")
+        cache = ProductDetailsCache(db_path=db_path)
+        await cache.get_or_fetch(1, _fetcher())
+        await cache.close()
+
+        restarted = ProductDetailsCache(db_path=db_path)
+        fetch = _fetcher()
+        cached = json.loads(await restarted.get_or_fetch(1, fetch))
+        await restarted.close()
+        fetch.assert_not_awaited()
+        assert cached["data"]["composition"] == "молоко нормализованное"
+
+
+class TestRefreshAhead:
+    """Фоновое обновление горячих карточек."""
+
+    async def test_hot_item_refreshed_in_background(self) -> None:
+        cache = ProductDetailsCache(ttl=100, refresh_ahead=0.8, hot_hits=2)
+        fetch = _fetcher()
+        with patch(_TIME, return_value=0.0):
+            await cache.get_or_fetch(1, fetch)
+        with patch(_TIME, return_value=90.0):
+            await cache.get_or_fetch(1, fetch)  # 1 попадание — ещё не горячая
+            assert fetch.await_count == 1
+            await cache.get_or_fetch(1, fetch)  # 2 попадания — обновление в фоне
+            await asyncio.sleep(0)
+        assert fetch.await_count == 2
+        assert cache.stats["refreshes"] == 1
+        # Обновлённая карточка живёт полный TTL от момента обновления
+        with patch(_TIME, return_value=150.0):
+            await cache.get_or_fetch(1, fetch)
+        assert fetch.await_count == 2
+
+    async def test_fresh_item_not_refreshed(self) -> None:
+        cache = ProductDetailsCache(ttl=100, hot_hits=1)
+        fetch = _fetcher()
+        with patch(_TIME, return_value=0.0):
+            for _ in range(3):
+                await cache.get_or_fetch(1, fetch)
+        await asyncio.sleep(0)
+        assert fetch.await_count == 1
+
+
+class TestToolExecutor:
+    """ToolExecutor: карточка из кеша, цена — из PriceCache."""
+
+    @pytest.fixture
+    def mcp_client(self):
+        client = AsyncMock()
+        client.call_tool = AsyncMock(return_value=_OK)
+        return client
+
+    @pytest.fixture
+    def executor(self, mcp_client):
+        search_processor = SearchProcessor()
+        return ToolExecutor(
+            mcp_client=mcp_client,
+            search_processor=search_processor,
+            cart_processor=CartProcessor(search_processor.price_cache),
+            product_details_cache=ProductDetailsCache(),
+        )
+
+    async def _details(self, executor, xml_id: int = 1) -> dict:
+        args = {"xml_id": xml_id}
+        raw = await executor.execute("vkusvill_product_details", args, 1)
+        result = await executor.postprocess_result("vkusvill_product_details", args, raw, {}, {})
+        return json.loads(result)["data"]
+
+    async def test_cached_details_get_current_price(self, executor, mcp_client) -> None:
+        first = await self._details(executor)
+        assert first["price"] == 95
+        assert "images" not in first
+        # цена из карточки попала в кеш цен
+        assert executor.cart_processor.price_cache[1]["price"] == 95
+
+        await executor.cart_processor.price_cache.set(1, "Молоко 3,2%", 89.0)
+        again = await self._details(executor)
+
+        assert mcp_client.call_tool.await_count == 1
+        assert again["price"] == 89
+
+    async def test_refresh_prices_fills_details_cache(self, executor, mcp_client) -> None:
+        await executor.refresh_prices([1])
+        await self._details(executor)
+        assert mcp_client.call_tool.await_count == 1
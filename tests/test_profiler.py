@@ -0,0 +1,120 @@
+"""Тесты профилирования по команде администратора.
+
+Тестируем:
+- ProfileResult: collapsed stacks, доля простоя, топ функций
+- SamplingProfiler: сэмплы стека блокирующего кода, одна запись за раз
+- MemoryTracker: рост по строкам кода и размеры контейнеров, выключение
+- Размеры через аксессоры владельцев (lock_count, tracked_user_count)
+"""
+
+import asyncio
+import time
+import tracemalloc
+from collections import Counter
+
+import pytest
+
+from vkuswill_bot.bot.middlewares import ThrottlingMiddleware
+from vkuswill_bot.services.dialog_manager import DialogManager
+from vkuswill_bot.services.profiler import (
+    MemoryTracker,
+    ProfileResult,
+    SamplingProfiler,
+    _frame_label,
+)
+
+
+def _busy_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestProfileResult:
+    @pytest.fixture
+    def result(self) -> ProfileResult:
+        return ProfileResult(
+            seconds=1,
+            samples=10,
+            stacks=Counter(
+                {
+                    "main (a.py:1);run (b.py:2);select (selectors.py:3)": 5,
+                    "main (a.py:1);handle (c.py:4);dumps (json.py:5)": 4,
+                    "main (a.py:1);handle (c.py:4)": 1,
+                }
+            ),
+        )
+
+    def test_collapsed(self, result) -> None:
+        lines = result.collapsed().splitlines()
+        assert lines[0] == "main (a.py:1);run (b.py:2);select (selectors.py:3) 5"
+        assert len(lines) == 3
+
+    def test_idle_share(self, result) -> None:
+        assert result.idle_share() == 0.5
+
+    def test_top_functions_exclude_idle(self, result) -> None:
+        assert result.top_functions() == [("dumps (json.py:5)", 0.4), ("handle (c.py:4)", 0.1)]
+
+    def test_frame_label_strips_environment(self) -> None:
+        import sys
+
+        label = _frame_label(sys._getframe())
+        assert label.startswith("test_frame_label_strips_environment (test_profiler.py:")
+
+
+class TestSamplingProfiler:
+    async def test_captures_blocking_code(self) -> None:
+        profiler = SamplingProfiler(interval=0.002)
+        task = asyncio.create_task(profiler.capture(1))
+        await asyncio.sleep(0.05)
+        _busy_work(0.3)
+        result = await task
+
+        assert result.samples > 0
+        assert any("_busy_work (" in stack for stack in result.stacks)
+        assert not profiler.running
+
+    async def test_single_capture_at_a_time(self) -> None:
+        profiler = SamplingProfiler(interval=0.01)
+        task = asyncio.create_task(profiler.capture(1))
+        await asyncio.sleep(0)
+        assert profiler.running
+        with pytest.raises(RuntimeError, match="уже запущено"):
+            await profiler.capture(1)
+        await task
+
+
+class TestMemoryTracker:
+    def test_diff_shows_growth(self) -> None:
+        was_tracing = tracemalloc.is_tracing()
+        tracker = MemoryTracker()
+        conversations: dict[int, list[str]] = {1: ["a"]}
+        tracker.track("conversations", conversations)
+
+        tracker.start()
+        for user_id in range(2, 2002):
+            conversations[user_id] = [f"сообщение {user_id}" * 10]
+        report = tracker.diff()
+        tracker.stop()
+
+        assert report.sizes == {"conversations": (1, 2001)}
+        assert report.traced_current > 0
+        assert any("test_profiler.py" in line for line in report.top)
+        assert tracemalloc.is_tracing() == was_tracing
+        assert not tracker.active
+
+    def test_size_accessors_follow_owner(self) -> None:
+        """Размер берётся через аксессор владельца — замена словаря видна."""
+        throttling = ThrottlingMiddleware()
+        tracker = MemoryTracker()
+        tracker.track("throttling_users", throttling.tracked_user_count)
+        tracker.track("dialog_locks", DialogManager().lock_count)
+
+        throttling._user_timestamps = {1: [0.0], 2: [0.0]}
+
+        assert tracker.sizes() == {"throttling_users": 2, "dialog_locks": 0}
+
+    def test_diff_without_start(self) -> None:
+        with pytest.raises(RuntimeError, match="start"):
+            MemoryTracker().diff()
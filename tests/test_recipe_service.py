@@ -10,7 +10,10 @@
 - Фильтрация ферментированных/консервированных продуктов
 """
 
+import asyncio
 import json
+import threading
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -644,3 +647,181 @@ class TestGetIngredientsFermentedBlock:
         result = await service.get_ingredients({"dish": "варенье из малины"})
         parsed = json.loads(result)
         assert parsed["ok"] is False
+
+
+# ============================================================================
+# План питания: resolve_plan и merge_ingredients
+# ============================================================================
+
+
+def _llm_response(ingredients: list[dict]) -> MagicMock:
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = json.dumps(ingredients, ensure_ascii=False)
+    return response
+
+
+_PLAN_CACHE = {
+    "омлет": {
+        "servings": 2,
+        "ingredients": [
+            {"name": "яйца", "quantity": 4, "unit": "шт", "search_query": "яйца куриные"},
+            {"name": "молоко", "quantity": 100, "unit": "мл", "search_query": "молоко"},
+        ],
+    },
+    "сырники": {
+        "servings": 2,
+        "ingredients": [
+            {"name": "творог", "quantity": 400, "unit": "г", "search_query": "творог"},
+            {"name": "яйцо", "quantity": 2, "unit": "шт", "search_query": "яйцо куриное"},
+        ],
+    },
+}
+
+
+class TestResolvePlan:
+    """resolve_plan: рецепты нескольких блюд за один вызов."""
+
+    async def test_cached_dishes(self, service, mock_recipe_store, mock_gigachat_client):
+        mock_recipe_store.get.side_effect = lambda dish, **kw: _PLAN_CACHE.get(dish)
+
+        plan = await service.resolve_plan(
+            [{"dish": "омлет", "servings": 2}, {"dish": "сырники", "servings": 2}]
+        )
+
+        mock_gigachat_client.chat.assert_not_called()
+        assert [d["dish"] for d in plan["dishes"]] == ["омлет", "сырники"]
+        assert all(d["cached"] for d in plan["dishes"])
+        # яйца из обоих блюд — одна позиция: 4 + 2 шт → 1 упаковка
+        eggs = [i for i in plan["ingredients"] if i["name"] in ("яйца", "яйцо")]
+        assert len(eggs) == 1
+        assert eggs[0]["quantity"] == 6
+        assert eggs[0]["pack_equivalent"] == 1
+        assert eggs[0]["dishes"] == ["омлет", "сырники"]
+        assert len(plan["ingredients"]) == 3
+
+    async def test_repeated_dish_servings_summed(self, service, mock_recipe_store):
+        mock_recipe_store.get.side_effect = lambda dish, **kw: _PLAN_CACHE.get(dish)
+
+        plan = await service.resolve_plan(["омлет", {"dish": "Омлет", "servings": 4}])
+
+        assert plan["dishes"] == [
+            {"dish": "омлет", "servings": 6, "cached": True, "ingredients_count": 2}
+        ]
+        milk = next(i for i in plan["ingredients"] if i["name"] == "молоко")
+        assert milk["quantity"] == 300  # 100 мл на 2 порции → на 6
+
+    async def test_llm_misses_run_concurrently(self, mock_gigachat_client, mock_recipe_store):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_chat(chat):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return _llm_response([{"name": "рис", "quantity": 100, "unit": "г"}])
+
+        mock_gigachat_client.chat.side_effect = slow_chat
+        service = RecipeService(
+            gigachat_client=mock_gigachat_client,
+            recipe_store=mock_recipe_store,
+            llm_semaphore=asyncio.Semaphore(2),
+        )
+
+        plan = await service.resolve_plan(["плов", "ризотто", "суши", "паэлья"])
+
+        assert mock_gigachat_client.chat.call_count == 4
+        assert peak == 2
+        assert mock_recipe_store.save.call_count == 4
+        # рис из четырёх блюд — одна позиция
+        assert plan["ingredients"][0]["quantity"] == 400
+        assert plan["ingredients"][0]["kg_equivalent"] == 0.4
+
+    async def test_failed_and_fermented_dishes(self, service, mock_recipe_store):
+        mock_recipe_store.get.side_effect = lambda dish, **kw: _PLAN_CACHE.get(dish)
+
+        with patch.object(service._client, "chat", side_effect=RuntimeError("LLM down")):
+            plan = await service.resolve_plan(["омлет", "жаркое", "квашеная капуста"])
+
+        errors = {d["dish"]: d.get("error") for d in plan["dishes"]}
+        assert errors["омлет"] is None
+        assert "Не удалось" in errors["жаркое"]
+        assert "готовый" in errors["квашеная капуста"]
+        assert len(plan["ingredients"]) == 2
+
+    async def test_dish_limit(self, service, mock_recipe_store):
+        mock_recipe_store.get.return_value = {"servings": 2, "ingredients": []}
+        plan = await service.resolve_plan([f"блюдо {i}" for i in range(15)])
+        assert len(plan["dishes"]) == 10
+
+    async def test_invalid_input(self, service):
+        assert await service.resolve_plan("омлет") == {"dishes": [], "ingredients": []}
+        assert await service.resolve_plan([{"servings": 2}, 42]) == {
+            "dishes": [],
+            "ingredients": [],
+        }
+
+
+class TestMergeIngredients:
+    """merge_ingredients: сводный список без повторов."""
+
+    def test_word_forms_merged(self):
+        merged = RecipeService.merge_ingredients(
+            [
+                ("борщ", [{"name": "лук", "quantity": 100, "unit": "г", "search_query": "Лук"}]),
+                ("плов", [{"name": "лук", "quantity": 200, "unit": "г", "search_query": "лука"}]),
+            ]
+        )
+        assert len(merged) == 1
+        assert merged[0]["quantity"] == 300
+        assert merged[0]["kg_equivalent"] == 0.3
+
+    def test_different_units_via_kg(self):
+        merged = RecipeService.merge_ingredients(
+            [
+                ("борщ", [{"name": "морковь", "quantity": 2, "unit": "шт", "kg_equivalent": 0.3}]),
+                ("плов", [{"name": "морковь", "quantity": 200, "unit": "г", "kg_equivalent": 0.2}]),
+            ]
+        )
+        assert merged[0]["unit"] == "кг"
+        assert merged[0]["quantity"] == 0.5
+
+    def test_incomparable_units_kept_aside(self):
+        merged = RecipeService.merge_ingredients(
+            [
+                ("суп", [{"name": "укроп", "quantity": 1, "unit": "пучок"}]),
+                ("салат", [{"name": "укроп", "quantity": 2, "unit": "ст.л."}]),
+            ]
+        )
+        assert merged[0]["quantity"] == 1
+        assert merged[0]["also_needed"] == ["2 ст.л."]
+
+    def test_different_products_kept(self):
+        merged = RecipeService.merge_ingredients(
+            [
+                (
+                    "салат",
+                    [
+                        {"name": "масло", "quantity": 30, "unit": "мл", "search_query": "масло"},
+                        {
+                            "name": "масло оливковое",
+                            "quantity": 20,
+                            "unit": "мл",
+                            "search_query": "масло оливковое",
+                        },
+                    ],
+                )
+            ]
+        )
+        assert len(merged) == 2
+
+    def test_source_not_mutated(self):
+        source = [{"name": "рис", "quantity": 100, "unit": "г", "kg_equivalent": 0.1}]
+        RecipeService.merge_ingredients([("плов", source), ("суп", [dict(source[0])])])
+        assert source[0]["quantity"] == 100
+        assert source[0]["kg_equivalent"] == 0.1
@@ -0,0 +1,231 @@
+"""Тесты SearchPrefetcher (спекулятивный префетч поиска по списку покупок).
+
+Тестируем:
+- Разбор списка покупок из сообщения
+- Ключ запроса (регистр, порядок слов, словоформы)
+- Параллельный запуск поисков и выдачу готового ответа
+- Несовпадающие аргументы и упавший префетч
+- Учёт hit rate и лишних поисков
+- Интеграцию: ToolExecutor и GigaChatService
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from helpers import make_function_call_response, make_text_response
+from vkuswill_bot.services.cart_processor import CartProcessor
+from vkuswill_bot.services.gigachat_service import GigaChatService
+from vkuswill_bot.services.search_prefetcher import (
+    SearchPrefetcher,
+    extract_queries,
+    query_key,
+)
+from vkuswill_bot.services.search_processor import SEARCH_LIMIT, SearchProcessor
+from vkuswill_bot.services.tool_executor import ToolExecutor
+
+
+def _result(q: str) -> str:
+    return json.dumps({"ok": True, "data": {"items": [], "q": q}}, ensure_ascii=False)
+
+
+@pytest.fixture
+def search():
+    return AsyncMock(side_effect=lambda args: _result(args["q"]))
+
+
+class TestExtractQueries:
+    """Разбор списка покупок."""
+
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("молоко, хлеб, сыр и масло", ["молоко", "хлеб", "сыр", "масло"]),
+            ("Купи молоко и хлеб", ["молоко", "хлеб"]),
+            ("Собери корзину: творог 5% 400 гр; кефир", ["творог", "кефир"]),
+            ("- яйца\n- сметана 20%\n- бананы", ["яйца", "сметана", "бананы"]),
+            ("молоко, молоко, хлеб", ["молоко", "хлеб"]),
+            ("привет, нужны гречка и рис", ["гречка", "рис"]),
+        ],
+    )
+    def test_lists(self, text, expected) -> None:
+        assert extract_queries(text) == expected
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "молоко",
+            "привет",
+            "",
+            "хочу приготовить борщ на четверых, что для этого нужно купить в магазине",
+            "2 и 3",
+        ],
+    )
+    def test_not_a_list(self, text) -> None:
+        assert extract_queries(text) == []
+
+
+class TestQueryKey:
+    """Ключ совпадения запросов."""
+
+    def test_case_and_order(self) -> None:
+        assert query_key("Масло сливочное") == query_key("сливочное масло")
+
+    def test_word_forms(self) -> None:
+        assert query_key("молока") == query_key("Молоко")
+
+    def test_different_products(self) -> None:
+        assert query_key("молоко") != query_key("молоко овсяное")
+
+
+class TestSession:
+    """Сессия префетча одного сообщения."""
+
+    async def test_prefetch_and_take(self, search) -> None:
+        prefetcher = SearchPrefetcher()
+        assert prefetcher.start(1, "молоко, хлеб и сыр", search) == 3
+
+        result = await prefetcher.take(1, {"q": "Молоко", "limit": SEARCH_LIMIT})
+
+        assert json.loads(result)["data"]["q"] == "молоко"
+        assert prefetcher.stats["hits"] == 1
+        prefetcher.finish(1)
+        assert prefetcher.stats["wasted"] == 2
+        assert prefetcher.stats["hit_rate"] == pytest.approx(1 / 3)
+
+    async def test_searches_run_concurrently(self) -> None:
+        active = 0
+        peak = 0
+
+        async def slow_search(args):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return _result(args["q"])
+
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб, сыр и масло", slow_search)
+        for q in ("молоко", "хлеб", "сыр", "масло"):
+            assert await prefetcher.take(1, {"q": q}) is not None
+        assert peak == 4
+
+    async def test_take_once(self, search) -> None:
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб", search)
+        assert await prefetcher.take(1, {"q": "молоко"}) is not None
+        assert await prefetcher.take(1, {"q": "молоко"}) is None
+
+    async def test_other_args_not_served(self, search) -> None:
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб", search)
+        assert await prefetcher.take(1, {"q": "молоко", "limit": 3}) is None
+        assert await prefetcher.take(1, {"q": "молоко", "sort": "price"}) is None
+        assert await prefetcher.take(1, {"q": "кефир"}) is None
+        assert await prefetcher.take(2, {"q": "молоко"}) is None
+
+    async def test_failed_prefetch_falls_back(self) -> None:
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб", AsyncMock(side_effect=ConnectionError("MCP down")))
+        assert await prefetcher.take(1, {"q": "молоко"}) is None
+        assert prefetcher.stats["failed"] == 1
+
+    async def test_finish_cancels_pending(self) -> None:
+        started = asyncio.Event()
+
+        async def hanging(args):
+            started.set()
+            await asyncio.sleep(10)
+
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб", hanging)
+        await started.wait()
+        task = next(iter(prefetcher._sessions[1].values()))
+        prefetcher.finish(1)
+        await asyncio.sleep(0)
+        assert task.cancelled()
+        assert prefetcher.stats["wasted"] == 2
+
+    async def test_max_queries(self, search) -> None:
+        prefetcher = SearchPrefetcher(max_queries=2)
+        assert prefetcher.start(1, "молоко, хлеб, сыр", search) == 2
+
+    async def test_not_a_list_no_session(self, search) -> None:
+        prefetcher = SearchPrefetcher()
+        assert prefetcher.start(1, "привет", search) == 0
+        search.assert_not_called()
+        assert prefetcher.stats["messages"] == 0
+
+    async def test_close(self) -> None:
+        prefetcher = SearchPrefetcher()
+        prefetcher.start(1, "молоко, хлеб", AsyncMock(return_value="{}"))
+        prefetcher.close()
+        assert prefetcher._sessions == {}
+
+
+class TestIntegration:
+    """ToolExecutor и GigaChatService используют префетч."""
+
+    @pytest.fixture
+    def mcp_client(self):
+        client = AsyncMock()
+        client.get_tools.return_value = [
+            {
+                "name": "vkusvill_products_search",
+                "description": "Поиск товаров",
+                "parameters": {"type": "object", "properties": {"q": {"type": "string"}}},
+            },
+        ]
+        client.call_tool = AsyncMock(side_effect=lambda name, args: _result(args["q"]))
+        return client
+
+    @pytest.fixture
+    def executor(self, mcp_client):
+        search_processor = SearchProcessor()
+        return ToolExecutor(
+            mcp_client=mcp_client,
+            search_processor=search_processor,
+            cart_processor=CartProcessor(search_processor.price_cache),
+            search_prefetcher=SearchPrefetcher(),
+        )
+
+    async def test_executor_serves_prefetched(self, executor, mcp_client) -> None:
+        executor.start_prefetch(1, "молоко, хлеб")
+        args = await executor.preprocess_args("vkusvill_products_search", {"q": "Молоко 1 л"}, {})
+        result = await executor.execute("vkusvill_products_search", args, 1)
+        executor.finish_prefetch(1)
+
+        assert json.loads(result)["data"]["q"] == "молоко"
+        # только два вызова префетча, живой вызов не понадобился
+        assert mcp_client.call_tool.call_count == 2
+
+    async def test_process_message(self, executor, mcp_client) -> None:
+        service = GigaChatService(
+            credentials="test-creds",
+            model="GigaChat",
+            scope="GIGACHAT_API_PERS",
+            mcp_client=mcp_client,
+            tool_executor=executor,
+            max_tool_calls=5,
+            max_history=10,
+        )
+        steps = iter(
+            [
+                make_function_call_response("vkusvill_products_search", {"q": "молоко"}),
+                make_function_call_response("vkusvill_products_search", {"q": "хлеб"}),
+                make_text_response("Нашёл молоко и хлеб"),
+            ]
+        )
+
+        with patch.object(service._client, "chat", side_effect=lambda chat: next(steps)):
+            answer = await service.process_message(user_id=1, text="молоко, хлеб и сыр")
+
+        assert answer == "Нашёл молоко и хлеб"
+        stats = executor._search_prefetcher.stats
+        assert stats["hits"] == 2
+        assert stats["wasted"] == 1
+        assert mcp_client.call_tool.call_count == 3
+        assert executor._search_prefetcher._sessions == {}
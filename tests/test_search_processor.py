@@ -617,6 +617,11 @@ class TestCheckRelevance:
         missing = SearchProcessor.check_relevance("стейк вагю", items)
         assert missing == ["вагю"]
 
+    def test_word_inside_longer_name_word(self):
+        """Слово запроса внутри длинного слова названия — найдено (подстрока)."""
+        items = [{"name": "Биокефир 1% 930 г"}]
+        assert SearchProcessor.check_relevance("кефир", items) == []
+
     def test_multiple_missing_terms(self):
         """Несколько пропущенных слов."""
         items = [{"name": "Молоко 3,2%"}]
@@ -686,6 +691,24 @@ class TestCheckRelevance:
         # "соус" в первом, "оливковое" во втором
         assert SearchProcessor.check_relevance("соус оливковое", items) == []
 
+    def test_inflected_forms_match(self):
+        """Падежные формы не дают ложного предупреждения (яйца → Яйцо, курицы → Курица)."""
+        items = [
+            {"name": "Яйцо куриное С0, 10 шт"},
+            {"name": "Курица тушка охл."},
+        ]
+        assert SearchProcessor.check_relevance("яйца курицы", items) == []
+
+    def test_derived_form_matches_prefix(self):
+        """Слово запроса — начало слова в названии (шоколад → шоколадный)."""
+        items = [{"name": "Батончик шоколадный"}]
+        assert SearchProcessor.check_relevance("шоколад", items) == []
+
+    def test_punctuation_in_query_ignored(self):
+        """Запятая после слова не ломает проверку."""
+        items = [{"name": "Молоко 3,2%"}]
+        assert SearchProcessor.check_relevance("молоко,", items) == []
+
     def test_constants_exported(self):
         """Константы _MIN_RELEVANCE_WORD_LEN и _STOP_WORDS экспортируются."""
         assert _MIN_RELEVANCE_WORD_LEN == 3
@@ -0,0 +1,309 @@
+"""Тесты TieredRecipeStore (L1 LRU + SQLite + Redis, нечёткий поиск).
+
+Тестируем:
+- Ключ блюда (нормальные формы, порядок слов)
+- Попадания по уровням и promote наверх
+- Нечёткий поиск ("борщик", "борщ украинский" → "борщ")
+- Отказ нечёткого поиска для разных блюд и общего запроса к частному блюду
+- Индекс ключей Redis (ZSET с обрезкой по TTL)
+- Вытеснение из L1 (LRU)
+- prompt_version на всех уровнях
+- Graceful fallback при ошибках Redis
+- Статистика (hit rate, сэкономленные вызовы LLM)
+"""
+
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from vkuswill_bot.services.recipe_store import RecipeStore, TieredRecipeStore
+
+INGREDIENTS = [
+    {"name": "свёкла", "quantity": 0.5, "unit": "кг", "search_query": "свёкла"},
+    {"name": "капуста", "quantity": 0.3, "unit": "кг", "search_query": "капуста"},
+]
+
+
+@pytest.fixture
+def mock_redis():
+    """Мок async Redis-клиента."""
+    redis = AsyncMock()
+    redis.get = AsyncMock(return_value=None)
+    redis.zrangebyscore = AsyncMock(return_value=[])
+    redis.delete = AsyncMock(return_value=0)
+    redis.zrem = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[True, 1, 0])
+    redis.pipeline = MagicMock(return_value=pipe)
+    return redis
+
+
+@pytest.fixture
+async def store(tmp_path, mock_redis):
+    """TieredRecipeStore с временной БД и мок-Redis."""
+    s = TieredRecipeStore(str(tmp_path / "recipes.db"), redis=mock_redis)
+    yield s
+    await s.close()
+
+
+class TestDishKey:
+    """Ключ блюда."""
+
+    def test_case_and_inflection(self):
+        assert TieredRecipeStore.dish_key("Блины") == TieredRecipeStore.dish_key("блинов")
+
+    def test_word_order(self):
+        assert TieredRecipeStore.dish_key("Борщ украинский") == TieredRecipeStore.dish_key(
+            "украинский борщ"
+        )
+
+    def test_punctuation_ignored(self):
+        assert TieredRecipeStore.dish_key(" борщ! ") == TieredRecipeStore.dish_key("борщ")
+
+
+class TestTiers:
+    """Попадания по уровням."""
+
+    async def test_l1_hit_after_save(self, store, mock_redis):
+        await store.save("Борщ", 4, INGREDIENTS)
+        recipe = await store.get("борщ")
+        assert recipe == {"dish_name": "борщ", "servings": 4, "ingredients": INGREDIENTS}
+        assert store.stats["l1"] == 1
+        mock_redis.get.assert_not_called()
+
+    async def test_save_writes_redis(self, store, mock_redis):
+        await store.save("Борщ", 4, INGREDIENTS, prompt_version="v1")
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        pipe = mock_redis.pipeline.return_value
+        key, payload = pipe.set.call_args.args
+        assert key == "recipe:борщ"
+        assert json.loads(payload)["prompt_version"] == "v1"
+        assert pipe.set.call_args.kwargs["ex"] > 0
+        pipe.execute.assert_awaited_once()
+
+    async def test_save_indexes_key_and_trims_expired(self, store, mock_redis):
+        """Ключ попадает в ZSET со временем записи, члены старше TTL обрезаются."""
+        await store.save("Борщ", 4, INGREDIENTS)
+        pipe = mock_redis.pipeline.return_value
+        zset, mapping = pipe.zadd.call_args.args
+        assert zset == "recipe:keys"
+        written_at = mapping["борщ"]
+        pipe.zremrangebyscore.assert_called_once_with(
+            "recipe:keys", "-inf", written_at - store._ttl
+        )
+
+    async def test_sqlite_hit_promotes_to_l1(self, tmp_path, mock_redis):
+        db_path = str(tmp_path / "recipes.db")
+        plain = RecipeStore(db_path)
+        await plain.save("борщ", 4, INGREDIENTS)
+        await plain.close()
+
+        store = TieredRecipeStore(db_path, redis=mock_redis)
+        assert await store.get("Борщ") is not None
+        assert await store.get("борщ") is not None
+        assert store.stats["sqlite"] == 1
+        assert store.stats["l1"] == 1
+        await store.close()
+
+    async def test_redis_hit_promotes_to_sqlite(self, store, mock_redis):
+        """Рецепт, извлечённый другим подом, берётся из Redis и кешируется локально."""
+        mock_redis.get.return_value = json.dumps(
+            {"dish_name": "борщ", "servings": 4, "ingredients": INGREDIENTS, "prompt_version": ""},
+            ensure_ascii=False,
+        ).encode()
+        recipe = await store.get("борщ")
+        assert recipe["ingredients"] == INGREDIENTS
+        assert store.stats["redis"] == 1
+        assert await RecipeStore.get(store, "борщ") is not None
+
+    async def test_miss(self, store):
+        assert await store.get("рататуй") is None
+        assert store.stats["misses"] == 1
+        assert store.stats["llm_calls_saved"] == 0
+
+
+class TestFuzzy:
+    """Нечёткий поиск по названию блюда."""
+
+    @pytest.mark.parametrize("query", ["борщик", "борщ украинский", "Украинский борщ"])
+    async def test_variants_hit(self, store, query):
+        await store.save("борщ", 4, INGREDIENTS)
+        recipe = await store.get(query)
+        assert recipe is not None
+        assert recipe["dish_name"] == "борщ"
+
+    async def test_fuzzy_counted_and_aliased(self, store):
+        await store.save("борщ", 4, INGREDIENTS)
+        await store.get("борщик")
+        await store.get("борщик")
+        assert store.stats["fuzzy"] == 1
+        assert store.stats["l1"] == 1
+
+    @pytest.mark.parametrize(
+        ("saved", "query"),
+        [
+            ("котлеты куриные", "котлеты рыбные"),
+            ("салат цезарь", "салат греческий"),
+            ("пельмени", "вареники"),
+            ("курица", "куриные крылышки"),
+        ],
+    )
+    async def test_different_dishes_miss(self, store, saved, query):
+        await store.save(saved, 4, INGREDIENTS)
+        assert await store.get(query) is None
+
+    @pytest.mark.parametrize(
+        ("saved", "query"),
+        [
+            ("салат оливье", "салат"),
+            ("суп гороховый", "суп"),
+            ("торт наполеон", "торт"),
+            ("пицца маргарита", "пицца"),
+        ],
+    )
+    async def test_generic_query_misses_specific_dish(self, store, saved, query):
+        """Общий запрос не получает ингредиенты частного блюда и не пишет алиас в L1."""
+        await store.save(saved, 4, INGREDIENTS)
+        assert await store.get(query) is None
+        assert store.dish_key(query) not in store._l1
+
+    async def test_specific_query_finds_generic_dish(self, store):
+        await store.save("салат", 4, INGREDIENTS)
+        recipe = await store.get("салат оливье")
+        assert recipe is not None
+        assert recipe["dish_name"] == "салат"
+
+    async def test_fuzzy_disabled(self, tmp_path):
+        store = TieredRecipeStore(str(tmp_path / "r.db"), fuzzy_threshold=0)
+        await store.save("борщ", 4, INGREDIENTS)
+        assert await store.get("борщик") is None
+        await store.close()
+
+    async def test_fuzzy_finds_sqlite_recipes_of_previous_run(self, tmp_path):
+        db_path = str(tmp_path / "r.db")
+        plain = RecipeStore(db_path)
+        await plain.save("Блины", 4, INGREDIENTS)
+        await plain.close()
+
+        store = TieredRecipeStore(db_path)
+        recipe = await store.get("блинчики")
+        assert recipe is not None
+        assert recipe["dish_name"] == "блины"
+        await store.close()
+
+    async def test_fuzzy_finds_redis_keys(self, store, mock_redis):
+        payload = json.dumps(
+            {"dish_name": "борщ", "servings": 4, "ingredients": INGREDIENTS, "prompt_version": ""},
+            ensure_ascii=False,
+        ).encode()
+        mock_redis.zrangebyscore.return_value = ["борщ".encode()]
+        mock_redis.get.side_effect = lambda key: payload if key == "recipe:борщ" else None
+        recipe = await store.get("борщик")
+        assert recipe is not None
+        assert store.stats["fuzzy"] == 1
+
+    async def test_redis_keys_read_within_ttl(self, store, mock_redis):
+        """Из индекса читаются только ключи моложе TTL рецепта."""
+        await store.get("борщик")
+        zset, min_score, max_score = mock_redis.zrangebyscore.call_args.args
+        assert zset == "recipe:keys"
+        assert max_score == "+inf"
+        assert min_score > 0
+
+    async def test_expired_fuzzy_key_forgotten(self, store, mock_redis):
+        """Ключ из индекса без рецепта в Redis удаляется и больше не проверяется."""
+        mock_redis.zrangebyscore.return_value = ["борщ".encode()]
+        assert await store.get("борщик") is None
+        mock_redis.zrem.assert_awaited_once_with("recipe:keys", "борщ")
+        assert "борщ" not in store._known
+
+
+class TestLRU:
+    """Вытеснение из L1."""
+
+    async def test_eviction(self, tmp_path):
+        store = TieredRecipeStore(str(tmp_path / "r.db"), l1_size=2, fuzzy_threshold=0)
+        for dish in ("борщ", "плов", "уха"):
+            await store.save(dish, 4, INGREDIENTS)
+        assert await store.get("борщ") is not None
+        assert store.stats["sqlite"] == 1
+        assert await store.get("уха") is not None
+        assert store.stats["l1"] == 1
+        await store.close()
+
+
+class TestPromptVersion:
+    """Версия промпта проверяется на всех уровнях."""
+
+    async def test_stale_l1_and_sqlite(self, store):
+        await store.save("борщ", 4, INGREDIENTS, prompt_version="v1")
+        assert await store.get("борщ", prompt_version="v2") is None
+        assert await store.get("борщ", prompt_version="v1") is None  # SQLite удалил запись
+
+    async def test_stale_redis(self, store, mock_redis):
+        mock_redis.get.return_value = json.dumps(
+            {"dish_name": "борщ", "servings": 4, "ingredients": [], "prompt_version": "v1"}
+        )
+        assert await store.get("борщ", prompt_version="v2") is None
+
+
+class TestRedisErrors:
+    """Ошибки Redis не ломают кеш."""
+
+    async def test_get_error(self, store, mock_redis):
+        mock_redis.get.side_effect = ConnectionError("down")
+        mock_redis.zrangebyscore.side_effect = ConnectionError("down")
+        assert await store.get("борщ") is None
+
+    async def test_save_error_keeps_local(self, store, mock_redis):
+        mock_redis.pipeline.return_value.execute.side_effect = ConnectionError("down")
+        await store.save("борщ", 4, INGREDIENTS)
+        assert await store.get("борщ") is not None
+
+    async def test_without_redis(self, tmp_path):
+        store = TieredRecipeStore(str(tmp_path / "r.db"))
+        await store.save("борщ", 4, INGREDIENTS)
+        assert await store.get("борщик") is not None
+        await store.close()
+
+
+class TestDelete:
+    """Удаление из всех уровней."""
+
+    async def test_delete_all_tiers(self, store, mock_redis):
+        await store.save("борщ", 4, INGREDIENTS)
+        assert await store.delete("Борщ") is True
+        mock_redis.delete.assert_called_once_with("recipe:борщ")
+        mock_redis.zrem.assert_called_once_with("recipe:keys", "борщ")
+        assert await store.get("борщ") is None
+
+    async def test_delete_drops_fuzzy_aliases(self, store):
+        await store.save("борщ", 4, INGREDIENTS)
+        assert await store.get("борщик") is not None
+        assert await store.delete("борщ") is True
+        assert await store.get("борщик") is None
+
+
+class TestStats:
+    """Статистика кеша."""
+
+    async def test_hit_rate(self, store):
+        await store.save("борщ", 4, INGREDIENTS)
+        await store.get("борщ")
+        await store.get("рататуй")
+        stats = store.stats
+        assert stats["hit_rate"] == 0.5
+        assert stats["llm_calls_saved"] == 1
+
+    async def test_preload_not_counted(self, store):
+        await store.save("борщ", 4, INGREDIENTS)
+        store._l1.clear()
+        assert await store.preload("борщ") is True
+        assert await store.preload("рататуй") is False
+        assert "борщ" in store._l1
+        assert store.stats["llm_calls_saved"] == 0
+        assert store.stats["misses"] == 0
+
+    def test_empty(self, tmp_path):
+        assert TieredRecipeStore(str(tmp_path / "r.db")).stats["hit_rate"] == 0.0
@@ -1971,3 +1971,236 @@ class TestProductSearchEventLogging:
             search_log={},
             user_id=42,
         )
+
+    async def test_logs_recipe_request_event(
+        self,
+        executor_with_user_store,
+        mock_user_store,
+    ):
+        """Успешный recipe_ingredients логируется как recipe_request (для прогрева)."""
+        await executor_with_user_store.postprocess_result(
+            tool_name="recipe_ingredients",
+            args={"dish": " Борщ "},
+            result=json.dumps({"ok": True, "dish": "Борщ", "cached": True}),
+            user_prefs={},
+            search_log={},
+            user_id=42,
+        )
+
+        mock_user_store.log_event.assert_called_once_with(
+            42,
+            "recipe_request",
+            {"dish": "Борщ", "cached": True},
+        )
+
+    async def test_no_recipe_request_on_error(
+        self,
+        executor_with_user_store,
+        mock_user_store,
+    ):
+        """Ошибка recipe_ingredients не логируется."""
+        await executor_with_user_store.postprocess_result(
+            tool_name="recipe_ingredients",
+            args={"dish": "квашеная капуста"},
+            result=json.dumps({"ok": False, "error": "ферментированный продукт"}),
+            user_prefs={},
+            search_log={},
+            user_id=42,
+        )
+
+        mock_user_store.log_event.assert_not_called()
+
+    async def test_recipes_plan_logs_dishes_and_search_log(
+        self,
+        executor_with_user_store,
+        mock_user_store,
+    ):
+        """recipes_plan: recipe_request на каждое блюдо + search_log для корзины."""
+        search_log: dict = {}
+        await executor_with_user_store.postprocess_result(
+            tool_name="recipes_plan",
+            args={"dishes": ["омлет", "жаркое"]},
+            result=json.dumps(
+                {
+                    "ok": True,
+                    "dishes": [
+                        {"dish": "омлет", "servings": 2, "cached": False},
+                        {"dish": "жаркое", "error": "Не удалось получить рецепт"},
+                    ],
+                    "search_log": {"яйца": [1, 2]},
+                }
+            ),
+            user_prefs={},
+            search_log=search_log,
+            user_id=42,
+        )
+
+        assert search_log == {"яйца": {1, 2}}
+        mock_user_store.log_event.assert_called_once_with(
+            42,
+            "recipe_request",
+            {"dish": "омлет", "cached": False},
+        )
+
+
+# ============================================================================
+# products_search_batch
+# ============================================================================
+
+
+def _search_response(query: str, items: list[dict]) -> str:
+    return json.dumps(
+        {"ok": True, "data": {"meta": {"q": query}, "items": items}},
+        ensure_ascii=False,
+    )
+
+
+_BATCH_CATALOG = {
+    "молоко": [
+        {
+            "xml_id": 1,
+            "name": "Молоко 3,2%",
+            "price": {"current": 89},
+            "unit": "шт",
+            "description": "Длинное описание",
+        }
+    ],
+    "хлеб": [{"xml_id": 2, "name": "Хлеб бородинский", "price": {"current": 55}}],
+}
+
+
+class TestProductsSearchBatch:
+    """Пакетный поиск товаров одним вызовом инструмента."""
+
+    @pytest.fixture
+    def batch_executor(self, mock_mcp_client, search_processor, cart_processor):
+        mock_mcp_client.call_tool = AsyncMock(
+            side_effect=lambda name, args: _search_response(
+                args["q"], _BATCH_CATALOG.get(args["q"], [])
+            )
+        )
+        return ToolExecutor(
+            mcp_client=mock_mcp_client,
+            search_processor=search_processor,
+            cart_processor=cart_processor,
+        )
+
+    async def test_results_not_found_and_search_log(self, batch_executor, search_processor):
+        raw = await batch_executor.execute(
+            "products_search_batch", {"queries": ["молоко", "хлеб", "авокадо"]}, 1
+        )
+        data = json.loads(raw)
+
+        assert data["ok"] is True
+        assert [r["query"] for r in data["results"]] == ["молоко", "хлеб", "авокадо"]
+        milk = data["results"][0]["items"][0]
+        assert milk == {"xml_id": 1, "name": "Молоко 3,2%", "price": 89, "unit": "шт"}
+        assert data["not_found"] == ["авокадо"]
+        assert data["search_log"] == {"молоко": [1], "хлеб": [2]}
+        # цены закешированы до обрезки
+        assert 1 in search_processor.price_cache
+
+    async def test_search_log_merged_in_postprocess(self, batch_executor):
+        args = {"queries": ["молоко", "хлеб"]}
+        raw = await batch_executor.execute("products_search_batch", args, 1)
+        search_log: dict[str, set[int]] = {}
+
+        await batch_executor.postprocess_result(
+            "products_search_batch", args, raw, {}, search_log, user_id=1
+        )
+
+        assert search_log == {"молоко": {1}, "хлеб": {2}}
+
+    async def test_concurrency_bounded(self, mock_mcp_client, search_processor, cart_processor):
+        import asyncio
+
+        from vkuswill_bot.services.tool_executor import BATCH_SEARCH_CONCURRENCY
+
+        active = 0
+        peak = 0
+
+        async def call_tool(name, args):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return _search_response(args["q"], [])
+
+        mock_mcp_client.call_tool = AsyncMock(side_effect=call_tool)
+        executor = ToolExecutor(
+            mcp_client=mock_mcp_client,
+            search_processor=search_processor,
+            cart_processor=cart_processor,
+        )
+        queries = [f"товар {i}" for i in range(BATCH_SEARCH_CONCURRENCY + 3)]
+        await executor.execute("products_search_batch", {"queries": queries}, 1)
+
+        assert peak == BATCH_SEARCH_CONCURRENCY
+
+    async def test_one_failure_does_not_break_batch(self, batch_executor, mock_mcp_client):
+        async def call_tool(name, args):
+            if args["q"] == "хлеб":
+                raise ConnectionError("MCP down")
+            return _search_response(args["q"], _BATCH_CATALOG[args["q"]])
+
+        mock_mcp_client.call_tool = AsyncMock(side_effect=call_tool)
+        data = json.loads(
+            await batch_executor.execute(
+                "products_search_batch", {"queries": ["молоко", "хлеб"]}, 1
+            )
+        )
+
+        assert data["search_log"] == {"молоко": [1]}
+        assert data["not_found"] == ["хлеб"]
+        assert "MCP down" in data["results"][1]["error"]
+
+    async def test_empty_queries(self, batch_executor):
+        data = json.loads(await batch_executor.execute("products_search_batch", {"queries": []}, 1))
+        assert data["ok"] is False
+
+    async def test_preprocess_cleans_and_dedups(self, batch_executor):
+        args = await batch_executor.preprocess_args(
+            "products_search_batch",
+            {"queries": ["Творог 5% 400 гр", "молоко 2", "молоко", ""]},
+            {"молоко": "овсяное"},
+        )
+        assert args["queries"][0] == "Творог"
+        assert len(args["queries"]) == 2
+        assert "овсяное" in args["queries"][1]
+
+    async def test_preprocess_caps_queries(self, batch_executor):
+        from vkuswill_bot.services.tool_executor import MAX_BATCH_QUERIES
+
+        queries = [f"товар{i}" for i in range(MAX_BATCH_QUERIES + 5)]
+        args = await batch_executor.preprocess_args(
+            "products_search_batch", {"queries": queries}, {}
+        )
+        assert len(args["queries"]) == MAX_BATCH_QUERIES
+
+    async def test_logs_product_search_per_query(
+        self, mock_mcp_client, search_processor, cart_processor
+    ):
+        user_store = AsyncMock()
+        executor = ToolExecutor(
+            mcp_client=mock_mcp_client,
+            search_processor=search_processor,
+            cart_processor=cart_processor,
+            user_store=user_store,
+        )
+        result = json.dumps({"ok": True, "results": [], "search_log": {"молоко": [1]}})
+
+        await executor.postprocess_result(
+            "products_search_batch",
+            {"queries": ["молоко", "авокадо"]},
+            result,
+            {},
+            {},
+            user_id=42,
+        )
+
+        logged = [c.args[2] for c in user_store.log_event.call_args_list]
+        assert logged == [
+            {"query": "молоко", "results_count": 1, "had_results": True},
+            {"query": "авокадо", "results_count": 0, "had_results": False},
+        ]
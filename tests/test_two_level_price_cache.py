@@ -4,12 +4,15 @@
 - L1 hit (sync fast-path)
 - L2 hit с promote в L1
 - Miss (L1 + L2)
-- set() пишет в оба уровня
+- set() пишет в оба уровня (L2 — одной транзакцией)
 - Redis-ошибки → graceful fallback на L1
+- get_many(max_age=...) не отдаёт устаревшие записи
 """
 
+import time
+
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 from vkuswill_bot.services.price_cache import TwoLevelPriceCache
 
@@ -19,11 +22,18 @@ def mock_redis():
     """Мок Redis-клиента."""
     redis = AsyncMock()
     redis.hgetall = AsyncMock(return_value={})
-    redis.hset = AsyncMock()
-    redis.expire = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[3, True])
+    redis.pipeline = MagicMock(return_value=pipe)
     return redis
 
 
+@pytest.fixture
+def pipe(mock_redis) -> MagicMock:
+    """Pipeline, через который set() пишет в L2."""
+    return mock_redis.pipeline.return_value
+
+
 @pytest.fixture
 def cache(mock_redis) -> TwoLevelPriceCache:
     """TwoLevelPriceCache с мок-Redis."""
@@ -116,6 +126,17 @@ class TestGet:
 
         assert result is None
 
+    async def test_counters_per_level(self, cache, mock_redis):
+        """L1 и L2 — попадания, промах обоих уровней — промах."""
+        cache[1] = {"name": "Молоко", "price": 79.0, "unit": "шт"}
+        await cache.get(1)
+        mock_redis.hgetall.return_value = {b"name": b"Kefir", b"price": b"89.0", b"unit": b"sht"}
+        await cache.get(2)
+        mock_redis.hgetall.return_value = {}
+        await cache.get(3)
+
+        assert (cache.hits, cache.misses) == (2, 1)
+
     async def test_redis_error_returns_none(self, cache, mock_redis):
         """Ошибка Redis → graceful fallback (None, L1 пуст)."""
         mock_redis.hgetall.side_effect = Exception("connection lost")
@@ -128,8 +149,8 @@ class TestGet:
 class TestSet:
     """Тесты set: запись в L1 + L2."""
 
-    async def test_writes_to_both_levels(self, cache, mock_redis):
-        """set() пишет в L1 и L2."""
+    async def test_writes_to_both_levels(self, cache, mock_redis, pipe):
+        """set() пишет в L1 и L2 (hset + expire одной транзакцией)."""
         await cache.set(100, "Молоко", 79.0, "шт")
 
         # L1
@@ -137,13 +158,21 @@ class TestSet:
         assert l1_result is not None
         assert l1_result.name == "Молоко"
         # L2
-        mock_redis.hset.assert_called_once_with(
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        pipe.hset.assert_called_once_with(
             "price:100",
-            mapping={"name": "Молоко", "price": "79.0", "unit": "шт"},
+            mapping={
+                "name": "Молоко",
+                "price": "79.0",
+                "unit": "шт",
+                "updated_at": str(cache._stored_at[100]),
+            },
         )
-        mock_redis.expire.assert_called_once_with("price:100", 3600)
+        pipe.expire.assert_called_once_with("price:100", 3600)
+        pipe.incr.assert_not_called()
+        pipe.execute.assert_awaited_once()
 
-    async def test_writes_weight_to_redis(self, cache, mock_redis):
+    async def test_writes_weight_to_redis(self, cache, pipe):
         """set() с weight пишет weight_value и weight_unit в Redis."""
         await cache.set(
             100,
@@ -160,20 +189,21 @@ class TestSet:
         assert l1_result.weight_value == 1.0
         assert l1_result.weight_unit == "кг"
         # L2
-        mock_redis.hset.assert_called_once_with(
+        pipe.hset.assert_called_once_with(
             "price:100",
             mapping={
                 "name": "Сахар 1 кг",
                 "price": "85.0",
                 "unit": "шт",
+                "updated_at": str(cache._stored_at[100]),
                 "weight_value": "1.0",
                 "weight_unit": "кг",
             },
         )
 
-    async def test_redis_error_still_writes_l1(self, cache, mock_redis):
+    async def test_redis_error_still_writes_l1(self, cache, mock_redis, pipe):
         """Ошибка Redis → L1 всё равно обновляется."""
-        mock_redis.hset.side_effect = Exception("connection lost")
+        pipe.execute.side_effect = Exception("connection lost")
 
         await cache.set(100, "Молоко", 79.0, "шт")
 
@@ -193,7 +223,7 @@ class TestDictAPI:
 
         assert 100 in cache
         # Redis НЕ вызывается (sync shortcut)
-        mock_redis.hset.assert_not_called()
+        mock_redis.pipeline.assert_not_called()
 
     def test_getitem_reads_l1_only(self, cache):
         """__getitem__ читает только из L1 (sync)."""
@@ -225,12 +255,13 @@ class TestCustomTTL:
 
     async def test_custom_ttl(self):
         """Кастомный TTL передаётся в expire."""
-        redis = AsyncMock()
+        redis = MagicMock()
+        redis.pipeline.return_value.execute = AsyncMock()
         cache = TwoLevelPriceCache(redis=redis, ttl=7200)
 
         await cache.set(1, "item", 10.0)
 
-        redis.expire.assert_called_once_with("price:1", 7200)
+        redis.pipeline.return_value.expire.assert_called_once_with("price:1", 7200)
 
 
 class TestEviction:
@@ -245,3 +276,65 @@ class TestEviction:
             await cache.set(i, f"item_{i}", float(i))
 
         assert len(cache) <= 5
+
+
+class TestGetMany:
+    """Тесты get_many: L1 + один pipeline в Redis для промахов."""
+
+    async def test_l1_and_l2_in_one_pipeline(self):
+        """Промахи L1 читаются одним pipeline и промотируются в L1."""
+        redis = MagicMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(
+            return_value=[{b"name": "Хлеб".encode(), b"price": b"55", b"unit": "шт".encode()}, {}]
+        )
+        redis.pipeline.return_value = pipe
+        cache = TwoLevelPriceCache(redis=redis, ttl=3600)
+        cache[1] = {"name": "Молоко", "price": 79.0}
+
+        found = await cache.get_many([1, 2, 3])
+
+        assert {x: p.price for x, p in found.items()} == {1: 79.0, 2: 55.0}
+        assert pipe.hgetall.call_count == 2
+        pipe.execute.assert_awaited_once()
+        assert 2 in cache
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    async def test_max_age_skips_stale_entries(self):
+        """С max_age устаревшая запись L1 перечитывается, устаревшая L2 — промах."""
+        now = time.time()
+        redis = MagicMock()
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(
+            return_value=[
+                {
+                    b"name": b"milk",
+                    b"price": b"85",
+                    b"unit": b"pc",
+                    b"updated_at": str(now).encode(),
+                },
+                {b"name": b"bread", b"price": b"55", b"unit": b"pc", b"updated_at": b"1.0"},
+                {b"name": b"eggs", b"price": b"99", b"unit": b"pc"},
+            ]
+        )
+        redis.pipeline.return_value = pipe
+        cache = TwoLevelPriceCache(redis=redis, ttl=3600)
+        cache[1] = {"name": "milk", "price": 79.0}
+        cache._stored_at[1] = now - 120
+
+        found = await cache.get_many([1, 2, 3], max_age=60)
+
+        assert {x: p.price for x, p in found.items()} == {1: 85.0}
+        assert pipe.hgetall.call_count == 3
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    async def test_redis_error_returns_l1(self):
+        """Ошибка Redis — только данные L1."""
+        redis = MagicMock()
+        redis.pipeline.return_value.execute = AsyncMock(side_effect=Exception("down"))
+        cache = TwoLevelPriceCache(redis=redis, ttl=3600)
+        cache[1] = {"name": "Молоко", "price": 79.0}
+
+        found = await cache.get_many([1, 2])
+
+        assert list(found) == [1]
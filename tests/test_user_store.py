@@ -432,6 +432,22 @@ class TestStatistics:
 
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_top_event_values(self, store):
+        """top_event_values возвращает значения поля metadata по частоте."""
+        s, conn = store
+        conn.fetch.return_value = [
+            {"value": "молоко", "cnt": 10},
+            {"value": "яйца", "cnt": 4},
+        ]
+
+        result = await s.top_event_values("product_search", "query", days=3, limit=2)
+
+        assert result == ["молоко", "яйца"]
+        sql, *params = conn.fetch.call_args[0]
+        assert "metadata->>$2" in sql
+        assert params == ["product_search", "query", 3, 2]
+
 
 # ---------------------------------------------------------------------------
 # Тесты: админские запросы